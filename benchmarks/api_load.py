@@ -0,0 +1,94 @@
+"""
+Load test so sánh p50/p99 latency của đường sync (threadpool) và async (AsyncMongoClient)
+cho GET /notifications/{user_id} và POST /notifications/read ở concurrency cao.
+
+Cần một MongoDB local; dữ liệu được seed vào database `<MONGO__DATABASE>-bench`.
+
+Chạy: python -m benchmarks.api_load [--requests 5000] [--concurrency 200]
+"""
+import os
+
+os.environ["MONGO__DATABASE"] = os.getenv("MONGO__DATABASE", "hospital-management") + "-bench"
+
+import argparse
+import asyncio
+import random
+import time
+
+import httpx
+
+from config.settings import settings
+from src.controllers.notification_controller import router
+from src.repositories import notification_repository
+from src.repositories.async_notification_repository import close_async_client
+from src.services.notification_service import NotificationService
+from fastapi import FastAPI
+
+
+def seed(users: int, per_user: int) -> list[str]:
+    notification_repository.db.drop_collection("notifications")
+    notification_repository.db.drop_collection("notification_summaries")
+    service = NotificationService()
+    service.ensure_indexes()
+    ids = []
+    for user_id in range(users):
+        ids += service.create_notifications([
+            service.build_notification(user_id=user_id, appointment_id=i, title="Bench", message="Bench")
+            for i in range(per_user)
+        ])
+    return ids
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    return round(samples[min(len(samples) - 1, int(len(samples) * pct))], 2)
+
+
+async def run(backend: str, users: int, ids: list[str], requests: int, concurrency: int) -> dict:
+    settings.mongo.backend = backend
+    app = FastAPI()
+    app.include_router(router)
+    rng = random.Random(7)
+    latencies: list[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def one(i: int):
+            async with semaphore:
+                start = time.perf_counter()
+                if i % 5 == 0:
+                    resp = await client.post("/notifications/read", json={"notification_id": rng.choice(ids)})
+                else:
+                    resp = await client.get(f"/notifications/{rng.randrange(users)}", params={"limit": 20})
+                latencies.append((time.perf_counter() - start) * 1000)
+                resp.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*[one(i) for i in range(requests)])
+        elapsed = time.perf_counter() - start
+
+    await close_async_client()
+    latencies.sort()
+    return {
+        "backend": backend,
+        "concurrency": concurrency,
+        "requests_per_sec": round(requests / elapsed, 1),
+        "p50_ms": percentile(latencies, 0.50),
+        "p99_ms": percentile(latencies, 0.99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--per-user", type=int, default=200)
+    args = parser.parse_args()
+
+    ids = seed(args.users, args.per_user)
+    for backend in ("sync", "async"):
+        print(asyncio.run(run(backend, args.users, ids, args.requests, args.concurrency)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark lookup appointment_id -> patient_id với appointment-service stub local.
+
+So sánh httpx.get không cache (cách cũ) với AppointmentClient (pool + cache + single-flight),
+và kiểm tra rằng nhiều lần miss đồng thời cho cùng một id chỉ tạo một request.
+
+Chạy: python -m benchmarks.appointment_lookup [--events 2000] [--appointments 200]
+"""
+import argparse
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+from benchmarks.stubs import AppointmentServiceStub
+from src.clients.appointment_client import AppointmentClient, TTLCache
+
+
+def make_client(url: str, ttl: float = 300) -> AppointmentClient:
+    return AppointmentClient(url, timeout=5.0, max_connections=20, cache=TTLCache(max_size=10000, ttl=ttl))
+
+
+def run_uncached(stub, ids):
+    start = time.perf_counter()
+    for appointment_id in ids:
+        httpx.get(f"{stub.url}/appointments/{appointment_id}", timeout=5.0).json()
+    return time.perf_counter() - start
+
+
+def run_client(stub, ids):
+    client = make_client(stub.url)
+    start = time.perf_counter()
+    for appointment_id in ids:
+        assert client.get_patient_id(appointment_id) == appointment_id % stub.patients
+    elapsed = time.perf_counter() - start
+    client.close()
+    return elapsed, client.stats()
+
+
+def run_coalescing(stub, concurrency: int):
+    client = make_client(stub.url)
+    before = stub.requests
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(client.get_patient_id, [424242] * concurrency))
+    client.close()
+    assert len(set(results)) == 1
+    return stub.requests - before
+
+
+async def run_coalescing_async(stub, concurrency: int):
+    client = make_client(stub.url)
+    before = stub.requests
+    results = await asyncio.gather(*[client.get_patient_id_async(434343) for _ in range(concurrency)])
+    await client.aclose()
+    assert len(set(results)) == 1
+    return stub.requests - before
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--appointments", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    ids = [rng.randrange(args.appointments) for _ in range(args.events)]
+
+    with AppointmentServiceStub(latency=args.latency_ms / 1000) as stub:
+        uncached = run_uncached(stub, ids)
+        cached, stats = run_client(stub, ids)
+        print({
+            "events": args.events,
+            "uncached_lookups_per_sec": round(args.events / uncached, 1),
+            "cached_lookups_per_sec": round(args.events / cached, 1),
+            "cache": stats,
+        })
+        print({
+            "concurrent_misses": 50,
+            "upstream_requests_threads": run_coalescing(stub, 50),
+            "upstream_requests_async": asyncio.run(run_coalescing_async(stub, 50)),
+        })
+
+
+if __name__ == "__main__":
+    main()
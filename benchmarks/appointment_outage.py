@@ -0,0 +1,72 @@
+"""
+Benchmark consumer khi appointment-service treo (mỗi request chậm hơn timeout của client).
+
+- no_breaker: mỗi prescription_ready chờ hết timeout rồi mới được đưa vào retry queue.
+- breaker: sau `failure_threshold` lỗi liên tiếp circuit mở, các event sau fail ngay và
+  được đưa vào retry queue mà không chặn consumer.
+
+Không event nào bị bỏ: tất cả nằm trong retry queue (FakeBroker.published) chờ xử lý lại.
+
+Chạy: python -m benchmarks.appointment_outage [--events 200] [--timeout-ms 100]
+"""
+import argparse
+import contextlib
+import io
+import time
+
+from benchmarks.events import encode, generate_events
+from benchmarks.fakes import FakeBroker, FakeCollection
+from benchmarks.stubs import AppointmentServiceStub
+from src.clients.appointment_client import AppointmentClient, CircuitBreaker, TTLCache
+from src.messaging import prescription_handler
+from src.messaging.batcher import NotificationBatcher
+from src.messaging.consumer import on_message
+from src.repositories import notification_repository, summary_repository
+from src.services.event_dedup import recent_events
+
+
+def run(bodies: list[bytes], stub_url: str, timeout: float, failure_threshold: int) -> dict:
+    notification_repository.collection = FakeCollection(latency=0)
+    summary_repository.summaries = FakeCollection(latency=0)
+    recent_events.clear()
+    client = AppointmentClient(
+        stub_url,
+        timeout=timeout,
+        max_connections=4,
+        cache=TTLCache(max_size=10000, ttl=300),
+        breaker=CircuitBreaker(failure_threshold=failure_threshold, reset_timeout=60)
+    )
+    prescription_handler.appointment_client = client
+    broker = FakeBroker(bodies)
+    batcher = NotificationBatcher(broker, call_later=broker.call_later, remove_timeout=broker.remove_timeout)
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        broker.run(on_message(batcher, "prescription_notifications"))
+    elapsed = time.perf_counter() - start
+    client.close()
+    assert broker.acked_up_to == len(bodies)
+    return {
+        "events_per_sec": round(len(bodies) / elapsed, 1),
+        "retried": len(broker.published),
+        "circuit": client.breaker.state,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--timeout-ms", type=float, default=100)
+    parser.add_argument("--failure-threshold", type=int, default=5)
+    args = parser.parse_args()
+
+    bodies = encode(generate_events(args.events, mix={"prescription_ready": 1.0}))
+    timeout = args.timeout_ms / 1000
+    # Stub trả lời chậm gấp 5 lần timeout: mọi lookup đều timeout
+    with AppointmentServiceStub(latency=timeout * 5) as stub:
+        for name, threshold in (("no_breaker", len(bodies) + 1), ("breaker", args.failure_threshold)):
+            print({"mode": name, **run(bodies, stub.url, timeout, threshold)})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark broadcast tới nhiều user (mặc định 100k người nhận).
+
+- per_recipient: cách duy nhất trước đây, mỗi người nhận một insert_one + một update summary
+  (đo trên một mẫu nhỏ rồi ngoại suy cho toàn bộ).
+- chunked: BroadcastService ghi theo chunk bằng insert_many không thứ tự và một bulk_write summary.
+- rerun: chạy lại job đã xong, mọi người nhận đều bị bỏ qua (không gửi hai lần).
+
+Chạy: python -m benchmarks.broadcast [--recipients 100000] [--chunk-sizes 100 1000 5000]
+"""
+import argparse
+import contextlib
+import io
+import time
+
+from benchmarks.fakes import FakeCollection
+from config.settings import BroadcastConfig
+from src.models.events import BroadcastData
+from src.repositories import broadcast_job_repository, notification_repository, summary_repository
+from src.repositories.broadcast_job_repository import BroadcastJobRepository
+from src.services.broadcast_service import BroadcastService
+from src.services.notification_service import NotificationService
+
+TITLE = "Phòng khám tạm đóng cửa"
+MESSAGE = "Phòng khám đóng cửa ngày 2025-06-01, lịch khám của bạn sẽ được sắp xếp lại."
+
+
+def use_fakes(latency: float) -> tuple[FakeCollection, FakeCollection]:
+    notifications, summaries = FakeCollection(latency=latency), FakeCollection(latency=latency)
+    notification_repository.collection = notifications
+    summary_repository.summaries = summaries
+    broadcast_job_repository.broadcast_jobs = FakeCollection(latency=latency)
+    return notifications, summaries
+
+
+def per_recipient(recipients: int, sample: int, latency: float) -> dict:
+    notifications, summaries = use_fakes(latency)
+    service = NotificationService()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for user_id in range(sample):
+            service.create_notification(user_id=user_id, title=TITLE, message=MESSAGE)
+    elapsed = time.perf_counter() - start
+    return {
+        "mode": "per_recipient",
+        "sample": sample,
+        "recipients_per_sec": round(sample / elapsed, 1),
+        "estimated_seconds": round(elapsed / sample * recipients, 1),
+        "mongo_round_trips": notifications.round_trips + summaries.round_trips,
+    }
+
+
+def chunked(recipients: int, chunk_size: int, latency: float, rerun: bool = False) -> dict:
+    notifications, summaries = use_fakes(latency)
+    broadcasts = BroadcastService(BroadcastConfig(chunk_size=chunk_size, max_recipients=recipients))
+    data = BroadcastData(title=TITLE, message=MESSAGE, user_ids=list(range(recipients)))
+    job_id = "bench"
+    BroadcastJobRepository.create(job_id, {"title": TITLE, "message": MESSAGE, "selector": None}, None)
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        broadcasts.run_job(job_id, data)
+        if rerun:
+            # Lần chạy lại của một job FAILED: người nhận đã có notification bị bỏ qua
+            broadcast_job_repository.broadcast_jobs.update_one({"_id": job_id}, {"$set": {"status": "FAILED"}})
+            start = time.perf_counter()
+            round_trips = notifications.round_trips + summaries.round_trips
+            broadcasts.run_job(job_id, data)
+    elapsed = time.perf_counter() - start
+    job = broadcasts.get_job(job_id)
+    assert job.status == "COMPLETED" and job.total == recipients
+    assert len(notifications.docs) == recipients
+    result = {
+        "mode": "rerun" if rerun else "chunked",
+        "chunk_size": chunk_size,
+        "seconds": round(elapsed, 2),
+        "recipients_per_sec": round(recipients / elapsed, 1),
+        "written": job.written,
+        "skipped": job.skipped,
+        "mongo_round_trips": notifications.round_trips + summaries.round_trips,
+    }
+    if rerun:
+        result["mongo_round_trips"] -= round_trips
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--recipients", type=int, default=100000)
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--sample", type=int, default=2000)
+    parser.add_argument("--latency-ms", type=float, default=0.5)
+    args = parser.parse_args()
+
+    latency = args.latency_ms / 1000
+    print(per_recipient(args.recipients, min(args.sample, args.recipients), latency))
+    for chunk_size in args.chunk_sizes:
+        print(chunked(args.recipients, chunk_size, latency))
+    print(chunked(args.recipients, args.chunk_sizes[-1], latency, rerun=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+So sánh layout single (một collection notifications) với monthly (bucket notifications_YYYYMM)
+trên 10M notification trải đều `--months` tháng.
+
+Các bước:
+1. Seed `--docs` document vào collection notifications (bỏ qua service để seed nhanh).
+2. Đo layout single: trang đầu, trang lịch sử (cursor lùi `--history-months` tháng), export
+   một tháng của một user, ghi batch notification mới; kích thước index.
+3. Chạy migration (src.services.bucket_migration) và đo tốc độ chuyển.
+4. Đo lại các truy vấn với layout monthly; kích thước index của bucket tháng hiện tại
+   (phần index mà ghi mới và trang đầu chạm tới) so với tổng.
+
+Cần một MongoDB local; dữ liệu được seed vào database `<MONGO__DATABASE>-bench`.
+
+Chạy: python -m benchmarks.bucketed_storage [--docs 10000000] [--users 200000] [--months 24]
+"""
+import os
+
+os.environ["MONGO__DATABASE"] = os.getenv("MONGO__DATABASE", "hospital-management") + "-bench"
+
+import argparse
+import random
+import struct
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from config.settings import settings
+from src.repositories import notification_repository
+from src.repositories.notification_buckets import BUCKET_FILTER, bucket_name, catalog, month_of
+from src.repositories.notification_repository import NotificationRepository, export_query
+from src.services.bucket_migration import migrate_to_buckets
+
+SEED_BATCH = 10000
+
+
+def object_id(at: datetime, counter: int) -> ObjectId:
+    # Timestamp của _id khớp created_at như khi notification được tạo thật
+    return ObjectId(struct.pack(">I", int((at - datetime(1970, 1, 1)).total_seconds())) + counter.to_bytes(8, "big"))
+
+
+def seed(docs: int, users: int, months: int, now: datetime):
+    db = notification_repository.db
+    for name in db.list_collection_names(filter=BUCKET_FILTER) + ["notifications"]:
+        db.drop_collection(name)
+    rng = random.Random(7)
+    span = timedelta(days=30 * months).total_seconds()
+    start = time.perf_counter()
+    for offset in range(0, docs, SEED_BATCH):
+        batch = []
+        for i in range(offset, min(docs, offset + SEED_BATCH)):
+            created_at = now - timedelta(seconds=rng.random() * span)
+            batch.append({
+                "_id": object_id(created_at, i),
+                "user_id": rng.randrange(users),
+                "title": "Lịch khám đã được xác nhận",
+                "message": "Lịch khám của bạn đã được xác nhận",
+                "appointment_id": i,
+                "status": "UNREAD" if rng.random() < 0.2 else "READ",
+                "created_at": created_at,
+                "event_id": f"seed:{i}",
+            })
+        notification_repository.collection.insert_many(batch, ordered=False)
+    settings.mongo.layout = "single"
+    NotificationRepository.ensure_indexes()
+    return round(docs / (time.perf_counter() - start), 1)
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    return round(samples[min(len(samples) - 1, int(len(samples) * pct))], 3)
+
+
+def timed(samples: int, query) -> dict:
+    latencies = []
+    for i in range(samples):
+        start = time.perf_counter()
+        query(i)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return {"p50_ms": percentile(latencies, 0.50), "p95_ms": percentile(latencies, 0.95)}
+
+
+def index_sizes(now: datetime) -> dict:
+    db = notification_repository.db
+    names = db.list_collection_names(filter=BUCKET_FILTER) + ["notifications"]
+    sizes = {name: db.command("collStats", name)["totalIndexSize"] for name in names}
+    return {
+        "total_index_mb": round(sum(sizes.values()) / 2 ** 20, 1),
+        "hot_index_mb": round(sizes.get(bucket_name(now), sizes["notifications"]) / 2 ** 20, 1),
+    }
+
+
+def measure(layout: str, users: int, samples: int, history_months: int, now: datetime) -> dict:
+    settings.mongo.layout = layout
+    catalog.invalidate()
+    rng = random.Random(11)
+    history = now - timedelta(days=30 * history_months)
+    month = month_of(history)
+    month_end = month_of(month + timedelta(days=32))
+    result = {"layout": layout}
+    result["first_page"] = timed(samples, lambda i: NotificationRepository.find_by_user(rng.randrange(users), limit=21))
+    result["history_page"] = timed(
+        samples, lambda i: NotificationRepository.find_by_user(rng.randrange(users), limit=21, before=(history, ObjectId.from_datetime(history)))
+    )
+    result["month_export"] = timed(
+        samples, lambda i: list(NotificationRepository.iter_export(export_query(rng.randrange(users), month, month_end), 1000))
+    )
+    batches = 200
+    start = time.perf_counter()
+    for i in range(batches):
+        NotificationRepository.save_many([
+            {"user_id": rng.randrange(users), "title": "Bench", "message": "Bench", "status": "UNREAD",
+             "created_at": datetime.utcnow(), "event_id": f"bench:{layout}:{i}:{j}"}
+            for j in range(100)
+        ])
+    result["insert_docs_per_sec"] = round(batches * 100 / (time.perf_counter() - start), 1)
+    result.update(index_sizes(now))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=10_000_000)
+    parser.add_argument("--users", type=int, default=200_000)
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--history-months", type=int, default=12)
+    parser.add_argument("--samples", type=int, default=2000)
+    args = parser.parse_args()
+
+    now = datetime.utcnow()
+    print({"seed_docs_per_sec": seed(args.docs, args.users, args.months, now)})
+    print(measure("single", args.users, args.samples, args.history_months, now))
+    migration = migrate_to_buckets(batch_size=SEED_BATCH)
+    migration["docs_per_sec"] = round(migration["moved"] / max(migration["seconds"], 0.001), 1)
+    print({"migration": migration})
+    print(measure("monthly", args.users, args.samples, args.history_months, now))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Benchmark throughput của consumer: insert từng message so với micro-batch insert_many.
+
+Chạy: python -m benchmarks.consumer_batching [--messages 5000] [--latency-ms 0.5]
+"""
+import argparse
+import contextlib
+import io
+import time
+
+from benchmarks.events import encode, generate_events
+from benchmarks.fakes import FakeBroker, FakeCollection
+from src.messaging.batcher import NotificationBatcher
+from src.messaging.consumer import handle_event
+from src.repositories import notification_repository, summary_repository
+from src.services.event_dedup import recent_events
+
+
+def make_events(count: int):
+    return encode(generate_events(count, mix={"appointment_confirmed": 1.0}))
+
+
+def run(bodies, batch_size: int, latency: float):
+    collection = FakeCollection(latency=latency)
+    summaries = FakeCollection(latency=latency)
+    notification_repository.collection = collection
+    summary_repository.summaries = summaries
+    recent_events.clear()
+    broker = FakeBroker(bodies)
+    batcher = NotificationBatcher(
+        broker,
+        call_later=broker.call_later,
+        remove_timeout=broker.remove_timeout,
+        batch_size=batch_size,
+        max_delay=0.2
+    )
+
+    def callback(ch, method, properties, body):
+        batcher.add(method.delivery_tag, handle_event(body))
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        broker.run(callback)
+    elapsed = time.perf_counter() - start
+    assert broker.acked_up_to == len(bodies)
+    assert len(collection.docs) == len(bodies)
+    return {
+        "batch_size": batch_size,
+        "messages_per_sec": round(len(bodies) / elapsed, 1),
+        "mongo_round_trips": collection.round_trips + summaries.round_trips,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--latency-ms", type=float, default=0.5)
+    args = parser.parse_args()
+
+    bodies = make_events(args.messages)
+    for batch_size in (1, 10, 100):
+        print(run(bodies, batch_size, args.latency_ms / 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Benchmark throughput của consumer worker pool khi tăng số process từ 1 lên N, đi qua router thật.
+
+Một process chạy PartitionRouter của src.messaging.worker_pool trên FakeBroker: router decode event,
+chọn partition bằng consistent hashing, publish sang queue của worker và chỉ ack message nguồn khi
+"RabbitMQ" confirm (confirm gộp, trễ `--confirm-latency-ms`, tối đa prefetch_count message chờ confirm).
+Mỗi worker process đọc queue partition của mình và chạy handle_event + NotificationBatcher trên
+FakeCollection riêng; prescription_ready tra patient_id qua AppointmentServiceStub dùng chung.
+
+Chạy: python -m benchmarks.consumer_scaling [--events 20000] [--workers 1 2 4 8]
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import time
+from collections import Counter, defaultdict
+from types import SimpleNamespace
+
+from benchmarks.events import encode, generate_events
+from benchmarks.stubs import AppointmentServiceStub
+
+# Số body gom lại mỗi lần chuyển sang worker, để chi phí pickle của multiprocessing.Queue không lấn át router
+CHUNK_SIZE = 64
+
+
+def route(bodies, workers, prefetch, confirm_latency, outputs, barrier, results):
+    import pika
+    from benchmarks.fakes import FakeBroker
+    from src.messaging.partitioning import partition_queue
+    from src.messaging.worker_pool import PartitionRouter
+
+    router = PartitionRouter(workers, prefetch)
+    queues = {partition_queue(i): output for i, output in enumerate(outputs)}
+    chunks = defaultdict(list)
+
+    class RouterBroker(FakeBroker):
+        # RabbitMQ confirm gộp (multiple) mọi message đã nhận sau `confirm_latency` giây
+        sequence = 0
+        confirm_timer = None
+
+        def basic_publish(self, exchange, routing_key, body, properties=None):
+            chunk = chunks[routing_key]
+            chunk.append(body)
+            if len(chunk) >= CHUNK_SIZE:
+                queues[routing_key].put(chunk)
+                chunks[routing_key] = []
+            self.sequence += 1
+            if self.confirm_timer is None:
+                self.confirm_timer = self.call_later(confirm_latency, self.confirm)
+
+        def confirm(self):
+            self.confirm_timer = None
+            router.on_confirm(SimpleNamespace(method=pika.spec.Basic.Ack(delivery_tag=self.sequence, multiple=True)))
+
+    broker = RouterBroker(bodies, prefetch_count=prefetch)
+    router.channel = broker
+    barrier.wait()
+    start = time.time()
+    broker.run(router.on_message)
+    for routing_key, queue in queues.items():
+        if chunks[routing_key]:
+            queue.put(chunks[routing_key])
+        queue.put(None)
+    results.put(("router", start, time.time(), broker.acked_up_to))
+
+
+def worker(source, batch_size, mongo_latency, stub_url, barrier, results):
+    from benchmarks.fakes import FakeBroker, FakeCollection
+    from src.clients.appointment_client import AppointmentClient, TTLCache
+    from src.messaging import appointment_handler, prescription_handler
+    from src.messaging.batcher import NotificationBatcher
+    from src.messaging.consumer import handle_event
+    from src.repositories import notification_repository, summary_repository
+
+    notification_repository.collection = FakeCollection(latency=mongo_latency)
+    summary_repository.summaries = FakeCollection(latency=mongo_latency)
+    client = AppointmentClient(stub_url, timeout=5.0, max_connections=4, cache=TTLCache(max_size=10000, ttl=300))
+    prescription_handler.appointment_client = appointment_handler.appointment_client = client
+
+    received = 0
+
+    def bodies():
+        nonlocal received
+        for chunk in iter(source.get, None):
+            received += len(chunk)
+            yield from chunk
+
+    broker = FakeBroker(bodies())
+    batcher = NotificationBatcher(
+        broker,
+        call_later=broker.call_later,
+        remove_timeout=broker.remove_timeout,
+        batch_size=batch_size,
+        max_delay=0.2
+    )
+
+    def callback(ch, method, properties, body):
+        batcher.add(method.delivery_tag, handle_event(body))
+
+    # Chỉ đo phần xử lý, không tính thời gian spawn/import
+    barrier.wait()
+    start = time.time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        broker.run(callback)
+    results.put(("worker", start, time.time(), received))
+
+
+def run(events, workers: int, batch_size: int, prefetch: int, confirm_latency: float, mongo_latency: float, stub_url: str) -> dict:
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(workers + 2)
+    results = context.Queue()
+    outputs = [context.Queue() for _ in range(workers)]
+    processes = [context.Process(target=route, args=(encode(events), workers, prefetch, confirm_latency, outputs, barrier, results))]
+    processes += [
+        context.Process(target=worker, args=(output, batch_size, mongo_latency, stub_url, barrier, results))
+        for output in outputs
+    ]
+    for process in processes:
+        process.start()
+    barrier.wait()
+    finished = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    (_, router_start, router_end, routed), = [result for result in finished if result[0] == "router"]
+    sizes = [count for kind, _, _, count in finished if kind == "worker"]
+    elapsed = max(end for _, _, end, _ in finished) - min(start for _, start, _, _ in finished)
+    assert routed == len(events) == sum(sizes)
+    return {
+        "workers": workers,
+        "events_per_sec": round(len(events) / elapsed, 1),
+        "router_events_per_sec": round(len(events) / (router_end - router_start), 1),
+        "partition_skew": round(max(sizes) / (len(events) / workers), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    parser.add_argument("--patients", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--prefetch", type=int, default=200)
+    parser.add_argument("--confirm-latency-ms", type=float, default=0.5)
+    parser.add_argument("--mongo-latency-ms", type=float, default=0.2)
+    parser.add_argument("--appointment-latency-ms", type=float, default=1.0)
+    args = parser.parse_args()
+
+    events = generate_events(args.events, patients=args.patients)
+    print({"cpu_count": os.cpu_count(), "events": len(events), "event_types": dict(Counter(e["event_type"] for e in events))})
+    with AppointmentServiceStub(latency=args.appointment_latency_ms / 1000, patients=args.patients) as stub:
+        baseline = None
+        for workers in args.workers:
+            result = run(
+                events, workers, args.batch_size, args.prefetch,
+                args.confirm_latency_ms / 1000, args.mongo_latency_ms / 1000, stub.url
+            )
+            baseline = baseline or result["events_per_sec"]
+            result["speedup"] = round(result["events_per_sec"] / baseline, 2)
+            print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
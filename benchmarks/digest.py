@@ -0,0 +1,91 @@
+"""
+Benchmark gộp digest: các đợt event dồn dập cho cùng một bệnh nhân (phòng khám hủy/xác nhận
+cả loạt lịch khám) đi qua consumer có và không có DigestCoalescer.
+
+- plain: mỗi event thành một notification.
+- digest: event cùng (user_id, kind) tới trong `window` được gộp thành một notification.
+
+Chạy: python -m benchmarks.digest [--patients 200] [--burst 8] [--window-ms 50]
+"""
+import argparse
+import contextlib
+import io
+import random
+import time
+from typing import Optional
+
+from benchmarks.events import appointment_event, encode
+from benchmarks.fakes import FakeBroker, FakeCollection
+from src.messaging.batcher import NotificationBatcher
+from src.messaging.consumer import on_message
+from src.messaging.digest import DigestCoalescer
+from src.repositories import notification_repository, summary_repository
+from src.services.event_dedup import recent_events
+
+
+def make_bursts(patients: int, burst: int, seed: int = 42) -> list[dict]:
+    """Mỗi bệnh nhân nhận một đợt `burst` event cùng loại; đợt của vài bệnh nhân đan xen nhau."""
+    rng = random.Random(seed)
+    events, sequence = [], 0
+    for start in range(0, patients, 4):
+        interleaved = []
+        for patient_id in range(start, min(start + 4, patients)):
+            event_type = rng.choice(["appointment_cancelled", "appointment_confirmed"])
+            for _ in range(burst):
+                event = appointment_event(event_type, sequence, patient_id, rng)
+                event["event_id"] = f"{seed}-{sequence}"
+                interleaved.append(event)
+                sequence += 1
+        rng.shuffle(interleaved)
+        events += interleaved
+    return events
+
+
+def run(bodies: list[bytes], coalescer: Optional[DigestCoalescer], latency: float) -> dict:
+    collection = FakeCollection(latency=latency)
+    notification_repository.collection = collection
+    summary_repository.summaries = FakeCollection(latency=latency)
+    recent_events.clear()
+    broker = FakeBroker(bodies)
+    batcher = NotificationBatcher(
+        broker,
+        call_later=broker.call_later,
+        remove_timeout=broker.remove_timeout,
+        coalescer=coalescer
+    )
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        broker.run(on_message(batcher, "appointment_notifications"))
+        batcher.flush(force=True)
+    elapsed = time.perf_counter() - start
+    # Mọi message đều được ack, kể cả các message chỉ còn là một dòng trong digest
+    assert not broker.outstanding
+    digests = [doc for doc in collection.docs if doc.get("digest_count")]
+    return {
+        "events": len(bodies),
+        "notifications": len(collection.docs),
+        "digests": len(digests),
+        "events_per_sec": round(len(bodies) / elapsed, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--patients", type=int, default=200)
+    parser.add_argument("--burst", type=int, default=8)
+    parser.add_argument("--window-ms", type=float, default=50)
+    parser.add_argument("--max-hold-ms", type=float, default=500)
+    parser.add_argument("--max-items", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=0.5)
+    args = parser.parse_args()
+
+    bodies = encode(make_bursts(args.patients, args.burst))
+    latency = args.latency_ms / 1000
+    print({"mode": "plain", **run(bodies, None, latency)})
+    coalescer = DigestCoalescer(args.window_ms / 1000, args.max_hold_ms / 1000, args.max_items)
+    print({"mode": "digest", **run(bodies, coalescer, latency)})
+
+
+if __name__ == "__main__":
+    main()
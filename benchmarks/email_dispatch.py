@@ -0,0 +1,77 @@
+"""
+Benchmark gửi email: mỗi email một kết nối + login (cách cũ) so với EmailDispatcher
+(pool session SMTP, gửi theo batch) với SMTP server stub local.
+
+Chạy: python -m benchmarks.email_dispatch [--emails 500]
+"""
+import argparse
+import smtplib
+import time
+from email.mime.text import MIMEText
+
+from benchmarks.stubs import SMTPStub
+from config.settings import EmailConfig
+from src.services.email_dispatcher import EmailDispatcher
+
+
+def make_config(port: int) -> EmailConfig:
+    return EmailConfig(
+        smtp_host="127.0.0.1",
+        smtp_port=port,
+        use_ssl=False,
+        username="bench",
+        password="bench",
+        sender="bench@example.com",
+        pool_size=2,
+        batch_size=50,
+    )
+
+
+def run_inline(stub: SMTPStub, cfg: EmailConfig, count: int) -> float:
+    start = time.perf_counter()
+    for i in range(count):
+        msg = MIMEText(f"Email {i}")
+        msg["Subject"], msg["From"], msg["To"] = "Bench", cfg.sender, "patient@example.com"
+        with smtplib.SMTP(cfg.smtp_host, cfg.smtp_port) as server:
+            server.login(cfg.username, cfg.password)
+            server.sendmail(cfg.sender, ["patient@example.com"], msg.as_string())
+    return time.perf_counter() - start
+
+
+def run_dispatcher(stub: SMTPStub, cfg: EmailConfig, count: int) -> tuple[float, float]:
+    dispatcher = EmailDispatcher(cfg)
+    dispatcher.start()
+    start = time.perf_counter()
+    jobs = [dispatcher.enqueue("patient@example.com", "Bench", f"Email {i}") for i in range(count)]
+    enqueue_elapsed = time.perf_counter() - start
+    while any(job.status not in ("SENT", "FAILED") for job in jobs):
+        time.sleep(0.005)
+    elapsed = time.perf_counter() - start
+    dispatcher.stop()
+    assert all(job.status == "SENT" for job in jobs)
+    return enqueue_elapsed, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--emails", type=int, default=500)
+    args = parser.parse_args()
+
+    with SMTPStub() as stub:
+        cfg = make_config(stub.port)
+        inline = run_inline(stub, cfg, args.emails)
+        inline_logins = stub.logins
+        enqueue, dispatched = run_dispatcher(stub, cfg, args.emails)
+        print({
+            "emails": args.emails,
+            "inline_emails_per_sec": round(args.emails / inline, 1),
+            "inline_logins": inline_logins,
+            "dispatcher_emails_per_sec": round(args.emails / dispatched, 1),
+            "dispatcher_enqueue_us_per_email": round(enqueue / args.emails * 1e6, 1),
+            "dispatcher_logins": stub.logins - inline_logins,
+            "delivered": len(stub.messages),
+        })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+So sánh throughput decode event trên cùng tập message của producer.
+
+- json: json.loads rồi đọc field từ dict như handler cũ (không validate gì).
+- orjson: như json nhưng parse bằng orjson (nếu có cài).
+- typed: decode_event() — parse + validate theo schema của event_type trong một lượt
+  (pydantic-core), handler nhận object có kiểu.
+
+Chạy: python -m benchmarks.event_decoding [--events 20000] [--rounds 20]
+"""
+import argparse
+import json
+import statistics
+import time
+
+from benchmarks.events import encode, generate_events
+from src.dto import notification_dto
+from src.messaging.decoding import decode_event
+
+
+def touch_dict(event: dict):
+    # Đọc các field mà handler dùng, giống cách truy cập dict trước đây
+    data = event["data"]
+    return event["event_type"], data["appointment_id"], data.get("patient_id")
+
+
+def json_path(bodies: list[bytes]):
+    for body in bodies:
+        touch_dict(json.loads(body))
+
+
+def orjson_path(bodies: list[bytes]):
+    loads = notification_dto.orjson.loads
+    for body in bodies:
+        touch_dict(loads(body))
+
+
+def typed_path(bodies: list[bytes]):
+    for body in bodies:
+        event = decode_event(body)
+        event.event_type, event.data.appointment_id, event.data.patient_id
+
+
+def measure(fn, bodies: list[bytes], rounds: int) -> float:
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn(bodies)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    bodies = encode(generate_events(args.events))
+    paths = {"json": json_path, "typed": typed_path}
+    if notification_dto.orjson is not None:
+        paths["orjson"] = orjson_path
+    baseline = None
+    for name, fn in paths.items():
+        events_per_sec = len(bodies) / measure(fn, bodies, args.rounds)
+        baseline = baseline or events_per_sec
+        print({"path": name, "events_per_sec": round(events_per_sec), "relative": round(events_per_sec / baseline, 2)})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Sinh event tổng hợp giống payload của các producer: prescription_ready,
+appointment_confirmed và appointment_cancelled.
+"""
+import json
+import random
+
+DOCTORS = ["Nguyễn Văn A", "Trần Thị B", "Lê Văn C", "Phạm Thị D"]
+DEFAULT_MIX = {"prescription_ready": 0.5, "appointment_confirmed": 0.35, "appointment_cancelled": 0.15}
+
+
+def appointment_event(event_type: str, appointment_id: int, patient_id: int, rng: random.Random) -> dict:
+    data = {
+        "appointment_id": appointment_id,
+        "patient_id": patient_id,
+        "doctor_name": rng.choice(DOCTORS),
+        "appointment_date": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "appointment_time": f"{rng.randint(7, 17):02d}:{rng.choice(['00', '30'])}",
+    }
+    if event_type == "appointment_cancelled":
+        data["cancellation_reason"] = "Bác sĩ bận đột xuất"
+    return {"event_type": event_type, "data": data}
+
+
+def prescription_event(appointment_id: int, sequence: int) -> dict:
+    return {
+        "event_type": "prescription_ready",
+        "data": {
+            "prescription_id": appointment_id,
+            "appointment_id": appointment_id,
+            "dispense_id": sequence,
+            "prescription_code": f"RX{appointment_id:08d}",
+        },
+    }
+
+
+def generate_events(
+    count: int,
+    patients: int = 1000,
+    appointments: int = 5000,
+    mix: dict = DEFAULT_MIX,
+    seed: int = 42,
+    duplicate_ratio: float = 0.0
+) -> list[dict]:
+    """
+    patient_id của một appointment luôn là appointment_id % patients, khớp với AppointmentServiceStub.
+
+    Mỗi event có event_id riêng; `duplicate_ratio` là tỉ lệ event được phát lại (cùng event_id)
+    để mô phỏng redelivery và producer retry.
+    """
+    rng = random.Random(seed)
+    event_types, weights = zip(*mix.items())
+    events = []
+    for sequence in range(count):
+        if events and rng.random() < duplicate_ratio:
+            # Phần lớn bản trùng tới ngay sau bản gốc (redelivery), số ít tới muộn hơn
+            events.append(events[-rng.randint(1, min(len(events), 50))])
+            continue
+        event_type = rng.choices(event_types, weights)[0]
+        appointment_id = rng.randrange(appointments)
+        if event_type == "prescription_ready":
+            event = prescription_event(appointment_id, sequence)
+        else:
+            event = appointment_event(event_type, appointment_id, appointment_id % patients, rng)
+        event["event_id"] = f"{seed}-{sequence}"
+        events.append(event)
+    return events
+
+
+def encode(events: list[dict]) -> list[bytes]:
+    return [json.dumps(event, ensure_ascii=False).encode() for event in events]
@@ -0,0 +1,196 @@
+"""
+Kiểm tra bộ nhớ của export NDJSON: stream 1M notification (mặc định) qua export_notifications
+và assert RSS đỉnh chỉ tăng tối đa `--budget-mb`.
+
+Cursor giả sinh document theo từng batch `batch_size` như getMore của Mongo, nên dữ liệu
+không nằm sẵn trong RAM của process. `--archive` export theo một user, cùng số notification
+trong archive (bucket `ARCHIVE_BUCKET_SIZE` document, cứ 10 document có một bản vẫn còn live).
+So sánh với cách đọc cũ (list(cursor) rồi serialize cả danh sách) trên `--materialized`
+document, chạy sau cùng vì RSS đỉnh chỉ tăng. tests/test_notification_export.py chạy bản thu
+nhỏ của cả hai luồng.
+
+Chạy: python -m benchmarks.export_memory [--documents 1000000] [--archive] [--compress] [--budget-mb 64]
+"""
+import argparse
+import resource
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from config.settings import settings
+from src.dto.notification_dto import dump_notifications
+from src.repositories import archive_repository, notification_repository
+from src.repositories.archive_repository import encode_block
+from src.services.notification_export import export_notifications
+
+START = datetime(2025, 1, 1)
+ARCHIVE_BUCKET_SIZE = 1000
+
+
+def archive_id(i: int) -> ObjectId:
+    # Không cần lưu danh sách id: id tự cho biết bản live còn hay không (i chia hết cho 10)
+    return ObjectId(f"{int(START.timestamp()):08x}{i:016x}")
+
+
+def still_live(_id: ObjectId) -> bool:
+    return int(str(_id)[8:], 16) % 10 == 0
+
+
+class SyntheticCursor:
+    def __init__(self, count: int, batch_size: int):
+        self.count = count
+        self._batch_size = batch_size
+        self.closed = False
+
+    def sort(self, *args, **kwargs):
+        return self
+
+    def close(self):
+        self.closed = True
+
+    def _batch(self, start: int) -> list[dict]:
+        return [
+            {
+                "_id": ObjectId(),
+                "user_id": i % 50000,
+                "title": "Lịch khám đã được xác nhận",
+                "message": f"Lịch khám với bác sĩ Trần Thị B vào 2025-06-{i % 28 + 1:02d} 09:30 đã được xác nhận.",
+                "appointment_id": i,
+                "status": "UNREAD" if i % 3 else "READ",
+                "created_at": START + timedelta(seconds=i),
+                "event_id": f"bench-{i}",
+                "kind": "appointment_confirmed",
+            }
+            for i in range(start, min(start + self._batch_size, self.count))
+        ]
+
+    def __iter__(self):
+        for start in range(0, self.count, self._batch_size):
+            if self.closed:
+                return
+            yield from self._batch(start)
+
+
+class SyntheticCollection:
+    def __init__(self, count: int):
+        self.count = count
+
+    def find(self, query=None, projection=None, batch_size: int = 101, **kwargs):
+        if query and isinstance(query.get("_id"), dict):
+            # NotificationRepository.live_ids: id archive nào còn bản live
+            return [{"_id": _id} for _id in query["_id"]["$in"] if still_live(_id)]
+        return SyntheticCursor(self.count, batch_size)
+
+
+class SyntheticArchiveCursor:
+    def __init__(self, count: int):
+        self.count = count
+
+    def sort(self, *args, **kwargs):
+        return self
+
+    def batch_size(self, size: int):
+        return self
+
+    def close(self):
+        pass
+
+    def __iter__(self):
+        # Bucket được dựng khi cursor tới, như getMore
+        for start in range(0, self.count, ARCHIVE_BUCKET_SIZE):
+            docs = [
+                {
+                    "_id": archive_id(i),
+                    "user_id": 1,
+                    "title": "Đơn thuốc đã sẵn sàng",
+                    "message": f"Đơn thuốc {i} đã sẵn sàng tại quầy phát thuốc.",
+                    "status": "READ",
+                    "created_at": START - timedelta(seconds=i + 1),
+                }
+                for i in range(start, min(start + ARCHIVE_BUCKET_SIZE, self.count))
+            ]
+            yield {"_id": f"1:{start}", "user_id": 1, "blocks": [{"count": len(docs), "data": encode_block(docs, 1)}]}
+
+
+class SyntheticArchive:
+    def __init__(self, count: int):
+        self.count = count
+
+    def find(self, query=None, projection=None, **kwargs):
+        return SyntheticArchiveCursor(self.count)
+
+
+def use_synthetic(live: int, archived: int = 0):
+    notification_repository.collection = SyntheticCollection(live)
+    archive_repository.archive = SyntheticArchive(archived)
+
+
+def expected_documents(live: int, archived: int) -> int:
+    return live + sum(1 for i in range(archived) if i % 10)
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss tính bằng KB trên Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def streamed(count: int, compress: bool, archive: bool = False) -> dict:
+    # --archive: export theo user, nửa live nửa archive
+    use_synthetic(count // 2, count - count // 2) if archive else use_synthetic(count)
+    before = peak_rss_mb()
+    start = time.perf_counter()
+    total_bytes = chunks = 0
+    stream = export_notifications(1, None, None, include_archive=True, compress=compress) if archive else export_notifications(None, START, None, compress=compress)
+    for chunk in stream:
+        total_bytes += len(chunk)
+        chunks += 1
+    elapsed = time.perf_counter() - start
+    return {
+        "mode": "streamed_with_archive" if archive else "streamed",
+        "documents": count,
+        "compress": compress,
+        "mb": round(total_bytes / 2 ** 20, 1),
+        "chunks": chunks,
+        "docs_per_sec": round(count / elapsed),
+        "peak_rss_growth_mb": round(peak_rss_mb() - before, 1),
+    }
+
+
+def materialized(count: int) -> dict:
+    # Cách đọc cũ: cả kết quả nằm trong list, rồi serialize một lần
+    collection = SyntheticCollection(count)
+    before = peak_rss_mb()
+    start = time.perf_counter()
+    docs = list(collection.find(batch_size=settings.mongo.export_batch_size))
+    body = dump_notifications(docs)
+    elapsed = time.perf_counter() - start
+    return {
+        "mode": "materialized",
+        "documents": count,
+        "mb": round(len(body) / 2 ** 20, 1),
+        "docs_per_sec": round(count / elapsed),
+        "peak_rss_growth_mb": round(peak_rss_mb() - before, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--documents", type=int, default=1_000_000)
+    parser.add_argument("--materialized", type=int, default=200_000)
+    parser.add_argument("--archive", action="store_true")
+    parser.add_argument("--compress", action="store_true")
+    parser.add_argument("--budget-mb", type=float, default=64)
+    args = parser.parse_args()
+
+    # Làm nóng import và allocator để phần tăng đo được chỉ đến từ export
+    streamed(10_000, args.compress, args.archive)
+    result = streamed(args.documents, args.compress, args.archive)
+    print(result)
+    assert result["peak_rss_growth_mb"] <= args.budget_mb, f"peak RSS grew {result['peak_rss_growth_mb']}MB > {args.budget_mb}MB"
+    if args.materialized:
+        print(materialized(args.materialized))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+"""
+In-process stand-ins cho RabbitMQ, MongoDB và Redis dùng trong benchmarks.
+
+Các fake này chỉ mô phỏng đủ phần interface mà service dùng, cộng thêm một
+độ trễ round trip cố định để kết quả phản ánh chi phí gọi mạng.
+"""
+import itertools
+import threading
+import time
+from collections import defaultdict
+from types import SimpleNamespace
+from typing import Optional
+
+import fakeredis
+from bson import ObjectId
+from pymongo import InsertOne
+from pymongo.errors import BulkWriteError
+
+
+def _compare(value, op: str, arg) -> bool:
+    if op == "$in":
+        return value in arg
+    if op == "$ne":
+        return value != arg
+    if value is None:
+        return False
+    if op == "$lt":
+        return value < arg
+    if op == "$lte":
+        return value <= arg
+    if op == "$gt":
+        return value > arg
+    if op == "$gte":
+        return value >= arg
+    raise NotImplementedError(op)
+
+
+def matches(doc: dict, query: dict) -> bool:
+    """Matcher tối giản: so sánh bằng, $lt/$lte/$gt/$gte/$in/$ne và $or."""
+    for key, expected in query.items():
+        if key == "$or":
+            if not any(matches(doc, branch) for branch in expected):
+                return False
+        elif isinstance(expected, dict) and expected and all(op.startswith("$") for op in expected):
+            if not all(_compare(doc.get(key), op, arg) for op, arg in expected.items()):
+                return False
+        elif doc.get(key) != expected:
+            return False
+    return True
+
+
+def apply_update(doc: dict, update: dict):
+    """Hỗ trợ $set, $inc và $push ($each/$slice); bỏ qua các path positional như `latest.$[header]`."""
+    for key, value in update.get("$set", {}).items():
+        if "$" not in key:
+            doc[key] = value
+    for key, value in update.get("$inc", {}).items():
+        doc[key] = doc.get(key, 0) + value
+    for key, value in update.get("$push", {}).items():
+        items = doc.setdefault(key, [])
+        if isinstance(value, dict) and "$each" in value:
+            items[:0] = value["$each"]
+            if "$slice" in value:
+                del items[value["$slice"]:]
+        else:
+            items.append(value)
+
+
+class FakeCursor:
+    def __init__(self, docs: list[dict], projection: Optional[dict]):
+        self._docs = docs
+        self._projection = projection
+        self._limit = 0
+
+    def sort(self, keys, direction=None):
+        if isinstance(keys, str):
+            keys = [(keys, direction or 1)]
+        for key, order in reversed(keys):
+            self._docs.sort(key=lambda doc: doc.get(key), reverse=order < 0)
+        return self
+
+    def limit(self, limit: int):
+        self._limit = limit
+        return self
+
+    def batch_size(self, size: int):
+        return self
+
+    def close(self):
+        pass
+
+    def __iter__(self):
+        docs = self._docs[:self._limit] if self._limit else self._docs
+        for doc in docs:
+            if self._projection:
+                yield {key: doc[key] for key in ("_id", *self._projection) if key in doc}
+            else:
+                yield dict(doc)
+
+
+class FakeCollection:
+    """
+    Collection trong bộ nhớ, mỗi lệnh tốn `latency` giây như một round trip tới Mongo.
+
+    Document được index theo _id và user_id (giống index user_id của collection thật)
+    để các truy vấn theo user không phải quét toàn bộ dữ liệu.
+    """
+
+    def __init__(self, latency: float = 0.0005, name: str = "fake"):
+        self.latency = latency
+        self.name = name
+        self.docs: list[dict] = []
+        self.round_trips = 0
+        self._by_id: dict = {}
+        self._by_user: dict = defaultdict(list)
+        self._by_event: dict = {}
+        self._lock = threading.Lock()
+
+    def _round_trip(self):
+        self.round_trips += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _insert(self, doc: dict):
+        doc.setdefault("_id", ObjectId())
+        self.docs.append(doc)
+        self._by_id[doc["_id"]] = doc
+        if "user_id" in doc:
+            self._by_user[doc["user_id"]].append(doc)
+        if "event_id" in doc:
+            self._by_event[doc["event_id"]] = doc
+
+    def _candidates(self, query: dict) -> list[dict]:
+        if isinstance(query.get("_id"), ObjectId) or isinstance(query.get("_id"), int):
+            doc = self._by_id.get(query["_id"])
+            return [doc] if doc else []
+        if isinstance(query.get("event_id"), str):
+            doc = self._by_event.get(query["event_id"])
+            return [doc] if doc else []
+        if "user_id" in query and not isinstance(query["user_id"], dict):
+            return self._by_user.get(query["user_id"], [])
+        return self.docs
+
+    def _find(self, query: dict) -> list[dict]:
+        with self._lock:
+            return [doc for doc in self._candidates(query) if matches(doc, query)]
+
+    def create_index(self, keys, **kwargs):
+        self._round_trip()
+        return kwargs.get("name", "index")
+
+    def drop(self):
+        with self._lock:
+            self.docs, self._by_id, self._by_user, self._by_event = [], {}, defaultdict(list), {}
+
+    def insert_one(self, doc: dict):
+        self._round_trip()
+        with self._lock:
+            self._insert(doc)
+        return SimpleNamespace(inserted_id=doc["_id"])
+
+    def insert_many(self, docs: list[dict], ordered: bool = True):
+        self._round_trip()
+        # Giống unique index event_id: document trùng bị bỏ qua và báo trong writeErrors
+        errors = []
+        with self._lock:
+            for i, doc in enumerate(docs):
+                if doc.get("event_id") is not None and doc["event_id"] in self._by_event:
+                    errors.append({"index": i, "code": 11000, "errmsg": "duplicate key"})
+                    continue
+                self._insert(doc)
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(docs) - len(errors)})
+        return SimpleNamespace(inserted_ids=[doc["_id"] for doc in docs])
+
+    def find(self, query: Optional[dict] = None, projection: Optional[dict] = None, **kwargs):
+        self._round_trip()
+        return FakeCursor(self._find(query or {}), projection)
+
+    def find_one(self, query: dict, projection: Optional[dict] = None):
+        self._round_trip()
+        docs = self._find(query)
+        return dict(docs[0]) if docs else None
+
+    def count_documents(self, query: dict):
+        self._round_trip()
+        return len(self._find(query))
+
+    def _update(self, query: dict, update: dict, upsert: bool, many: bool):
+        with self._lock:
+            docs = [doc for doc in self._candidates(query) if matches(doc, query)]
+            if not many:
+                docs = docs[:1]
+            for doc in docs:
+                apply_update(doc, update)
+            upserted_id = None
+            if not docs and upsert:
+                doc = {key: value for key, value in query.items() if not isinstance(value, dict)}
+                doc.update(update.get("$setOnInsert", {}))
+                apply_update(doc, update)
+                self._insert(doc)
+                upserted_id = doc["_id"]
+        return SimpleNamespace(matched_count=len(docs), modified_count=len(docs), upserted_id=upserted_id)
+
+    def update_one(self, query: dict, update: dict, upsert: bool = False, **kwargs):
+        self._round_trip()
+        return self._update(query, update, upsert, many=False)
+
+    def update_many(self, query: dict, update: dict, upsert: bool = False, **kwargs):
+        self._round_trip()
+        return self._update(query, update, upsert, many=True)
+
+    def find_one_and_update(self, query: dict, update: dict, projection: Optional[dict] = None, **kwargs):
+        self._round_trip()
+        with self._lock:
+            docs = [doc for doc in self._candidates(query) if matches(doc, query)]
+            if not docs:
+                return None
+            before = dict(docs[0])
+            apply_update(docs[0], update)
+        if projection:
+            return {key: before[key] for key in ("_id", *projection) if key in before}
+        return before
+
+    def bulk_write(self, requests: list, ordered: bool = True):
+        self._round_trip()
+        upserted_ids = {}
+        for i, request in enumerate(requests):
+            if isinstance(request, InsertOne):
+                with self._lock:
+                    self._insert(request._doc)
+                continue
+            result = self._update(request._filter, request._doc, request._upsert, many=False)
+            if result.upserted_id is not None:
+                upserted_ids[i] = result.upserted_id
+        return SimpleNamespace(modified_count=len(requests) - len(upserted_ids), upserted_ids=upserted_ids)
+
+
+class FakeBroker:
+    """
+    Stand-in cho pika BlockingConnection + channel.
+
+    Giao message tuần tự cho callback với delivery tag tăng dần và chạy các
+    timer đăng ký qua call_later khi tới hạn, giống vòng lặp của start_consuming.
+    `bodies` có thể là iterator (vd. đọc từ queue giữa các process). Với `prefetch_count` > 0,
+    khi đang có đủ số message chưa ack thì broker chờ timer kế tiếp thay vì giao thêm.
+    """
+
+    def __init__(self, bodies, prefetch_count: int = 0):
+        self.bodies = iter(bodies)
+        self.prefetch_count = prefetch_count
+        self.timers: dict[int, tuple[float, object]] = {}
+        self._timer_ids = itertools.count(1)
+        self.acked_up_to = 0
+        self.nacked = 0
+        self.published: list[tuple] = []
+        # Tag đã giao nhưng chưa được ack (ack multiple=True xóa mọi tag <= delivery_tag)
+        self.outstanding: set[int] = set()
+
+    def call_later(self, delay, callback):
+        timer_id = next(self._timer_ids)
+        self.timers[timer_id] = (time.monotonic() + delay, callback)
+        return timer_id
+
+    def remove_timeout(self, timer_id):
+        self.timers.pop(timer_id, None)
+
+    def basic_ack(self, delivery_tag, multiple=False):
+        self.acked_up_to = max(self.acked_up_to, delivery_tag)
+        if multiple:
+            self.outstanding = {tag for tag in self.outstanding if tag > delivery_tag}
+        else:
+            self.outstanding.discard(delivery_tag)
+
+    def basic_nack(self, delivery_tag, multiple=False, requeue=True):
+        self.nacked += 1
+
+    def basic_publish(self, exchange, routing_key, body, properties=None):
+        self.published.append((exchange, routing_key, body, properties))
+
+    def _fire_timers(self, force: bool = False):
+        now = time.monotonic()
+        for timer_id, (deadline, callback) in list(self.timers.items()):
+            if force or deadline <= now:
+                self.timers.pop(timer_id, None)
+                callback()
+
+    def _wait_for_timer(self):
+        deadline = min(deadline for deadline, _ in self.timers.values())
+        time.sleep(max(0.0, deadline - time.monotonic()))
+        self._fire_timers()
+
+    def run(self, on_message_callback):
+        for delivery_tag, body in enumerate(self.bodies, 1):
+            while self.prefetch_count and len(self.outstanding) >= self.prefetch_count and self.timers:
+                self._wait_for_timer()
+            method = SimpleNamespace(delivery_tag=delivery_tag)
+            self.outstanding.add(delivery_tag)
+            on_message_callback(self, method, None, body)
+            self._fire_timers()
+        while self.timers:
+            self._fire_timers(force=True)
+
+
+class LatencyRedis(fakeredis.FakeRedis):
+    """
+    fakeredis (chạy FILL_SCRIPT bằng Lua thật qua lupa) cộng thêm `latency` giây cho mỗi round
+    trip: một lệnh, một lần gọi script hoặc một pipeline.execute().
+    """
+
+    def __init__(self, latency: float = 0.0002, **kwargs):
+        super().__init__(**kwargs)
+        self.latency = latency
+        self.round_trips = 0
+
+    def _round_trip(self):
+        self.round_trips += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def execute_command(self, *args, **options):
+        self._round_trip()
+        return super().execute_command(*args, **options)
+
+    def pipeline(self, transaction: bool = True, shard_hint=None):
+        pipe = super().pipeline(transaction, shard_hint)
+        # Lệnh trong pipeline chỉ được gom lại, cả pipeline là một round trip khi execute()
+        execute = pipe.execute
+
+        def timed_execute(raise_on_error: bool = True):
+            self._round_trip()
+            return execute(raise_on_error)
+
+        pipe.execute = timed_execute
+        return pipe
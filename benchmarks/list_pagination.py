@@ -0,0 +1,80 @@
+"""
+Benchmark latency của trang đầu GET /notifications/{user_id} khi lịch sử của user tăng dần.
+
+Cần một MongoDB local (MONGO__HOST/MONGO__PORT); dữ liệu được seed vào database
+riêng `<MONGO__DATABASE>-bench` và bị xóa sau khi chạy.
+
+Chạy: python -m benchmarks.list_pagination [--sizes 1000 10000 100000] [--limit 50]
+"""
+import os
+
+os.environ["MONGO__DATABASE"] = os.getenv("MONGO__DATABASE", "hospital-management") + "-bench"
+
+import argparse
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from src.repositories import notification_repository
+from src.services.notification_service import NotificationService
+
+
+def seed(collection, user_id: int, count: int, start: int):
+    base = datetime(2024, 1, 1)
+    docs = [
+        {
+            "user_id": user_id,
+            "title": "Lịch khám đã được xác nhận",
+            "message": "Lịch khám với bác sĩ Nguyễn Văn A đã được xác nhận.",
+            "appointment_id": i,
+            "status": "READ" if i % 3 else "UNREAD",
+            "created_at": base + timedelta(seconds=i),
+        }
+        for i in range(start, count)
+    ]
+    for offset in range(0, len(docs), 10000):
+        collection.insert_many(docs[offset:offset + 10000], ordered=False)
+
+
+def measure(service, user_id: int, limit: int, rounds: int, **kwargs):
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        service.get_notifications_for_user(user_id, limit=limit, **kwargs)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return round(statistics.median(samples), 3), round(samples[int(len(samples) * 0.99) - 1], 3)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    collection = notification_repository.collection
+    collection.drop()
+
+    service = NotificationService()
+    service.ensure_indexes()
+    user_id, seeded = 1, 0
+    try:
+        for size in sorted(args.sizes):
+            seed(collection, user_id, size, seeded)
+            seeded = size
+            p50, p99 = measure(service, user_id, args.limit, args.rounds)
+            unread_p50, unread_p99 = measure(service, user_id, args.limit, args.rounds, status="UNREAD")
+            print({
+                "history": size,
+                "first_page_p50_ms": p50,
+                "first_page_p99_ms": p99,
+                "unread_page_p50_ms": unread_p50,
+                "unread_page_p99_ms": unread_p99,
+            })
+    finally:
+        collection.drop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Chi phí log trên mỗi event khi stdout chậm (pipe tới log collector bị nghẽn, terminal...).
+
+- no_logging: root logger ở mức WARNING, dòng INFO của consumer không được tạo (mốc so sánh).
+- sync_text: ghi đồng bộ trên thread consumer như print() trước đây; mỗi dòng chờ sink.
+- queue_json: configure_logging không rate limit; thread consumer chỉ đưa record vào queue,
+  JSON được format và ghi trên thread nền. Queue đầy thì dòng bị bỏ thay vì chặn consumer.
+- queue_json_rate_limited: cấu hình mặc định, dòng lặp lại theo event_type bị giới hạn.
+
+`drain_ms` là thời gian thread nền cần để ghi nốt queue sau khi consumer xong. Với sink nhanh
+(--sink-latency-us 0) trên máy 1 CPU, queue_json có thể đắt hơn sync_text vì thread ghi log
+tranh CPU với consumer; lợi ích nằm ở chỗ consumer không còn chờ I/O của stdout.
+
+Chạy: python -m benchmarks.logging_overhead [--events 5000] [--sink-latency-us 50]
+"""
+import argparse
+import io
+import logging
+import time
+
+from benchmarks.events import encode, generate_events
+from benchmarks.fakes import FakeCollection
+from config.settings import LoggingConfig
+from src.messaging.consumer import handle_event
+from src.monitoring.logs import configure_logging, shutdown_logging
+from src.monitoring.metrics import log_records_dropped_total
+from src.repositories import notification_repository, summary_repository
+from src.services.event_dedup import recent_events
+
+
+class SlowSink(io.TextIOBase):
+    """Stream mà mỗi lần ghi tốn `latency` giây."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.lines = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        if self.latency:
+            time.sleep(self.latency)
+        self.lines += text.count("\n")
+        return len(text)
+
+
+def process(bodies: list[bytes]) -> float:
+    notification_repository.collection = FakeCollection(latency=0)
+    summary_repository.summaries = FakeCollection(latency=0)
+    recent_events.clear()
+    start = time.perf_counter()
+    for body in bodies:
+        handle_event(body)
+    return time.perf_counter() - start
+
+
+def run_once(mode: str, bodies: list[bytes], latency: float) -> tuple[float, dict]:
+    root = logging.getLogger()
+    sink = SlowSink(latency)
+    dropped = {reason: log_records_dropped_total.value(reason) for reason in ("rate_limited", "queue_full")}
+    drain = 0.0
+    if mode == "no_logging":
+        root.handlers = []
+        root.setLevel(logging.WARNING)
+        elapsed = process(bodies)
+    elif mode == "sync_text":
+        handler = logging.StreamHandler(sink)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        root.handlers = [handler]
+        root.setLevel(logging.INFO)
+        elapsed = process(bodies)
+    else:
+        cfg = LoggingConfig() if mode == "queue_json_rate_limited" else LoggingConfig(rate_limit_per_second=0)
+        configure_logging(cfg, stream=sink)
+        elapsed = process(bodies)
+        start = time.perf_counter()
+        shutdown_logging()
+        drain = time.perf_counter() - start
+    root.handlers = []
+    result = {"mode": mode, "lines_written": sink.lines, "drain_ms": round(drain * 1000, 1)}
+    for reason, before in dropped.items():
+        result[reason] = int(log_records_dropped_total.value(reason) - before)
+    return elapsed, result
+
+
+def run(mode: str, bodies: list[bytes], latency: float, repeats: int, baseline: float = None) -> tuple[float, dict]:
+    # Lấy lượt nhanh nhất để giảm nhiễu của máy
+    elapsed, result = min((run_once(mode, bodies, latency) for _ in range(repeats)), key=lambda item: item[0])
+    result["us_per_event"] = round(elapsed / len(bodies) * 1e6, 1)
+    if baseline is not None:
+        result["overhead_us_per_event"] = round((elapsed - baseline) / len(bodies) * 1e6, 1)
+    return elapsed, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--sink-latency-us", type=float, default=50)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    bodies = encode(generate_events(args.events, mix={"appointment_confirmed": 0.7, "appointment_cancelled": 0.3}))
+    latency = args.sink_latency_us / 1e6
+    baseline, result = run("no_logging", bodies, latency, args.repeats)
+    print(result)
+    for mode in ("sync_text", "queue_json", "queue_json_rate_limited"):
+        print(run(mode, bodies, latency, args.repeats, baseline)[1])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Benchmark cache Redis cho trang đầu danh sách notification (fakeredis + FakeCollection).
+
+- workload: nhiều thread đọc trang đầu (version cho ETag + trang notification) của user theo
+  phân bố lệch (user "nóng" được đọc nhiều), xen kẽ notification mới và mark-read. So sánh
+  latency p50/p95/p99 và hit ratio khi đọc thẳng Mongo và khi qua cache.
+- stampede: `--stampede` thread cùng đọc một key nguội; đếm số lần phải query Mongo.
+
+Chạy: python -m benchmarks.notification_cache [--requests 5000] [--threads 4]
+"""
+import argparse
+import contextlib
+import io
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fakes import FakeCollection, LatencyRedis
+from benchmarks.suite import percentiles
+from src.monitoring.metrics import cache_requests_total
+from src.repositories import notification_repository, summary_repository
+from src.services.notification_cache import notification_cache
+from src.services.notification_service import NotificationService
+
+service = NotificationService()
+
+
+def use_backends(mongo_latency: float, redis_latency: float, cache: bool) -> tuple[FakeCollection, LatencyRedis]:
+    notifications = FakeCollection(latency=mongo_latency, name="notifications")
+    summaries = FakeCollection(latency=mongo_latency, name="notification_summaries")
+    notification_repository.collection = notifications
+    summary_repository.summaries = summaries
+    summary_repository.notifications = notifications
+    redis = LatencyRedis(latency=redis_latency)
+    notification_cache.use_client(redis)
+    notification_cache.cfg.cache_enabled = cache
+    return notifications, redis
+
+
+def seed(users: int, per_user: int) -> list[str]:
+    ids = []
+    for user_id in range(users):
+        ids += service.create_notifications([
+            service.build_notification(user_id=user_id, appointment_id=i, title="Bench", message="Bench")
+            for i in range(per_user)
+        ])
+    return ids
+
+
+def read_first_page(user_id: int, limit: int):
+    # Giống list_notifications: version cho ETag rồi tới trang đầu
+    service.get_version(user_id)
+    return service.get_notifications_for_user(user_id, limit=limit)
+
+
+def cache_counts() -> dict:
+    return {result: cache_requests_total.value(result) for result in ("hit", "miss", "wait_timeout", "error")}
+
+
+def run_workload(args, cache: bool) -> dict:
+    use_backends(args.mongo_latency_ms / 1000, args.redis_latency_ms / 1000, cache)
+    ids = seed(args.users, args.per_user)
+    rng = random.Random(7)
+    # Phân bố lệch: user i được chọn với trọng số 1/(i+1)
+    weights = [1 / (i + 1) for i in range(args.users)]
+    plan = [
+        ("write" if rng.random() < args.write_ratio else "read", rng.choices(range(args.users), weights)[0], rng.choice(ids))
+        for _ in range(args.requests)
+    ]
+    # Đo ở trạng thái ổn định: mỗi user được đọc một lượt trước (cả hai chế độ)
+    for user_id in range(args.users):
+        read_first_page(user_id, args.limit)
+    latencies: list[float] = []
+    before = cache_counts()
+
+    def one(op):
+        kind, user_id, notification_id = op
+        start = time.perf_counter()
+        if kind == "read":
+            read_first_page(user_id, args.limit)
+            latencies.append((time.perf_counter() - start) * 1000)
+        elif rng.random() < 0.5:
+            service.mark_as_read(notification_id)
+        else:
+            service.create_notifications([service.build_notification(user_id=user_id, appointment_id=0, title="Bench", message="Bench")])
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(args.threads) as pool:
+        list(pool.map(one, plan))
+    elapsed = time.perf_counter() - start
+
+    after = cache_counts()
+    delta = {result: after[result] - before[result] for result in after}
+    lookups = sum(delta.values())
+    return {
+        "cache": cache,
+        "requests_per_sec": round(args.requests / elapsed, 1),
+        "reads": percentiles(latencies),
+        "hit_ratio": round(delta["hit"] / lookups, 3) if lookups else None,
+    }
+
+
+def run_stampede(args, cache: bool) -> dict:
+    notifications, _ = use_backends(args.mongo_latency_ms / 1000, args.redis_latency_ms / 1000, cache)
+    seed(1, args.limit)
+    notification_cache.invalidate([0])
+    barrier = threading.Barrier(args.stampede)
+    round_trips = notifications.round_trips
+
+    def one(_):
+        barrier.wait()
+        return service.get_notifications_for_user(0, limit=args.limit)
+
+    with ThreadPoolExecutor(args.stampede) as pool:
+        pages = list(pool.map(one, range(args.stampede)))
+    # So theo _id: FakeCollection giữ created_at tới micro giây, BSON (như Mongo thật) chỉ tới mili giây
+    assert len({tuple(doc["_id"] for doc in docs) for docs, _ in pages}) == 1
+    return {"cache": cache, "callers": args.stampede, "mongo_queries": notifications.round_trips - round_trips}
+
+
+def check_invalidation():
+    # Sau mark-read, lần đọc kế tiếp phải thấy trạng thái mới chứ không phải trang cũ trong cache
+    use_backends(0, 0, cache=True)
+    ids = seed(1, 5)
+    version = service.get_version(0)
+    assert all(doc["status"] == "UNREAD" for doc in service.get_notifications_for_user(0, limit=5)[0])
+    with contextlib.redirect_stdout(io.StringIO()):
+        service.mark_as_read(ids[0])
+    docs, _ = service.get_notifications_for_user(0, limit=5)
+    assert {str(doc["_id"]): doc["status"] for doc in docs}[ids[0]] == "READ"
+    assert service.get_version(0) > version
+    assert service.get_summary(0)["unread_count"] == 4
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--per-user", type=int, default=30)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--write-ratio", type=float, default=0.05)
+    parser.add_argument("--stampede", type=int, default=32)
+    parser.add_argument("--mongo-latency-ms", type=float, default=0.5)
+    parser.add_argument("--redis-latency-ms", type=float, default=0.1)
+    args = parser.parse_args()
+
+    check_invalidation()
+    for cache in (False, True):
+        print(run_workload(args, cache))
+    for cache in (False, True):
+        print(run_stampede(args, cache))
+
+
+if __name__ == "__main__":
+    main()
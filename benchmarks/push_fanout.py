@@ -0,0 +1,87 @@
+"""
+Benchmark hub push: bộ nhớ cho mỗi kết nối idle và độ trễ từ lúc publish tới lúc
+subscriber nhận được event.
+
+Mỗi "kết nối" là một Subscription cùng một task chạy vòng lặp chờ event giống
+endpoint SSE/WebSocket (không tính buffer socket của uvicorn). Event được publish
+từ một thread khác, giống consumer thread.
+
+Chạy: python -m benchmarks.push_fanout [--connections 5000] [--events 2000]
+"""
+import argparse
+import asyncio
+import gc
+import json
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+from src.controllers.stream_controller import _next_event
+from src.services.notification_hub import NotificationHub
+from src.services import notification_hub as hub_module
+
+
+async def run(connections: int, events: int) -> dict:
+    hub = NotificationHub(buffer_size=100)
+    hub_module.notification_hub = hub
+    hub.bind(asyncio.get_running_loop())
+    delays: list[float] = []
+    # Payload có đúng dạng dòng của API nên thời điểm gửi được ghi riêng theo id
+    sent_at: dict[str, float] = {}
+    received = asyncio.Event()
+
+    async def listener(subscription):
+        while not subscription.closed:
+            payload = await _next_event(subscription)
+            if payload is not None:
+                delays.append(time.perf_counter() - sent_at[json.loads(payload)["id"]])
+                if len(delays) >= events:
+                    received.set()
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tasks = [asyncio.create_task(listener(hub.subscribe(user_id))) for user_id in range(connections)]
+    await asyncio.sleep(0.1)
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    per_connection = sum(stat.size_diff for stat in after.compare_to(before, "filename")) / connections
+
+    def producer():
+        for i in range(events):
+            sent_at[str(i)] = time.perf_counter()
+            hub.publish({
+                "_id": i, "user_id": i % connections, "title": "Benchmark", "message": f"event {i}",
+                "status": "UNREAD", "created_at": datetime.utcnow()
+            })
+            time.sleep(0.0005)
+
+    threading.Thread(target=producer, daemon=True).start()
+    await asyncio.wait_for(received.wait(), timeout=60)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    delays.sort()
+    return {
+        "connections": connections,
+        "bytes_per_idle_connection": round(per_connection),
+        "events": events,
+        "push_delay_p50_ms": round(delays[len(delays) // 2] * 1000, 3),
+        "push_delay_p99_ms": round(delays[int(len(delays) * 0.99) - 1] * 1000, 3),
+        "dropped_subscribers": hub.dropped,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--connections", type=int, default=5000)
+    parser.add_argument("--events", type=int, default=2000)
+    args = parser.parse_args()
+    print(asyncio.run(run(args.connections, args.events)))
+
+
+if __name__ == "__main__":
+    main()
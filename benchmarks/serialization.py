@@ -0,0 +1,98 @@
+"""
+So sánh chi phí serialize danh sách notification trên mỗi 1.000 dòng.
+
+- pydantic: cách cũ — dựng NotificationResponseDTO cho từng document, validate lại theo
+  response_model rồi JSONResponse dump bằng json.dumps.
+- orjson / stdlib: dump_notifications() đi thẳng từ document đã project ra JSON bytes.
+
+Chạy: python -m benchmarks.serialization [--rows 1000] [--rounds 200]
+"""
+import argparse
+import json
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from pydantic import TypeAdapter
+
+from src.dto import notification_dto
+from src.dto.notification_dto import NotificationResponseDTO, dump_notifications
+
+response_adapter = TypeAdapter(list[NotificationResponseDTO])
+
+
+def make_docs(rows: int) -> list[dict]:
+    base = datetime(2024, 1, 1)
+    return [
+        {
+            "_id": ObjectId(),
+            "user_id": 1,
+            "title": "Lịch khám đã được xác nhận",
+            "message": "Lịch khám với bác sĩ Nguyễn Văn A đã được xác nhận.",
+            "appointment_id": i,
+            "status": "UNREAD",
+            "created_at": base + timedelta(seconds=i, microseconds=i * 1000 % 1000000),
+        }
+        for i in range(rows)
+    ]
+
+
+def pydantic_path(docs: list[dict]) -> bytes:
+    dtos = [
+        NotificationResponseDTO(
+            id=str(doc["_id"]),
+            user_id=doc["user_id"],
+            title=doc["title"],
+            message=doc["message"],
+            prescription_id=doc.get("prescription_id"),
+            appointment_id=doc["appointment_id"],
+            dispense_id=doc.get("dispense_id"),
+            status=doc["status"],
+            created_at=doc["created_at"]
+        )
+        for doc in docs
+    ]
+    content = response_adapter.dump_python(response_adapter.validate_python(dtos), mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+def stdlib_path(docs: list[dict]) -> bytes:
+    orjson, notification_dto.orjson = notification_dto.orjson, None
+    try:
+        return dump_notifications(docs)
+    finally:
+        notification_dto.orjson = orjson
+
+
+def measure(fn, docs: list[dict], rounds: int) -> float:
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn(docs)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    docs = make_docs(args.rows)
+    # Cả ba cách phải cho ra cùng một JSON
+    assert json.loads(pydantic_path(docs)) == json.loads(dump_notifications(docs)) == json.loads(stdlib_path(docs))
+
+    paths = {"pydantic": pydantic_path, "stdlib": stdlib_path}
+    if notification_dto.orjson is not None:
+        paths["orjson"] = dump_notifications
+    baseline = None
+    for name, fn in paths.items():
+        per_1000 = measure(fn, docs, args.rounds) * 1000 / args.rows
+        baseline = baseline or per_1000
+        print({"path": name, "ms_per_1000_rows": round(per_1000, 3), "speedup": round(baseline / per_1000, 2)})
+
+
+if __name__ == "__main__":
+    main()
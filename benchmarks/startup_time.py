@@ -0,0 +1,61 @@
+"""
+Benchmark thời gian import lúc khởi động (python -X importtime) với ngưỡng regression.
+
+Đo cumulative import time của `src.controllers.front_controller` trong process mới,
+đồng thời kiểm tra các backend không dùng tới (SQLAlchemy/psycopg2/redis/pika) không bị import.
+Thoát với mã 1 nếu vượt budget.
+
+Chạy: python -m benchmarks.startup_time [--budget-ms 1000] [--runs 5]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+MODULE = "src.controllers.front_controller"
+FORBIDDEN = ("sqlalchemy", "psycopg2", "redis", "pika")
+
+
+def import_time_ms(module: str) -> float:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True
+    )
+    for line in result.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        parts = [part.strip() for part in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1]) / 1000
+    raise RuntimeError(f"{module} not found in importtime output")
+
+
+def imported_backends(module: str) -> list[str]:
+    code = f"import sys, {module}; print(','.join(m for m in {FORBIDDEN!r} if m in sys.modules))"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout.strip()
+    return [name for name in output.split(",") if name]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget-ms", type=float, default=1000.0)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    samples = [import_time_ms(MODULE) for _ in range(args.runs)]
+    backends = imported_backends(MODULE)
+    median = statistics.median(samples)
+    report = {
+        "module": MODULE,
+        "import_ms_median": round(median, 1),
+        "import_ms_max": round(max(samples), 1),
+        "budget_ms": args.budget_ms,
+        "unexpected_backends": backends,
+    }
+    print(json.dumps(report))
+    if median > args.budget_ms or backends:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Stub HTTP server cho appointment-service, chạy trong thread riêng trên cổng ngẫu nhiên.
+"""
+import json
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class AppointmentServiceStub:
+    """
+    GET /appointments/{id} -> {"id": id, "patient_id": id % patients}, trễ `latency` giây mỗi request.
+
+    `status` khác 200 giả lập appointment-service lỗi: mọi request nhận status đó, body rỗng.
+    """
+
+    def __init__(self, latency: float = 0.005, patients: int = 1000, status: int = 200):
+        self.latency = latency
+        self.patients = patients
+        self.status = status
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                with stub._lock:
+                    stub.requests += 1
+                time.sleep(stub.latency)
+                parts = self.path.strip("/").split("/")
+                if stub.status != 200 or len(parts) != 2 or parts[0] != "appointments" or not parts[1].isdigit():
+                    self.send_response(404 if stub.status == 200 else stub.status)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                appointment_id = int(parts[1])
+                body = json.dumps({"id": appointment_id, "patient_id": appointment_id % stub.patients}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def handle(self):
+                # Client bỏ request khi timeout (benchmarks.appointment_outage)
+                try:
+                    super().handle()
+                except ConnectionError:
+                    pass
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class SMTPStub:
+    """
+    SMTP server tối giản (không TLS) chấp nhận mọi AUTH và lưu message vào `messages`.
+
+    Đủ cho smtplib: EHLO/HELO, AUTH, MAIL, RCPT, DATA, NOOP, RSET, QUIT.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.messages: list[bytes] = []
+        self.connections = 0
+        self.logins = 0
+        self._lock = threading.Lock()
+        self._server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def _handler(self):
+        stub = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            disable_nagle_algorithm = True
+
+            def reply(self, line: str):
+                self.wfile.write(line.encode() + b"\r\n")
+
+            def handle(self):
+                with stub._lock:
+                    stub.connections += 1
+                self.reply("220 stub ESMTP")
+                while True:
+                    line = self.rfile.readline()
+                    if not line:
+                        return
+                    command = line.decode().strip().upper()
+                    if command.startswith(("EHLO", "HELO")):
+                        self.reply("250-stub")
+                        self.reply("250 AUTH PLAIN LOGIN")
+                    elif command.startswith("AUTH"):
+                        with stub._lock:
+                            stub.logins += 1
+                        self.reply("235 Authentication successful")
+                    elif command.startswith("DATA"):
+                        self.reply("354 End data with <CR><LF>.<CR><LF>")
+                        data = b""
+                        while (chunk := self.rfile.readline()) not in (b".\r\n", b""):
+                            data += chunk
+                        if stub.latency:
+                            time.sleep(stub.latency)
+                        with stub._lock:
+                            stub.messages.append(data)
+                        self.reply("250 OK")
+                    elif command.startswith("QUIT"):
+                        self.reply("221 Bye")
+                        return
+                    else:
+                        self.reply("250 OK")
+
+        return Handler
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
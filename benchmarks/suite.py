@@ -0,0 +1,192 @@
+"""
+Bộ benchmark end-to-end chạy offline cho consumer và API.
+
+- Consumer: event tổng hợp (benchmarks.events) đi qua FakeBroker -> handle_event ->
+  NotificationBatcher -> FakeCollection, prescription_ready tra cứu patient_id qua
+  AppointmentServiceStub. Báo cáo events/sec.
+- API: list_notifications và mark_read chạy đồng thời qua ASGI in-process (backend sync)
+  trên FakeCollection. Báo cáo p50/p95/p99 theo route.
+
+Kết quả được ghi ra JSON (kèm commit hiện tại) để so sánh giữa các commit.
+
+Chạy: python -m benchmarks.suite [--output results.json] [--events 20000] [--requests 5000]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import platform
+import random
+import subprocess
+import time
+from datetime import datetime, timezone
+
+import httpx
+from fastapi import FastAPI
+
+from benchmarks.events import encode, generate_events
+from benchmarks.fakes import FakeBroker, FakeCollection
+from benchmarks.stubs import AppointmentServiceStub
+from config.settings import settings
+from src.clients.appointment_client import AppointmentClient, TTLCache
+from src.controllers.notification_controller import router
+from src.messaging import appointment_handler, prescription_handler
+from src.messaging.batcher import NotificationBatcher
+from src.messaging.consumer import handle_event
+from src.repositories import notification_repository, summary_repository
+from src.services.event_dedup import recent_events
+from src.services.notification_service import NotificationService
+
+
+def use_fake_mongo(latency: float) -> tuple[FakeCollection, FakeCollection]:
+    notifications = FakeCollection(latency=latency, name="notifications")
+    summaries = FakeCollection(latency=latency, name="notification_summaries")
+    notification_repository.collection = notifications
+    summary_repository.summaries = summaries
+    summary_repository.notifications = notifications
+    return notifications, summaries
+
+
+def use_appointment_stub(stub: AppointmentServiceStub) -> AppointmentClient:
+    client = AppointmentClient(stub.url, timeout=5.0, max_connections=20, cache=TTLCache(max_size=10000, ttl=300))
+    prescription_handler.appointment_client = client
+    appointment_handler.appointment_client = client
+    return client
+
+
+def percentiles(samples: list[float]) -> dict:
+    samples = sorted(samples)
+    pick = lambda pct: round(samples[min(len(samples) - 1, int(len(samples) * pct))], 3)
+    return {"count": len(samples), "p50_ms": pick(0.50), "p95_ms": pick(0.95), "p99_ms": pick(0.99)}
+
+
+def run_consumer(bodies: list[bytes], batch_size: int, mongo_latency: float, stub_latency: float) -> dict:
+    notifications, summaries = use_fake_mongo(mongo_latency)
+    recent_events.clear()
+    with AppointmentServiceStub(latency=stub_latency) as stub:
+        client = use_appointment_stub(stub)
+        broker = FakeBroker(bodies)
+        batcher = NotificationBatcher(
+            broker,
+            call_later=broker.call_later,
+            remove_timeout=broker.remove_timeout,
+            batch_size=batch_size,
+            max_delay=0.2
+        )
+
+        def callback(ch, method, properties, body):
+            batcher.add(method.delivery_tag, handle_event(body))
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            broker.run(callback)
+        elapsed = time.perf_counter() - start
+        client.close()
+        upstream_requests = stub.requests
+
+    return {
+        "batch_size": batch_size,
+        "events": len(bodies),
+        "events_per_sec": round(len(bodies) / elapsed, 1),
+        "notifications_written": len(notifications.docs),
+        "mongo_round_trips": notifications.round_trips + summaries.round_trips,
+        "appointment_requests": upstream_requests,
+        "appointment_cache": client.stats(),
+    }
+
+
+def seed_api(users: int, per_user: int) -> list[str]:
+    service = NotificationService()
+    ids = []
+    for user_id in range(users):
+        ids += service.create_notifications([
+            service.build_notification(user_id=user_id, appointment_id=i, title="Bench", message="Bench")
+            for i in range(per_user)
+        ])
+    return ids
+
+
+async def run_api(users: int, ids: list[str], requests: int, concurrency: int, mark_ratio: float) -> dict:
+    settings.mongo.backend = "sync"
+    app = FastAPI()
+    app.include_router(router)
+    rng = random.Random(7)
+    latencies: dict[str, list[float]] = {"list_notifications": [], "mark_read": []}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def one():
+            async with semaphore:
+                start = time.perf_counter()
+                if rng.random() < mark_ratio:
+                    route = "mark_read"
+                    resp = await client.post("/notifications/read", json={"notification_id": rng.choice(ids)})
+                else:
+                    route = "list_notifications"
+                    resp = await client.get(f"/notifications/{rng.randrange(users)}", params={"limit": 20})
+                latencies[route].append((time.perf_counter() - start) * 1000)
+                resp.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*[one() for _ in range(requests)])
+        elapsed = time.perf_counter() - start
+
+    return {
+        "backend": "sync",
+        "concurrency": concurrency,
+        "requests": requests,
+        "requests_per_sec": round(requests / elapsed, 1),
+        "routes": {route: percentiles(samples) for route, samples in latencies.items() if samples},
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--per-user", type=int, default=200)
+    parser.add_argument("--duplicate-ratio", type=float, default=0.05)
+    parser.add_argument("--mongo-latency-ms", type=float, default=0.3)
+    parser.add_argument("--appointment-latency-ms", type=float, default=2.0)
+    parser.add_argument("--output", help="Ghi kết quả JSON ra file")
+    args = parser.parse_args()
+
+    bodies = encode(generate_events(args.events, duplicate_ratio=args.duplicate_ratio))
+    consumer = [
+        run_consumer(bodies, batch_size, args.mongo_latency_ms / 1000, args.appointment_latency_ms / 1000)
+        for batch_size in (1, 100)
+    ]
+
+    use_fake_mongo(args.mongo_latency_ms / 1000)
+    ids = seed_api(args.users, args.per_user)
+    api = asyncio.run(run_api(args.users, ids, args.requests, args.concurrency, mark_ratio=0.2))
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "params": vars(args),
+        "consumer": consumer,
+        "api": api,
+    }
+    output = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
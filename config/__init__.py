@@ -1,5 +1,14 @@
-from .database import get_db, engine, SessionLocal, Base, test_db_connection, init_db
 from .settings import settings, get_settings
+from .resources import resources
+
+# Các thành phần SQLAlchemy chỉ được import khi thực sự dùng tới
+_DATABASE_EXPORTS = {"get_db", "engine", "SessionLocal", "Base", "test_db_connection", "init_db"}
+
+def __getattr__(name):
+    if name in _DATABASE_EXPORTS:
+        from . import database
+        return getattr(database, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 __all__ = [
     "get_db",
@@ -9,5 +18,6 @@ __all__ = [
     "test_db_connection",
     "init_db",
     "settings",
-    "get_settings"
+    "get_settings",
+    "resources"
 ]
\ No newline at end of file
@@ -1,25 +1,28 @@
-from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from typing import Generator
+from .resources import resources
 from .settings import settings
 
-# Create engine with connection pooling using settings
-engine = create_engine(
-    settings.database.url,
-    pool_size=settings.database.pool_size,
-    max_overflow=settings.database.max_overflow,
-    pool_pre_ping=True,
-    pool_recycle=settings.database.pool_recycle,
-    echo=settings.database.echo
-)
+_session_factory = None
 
-# Create SessionLocal class
-SessionLocal = sessionmaker(
-    autocommit=False,
-    autoflush=False,
-    bind=engine
-)
+def get_engine():
+    """Engine được tạo khi dùng lần đầu (xem config.resources)"""
+    return resources.get("postgres")
+
+def get_session_factory():
+    global _session_factory
+    if _session_factory is None:
+        _session_factory = sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
+    return _session_factory
+
+def __getattr__(name):
+    # Giữ tương thích với `from config.database import engine, SessionLocal`
+    if name == "engine":
+        return get_engine()
+    if name == "SessionLocal":
+        return get_session_factory()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Create Base class for models
 Base = declarative_base()
@@ -32,7 +35,7 @@ def get_db() -> Generator:
     Yields:
         Database session
     """
-    db = SessionLocal()
+    db = get_session_factory()()
     try:
         yield db
     except Exception:
@@ -51,7 +54,7 @@ def test_db_connection() -> bool:
     """
     try:
         from sqlalchemy import text
-        with engine.connect() as connection:
+        with get_engine().connect() as connection:
             result = connection.execute(text("SELECT 1"))
             result.fetchone()
         return True
@@ -72,7 +75,7 @@ def init_db():
         from src.models.prescription import Prescription
 
         # Create all tables
-        Base.metadata.create_all(bind=engine)
+        Base.metadata.create_all(bind=get_engine())
         print("Database tables created successfully")
 
         if settings.database.echo:
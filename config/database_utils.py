@@ -2,7 +2,7 @@
 Database utilities and helper functions
 """
 from sqlalchemy import text
-from .database import engine
+from .database import get_engine
 from .settings import settings
 import logging
 
@@ -15,7 +15,9 @@ def get_database_info() -> dict:
     Returns:
         Dict with database details
     """
+    engine = None
     try:
+        engine = get_engine()
         with engine.connect() as connection:
             # Get database type and version
             result = connection.execute(text("SELECT version()"))
@@ -47,7 +49,7 @@ def get_connection_pool_status() -> dict:
         Dict with pool information
     """
     try:
-        pool = engine.pool
+        pool = get_engine().pool
         return {
             "pool_size": pool.size(),
             "checked_in": pool.checkedin(),
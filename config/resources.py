@@ -0,0 +1,110 @@
+"""
+Lazy resource registry
+
+Mỗi backend (Mongo, Postgres, Redis) được đăng ký bằng một factory và chỉ
+được import/kết nối khi dùng lần đầu, hoặc khi lifespan gọi init() một cách tường minh.
+Connection RabbitMQ không nằm ở đây: mỗi consumer/publisher tự mở connection từ
+consumer.connection_params() vì connection pika không dùng chung được giữa các thread.
+"""
+import threading
+from typing import Any, Callable, Optional
+
+from .settings import settings
+
+class LazyResource:
+    def __init__(self, name: str, factory: Callable[[], Any], closer: Optional[Callable[[Any], None]] = None):
+        self.name = name
+        self.factory = factory
+        self.closer = closer
+        self._value = None
+        self._lock = threading.Lock()
+
+    @property
+    def initialized(self) -> bool:
+        return self._value is not None
+
+    def get(self):
+        if self._value is None:
+            with self._lock:
+                if self._value is None:
+                    self._value = self.factory()
+        return self._value
+
+    def close(self):
+        with self._lock:
+            value, self._value = self._value, None
+        if value is not None and self.closer:
+            self.closer(value)
+
+class ResourceRegistry:
+    def __init__(self):
+        self._resources: dict[str, LazyResource] = {}
+
+    def register(self, name: str, factory: Callable[[], Any], closer: Optional[Callable[[Any], None]] = None):
+        self._resources[name] = LazyResource(name, factory, closer)
+
+    def get(self, name: str):
+        return self._resources[name].get()
+
+    def init(self, *names: str):
+        for name in names:
+            self.get(name)
+
+    def close_all(self):
+        for resource in self._resources.values():
+            resource.close()
+
+    def status(self) -> dict:
+        return {name: resource.initialized for name, resource in self._resources.items()}
+
+class LazyCollection:
+    """Proxy tới một Mongo collection, chỉ tạo MongoClient khi được dùng lần đầu."""
+
+    def __init__(self, name: str):
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(resources.get("mongo")[settings.mongo.database][self._name], attr)
+
+class LazyDatabase:
+    def __getitem__(self, name: str) -> LazyCollection:
+        return LazyCollection(name)
+
+    def __getattr__(self, attr):
+        return getattr(resources.get("mongo")[settings.mongo.database], attr)
+
+def _create_mongo():
+    from pymongo import MongoClient
+    mongo_cfg = settings.mongo
+    return MongoClient(
+        host=mongo_cfg.host,
+        port=mongo_cfg.port,
+        username=mongo_cfg.username,
+        password=mongo_cfg.password
+    )
+
+def _create_postgres():
+    from sqlalchemy import create_engine
+    # Create engine with connection pooling using settings
+    return create_engine(
+        settings.database.url,
+        pool_size=settings.database.pool_size,
+        max_overflow=settings.database.max_overflow,
+        pool_pre_ping=True,
+        pool_recycle=settings.database.pool_recycle,
+        echo=settings.database.echo
+    )
+
+def _create_redis():
+    import redis
+    return redis.Redis(
+        host=settings.redis.host,
+        port=settings.redis.port,
+        db=settings.redis.db,
+        password=settings.redis.password
+    )
+
+resources = ResourceRegistry()
+resources.register("mongo", _create_mongo, lambda client: client.close())
+resources.register("postgres", _create_postgres, lambda engine: engine.dispose())
+resources.register("redis", _create_redis, lambda client: client.close())
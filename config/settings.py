@@ -18,14 +18,22 @@ class RedisConfig(BaseModel):
     port: int = Field(default=6379, ge=1, le=65535)
     db: int = Field(default=0, ge=0, le=15)
     password: Optional[str] = Field(default=None)
+    cache_enabled: bool = Field(default=False)
+    cache_ttl_seconds: float = Field(default=30.0, gt=0)
+    cache_lock_ms: int = Field(default=2000, ge=1)
+    cache_wait_ms: int = Field(default=200, ge=0)
 
 class MongoConfig(BaseModel):
-    """MongoDB configuration settings"""
+    """MongoDB configuration settings (server >= 5.2: rebuild summary dùng $topN)"""
     host: str = Field(default="localhost")
     port: int = Field(default=27017, ge=1, le=65535)
     database: str = Field(default="hospital-management")
     username: Optional[str] = Field(default=None)
     password: Optional[str] = Field(default=None)
+    backend: str = Field(default="sync", pattern="^(sync|async)$")
+    export_batch_size: int = Field(default=1000, ge=1, le=100000)
+    # single: một collection notifications; monthly: mỗi tháng một collection notifications_YYYYMM
+    layout: str = Field(default="single", pattern="^(single|monthly)$")
 
 class AppConfig(BaseModel):
     """Application configuration settings"""
@@ -41,6 +49,7 @@ class AppConfig(BaseModel):
     secret_key: str = Field(default="your-secret-key-here")
     algorithm: str = Field(default="HS256")
     access_token_expire_minutes: int = Field(default=30, ge=1)
+    admin_token: Optional[str] = Field(default=None)  # header X-Admin-Token cho /admin/*; chưa đặt thì /admin bị tắt
 
 class RabbitMQConfig(BaseModel):
     """RabbitMQ configuration settings"""
@@ -52,6 +61,95 @@ class RabbitMQConfig(BaseModel):
     exchange_name: str = Field(default="prescription_exchange")
     queue_name: str = Field(default="prescription_notifications")
     routing_key: str = Field(default="prescription.ready")
+    prefetch_count: int = Field(default=200, ge=1, le=65535)
+    batch_size: int = Field(default=100, ge=1)
+    batch_max_delay_ms: int = Field(default=200, ge=1)
+    consumer_mode: str = Field(default="thread", pattern="^(thread|async|process)$")
+    consumer_concurrency: int = Field(default=10, ge=1, le=1000)
+    dedup_cache_size: int = Field(default=100000, ge=0)
+    consumer_workers: int = Field(default=4, ge=1, le=256)
+    partition_queue_prefix: str = Field(default="notifications.partition")
+    retry_base_delay_ms: int = Field(default=2000, ge=1)
+    retry_max_delay_ms: int = Field(default=300000, ge=1)
+    max_retries: int = Field(default=6, ge=0, le=20)
+    dead_letter_queue: str = Field(default="notifications.dead_letter")
+    digest_enabled: bool = Field(default=False)
+    digest_window_ms: int = Field(default=5000, ge=1)
+    digest_max_hold_ms: int = Field(default=30000, ge=1)
+
+class AppointmentServiceConfig(BaseModel):
+    """Appointment-service client settings"""
+    endpoint: str = Field(default="http://localhost:8005")
+    timeout: float = Field(default=5.0, gt=0)
+    max_connections: int = Field(default=20, ge=1)
+    cache_ttl_seconds: float = Field(default=300.0, ge=0)
+    cache_max_size: int = Field(default=10000, ge=1)
+    prime_cache: bool = Field(default=True)
+    breaker_failure_threshold: int = Field(default=5, ge=1)
+    breaker_reset_seconds: float = Field(default=30.0, gt=0)
+
+class EmailConfig(BaseModel):
+    """SMTP / email dispatch settings"""
+    smtp_host: str = Field(default="smtp.gmail.com")
+    smtp_port: int = Field(default=465, ge=1, le=65535)
+    use_ssl: bool = Field(default=True)
+    username: Optional[str] = Field(default=None)
+    password: Optional[str] = Field(default=None)
+    sender: Optional[str] = Field(default=None)
+    timeout: float = Field(default=10.0, gt=0)
+    pool_size: int = Field(default=2, ge=1, le=20)
+    batch_size: int = Field(default=20, ge=1)
+    max_retries: int = Field(default=5, ge=0)
+    backoff_base_seconds: float = Field(default=2.0, gt=0)
+    max_tracked_jobs: int = Field(default=10000, ge=1)
+
+class PushConfig(BaseModel):
+    """Real-time push (SSE / WebSocket) settings"""
+    buffer_size: int = Field(default=100, ge=1)
+    heartbeat_seconds: float = Field(default=15.0, gt=0)
+    # Fanout exchange chuyển notification từ consumer process (RABBITMQ__CONSUMER_MODE=process) tới hub của API
+    exchange_name: str = Field(default="notifications.push")
+
+class RetentionConfig(BaseModel):
+    """Retention / archive settings"""
+    enabled: bool = Field(default=False)  # opt-in: job nền xóa dữ liệu live
+    archive_read_after_days: int = Field(default=90, ge=1)
+    unread_ttl_days: int = Field(default=0, ge=0)  # 0 = không tự xóa notification UNREAD
+    batch_size: int = Field(default=500, ge=1, le=10000)
+    batch_pause_ms: int = Field(default=200, ge=0)
+    interval_seconds: float = Field(default=3600.0, gt=0)
+    compression_level: int = Field(default=6, ge=1, le=9)
+    lease_seconds: float = Field(default=300.0, gt=0)  # lease Mongo: chỉ một process chạy job tại một thời điểm
+
+class SummaryConfig(BaseModel):
+    """Inbox summary reconciliation settings"""
+    reconcile_interval_seconds: float = Field(default=600.0, ge=0)  # 0 = tắt
+    reconcile_window_seconds: float = Field(default=1800.0, gt=0)
+
+class BroadcastConfig(BaseModel):
+    """Broadcast job settings"""
+    chunk_size: int = Field(default=1000, ge=1, le=100000)
+    max_recipients: int = Field(default=1000000, ge=1)
+    lease_seconds: float = Field(default=300.0, gt=0)  # job RUNNING không có heartbeat quá lâu được process khác chạy lại
+    recovery_interval_seconds: float = Field(default=60.0, gt=0)  # chu kỳ quét job QUEUED / mất heartbeat
+
+class ProfilingConfig(BaseModel):
+    """Profiling / slow-operation log settings (đổi được lúc chạy qua /admin/profiling)"""
+    enabled: bool = Field(default=False)
+    sample_rate: float = Field(default=0.01, ge=0, le=1)
+    interval_ms: float = Field(default=5.0, gt=0)
+    slow_threshold_ms: float = Field(default=500.0, ge=0)
+    max_profiles: int = Field(default=50, ge=1)
+    max_slow_operations: int = Field(default=200, ge=1)
+    max_concurrent_samples: int = Field(default=2, ge=1)
+
+class LoggingConfig(BaseModel):
+    """Structured logging settings"""
+    level: str = Field(default="INFO")
+    format: str = Field(default="json", pattern="^(json|text)$")
+    queue_size: int = Field(default=10000, ge=1)
+    rate_limit_per_second: float = Field(default=20.0, ge=0)
+    rate_limit_burst: int = Field(default=50, ge=1)
 
 class Settings(BaseModel):
     """Main settings class"""
@@ -60,6 +158,14 @@ class Settings(BaseModel):
     redis: RedisConfig = RedisConfig()
     mongo: MongoConfig = MongoConfig()
     rabbitmq: RabbitMQConfig = RabbitMQConfig()
+    appointment_service: AppointmentServiceConfig = AppointmentServiceConfig()
+    email: EmailConfig = EmailConfig()
+    push: PushConfig = PushConfig()
+    retention: RetentionConfig = RetentionConfig()
+    summary: SummaryConfig = SummaryConfig()
+    broadcast: BroadcastConfig = BroadcastConfig()
+    profiling: ProfilingConfig = ProfilingConfig()
+    logging: LoggingConfig = LoggingConfig()
     class Config:
         env_file = ".env"
         env_nested_delimiter = "__"
@@ -91,6 +197,7 @@ def get_settings() -> Settings:
             host=os.getenv("APP__HOST", "127.0.0.1"),
             port=int(os.getenv("APP__PORT", "8022")),
             secret_key=os.getenv("APP__SECRET_KEY", "your-secret-key-here"),
+            admin_token=os.getenv("APP__ADMIN_TOKEN") or None,
         ),
         database=DatabaseConfig(
             url=database_url,
@@ -103,6 +210,10 @@ def get_settings() -> Settings:
             host=os.getenv("REDIS__HOST", "localhost"),
             port=int(os.getenv("REDIS__PORT", "6379")),
             password=os.getenv("REDIS__PASSWORD"),
+            cache_enabled=os.getenv("REDIS__CACHE_ENABLED", "false").lower() == "true",
+            cache_ttl_seconds=float(os.getenv("REDIS__CACHE_TTL_SECONDS", "30")),
+            cache_lock_ms=int(os.getenv("REDIS__CACHE_LOCK_MS", "2000")),
+            cache_wait_ms=int(os.getenv("REDIS__CACHE_WAIT_MS", "200")),
         ),
         mongo=MongoConfig(
             host=os.getenv("MONGO__HOST", "localhost"),
@@ -110,6 +221,9 @@ def get_settings() -> Settings:
             database=os.getenv("MONGO__DATABASE", "hospital-management"),
             username=os.getenv("MONGO__USERNAME"),
             password=os.getenv("MONGO__PASSWORD"),
+            backend=os.getenv("MONGO__BACKEND", "sync").lower(),
+            export_batch_size=int(os.getenv("MONGO__EXPORT_BATCH_SIZE", "1000")),
+            layout=os.getenv("MONGO__LAYOUT", "single").lower(),
         ),
         rabbitmq=RabbitMQConfig(
             host=os.getenv("RABBITMQ__HOST", "localhost"),
@@ -120,6 +234,85 @@ def get_settings() -> Settings:
             exchange_name=os.getenv("RABBITMQ__EXCHANGE_NAME", "prescription_exchange"),
             queue_name=os.getenv("RABBITMQ__QUEUE_NAME", "prescription_notifications"),
             routing_key=os.getenv("RABBITMQ__ROUTING_KEY", "prescription.ready"),
+            prefetch_count=int(os.getenv("RABBITMQ__PREFETCH_COUNT", "200")),
+            batch_size=int(os.getenv("RABBITMQ__BATCH_SIZE", "100")),
+            batch_max_delay_ms=int(os.getenv("RABBITMQ__BATCH_MAX_DELAY_MS", "200")),
+            consumer_mode=os.getenv("RABBITMQ__CONSUMER_MODE", "thread").lower(),
+            consumer_concurrency=int(os.getenv("RABBITMQ__CONSUMER_CONCURRENCY", "10")),
+            dedup_cache_size=int(os.getenv("RABBITMQ__DEDUP_CACHE_SIZE", "100000")),
+            consumer_workers=int(os.getenv("RABBITMQ__CONSUMER_WORKERS", "4")),
+            partition_queue_prefix=os.getenv("RABBITMQ__PARTITION_QUEUE_PREFIX", "notifications.partition"),
+            retry_base_delay_ms=int(os.getenv("RABBITMQ__RETRY_BASE_DELAY_MS", "2000")),
+            retry_max_delay_ms=int(os.getenv("RABBITMQ__RETRY_MAX_DELAY_MS", "300000")),
+            max_retries=int(os.getenv("RABBITMQ__MAX_RETRIES", "6")),
+            dead_letter_queue=os.getenv("RABBITMQ__DEAD_LETTER_QUEUE", "notifications.dead_letter"),
+            digest_enabled=os.getenv("RABBITMQ__DIGEST_ENABLED", "false").lower() == "true",
+            digest_window_ms=int(os.getenv("RABBITMQ__DIGEST_WINDOW_MS", "5000")),
+            digest_max_hold_ms=int(os.getenv("RABBITMQ__DIGEST_MAX_HOLD_MS", "30000")),
+        ),
+        appointment_service=AppointmentServiceConfig(
+            endpoint=os.getenv("APPOINTMENT__SERVICE__ENDPOINT", "http://localhost:8005"),
+            timeout=float(os.getenv("APPOINTMENT__SERVICE__TIMEOUT", "5.0")),
+            max_connections=int(os.getenv("APPOINTMENT__SERVICE__MAX_CONNECTIONS", "20")),
+            cache_ttl_seconds=float(os.getenv("APPOINTMENT__SERVICE__CACHE_TTL_SECONDS", "300")),
+            cache_max_size=int(os.getenv("APPOINTMENT__SERVICE__CACHE_MAX_SIZE", "10000")),
+            prime_cache=os.getenv("APPOINTMENT__SERVICE__PRIME_CACHE", "true").lower() == "true",
+            breaker_failure_threshold=int(os.getenv("APPOINTMENT__SERVICE__BREAKER_FAILURE_THRESHOLD", "5")),
+            breaker_reset_seconds=float(os.getenv("APPOINTMENT__SERVICE__BREAKER_RESET_SECONDS", "30")),
+        ),
+        email=EmailConfig(
+            smtp_host=os.getenv("EMAIL__SMTP_HOST", "smtp.gmail.com"),
+            smtp_port=int(os.getenv("EMAIL__SMTP_PORT", "465")),
+            use_ssl=os.getenv("EMAIL__USE_SSL", "true").lower() == "true",
+            username=os.getenv("EMAIL__USERNAME"),
+            password=os.getenv("EMAIL__PASSWORD"),
+            sender=os.getenv("EMAIL__SENDER") or os.getenv("EMAIL__USERNAME"),
+            timeout=float(os.getenv("EMAIL__TIMEOUT", "10")),
+            pool_size=int(os.getenv("EMAIL__POOL_SIZE", "2")),
+            batch_size=int(os.getenv("EMAIL__BATCH_SIZE", "20")),
+            max_retries=int(os.getenv("EMAIL__MAX_RETRIES", "5")),
+            backoff_base_seconds=float(os.getenv("EMAIL__BACKOFF_BASE_SECONDS", "2")),
+        ),
+        push=PushConfig(
+            buffer_size=int(os.getenv("PUSH__BUFFER_SIZE", "100")),
+            heartbeat_seconds=float(os.getenv("PUSH__HEARTBEAT_SECONDS", "15")),
+            exchange_name=os.getenv("PUSH__EXCHANGE_NAME", "notifications.push"),
+        ),
+        retention=RetentionConfig(
+            enabled=os.getenv("RETENTION__ENABLED", "false").lower() == "true",
+            archive_read_after_days=int(os.getenv("RETENTION__ARCHIVE_READ_AFTER_DAYS", "90")),
+            unread_ttl_days=int(os.getenv("RETENTION__UNREAD_TTL_DAYS", "0")),
+            batch_size=int(os.getenv("RETENTION__BATCH_SIZE", "500")),
+            batch_pause_ms=int(os.getenv("RETENTION__BATCH_PAUSE_MS", "200")),
+            interval_seconds=float(os.getenv("RETENTION__INTERVAL_SECONDS", "3600")),
+            compression_level=int(os.getenv("RETENTION__COMPRESSION_LEVEL", "6")),
+            lease_seconds=float(os.getenv("RETENTION__LEASE_SECONDS", "300")),
+        ),
+        summary=SummaryConfig(
+            reconcile_interval_seconds=float(os.getenv("SUMMARY__RECONCILE_INTERVAL_SECONDS", "600")),
+            reconcile_window_seconds=float(os.getenv("SUMMARY__RECONCILE_WINDOW_SECONDS", "1800")),
+        ),
+        broadcast=BroadcastConfig(
+            chunk_size=int(os.getenv("BROADCAST__CHUNK_SIZE", "1000")),
+            max_recipients=int(os.getenv("BROADCAST__MAX_RECIPIENTS", "1000000")),
+            lease_seconds=float(os.getenv("BROADCAST__LEASE_SECONDS", "300")),
+            recovery_interval_seconds=float(os.getenv("BROADCAST__RECOVERY_INTERVAL_SECONDS", "60")),
+        ),
+        profiling=ProfilingConfig(
+            enabled=os.getenv("PROFILING__ENABLED", "false").lower() == "true",
+            sample_rate=float(os.getenv("PROFILING__SAMPLE_RATE", "0.01")),
+            interval_ms=float(os.getenv("PROFILING__INTERVAL_MS", "5")),
+            slow_threshold_ms=float(os.getenv("PROFILING__SLOW_THRESHOLD_MS", "500")),
+            max_profiles=int(os.getenv("PROFILING__MAX_PROFILES", "50")),
+            max_slow_operations=int(os.getenv("PROFILING__MAX_SLOW_OPERATIONS", "200")),
+            max_concurrent_samples=int(os.getenv("PROFILING__MAX_CONCURRENT_SAMPLES", "2")),
+        ),
+        logging=LoggingConfig(
+            level=os.getenv("LOGGING__LEVEL", "INFO").upper(),
+            format=os.getenv("LOGGING__FORMAT", "json").lower(),
+            queue_size=int(os.getenv("LOGGING__QUEUE_SIZE", "10000")),
+            rate_limit_per_second=float(os.getenv("LOGGING__RATE_LIMIT_PER_SECOND", "20")),
+            rate_limit_burst=int(os.getenv("LOGGING__RATE_LIMIT_BURST", "50")),
         )
     )
 
@@ -0,0 +1,11 @@
+import argparse
+from src.services.retention_service import retention_service
+from src.monitoring.metrics import register_mongo_listener
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chạy một lượt retention: archive notification READ cũ, dọn summary hết hạn")
+    parser.parse_args()
+
+    register_mongo_listener()
+    retention_service.ensure_indexes()
+    print(f"Retention: {retention_service.compact()}")
@@ -0,0 +1,315 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Optional
+
+import httpx
+from config.settings import settings
+from src.monitoring.metrics import appointment_circuit_open, appointment_request_duration
+from src.monitoring.profiling import profiler
+
+def _endpoint(url: str) -> str:
+    # Bỏ appointment_id khỏi path để slow log và breakdown không tách theo từng appointment
+    return "GET /appointments/{id}" if url.count("/") > 1 else f"GET {url}"
+
+class TTLCache:
+    """LRU cache có giới hạn kích thước, mỗi entry hết hạn sau `ttl` giây. Thread-safe."""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key) -> tuple[bool, object]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return True, entry[1]
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return False, None
+
+    def set(self, key, value):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+class CircuitOpenError(Exception):
+    pass
+
+class SelectorLookupError(Exception):
+    """appointment-service không trả về được danh sách lịch khám cho selector của broadcast."""
+
+class CircuitBreaker:
+    """
+    Ngắt các lời gọi appointment-service sau `failure_threshold` lỗi liên tiếp.
+
+    Khi mở, mọi lời gọi fail ngay trong `reset_timeout` giây; sau đó cho đúng một lời gọi
+    thử (half-open): thành công thì đóng lại, lỗi thì mở thêm một chu kỳ nữa. Thread-safe.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if self._probing or time.monotonic() - self._opened_at < self.reset_timeout:
+            return "open"
+        return "half_open"
+
+    def before_call(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if self._probing or time.monotonic() - self._opened_at < self.reset_timeout:
+                raise CircuitOpenError("appointment-service circuit is open")
+            self._probing = True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+class AppointmentClient:
+    """
+    Tra cứu appointment_id -> patient_id từ appointment-service.
+
+    Dùng chung một HTTP client có keep-alive, cache kết quả theo TTL/LRU và gộp
+    các lần miss đồng thời cho cùng một id thành một request duy nhất (single-flight).
+    Lỗi mạng và 5xx được đếm bởi circuit breaker; khi breaker mở, lookup raise
+    CircuitOpenError ngay thay vì chờ timeout.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        timeout: float,
+        max_connections: int,
+        cache: TTLCache,
+        breaker: Optional[CircuitBreaker] = None
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.cache = cache
+        self.breaker = breaker or CircuitBreaker(failure_threshold=5, reset_timeout=30.0)
+        self._client: Optional[httpx.Client] = None
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._inflight: dict[int, Future] = {}
+        self._async_inflight: dict[int, asyncio.Future] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls) -> "AppointmentClient":
+        cfg = settings.appointment_service
+        return cls(
+            base_url=cfg.endpoint,
+            timeout=cfg.timeout,
+            max_connections=cfg.max_connections,
+            cache=TTLCache(max_size=cfg.cache_max_size, ttl=cfg.cache_ttl_seconds),
+            breaker=CircuitBreaker(cfg.breaker_failure_threshold, cfg.breaker_reset_seconds)
+        )
+
+    @property
+    def client(self) -> httpx.Client:
+        if self._client is None:
+            self._client = httpx.Client(base_url=self.base_url, timeout=self.timeout, limits=self.limits)
+        return self._client
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout, limits=self.limits)
+        return self._async_client
+
+    def prime(self, appointment_id: int, patient_id: int):
+        """Nạp sẵn cache từ các event đã mang sẵn patient_id (vd. appointment_confirmed)."""
+        self.cache.set(appointment_id, patient_id)
+
+    def get_patient_id(self, appointment_id: int) -> Optional[int]:
+        """Trả về patient_id, None nếu appointment không tồn tại. Lỗi mạng, 5xx và CircuitOpenError được raise."""
+        found, patient_id = self.cache.get(appointment_id)
+        if found:
+            return patient_id
+
+        with self._lock:
+            future = self._inflight.get(appointment_id)
+            leader = future is None
+            if leader:
+                future = self._inflight[appointment_id] = Future()
+        if not leader:
+            return future.result()
+
+        try:
+            patient_id = self._fetch(appointment_id)
+            if patient_id is not None:
+                self.cache.set(appointment_id, patient_id)
+            future.set_result(patient_id)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(appointment_id, None)
+        return patient_id
+
+    async def get_patient_id_async(self, appointment_id: int) -> Optional[int]:
+        found, patient_id = self.cache.get(appointment_id)
+        if found:
+            return patient_id
+
+        future = self._async_inflight.get(appointment_id)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = self._async_inflight[appointment_id] = asyncio.get_running_loop().create_future()
+        try:
+            patient_id = await self._fetch_async(appointment_id)
+            if patient_id is not None:
+                self.cache.set(appointment_id, patient_id)
+            future.set_result(patient_id)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Đánh dấu exception đã được đọc để không bị log khi không có caller nào đang chờ
+            future.exception()
+            raise
+        finally:
+            self._async_inflight.pop(appointment_id, None)
+        return patient_id
+
+    def find_patient_ids(self, doctor_name: str, appointment_date: str) -> list[int]:
+        """
+        patient_id của các lịch khám với bác sĩ `doctor_name` vào ngày `appointment_date` (không cache).
+
+        Giả định appointment-service có `GET /appointments?doctor_name=&appointment_date=` trả về danh
+        sách appointment (mỗi phần tử có patient_id); endpoint này chưa được xác nhận, nên selector của
+        broadcast chỉ đi qua hàm này để đổi contract ở một chỗ. 400/404 hoặc body không phải danh sách
+        raise SelectorLookupError để job broadcast FAILED kèm lý do.
+        """
+        self.breaker.before_call()
+        params = {"doctor_name": doctor_name, "appointment_date": appointment_date}
+        try:
+            resp = self._timed(lambda url: self.client.get(url, params=params), "/appointments")
+            if resp.status_code >= 500:
+                resp.raise_for_status()
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        if resp.status_code in (400, 404):
+            # Endpoint chưa có hoặc không nhận query này: báo lỗi rõ thay vì coi như không có bệnh nhân nào
+            raise SelectorLookupError(f"appointment-service GET /appointments returned {resp.status_code}: {resp.text[:200]}")
+        resp.raise_for_status()
+        appointments = resp.json()
+        if not isinstance(appointments, list):
+            raise SelectorLookupError(f"appointment-service GET /appointments returned {type(appointments).__name__}, expected a list")
+        return [appointment["patient_id"] for appointment in appointments]
+
+    def _fetch(self, appointment_id: int) -> Optional[int]:
+        self.breaker.before_call()
+        try:
+            patient_id = self._parse(self._timed(self.client.get, f"/appointments/{appointment_id}"))
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return patient_id
+
+    async def _fetch_async(self, appointment_id: int) -> Optional[int]:
+        self.breaker.before_call()
+        try:
+            patient_id = self._parse(await self._timed_async(self.async_client.get, f"/appointments/{appointment_id}"))
+        except BaseException:
+            # Gồm cả CancelledError, để lời gọi thử half-open không bị treo
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return patient_id
+
+    @staticmethod
+    def _timed(get, url: str) -> httpx.Response:
+        start, outcome = time.perf_counter(), "error"
+        try:
+            resp = get(url)
+            outcome = str(resp.status_code)
+            return resp
+        finally:
+            elapsed = time.perf_counter() - start
+            appointment_request_duration.observe(elapsed, outcome)
+            profiler.record("appointment", _endpoint(url), elapsed)
+
+    @staticmethod
+    async def _timed_async(get, url: str) -> httpx.Response:
+        start, outcome = time.perf_counter(), "error"
+        try:
+            resp = await get(url)
+            outcome = str(resp.status_code)
+            return resp
+        finally:
+            elapsed = time.perf_counter() - start
+            appointment_request_duration.observe(elapsed, outcome)
+            profiler.record("appointment", _endpoint(url), elapsed)
+
+    def stats(self) -> dict:
+        return self.cache.stats()
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
+    @staticmethod
+    def _parse(resp: httpx.Response) -> Optional[int]:
+        # 5xx là lỗi của appointment-service (được retry), các status khác coi như không tìm thấy
+        if resp.status_code >= 500:
+            resp.raise_for_status()
+        if resp.status_code != 200:
+            return None
+        return resp.json()["patient_id"]
+
+appointment_client = AppointmentClient.from_settings()
+appointment_circuit_open.set_function(lambda: int(appointment_client.breaker.state == "open"))
@@ -0,0 +1,16 @@
+import argparse
+from config import settings
+from src.messaging.worker_pool import Supervisor
+from src.monitoring.logs import configure_logging
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Chạy N process consumer (tách khỏi uvicorn), event được chia theo lịch khám bằng consistent hashing"
+    )
+    parser.add_argument("--workers", type=int, default=settings.rabbitmq.consumer_workers, help="Số worker process")
+    args = parser.parse_args()
+
+    print("RabbitMQ host:", settings.rabbitmq.host)
+    print("Consumer workers:", args.workers)
+    configure_logging()
+    Supervisor(args.workers).run()
@@ -0,0 +1,122 @@
+import secrets
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from config.settings import settings
+from src.dto.notification_dto import (
+    BroadcastJobDTO,
+    BroadcastRequestDTO,
+    DeadLetterQueueDTO,
+    DeadLetterReplayDTO,
+    ProfileSummaryDTO,
+    ProfilingStatusDTO,
+    ProfilingUpdateDTO,
+    SlowOperationDTO
+)
+from src.messaging import retry
+from src.models.broadcast_job import BroadcastJob
+from src.monitoring.profiling import profiler
+from src.services.broadcast_service import broadcast_service
+from src.services.notification_export import export_headers, export_stream
+
+ADMIN_TOKEN_HEADER = "X-Admin-Token"
+
+def require_admin(token: Optional[str] = Header(default=None, alias=ADMIN_TOKEN_HEADER)):
+    """Mọi route /admin (replay DLQ, broadcast, export mọi user, profiling) cần token APP__ADMIN_TOKEN."""
+    expected = settings.app.admin_token
+    # Chưa cấu hình token thì tắt hẳn thay vì mở cho bất kỳ ai gọi tới service
+    if not expected:
+        raise HTTPException(status_code=403, detail="Admin API disabled: APP__ADMIN_TOKEN is not set")
+    if token is None or not secrets.compare_digest(token.encode(), expected.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+# Các endpoint dùng pika BlockingConnection nên khai báo def thường để FastAPI chạy trên threadpool
+@router.get("/dead-letters", response_model=DeadLetterQueueDTO)
+def get_dead_letters():
+    try:
+        messages = retry.dead_letter_count()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"RabbitMQ unavailable: {e!r}")
+    return DeadLetterQueueDTO(queue=settings.rabbitmq.dead_letter_queue, messages=messages)
+
+@router.post("/dead-letters/replay", response_model=DeadLetterReplayDTO)
+def replay_dead_letters(limit: int = Query(100, ge=1, le=10000)):
+    """Đưa event trong dead-letter queue về queue nguồn để consumer xử lý lại (vd. sau khi appointment-service hồi phục)."""
+    try:
+        return DeadLetterReplayDTO(**retry.replay_dead_letters(limit))
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"RabbitMQ unavailable: {e!r}")
+
+def _broadcast_job_dto(job: BroadcastJob) -> BroadcastJobDTO:
+    return BroadcastJobDTO(
+        job_id=job.id,
+        title=job.title,
+        status=job.status,
+        total=job.total,
+        written=job.written,
+        skipped=job.skipped,
+        progress=round((job.written + job.skipped) / job.total, 4) if job.total else None,
+        error=job.error,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at
+    )
+
+@router.post("/broadcasts", status_code=202, response_model=BroadcastJobDTO)
+def create_broadcast(dto: BroadcastRequestDTO):
+    """Gửi một notification tới nhiều user; job chạy nền, theo dõi tiến độ qua GET /admin/broadcasts/{job_id}."""
+    try:
+        job = broadcast_service.submit(dto, job_id=dto.broadcast_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _broadcast_job_dto(job)
+
+@router.get("/broadcasts/{job_id}", response_model=BroadcastJobDTO)
+def get_broadcast(job_id: str):
+    job = broadcast_service.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Broadcast job not found")
+    return _broadcast_job_dto(job)
+
+@router.get("/notifications/export")
+async def export_notifications(created_from: datetime, created_to: datetime, compress: bool = False):
+    """Notification của mọi user có created_at trong [created_from, created_to), dạng NDJSON."""
+    if created_from >= created_to:
+        raise HTTPException(status_code=400, detail="created_from must be before created_to")
+    media_type, headers = export_headers(f"notifications-{created_from:%Y%m%d}-{created_to:%Y%m%d}", compress)
+    stream = export_stream(None, created_from, created_to, compress=compress)
+    return StreamingResponse(stream, media_type=media_type, headers=headers)
+
+@router.get("/profiling", response_model=ProfilingStatusDTO)
+async def get_profiling():
+    return profiler.status()
+
+@router.put("/profiling", response_model=ProfilingStatusDTO)
+async def update_profiling(dto: ProfilingUpdateDTO):
+    """Bật/tắt profiling và slow log lúc chạy (chỉ áp dụng cho process API này)."""
+    profiler.configure(enabled=dto.enabled, sample_rate=dto.sample_rate, slow_threshold_ms=dto.slow_threshold_ms)
+    return profiler.status()
+
+@router.get("/profiling/profiles", response_model=list[ProfileSummaryDTO])
+async def list_profiles():
+    return [ProfileSummaryDTO(**profile) for profile in reversed(profiler.profiles)]
+
+@router.get("/profiling/profiles/{profile_id}", response_class=PlainTextResponse)
+async def get_profile(profile_id: str):
+    """
+    Collapsed stack (một dòng `frame;frame;... count`), dùng trực tiếp với flamegraph.pl hoặc speedscope.
+
+    Chỉ có stack của route sync (threadpool) và event handler của consumer thread; route async và
+    consumer mode async chạy trên event loop dùng chung với request khác nên không được lấy mẫu (samples = 0).
+    """
+    profile = profiler.get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(profile["collapsed"])
+
+@router.get("/profiling/slow", response_model=list[SlowOperationDTO])
+async def list_slow_operations(limit: int = Query(50, ge=1, le=1000)):
+    return list(reversed(profiler.slow_operations))[:limit]
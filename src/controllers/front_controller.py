@@ -1,25 +1,80 @@
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-import logging
+import time
 
 from src.controllers.notification_controller import router
+from src.controllers.stream_controller import router as stream_router
+from src.controllers.admin_controller import router as admin_router
 from config.settings import settings
-from src.messaging.consumer import start_consumer
+from config.resources import resources
+from src.messaging.consumer import run_consumer
+from src.services.notification_service import NotificationService
+from src.clients.appointment_client import appointment_client
+from src.repositories.async_notification_repository import close_async_client
+from src.services.email_dispatcher import email_dispatcher
+from src.services.broadcast_service import broadcast_service
+from src.services.notification_hub import notification_hub
+from src.services.retention_service import retention_service
+from src.services.summary_reconciler import summary_reconciler
+from src.monitoring import metrics
+from src.monitoring.logs import configure_logging, correlation_id, get_logger, new_correlation_id
+from src.monitoring.profiling import profiler
+import asyncio
 import threading
 
-# logging config
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+# logging config: JSON ra stdout qua thread nền (LOGGING__*)
+configure_logging()
+logger = get_logger("app")
+
+CORRELATION_HEADER = "X-Correlation-ID"
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup logic
     logger.info(f"Starting {settings.mongo.database} Notification Service")
-    # Start RabbitMQ consumer in background thread
-    threading.Thread(target=start_consumer, daemon=True).start()
+    metrics.register_mongo_listener()
+    if settings.mongo.backend == "async":
+        await NotificationService().ensure_indexes_async()
+    else:
+        # Khởi tạo MongoClient tường minh thay vì lúc import
+        await asyncio.to_thread(resources.init, "mongo")
+        await asyncio.to_thread(NotificationService().ensure_indexes)
+    notification_hub.bind(asyncio.get_running_loop())
+    email_dispatcher.start()
+    # Worker broadcast quét lại job QUEUED / mất heartbeat còn sót từ lần chạy trước
+    broadcast_service.start()
+    retention_service.start()
+    summary_reconciler.start()
+    consumer, consumer_task = None, None
+    if settings.rabbitmq.consumer_mode == "async":
+        # Consumer chạy như task trên event loop của app
+        from src.messaging.async_consumer import AsyncConsumer
+        consumer = AsyncConsumer(concurrency=settings.rabbitmq.consumer_concurrency)
+        consumer_task = asyncio.create_task(consumer.run())
+    elif settings.rabbitmq.consumer_mode == "thread":
+        # Start RabbitMQ consumer in background thread
+        threading.Thread(target=run_consumer, daemon=True).start()
+    else:
+        # Consumer process đẩy notification qua fanout exchange; hub của app nhận lại để push tới client
+        from src.messaging.push_relay import PushRelayConsumer
+        logger.info("Consumers run as separate processes (python -m src.consumer_pool)")
+        consumer = PushRelayConsumer()
+        consumer_task = asyncio.create_task(consumer.run())
     yield
     logger.info("Shutting down Notification Service")
+    if consumer is not None:
+        await consumer.stop()
+        consumer_task.cancel()
+        await asyncio.gather(consumer_task, return_exceptions=True)
+    await asyncio.to_thread(email_dispatcher.stop)
+    await asyncio.to_thread(broadcast_service.stop)
+    await asyncio.to_thread(retention_service.stop)
+    await asyncio.to_thread(summary_reconciler.stop)
+    appointment_client.close()
+    await appointment_client.aclose()
+    await close_async_client()
+    await asyncio.to_thread(resources.close_all)
 
 app = FastAPI(
     title="Notification Service",
@@ -35,10 +90,34 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", CORRELATION_HEADER],
 )
 
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    # Id do gateway/service gọi gửi kèm được giữ nguyên để nối log giữa các service
+    request_id = request.headers.get(CORRELATION_HEADER, "")[:128] or new_correlation_id()
+    token = correlation_id.set(request_id)
+    with profiler.operation("route", request.method) as operation:
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            response.headers[CORRELATION_HEADER] = request_id
+            return response
+        finally:
+            correlation_id.reset(token)
+            # Dùng route template (vd. /notifications/{user_id}) để không sinh label theo từng user
+            route = request.scope.get("route")
+            path = route.path if route is not None else "unmatched"
+            metrics.http_request_duration.observe(time.perf_counter() - start, request.method, path, status)
+            operation.name = f"{request.method} {path}"
+
 # include notification router
 app.include_router(router)
+app.include_router(stream_router)
+app.include_router(admin_router)
 
 @app.get("/")
 async def root():
@@ -49,5 +128,13 @@ async def health_check():
     return {
         "status": "healthy",
         "mongo_db": settings.mongo.database,
-        "rabbitmq": settings.rabbitmq.host
+        "rabbitmq": settings.rabbitmq.host,
+        "appointment_cache": appointment_client.stats(),
+        "appointment_circuit": appointment_client.breaker.state,
+        "push_connections": notification_hub.connection_count(),
+        "resources": resources.status()
     }
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    return Response(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
@@ -1,50 +1,143 @@
-from fastapi import APIRouter, Body
+from fastapi import APIRouter, Body, Header, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from datetime import datetime
+from typing import Literal, Optional
+from pydantic import EmailStr
+import hashlib
+from config.settings import settings
 from src.services.notification_service import NotificationService
-from src.dto.notification_dto import NotificationResponseDTO, MarkReadDTO
-
-import smtplib
-from email.mime.text import MIMEText
+from src.dto.notification_dto import (
+    NotificationResponseDTO,
+    MarkReadDTO,
+    BulkMarkReadDTO,
+    MarkAllReadDTO,
+    MarkReadResultDTO,
+    NotificationHeaderDTO,
+    NotificationSummaryDTO,
+    EmailJobDTO,
+    dump_notifications
+)
+from src.models.email_job import EmailJob
+from src.services.email_dispatcher import email_dispatcher
+from src.services.notification_export import export_headers, export_stream
 
 router = APIRouter(prefix="/notifications", tags=["notifications"])
 service = NotificationService()
 
+async def _run(sync_method, async_method, *args, **kwargs):
+    # MONGO__BACKEND=async chạy thẳng trên event loop, sync thì đẩy sang threadpool
+    if settings.mongo.backend == "async":
+        return await async_method(*args, **kwargs)
+    return await run_in_threadpool(sync_method, *args, **kwargs)
+
+@router.get("/{user_id}/summary", response_model=NotificationSummaryDTO)
+async def get_summary(user_id: int):
+    summary = await _run(service.get_summary, service.get_summary_async, user_id)
+    return NotificationSummaryDTO(
+        user_id=user_id,
+        unread_count=summary["unread_count"],
+        latest=[
+            NotificationHeaderDTO(
+                id=str(header["notification_id"]),
+                title=header["title"],
+                status=header["status"],
+                created_at=header["created_at"]
+            )
+            for header in summary["latest"]
+        ]
+    )
+
+def _list_etag(user_id: int, version: int, *query_params) -> str:
+    query = hashlib.blake2b("|".join(str(param) for param in query_params).encode(), digest_size=8).hexdigest()
+    return f'"{user_id}-{version}-{query}"'
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
 @router.get("/{user_id}", response_model=list[NotificationResponseDTO])
-def list_notifications(user_id: int):
-    docs = service.get_notifications_for_user(user_id)
-    return [
-        NotificationResponseDTO(
-            id=str(doc["_id"]),
-            user_id=doc["user_id"],
-            title=doc["title"],
-            message=doc["message"],
-            prescription_id=doc["prescription_id"],
-            appointment_id=doc["appointment_id"],
-            dispense_id=doc["dispense_id"],
-            status=doc["status"],
-            created_at=doc["created_at"]
+async def list_notifications(
+    user_id: int,
+    limit: int = Query(50, ge=1, le=200),
+    before: Optional[str] = None,
+    status: Optional[Literal["UNREAD", "READ"]] = None,
+    include_archive: bool = False,
+    if_none_match: Optional[str] = Header(None)
+):
+    # Version của user tăng khi có notification mới hoặc mark-read, nên client đang có
+    # bản mới nhất được trả 304 mà không cần query collection notifications
+    version = await _run(service.get_version, service.get_version_async, user_id)
+    etag = _list_etag(user_id, version, limit, before, status, include_archive)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    try:
+        docs, next_cursor = await _run(
+            service.get_notifications_for_user,
+            service.get_notifications_for_user_async,
+            user_id, limit=limit, before=before, status=status, include_archive=include_archive
         )
-        for doc in docs
-    ]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Cursor của trang kế tiếp, truyền lại qua ?before=
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    return Response(dump_notifications(docs), media_type="application/json", headers=headers)
+
+@router.get("/{user_id}/export")
+async def export_notifications(
+    user_id: int,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    include_archive: bool = True,
+    compress: bool = False
+):
+    """Toàn bộ lịch sử notification của user dạng NDJSON (gzip nếu `compress`), stream từ cursor Mongo."""
+    media_type, headers = export_headers(f"notifications-{user_id}", compress)
+    stream = export_stream(user_id, created_from, created_to, include_archive=include_archive, compress=compress)
+    return StreamingResponse(stream, media_type=media_type, headers=headers)
 
 @router.post("/read")
-def mark_read(dto: MarkReadDTO):
-    service.mark_as_read(dto.notification_id)
+async def mark_read(dto: MarkReadDTO):
+    try:
+        found = await _run(service.mark_as_read, service.mark_as_read_async, dto.notification_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not found:
+        raise HTTPException(status_code=404, detail="Notification not found")
     return {"status": "ok"}
 
-@router.post("/send-email")
-def send_email(to: str = Body(...), subject: str = Body(...), text: str = Body(...)):
-    sender = "dangkhoaly431@gmail.com"
-    password = "fjpl nyoi fcfa wzjs"
+@router.post("/read/bulk", response_model=MarkReadResultDTO)
+async def mark_read_bulk(dto: BulkMarkReadDTO):
+    return await _run(service.mark_many_as_read, service.mark_many_as_read_async, dto.notification_ids)
 
-    msg = MIMEText(text)
-    msg["Subject"] = subject
-    msg["From"] = sender
-    msg["To"] = to
+@router.post("/{user_id}/read-all", response_model=MarkReadResultDTO)
+async def mark_all_read(user_id: int, dto: Optional[MarkAllReadDTO] = None):
+    return await _run(service.mark_all_as_read, service.mark_all_as_read_async, user_id, dto.up_to if dto else None)
 
-    try:
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465) as server:
-            server.login(sender, password)
-            server.sendmail(sender, [to], msg.as_string())
-        return {"message": "Email sent successfully!"}
-    except Exception as e:
-        return {"error": str(e)}
+def _email_job_dto(job: EmailJob) -> EmailJobDTO:
+    return EmailJobDTO(
+        job_id=job.id,
+        status=job.status,
+        attempts=job.attempts,
+        error=job.error,
+        created_at=job.created_at,
+        sent_at=job.sent_at
+    )
+
+@router.post("/send-email", status_code=202, response_model=EmailJobDTO)
+def send_email(to: EmailStr = Body(...), subject: str = Body(...), text: str = Body(...)):
+    # Chỉ enqueue; email được gửi bởi worker nền của email_dispatcher
+    return _email_job_dto(email_dispatcher.enqueue(to, subject, text))
+
+@router.get("/email-jobs/{job_id}", response_model=EmailJobDTO)
+def get_email_job(job_id: str):
+    job = email_dispatcher.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Email job not found")
+    return _email_job_dto(job)
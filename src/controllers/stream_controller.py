@@ -0,0 +1,59 @@
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from config.settings import settings
+from src.services.notification_hub import Subscription, notification_hub
+
+router = APIRouter(prefix="/notifications", tags=["notifications"])
+
+async def _next_event(subscription: Subscription) -> Optional[str]:
+    # None nghĩa là hết khoảng heartbeat mà chưa có notification mới
+    try:
+        return await asyncio.wait_for(subscription.queue.get(), timeout=settings.push.heartbeat_seconds)
+    except asyncio.TimeoutError:
+        return None
+
+@router.get("/{user_id}/stream")
+async def stream_notifications(user_id: int, request: Request):
+    """Server-Sent Events: đẩy notification mới của user ngay khi được lưu."""
+    subscription = notification_hub.subscribe(user_id)
+
+    async def event_stream():
+        try:
+            yield "retry: 5000\n\n"
+            while not subscription.closed:
+                payload = await _next_event(subscription)
+                if payload is None:
+                    if await request.is_disconnected():
+                        break
+                    yield ": heartbeat\n\n"
+                elif not subscription.closed:
+                    yield f"event: notification\ndata: {payload}\n\n"
+        finally:
+            notification_hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.websocket("/{user_id}/ws")
+async def notification_socket(websocket: WebSocket, user_id: int):
+    await websocket.accept()
+    subscription = notification_hub.subscribe(user_id)
+    try:
+        while not subscription.closed:
+            payload = await _next_event(subscription)
+            if payload is None:
+                await websocket.send_json({"type": "heartbeat"})
+            elif not subscription.closed:
+                await websocket.send_text(payload)
+        # Bị hub ngắt vì đọc chậm: client nên kết nối lại và tải lại danh sách
+        await websocket.close(code=1013)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        notification_hub.unsubscribe(subscription)
@@ -1,6 +1,13 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
 from typing import Optional
+import json
+from src.models.events import BroadcastData
+
+try:
+    import orjson
+except ImportError:  # orjson là dependency (pyproject); fallback stdlib cho môi trường cài tay thiếu orjson
+    orjson = None
 
 class NotificationResponseDTO(BaseModel):
     id: str
@@ -8,10 +15,137 @@ class NotificationResponseDTO(BaseModel):
     title: str
     message: str
     prescription_id: Optional[int] = None
-    appointment_id: int
+    appointment_id: Optional[int] = None
     dispense_id: Optional[int] = None
     status: str
     created_at: datetime
 
+def notification_row(doc: dict) -> dict:
+    """Document Mongo (đã project) -> dict cùng field và thứ tự với NotificationResponseDTO."""
+    return {
+        "id": str(doc["_id"]),
+        "user_id": doc["user_id"],
+        "title": doc["title"],
+        "message": doc["message"],
+        "prescription_id": doc.get("prescription_id"),
+        "appointment_id": doc.get("appointment_id"),
+        "dispense_id": doc.get("dispense_id"),
+        "status": doc["status"],
+        "created_at": doc["created_at"],
+    }
+
+def dump_notifications(docs: list[dict]) -> bytes:
+    """Serialize thẳng ra JSON bytes, không dựng model Pydantic cho từng dòng."""
+    rows = [notification_row(doc) for doc in docs]
+    if orjson is not None:
+        return orjson.dumps(rows)
+    return json.dumps(rows, default=datetime.isoformat, ensure_ascii=False, separators=(",", ":")).encode()
+
+def dump_notification(doc: dict) -> str:
+    """Một notification cùng dạng với phần tử của danh sách, dùng cho push SSE/WebSocket."""
+    row = notification_row(doc)
+    if orjson is not None:
+        return orjson.dumps(row).decode()
+    return json.dumps(row, default=datetime.isoformat, ensure_ascii=False, separators=(",", ":"))
+
+def dump_ndjson_line(doc: dict) -> bytes:
+    """Một dòng NDJSON cho export: các field của API cùng field truy vết nguồn gốc."""
+    row = notification_row(doc)
+    row["event_id"] = doc.get("event_id")
+    row["kind"] = doc.get("kind")
+    row["digest_count"] = doc.get("digest_count")
+    if orjson is not None:
+        return orjson.dumps(row, option=orjson.OPT_APPEND_NEWLINE)
+    return json.dumps(row, default=datetime.isoformat, ensure_ascii=False, separators=(",", ":")).encode() + b"\n"
+
 class MarkReadDTO(BaseModel):
     notification_id: str
+
+class BulkMarkReadDTO(BaseModel):
+    notification_ids: list[str] = Field(..., min_length=1, max_length=1000)
+
+class MarkAllReadDTO(BaseModel):
+    up_to: Optional[datetime] = None
+
+class MarkReadErrorDTO(BaseModel):
+    notification_id: str
+    error: str
+
+class MarkReadResultDTO(BaseModel):
+    matched: int
+    modified: int
+    errors: list[MarkReadErrorDTO] = []
+
+class NotificationHeaderDTO(BaseModel):
+    id: str
+    title: str
+    status: str
+    created_at: datetime
+
+class NotificationSummaryDTO(BaseModel):
+    user_id: int
+    unread_count: int
+    latest: list[NotificationHeaderDTO]
+
+class EmailJobDTO(BaseModel):
+    job_id: str
+    status: str
+    attempts: int = 0
+    error: Optional[str] = None
+    created_at: datetime
+    sent_at: Optional[datetime] = None
+
+class DeadLetterQueueDTO(BaseModel):
+    queue: str
+    messages: int
+
+class DeadLetterReplayDTO(BaseModel):
+    replayed: int
+    skipped: int
+    remaining: int
+
+class BroadcastRequestDTO(BroadcastData):
+    # Client tự đặt id để gửi lại request an toàn (cùng id không tạo broadcast thứ hai)
+    broadcast_id: Optional[str] = Field(default=None, min_length=1, max_length=100)
+
+class BroadcastJobDTO(BaseModel):
+    job_id: str
+    title: str
+    status: str
+    total: Optional[int] = None
+    written: int = 0
+    skipped: int = 0
+    progress: Optional[float] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+class ProfilingUpdateDTO(BaseModel):
+    enabled: Optional[bool] = None
+    sample_rate: Optional[float] = Field(default=None, ge=0, le=1)
+    slow_threshold_ms: Optional[float] = Field(default=None, ge=0)
+
+class ProfilingStatusDTO(BaseModel):
+    enabled: bool
+    sample_rate: float
+    slow_threshold_ms: float
+    interval_ms: float
+    profiles: int
+    slow_operations: int
+
+class ProfileSummaryDTO(BaseModel):
+    id: str
+    kind: str
+    name: str
+    duration_ms: float
+    samples: int
+    created_at: datetime
+
+class SlowOperationDTO(BaseModel):
+    kind: str
+    name: str
+    duration_ms: float
+    at: datetime
+    # part (vd. mongo.find, appointment.GET /appointments/{id}, self) -> {"calls", "ms"}
+    breakdown: Optional[dict[str, dict[str, float]]] = None
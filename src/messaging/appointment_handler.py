@@ -1,23 +1,34 @@
 from src.services.notification_service import NotificationService
+from src.clients.appointment_client import appointment_client
+from src.models.events import AppointmentCancelledEvent, AppointmentConfirmedEvent
+from config.settings import settings
 
 service = NotificationService()
 
-def handle_appointment_confirmed(event: dict):
-    data = event["data"]
-    service.create_notification(
-        user_id=data["patient_id"],
-        appointment_id=data["appointment_id"],
+def handle_appointment_confirmed(event: AppointmentConfirmedEvent):
+    data = event.data
+    # Event đã có sẵn patient_id: nạp cache để prescription_ready sau đó không phải gọi appointment-service
+    if settings.appointment_service.prime_cache:
+        appointment_client.prime(data.appointment_id, data.patient_id)
+    return service.build_notification(
+        user_id=data.patient_id,
+        appointment_id=data.appointment_id,
         title="Lịch khám đã được xác nhận",
-        message=f"Lịch khám với bác sĩ {data['doctor_name']} vào {data['appointment_date']} {data['appointment_time']} đã được xác nhận."
+        message=f"Lịch khám với bác sĩ {data.doctor_name} vào {data.appointment_date} {data.appointment_time} đã được xác nhận."
     )
-    print(f"✅ Notification saved for confirmed appointment {data['appointment_id']}")
 
-def handle_appointment_cancelled(event: dict):
-    data = event["data"]
-    service.create_notification(
-        user_id=data["patient_id"],
-        appointment_id=data["appointment_id"],
+def handle_appointment_cancelled(event: AppointmentCancelledEvent):
+    data = event.data
+    return service.build_notification(
+        user_id=data.patient_id,
+        appointment_id=data.appointment_id,
         title="Lịch khám đã bị hủy",
-        message=f"Lịch khám với bác sĩ {data['doctor_name']} vào {data['appointment_date']} {data['appointment_time']} đã bị hủy. Lý do: {data.get('cancellation_reason')}"
+        message=f"Lịch khám với bác sĩ {data.doctor_name} vào {data.appointment_date} {data.appointment_time} đã bị hủy. Lý do: {data.cancellation_reason}"
     )
-    print(f"✅ Notification saved for cancelled appointment {data['appointment_id']}")
+
+# Các handler appointment không có I/O, bản async chỉ để dùng chung dispatch với async consumer
+async def handle_appointment_confirmed_async(event: AppointmentConfirmedEvent):
+    return handle_appointment_confirmed(event)
+
+async def handle_appointment_cancelled_async(event: AppointmentCancelledEvent):
+    return handle_appointment_cancelled(event)
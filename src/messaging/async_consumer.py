@@ -0,0 +1,170 @@
+import asyncio
+import functools
+from typing import Optional
+
+from pika.adapters.asyncio_connection import AsyncioConnection
+
+from config.settings import settings
+from src.messaging.consumer import QUEUES, QUEUE_ARGUMENTS, connection_params, handle_event_async, reconnect_backoff
+from src.messaging.retry import RetryLater, schedule_retry, topology
+from src.monitoring.logs import get_logger
+from src.monitoring.metrics import consumer_inflight
+from src.services.notification_service import NotificationService
+
+service = NotificationService()
+logger = get_logger("async_consumer")
+
+async def open_connection(closed: asyncio.Future) -> AsyncioConnection:
+    """Mở AsyncioConnection trên event loop đang chạy; `closed` nhận lý do khi connection bị đóng."""
+    loop = asyncio.get_running_loop()
+    opened = loop.create_future()
+
+    def on_open(connection):
+        opened.set_result(connection)
+
+    def on_open_error(connection, error):
+        opened.set_exception(error if isinstance(error, BaseException) else Exception(error))
+
+    def on_close(connection, reason):
+        if not closed.done():
+            closed.set_result(reason)
+
+    AsyncioConnection(
+        connection_params(),
+        on_open_callback=on_open,
+        on_open_error_callback=on_open_error,
+        on_close_callback=on_close,
+        custom_ioloop=loop
+    )
+    return await opened
+
+async def call(method, callback_arg: str = "callback", **kwargs):
+    """Chuyển các method dạng callback của pika thành awaitable."""
+    future = asyncio.get_running_loop().create_future()
+
+    def on_done(result=None, *args):
+        if not future.done():
+            future.set_result(result)
+
+    method(**{callback_arg: on_done}, **kwargs)
+    return await future
+
+class AsyncConsumer:
+    """
+    Consumer chạy như một task trên event loop của FastAPI.
+
+    Mỗi queue được giữ tối đa `concurrency` message chưa ack (basic_qos theo consumer),
+    mỗi message được xử lý trong một task riêng nên một event chậm không chặn các event khác.
+    Không có micro-batch hay digest như mode thread/process: mỗi notification được lưu ngay
+    khi event xử lý xong và message được ack riêng.
+    """
+
+    def __init__(self, concurrency: int = 10, drain_timeout: float = 10.0):
+        self.concurrency = concurrency
+        self.drain_timeout = drain_timeout
+        self._connection: Optional[AsyncioConnection] = None
+        self._channel = None
+        self._consumer_tags: list[str] = []
+        self._tasks: set[asyncio.Task] = set()
+        self._closed: Optional[asyncio.Future] = None
+        self._stopping = False
+
+    async def run(self):
+        """Consume cho tới khi stop(); mất kết nối thì kết nối lại với backoff như consumer mode thread."""
+        loop = asyncio.get_running_loop()
+        if settings.rabbitmq.digest_enabled:
+            logger.warning("RABBITMQ__DIGEST_ENABLED is ignored in async consumer mode")
+        backoff = 0.0
+        while not self._stopping:
+            started = loop.time()
+            try:
+                reason = await self._consume()
+            except Exception as e:
+                reason = e
+            if self._stopping:
+                return
+            backoff = reconnect_backoff(backoff, loop.time() - started)
+            logger.error("Consumer connection lost: %r", reason, extra={"reconnect_in_s": backoff})
+            await asyncio.sleep(backoff)
+
+    async def _consume(self):
+        """Mở connection, khai báo topology, consume và trả về lý do connection bị đóng."""
+        self._closed = asyncio.get_running_loop().create_future()
+        self._consumer_tags = []
+        self._connection = await open_connection(self._closed)
+        self._channel = await call(self._connection.channel, callback_arg="on_open_callback")
+        await call(self._channel.basic_qos, prefetch_count=self.concurrency)
+
+        for queue in QUEUES:
+            await call(self._channel.queue_declare, queue=queue, durable=True, arguments=QUEUE_ARGUMENTS)
+        for method, kwargs in topology(QUEUES):
+            await call(getattr(self._channel, method), **kwargs)
+        for queue in QUEUES:
+            self._consumer_tags.append(
+                self._channel.basic_consume(queue=queue, on_message_callback=functools.partial(self._on_message, queue))
+            )
+
+        logger.info("Waiting for notifications (async)", extra={"queues": QUEUES})
+        return await self._closed
+
+    async def stop(self):
+        """Ngừng nhận message mới, chờ các handler đang chạy xong rồi đóng connection."""
+        self._stopping = True
+        if self._channel is not None and self._channel.is_open:
+            for tag in self._consumer_tags:
+                await call(self._channel.basic_cancel, consumer_tag=tag)
+        self._consumer_tags.clear()
+
+        if self._tasks:
+            _, pending = await asyncio.wait(self._tasks, timeout=self.drain_timeout)
+            # Message của các task bị hủy được nack (requeue) nên RabbitMQ sẽ giao lại
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        if self._connection is not None and not (self._connection.is_closed or self._connection.is_closing):
+            self._connection.close()
+            await self._closed
+
+    def _on_message(self, queue: str, channel, method, properties, body):
+        consumer_inflight.inc("async")
+        task = asyncio.ensure_future(self._process(channel, queue, method.delivery_tag, properties, body))
+        self._tasks.add(task)
+        task.add_done_callback(self._on_done)
+
+    def _on_done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        consumer_inflight.dec("async")
+
+    async def _process(self, channel, queue: str, delivery_tag: int, properties, body: bytes):
+        # Message luôn được ack hoặc nack (requeue) khi task kết thúc, kể cả khi lỗi bất ngờ hay bị hủy
+        ack = False
+        notification = None
+        try:
+            try:
+                notification = await handle_event_async(body)
+            except RetryLater as e:
+                # basic_publish của channel async không chặn; message gốc được ack ngay sau đó
+                if channel.is_open:
+                    schedule_retry(channel, queue, properties, body, str(e))
+            if notification is not None and settings.mongo.backend == "async":
+                await service.create_notifications_async([notification])
+            elif notification is not None:
+                await asyncio.to_thread(service.create_notifications, [notification])
+            ack = True
+        except asyncio.CancelledError:
+            # CancelledError cũng có thể đến từ leader single-flight (get_patient_id_async) bị hủy;
+            # chỉ raise tiếp khi chính task này đang bị hủy (stop() hết drain_timeout)
+            logger.warning("Event processing cancelled, requeueing")
+            if asyncio.current_task().cancelling():
+                raise
+        except Exception:
+            logger.exception("Error processing message, requeueing", extra={"correlation_id": notification.get("event_id") if notification else None})
+        finally:
+            if channel.is_open:
+                if ack:
+                    channel.basic_ack(delivery_tag=delivery_tag)
+                else:
+                    channel.basic_nack(delivery_tag=delivery_tag, requeue=True)
+        if ack and notification is not None:
+            logger.info("Notification saved", extra={"correlation_id": notification.get("event_id"), "user_id": notification["user_id"]})
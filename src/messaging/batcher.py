@@ -0,0 +1,115 @@
+import time
+from typing import Callable, Optional
+from src.messaging.digest import DigestCoalescer
+from src.monitoring.logs import get_logger
+from src.monitoring.metrics import consumer_inflight
+from src.services.notification_service import NotificationService
+
+service = NotificationService()
+logger = get_logger("batcher")
+
+class NotificationBatcher:
+    """
+    Gom notification documents thành micro-batch và ghi bằng một insert_many.
+
+    Message chỉ được ack sau khi batch chứa nó đã được lưu, nên process chết giữa chừng
+    thì RabbitMQ sẽ giao lại các message chưa ack. Với `coalescer`, notification có thể bị
+    giữ lại để gộp thành digest; message của chúng được ack khi digest được lưu.
+    """
+
+    def __init__(
+        self,
+        channel,
+        call_later: Callable,
+        remove_timeout: Callable,
+        batch_size: int = 100,
+        max_delay: float = 0.2,
+        coalescer: Optional[DigestCoalescer] = None
+    ):
+        self.channel = channel
+        self.call_later = call_later
+        self.remove_timeout = remove_timeout
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.coalescer = coalescer
+        self.pending: list[dict] = []
+        # Tag đã xử lý xong, chờ ack cùng batch kế tiếp (không gồm tag đang giữ trong coalescer)
+        self.delivery_tags: list[int] = []
+        self._timer = None
+        self._timer_at = 0.0
+
+    @property
+    def unacked(self) -> int:
+        return len(self.delivery_tags) + (self.coalescer.size if self.coalescer else 0)
+
+    def add(self, delivery_tag: int, notification: Optional[dict]):
+        consumer_inflight.inc("thread")
+        if notification is not None and self.coalescer is not None and self.coalescer.accepts(notification):
+            self.coalescer.add(delivery_tag, notification)
+            if self.coalescer.size >= self.coalescer.max_items:
+                self.flush(force=True)
+                return
+        else:
+            # Event không tạo notification (lỗi, không có handler) vẫn được ack cùng batch
+            if notification is not None:
+                self.pending.append(notification)
+            self.delivery_tags.append(delivery_tag)
+
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+        else:
+            self._schedule()
+
+    def _schedule(self):
+        # Timer ứng với hạn sớm nhất: batch hiện tại (max_delay) hoặc nhóm digest tới hạn trước
+        now = time.monotonic()
+        due = [now + self.max_delay] if self.delivery_tags else []
+        if self.coalescer is not None and self.coalescer.next_deadline() is not None:
+            due.append(self.coalescer.next_deadline())
+        if not due:
+            return
+        at = min(due)
+        if self._timer is not None:
+            if self._timer_at <= at:
+                return
+            self.remove_timeout(self._timer)
+        self._timer, self._timer_at = self.call_later(max(0.0, at - now), self._on_timeout), at
+
+    def _on_timeout(self):
+        self._timer = None
+        self.flush()
+
+    def flush(self, force: bool = False):
+        """Lưu batch hiện tại cùng các digest đã tới hạn; `force` xả luôn các nhóm đang giữ (khi dừng consumer)."""
+        if self._timer is not None:
+            self.remove_timeout(self._timer)
+            self._timer = None
+
+        batch, delivery_tags = self.pending, self.delivery_tags
+        self.pending, self.delivery_tags = [], []
+        if self.coalescer is not None:
+            digests, released = self.coalescer.pop_due(force)
+            batch += digests
+            delivery_tags += released
+        if delivery_tags:
+            consumer_inflight.dec("thread", amount=len(delivery_tags))
+            try:
+                service.create_notifications(batch)
+            except Exception:
+                logger.exception("Error saving notification batch", extra={"batch_size": len(batch)})
+                self._settle(delivery_tags, self.channel.basic_nack, requeue=True)
+            else:
+                self._settle(delivery_tags, self.channel.basic_ack)
+                if batch:
+                    logger.info("Saved notification batch", extra={"batch_size": len(batch), "acked": len(delivery_tags)})
+        self._schedule()
+
+    def _settle(self, delivery_tags: list[int], settle: Callable, **kwargs):
+        # Tag nhỏ hơn mọi tag còn giữ trong coalescer được ack gộp (multiple=True), phần còn lại từng cái
+        held = self.coalescer.oldest_tag() if self.coalescer is not None else None
+        delivery_tags = sorted(delivery_tags)
+        below = [tag for tag in delivery_tags if held is None or tag < held]
+        if below:
+            settle(delivery_tag=below[-1], multiple=True, **kwargs)
+        for tag in delivery_tags[len(below):]:
+            settle(delivery_tag=tag, **kwargs)
@@ -0,0 +1,12 @@
+import asyncio
+
+from src.models.events import BroadcastEvent
+from src.services.broadcast_service import broadcast_service
+
+def handle_broadcast(event: BroadcastEvent):
+    # Job chạy nền theo chunk; event id là id của job nên event giao lại không tạo job mới
+    broadcast_service.submit(event.data, job_id=str(event.event_id))
+    return None
+
+async def handle_broadcast_async(event: BroadcastEvent):
+    return await asyncio.to_thread(handle_broadcast, event)
@@ -1,54 +1,257 @@
-import pika, json
+import asyncio
+import time
+from typing import Optional, Union
 from config.settings import settings
-from src.messaging.prescription_handler import handle_prescription_ready
+from src.monitoring.logs import correlation_id, get_logger
+from src.monitoring.metrics import dedup_total, record_event, rejected_total
+from src.monitoring.profiling import profiler
+from src.services.event_dedup import recent_events
+from src.services.notification_hub import notification_hub
+from src.messaging.batcher import NotificationBatcher
+from src.messaging.digest import DigestCoalescer
+from src.messaging.retry import RetryLater, schedule_retry, topology
+from src.messaging.decoding import Event, InvalidEvent, UnknownEventType, decode_event
+from src.repositories.rejected_event_repository import RejectedEventRepository
+from src.messaging.prescription_handler import (
+    handle_prescription_ready,
+    handle_prescription_ready_async
+)
 from src.messaging.appointment_handler import (
     handle_appointment_confirmed,
-    handle_appointment_cancelled
+    handle_appointment_cancelled,
+    handle_appointment_confirmed_async,
+    handle_appointment_cancelled_async
 )
+from src.messaging.broadcast_handler import handle_broadcast, handle_broadcast_async
 
-# Map event_type -> handler function
+# Map event_type -> handler function (nhận event đã decode theo schema, trả về notification document hoặc None)
 HANDLERS = {
     "prescription_ready": handle_prescription_ready,
     "appointment_confirmed": handle_appointment_confirmed,
     "appointment_cancelled": handle_appointment_cancelled,
+    "broadcast": handle_broadcast,
+}
+
+# Các bản async dùng cho consumer chạy trên event loop của FastAPI
+ASYNC_HANDLERS = {
+    "prescription_ready": handle_prescription_ready_async,
+    "appointment_confirmed": handle_appointment_confirmed_async,
+    "appointment_cancelled": handle_appointment_cancelled_async,
+    "broadcast": handle_broadcast_async,
 }
 
-def callback(ch, method, properties, body):
+# Các field trong data định danh một event khi producer không gửi kèm event_id. Event appointment
+# mang cả ngày/giờ khám và updated_at (nếu có): đổi lịch hay xác nhận lại là event mới, không bị dedup
+EVENT_KEYS = {
+    "prescription_ready": ("dispense_id",),
+    "appointment_confirmed": ("appointment_id", "appointment_date", "appointment_time", "updated_at"),
+    "appointment_cancelled": ("appointment_id", "appointment_date", "appointment_time", "updated_at"),
+}
+
+logger = get_logger("consumer")
+
+QUEUES = ["prescription_notifications", "appointment.confirmed", "appointment.cancelled", "notification.broadcast"]
+QUEUE_ARGUMENTS = {'x-message-ttl': 86400000}
+
+# Kết nối lại RabbitMQ: chờ 1s, 2s, 4s... tối đa RECONNECT_MAX_BACKOFF giây; reset khi kết nối
+# trước đó sống đủ RECONNECT_STABLE_AFTER giây
+RECONNECT_MAX_BACKOFF = 30.0
+RECONNECT_STABLE_AFTER = 60.0
+
+def event_id(event: Event) -> str:
+    if event.event_id is not None:
+        return str(event.event_id)
+    values = (getattr(event.data, field) for field in EVENT_KEYS[event.event_type])
+    return ":".join([event.event_type, *(str(value) for value in values if value is not None)])
+
+def _decode(body: Union[bytes, str], started: float) -> tuple[Optional[Event], Optional[InvalidEvent]]:
+    # Message không xử lý được (không phải JSON, sai schema, event_type lạ) được ack (giao lại
+    # cũng không sửa được) và lưu vào rejected_events
+    try:
+        return decode_event(body), None
+    except UnknownEventType as e:
+        logger.warning("Rejected unhandled event: %s", e)
+        record_event(None, "unhandled", started)
+        return None, e
+    except InvalidEvent as e:
+        logger.error("Rejected invalid event: %s", e, extra={"event_type": e.event_type})
+        record_event(e.event_type, "rejected", started)
+        return None, e
+
+def reject(body: Union[bytes, str], error: InvalidEvent):
+    # event_type lạ do producer đặt tùy ý: không dùng làm label của metric
+    rejected_total.inc("unknown" if isinstance(error, UnknownEventType) else error.event_type or "unknown")
+    try:
+        RejectedEventRepository.save(body.encode() if isinstance(body, str) else body, error.event_type, str(error), error.errors)
+    except Exception:
+        logger.exception("Error saving rejected event", extra={"event_type": error.event_type})
+
+def _is_duplicate(key: Optional[str]) -> bool:
+    # Bản trùng "nóng" bị bỏ ngay (vẫn được ack), không tốn lookup appointment-service hay round trip Mongo
+    if key is not None and key in recent_events:
+        dedup_total.inc("memory")
+        logger.info("Duplicate event skipped", extra={"event_id": key})
+        return True
+    return False
+
+def _annotate(notification: Optional[dict], event: Event, key: Optional[str]) -> Optional[dict]:
+    # kind cho biết notification có thể gộp digest với notification cùng loại của user
+    if notification is not None:
+        notification["kind"] = event.event_type
+        if key is not None:
+            notification["event_id"] = key
+    return notification
+
+def handle_event(body) -> Optional[dict]:
+    """
+    Trả về notification document (None nếu không cần tạo); raise RetryLater nếu cần xử lý lại sau,
+    kể cả khi handler lỗi bất ngờ.
+    """
+    started = time.perf_counter()
+    event, invalid = _decode(body, started)
+    if invalid is not None:
+        reject(body, invalid)
+    if event is None:
+        return None
+    extra = {"event_type": event.event_type}
+    token = correlation_id.set(None)
     try:
-        event = json.loads(body)
-        event_type = event.get("event_type")
-        print(f"📩 Received event: {event_type}")
-
-        handler = HANDLERS.get(event_type)
-        if handler:
-            handler(event)
-        else:
-            print(f"⚠️ No handler for event_type={event_type}")
+        key = event_id(event)
+        # Mọi dòng log của event (kể cả từ handler, appointment client) mang correlation_id = event_id
+        correlation_id.set(key)
+        logger.info("Received event", extra=extra)
+        if _is_duplicate(key):
+            record_event(event.event_type, "duplicate", started)
+            return None
+        with profiler.operation("event", event.event_type):
+            notification = _annotate(HANDLERS[event.event_type](event), event, key)
+        record_event(event.event_type, "success", started)
+        return notification
+    except RetryLater as e:
+        logger.warning("Retrying event later: %s", e, extra=extra)
+        record_event(event.event_type, "retry", started)
+        raise
     except Exception as e:
-        print("❌ Error processing event:", e)
+        # Lỗi bất ngờ (bug handler, Mongo lỗi...) đi đường retry: sau max_retries lần message nằm
+        # trong dead-letter queue chờ replay thay vì bị ack và mất
+        logger.exception("Error processing event", extra=extra)
+        record_event(event.event_type, "failure", started)
+        raise RetryLater(f"Unexpected error: {e!r}") from e
+    finally:
+        correlation_id.reset(token)
+    return None
 
-def start_consumer():
-    params = pika.ConnectionParameters(
-        host=settings.rabbitmq.host,
-        port=settings.rabbitmq.port,
-        virtual_host=settings.rabbitmq.virtual_host,
+async def handle_event_async(body) -> Optional[dict]:
+    started = time.perf_counter()
+    event, invalid = _decode(body, started)
+    if invalid is not None:
+        await asyncio.to_thread(reject, body, invalid)
+    if event is None:
+        return None
+    extra = {"event_type": event.event_type}
+    token = correlation_id.set(None)
+    try:
+        key = event_id(event)
+        correlation_id.set(key)
+        logger.info("Received event", extra=extra)
+        if _is_duplicate(key):
+            record_event(event.event_type, "duplicate", started)
+            return None
+        with profiler.operation("event", event.event_type):
+            notification = _annotate(await ASYNC_HANDLERS[event.event_type](event), event, key)
+        record_event(event.event_type, "success", started)
+        return notification
+    except RetryLater as e:
+        logger.warning("Retrying event later: %s", e, extra=extra)
+        record_event(event.event_type, "retry", started)
+        raise
+    except Exception as e:
+        logger.exception("Error processing event", extra=extra)
+        record_event(event.event_type, "failure", started)
+        raise RetryLater(f"Unexpected error: {e!r}") from e
+    finally:
+        correlation_id.reset(token)
+    return None
+
+def connection_params() -> "pika.ConnectionParameters":
+    # pika chỉ được import khi consumer thực sự chạy
+    import pika
+    rabbit_cfg = settings.rabbitmq
+    return pika.ConnectionParameters(
+        host=rabbit_cfg.host,
+        port=rabbit_cfg.port,
+        virtual_host=rabbit_cfg.virtual_host,
         credentials=pika.PlainCredentials(
-            settings.rabbitmq.username,
-            settings.rabbitmq.password
+            rabbit_cfg.username,
+            rabbit_cfg.password
         ),
     )
-    connection = pika.BlockingConnection(params)
+
+def reconnect_backoff(previous: float, uptime: float) -> float:
+    if uptime >= RECONNECT_STABLE_AFTER:
+        return 1.0
+    return min(max(previous, 0.5) * 2, RECONNECT_MAX_BACKOFF)
+
+def on_message(batcher: NotificationBatcher, queue: str):
+    """Callback của basic_consume cho `queue`: event lỗi (dependency hoặc lỗi bất ngờ) được publish sang retry queue rồi ack cùng batch."""
+    def callback(ch, method, properties, body):
+        try:
+            notification = handle_event(body)
+        except RetryLater as e:
+            schedule_retry(ch, queue, properties, body, str(e))
+            notification = None
+        batcher.add(method.delivery_tag, notification)
+    return callback
+
+def start_consumer(queues: list[str] = QUEUES, relay_push: bool = False):
+    import pika
+    rabbit_cfg = settings.rabbitmq
+    connection = pika.BlockingConnection(connection_params())
+    if relay_push:
+        # Consumer process: notification tới hub của API qua fanout exchange thay vì hub của process này
+        from src.messaging.push_relay import PushPublisher
+        notification_hub.relay_to(PushPublisher(connection))
     channel = connection.channel()
+    channel.basic_qos(prefetch_count=rabbit_cfg.prefetch_count)
+
+    batcher = NotificationBatcher(
+        channel,
+        call_later=connection.call_later,
+        remove_timeout=connection.remove_timeout,
+        batch_size=rabbit_cfg.batch_size,
+        max_delay=rabbit_cfg.batch_max_delay_ms / 1000,
+        coalescer=DigestCoalescer.from_settings() if rabbit_cfg.digest_enabled else None
+    )
+
+    # Publish sang retry queue chờ RabbitMQ confirm, để message gốc chỉ được ack khi bản retry đã an toàn
+    channel.confirm_delivery()
 
     # declare queues khớp với producers
-    channel.queue_declare(queue="prescription_notifications", durable=True, arguments={'x-message-ttl': 86400000})
-    channel.queue_declare(queue="appointment.confirmed", durable=True, arguments={'x-message-ttl': 86400000})
-    channel.queue_declare(queue="appointment.cancelled", durable=True, arguments={'x-message-ttl': 86400000})
+    for queue in queues:
+        channel.queue_declare(queue=queue, durable=True, arguments=QUEUE_ARGUMENTS)
+    for method, kwargs in topology(queues):
+        getattr(channel, method)(**kwargs)
+
+    # consume từ nhiều queue, ack thủ công sau khi batch đã được lưu
+    for queue in queues:
+        channel.basic_consume(queue=queue, on_message_callback=on_message(batcher, queue), auto_ack=False)
 
-    # consume từ nhiều queue
-    channel.basic_consume(queue="prescription_notifications", on_message_callback=callback, auto_ack=True)
-    channel.basic_consume(queue="appointment.confirmed", on_message_callback=callback, auto_ack=True)
-    channel.basic_consume(queue="appointment.cancelled", on_message_callback=callback, auto_ack=True)
+    logger.info("Waiting for notifications", extra={"queues": queues})
+    try:
+        channel.start_consuming()
+    finally:
+        if channel.is_open:
+            batcher.flush(force=True)
 
-    print("👂 Waiting for notifications...")
-    channel.start_consuming()
+def run_consumer(queues: list[str] = QUEUES):
+    """start_consumer kèm kết nối lại với backoff khi mất kết nối RabbitMQ (consumer mode thread)."""
+    backoff = 0.0
+    while True:
+        started = time.monotonic()
+        try:
+            start_consumer(queues)
+            return
+        except Exception as e:
+            backoff = reconnect_backoff(backoff, time.monotonic() - started)
+            logger.error("Consumer connection lost: %r", e, extra={"reconnect_in_s": backoff})
+        time.sleep(backoff)
@@ -0,0 +1,51 @@
+from typing import Annotated, Optional, Union
+
+from pydantic import Field, TypeAdapter, ValidationError
+
+from src.models.events import (
+    AppointmentCancelledEvent,
+    AppointmentConfirmedEvent,
+    BroadcastEvent,
+    PrescriptionReadyEvent
+)
+
+# Map event_type -> schema của event
+EVENT_SCHEMAS = {
+    "prescription_ready": PrescriptionReadyEvent,
+    "appointment_confirmed": AppointmentConfirmedEvent,
+    "appointment_cancelled": AppointmentCancelledEvent,
+    "broadcast": BroadcastEvent,
+}
+
+Event = Annotated[Union[tuple(EVENT_SCHEMAS.values())], Field(discriminator="event_type")]
+
+# Parse JSON và validate trong một lượt (pydantic-core), chọn schema theo event_type
+_event_adapter = TypeAdapter(Event)
+
+class InvalidEvent(ValueError):
+    def __init__(self, errors: list[dict], event_type: Optional[str] = None):
+        super().__init__("; ".join(_describe(error) for error in errors))
+        self.errors = [{"loc": [str(part) for part in error["loc"]], "msg": error["msg"], "type": error["type"]} for error in errors]
+        self.event_type = event_type
+
+class UnknownEventType(InvalidEvent):
+    """event_type không có schema: cũng là event không xử lý được, bị từ chối như payload sai schema."""
+
+    def __init__(self, event_type: str):
+        super().__init__([{"loc": ("event_type",), "msg": f"No handler for event_type={event_type}", "type": "union_tag_invalid"}], event_type)
+
+def _describe(error: dict) -> str:
+    location = ".".join(map(str, error["loc"]))
+    return f"{location}: {error['msg']}" if location else error["msg"]
+
+def decode_event(body: Union[bytes, str]) -> Event:
+    """Raise UnknownEventType nếu không có schema cho event_type, InvalidEvent nếu payload sai schema."""
+    try:
+        return _event_adapter.validate_json(body)
+    except ValidationError as e:
+        errors = e.errors(include_url=False, include_input=False)
+        if errors[0]["type"] == "union_tag_invalid":
+            raise UnknownEventType(errors[0]["ctx"]["tag"]) from None
+        # loc của lỗi trong một schema bắt đầu bằng event_type của schema đó
+        event_type = errors[0]["loc"][0] if errors[0]["loc"] and errors[0]["loc"][0] in EVENT_SCHEMAS else None
+        raise InvalidEvent(errors, event_type) from None
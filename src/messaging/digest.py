@@ -0,0 +1,117 @@
+import time
+from typing import Callable, Optional
+
+from config.settings import settings
+from src.monitoring.metrics import digest_merged_total
+
+# Tiêu đề digest theo kind (event_type); {count} là số notification được gộp
+DIGEST_TITLES = {
+    "prescription_ready": "{count} đơn thuốc đã sẵn sàng",
+    "appointment_confirmed": "{count} lịch khám đã được xác nhận",
+    "appointment_cancelled": "{count} lịch khám đã bị hủy",
+}
+DEFAULT_DIGEST_TITLE = "Bạn có {count} thông báo mới"
+
+def digest(items: list[dict]) -> dict:
+    """
+    Gộp các notification cùng user và kind thành một notification liệt kê từng item.
+
+    Field tham chiếu (appointment_id, prescription_id...) và created_at lấy từ item mới nhất;
+    event_id lấy từ item đầu tiên để nhóm được giao lại nguyên vẹn không bị ghi hai lần;
+    event_id của các item còn lại nằm trong digest_event_ids để bộ lọc trùng trong RAM nhận biết.
+
+    Chỉ event_id đầu tiên là khóa idempotency được lưu (unique index): nếu process chết trước khi
+    ack và các message được giao lại rồi gộp theo nhóm khác (item đầu khác, hoặc thành notification
+    lẻ), các event_id không phải đầu nhóm có thể được lưu thêm một lần nữa.
+    """
+    if len(items) == 1:
+        return items[0]
+    notification = dict(items[-1])
+    notification["title"] = DIGEST_TITLES.get(notification.get("kind"), DEFAULT_DIGEST_TITLE).format(count=len(items))
+    notification["message"] = "\n".join(f"- {item['message']}" for item in items)
+    notification["digest_count"] = len(items)
+    notification.pop("event_id", None)
+    event_ids = [item["event_id"] for item in items if item.get("event_id")]
+    if event_ids:
+        notification["event_id"] = event_ids[0]
+        notification["digest_event_ids"] = event_ids[1:]
+    return notification
+
+class _Group:
+    __slots__ = ("items", "event_ids", "tags", "first_seen", "deadline")
+
+    def __init__(self, now: float):
+        self.items: list[dict] = []
+        self.event_ids: set[str] = set()
+        self.tags: list[int] = []
+        self.first_seen = now
+        self.deadline = now
+
+class DigestCoalescer:
+    """
+    Giữ notification theo (user_id, kind) trong một cửa sổ ngắn để gộp các đợt event dồn dập.
+
+    Mỗi item mới dời hạn của nhóm thêm `window` giây nhưng không quá `max_hold` giây kể từ
+    item đầu tiên. Delivery tag của message trong nhóm được giữ cùng nhóm để batcher chỉ
+    ack sau khi digest đã được lưu; khi đang giữ `max_items` message thì batcher xả hết
+    để không chiếm trọn prefetch của channel.
+    """
+
+    def __init__(self, window: float, max_hold: float, max_items: int, clock: Callable[[], float] = time.monotonic):
+        self.window = window
+        self.max_hold = max_hold
+        self.max_items = max_items
+        self.clock = clock
+        self.size = 0
+        self._groups: dict[tuple, _Group] = {}
+
+    @classmethod
+    def from_settings(cls) -> "DigestCoalescer":
+        cfg = settings.rabbitmq
+        return cls(
+            window=cfg.digest_window_ms / 1000,
+            max_hold=cfg.digest_max_hold_ms / 1000,
+            max_items=max(1, cfg.prefetch_count // 2)
+        )
+
+    @staticmethod
+    def accepts(notification: dict) -> bool:
+        # Notification tạo từ API không có kind nên không bị giữ lại
+        return notification.get("kind") is not None
+
+    def add(self, delivery_tag: int, notification: dict):
+        now = self.clock()
+        key = (notification["user_id"], notification["kind"])
+        group = self._groups.get(key)
+        if group is None:
+            group = self._groups[key] = _Group(now)
+        event_id = notification.get("event_id")
+        # Bản trùng trong cùng cửa sổ chỉ được ack cùng nhóm, không thành một dòng nữa trong digest
+        if event_id is None or event_id not in group.event_ids:
+            group.items.append(notification)
+            if event_id is not None:
+                group.event_ids.add(event_id)
+        group.tags.append(delivery_tag)
+        group.deadline = min(now + self.window, group.first_seen + self.max_hold)
+        self.size += 1
+
+    def oldest_tag(self) -> Optional[int]:
+        return min((group.tags[0] for group in self._groups.values()), default=None)
+
+    def next_deadline(self) -> Optional[float]:
+        return min((group.deadline for group in self._groups.values()), default=None)
+
+    def pop_due(self, force: bool = False) -> tuple[list[dict], list[int]]:
+        """Lấy các nhóm đã tới hạn (hoặc tất cả nếu `force`): trả về notification cần lưu và tag được giải phóng."""
+        now = self.clock()
+        notifications, tags = [], []
+        for key, group in list(self._groups.items()):
+            if not force and group.deadline > now:
+                continue
+            del self._groups[key]
+            self.size -= len(group.tags)
+            notifications.append(digest(group.items))
+            tags += group.tags
+            if len(group.items) > 1:
+                digest_merged_total.inc(group.items[0]["kind"], amount=len(group.items))
+        return notifications, tags
@@ -0,0 +1,32 @@
+import bisect
+import hashlib
+
+from config.settings import settings
+
+class HashRing:
+    """
+    Consistent hashing: key -> partition.
+
+    Mỗi partition có `replicas` điểm ảo trên vòng để phân bố đều; khi đổi số partition chỉ
+    khoảng 1/N số key bị chuyển sang partition khác.
+    """
+
+    def __init__(self, partitions: int, replicas: int = 64):
+        points = sorted(
+            (_hash(f"partition-{partition}:{replica}"), partition)
+            for partition in range(partitions)
+            for replica in range(replicas)
+        )
+        self.partitions = partitions
+        self._hashes = [point for point, _ in points]
+        self._owners = [partition for _, partition in points]
+
+    def partition(self, key) -> int:
+        i = bisect.bisect(self._hashes, _hash(str(key)))
+        return self._owners[i % len(self._owners)]
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+def partition_queue(index: int) -> str:
+    return f"{settings.rabbitmq.partition_queue_prefix}.{index}"
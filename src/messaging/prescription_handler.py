@@ -1,32 +1,46 @@
 from src.services.notification_service import NotificationService
-import httpx
-import os
+from src.clients.appointment_client import appointment_client
+from src.messaging.retry import RetryLater
+from src.models.events import PrescriptionReadyData, PrescriptionReadyEvent
+from src.monitoring.logs import get_logger
+from typing import Optional
 
 service = NotificationService()
-APPOINTMENT_SERVICE_URL = str(os.getenv("APPOINTMENT__SERVICE__ENDPOINT", "http://localhost:8005"))
-def handle_prescription_ready(event: dict):
-    data = event["data"]
-    prescription_id = data["prescription_id"]
-    appointment_id = data["appointment_id"]
-    dispense_id = data["dispense_id"]
-    code = data.get("prescription_code")
+logger = get_logger("prescription_handler")
 
-    # Gọi appointment-service để lấy patient_id
+def _build_notification(data: PrescriptionReadyData, patient_id: Optional[int]):
+    if patient_id is None:
+        logger.warning("Could not fetch appointment info", extra={"event_type": "prescription_ready", "appointment_id": data.appointment_id})
+        return None
+    return service.build_notification(
+        user_id=patient_id,
+        prescription_id=data.prescription_id,
+        appointment_id=data.appointment_id,
+        dispense_id=data.dispense_id,
+        prescription_code=data.prescription_code
+    )
+
+def handle_prescription_ready(event: PrescriptionReadyEvent):
+    data = event.data
+
+    # Gọi appointment-service (qua cache) để lấy patient_id, trừ khi producer đã gửi kèm
+    patient_id = data.patient_id
+    try:
+        if patient_id is None:
+            patient_id = appointment_client.get_patient_id(data.appointment_id)
+    except Exception as e:
+        # appointment-service lỗi hoặc circuit đang mở: event được đưa vào retry queue thay vì bị bỏ
+        raise RetryLater(f"Error contacting appointment-service: {e}") from e
+    return _build_notification(data, patient_id)
+
+async def handle_prescription_ready_async(event: PrescriptionReadyEvent):
+    data = event.data
+
+    patient_id = data.patient_id
     try:
-        url = f"{APPOINTMENT_SERVICE_URL}/appointments/{appointment_id}"
-        resp = httpx.get(url, timeout=5.0)
-        if resp.status_code == 200:
-            appointment = resp.json()
-            patient_id = appointment["patient_id"]
-            service.create_notification(
-                user_id=patient_id,
-                prescription_id=prescription_id,
-                appointment_id=appointment_id,
-                dispense_id=dispense_id,
-                prescription_code=code
-            )
-            print(f"✅ Notification saved for prescription {prescription_id}")
-        else:
-            print("⚠️ Could not fetch appointment info")
+        if patient_id is None:
+            patient_id = await appointment_client.get_patient_id_async(data.appointment_id)
     except Exception as e:
-        print("⚠️ Error contacting appointment-service:", e)
+        # appointment-service lỗi hoặc circuit đang mở: event được đưa vào retry queue thay vì bị bỏ
+        raise RetryLater(f"Error contacting appointment-service: {e}") from e
+    return _build_notification(data, patient_id)
@@ -0,0 +1,103 @@
+"""
+Chuyển notification từ consumer process tới hub push của API (RABBITMQ__CONSUMER_MODE=process).
+
+Worker publish từng notification đã lưu sang fanout exchange PUSH__EXCHANGE_NAME; mỗi API process
+consume exchange đó qua một queue exclusive của riêng nó rồi đẩy vào notification_hub. Push vẫn là
+best-effort như hub trong process: message không persistent, lúc API không chạy thì bị bỏ.
+"""
+import asyncio
+import threading
+from typing import Optional
+
+from config.settings import settings
+from src.messaging.async_consumer import call, open_connection
+from src.messaging.consumer import reconnect_backoff
+from src.monitoring.logs import get_logger
+from src.services.notification_hub import notification_hub
+
+logger = get_logger("push_relay")
+
+class PushPublisher:
+    """
+    Relay của hub trong consumer process: publish trên một channel riêng, không bật confirm.
+
+    BlockingConnection không thread-safe nên publish từ thread khác (vd. thread của broadcast)
+    được chuyển về thread của connection qua add_callback_threadsafe.
+    """
+
+    def __init__(self, connection):
+        import pika
+        self._connection = connection
+        self._channel = connection.channel()
+        self._channel.exchange_declare(exchange=settings.push.exchange_name, exchange_type="fanout")
+        self._owner = threading.get_ident()
+        self._properties = pika.BasicProperties
+
+    def __call__(self, user_id: int, payload: str):
+        # Notification đã được lưu: lỗi push chỉ làm client thấy muộn (khi tải lại danh sách)
+        try:
+            if threading.get_ident() == self._owner:
+                self._publish(user_id, payload)
+            else:
+                self._connection.add_callback_threadsafe(lambda: self._publish(user_id, payload))
+        except Exception as e:
+            logger.warning("Error relaying notification to push exchange: %r", e)
+
+    def _publish(self, user_id: int, payload: str):
+        try:
+            self._channel.basic_publish(
+                exchange=settings.push.exchange_name,
+                routing_key="",
+                body=payload.encode(),
+                properties=self._properties(headers={"user_id": user_id})
+            )
+        except Exception as e:
+            logger.warning("Error relaying notification to push exchange: %r", e)
+
+class PushRelayConsumer:
+    """Chạy như task trên event loop của API: nhận notification từ consumer process và đẩy vào hub."""
+
+    def __init__(self):
+        self._connection = None
+        self._closed: Optional[asyncio.Future] = None
+        self._stopping = False
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        backoff = 0.0
+        while not self._stopping:
+            started = loop.time()
+            try:
+                reason = await self._consume()
+            except Exception as e:
+                reason = e
+            if self._stopping:
+                return
+            backoff = reconnect_backoff(backoff, loop.time() - started)
+            logger.error("Push relay connection lost: %r", reason, extra={"reconnect_in_s": backoff})
+            await asyncio.sleep(backoff)
+
+    async def _consume(self):
+        exchange = settings.push.exchange_name
+        self._closed = asyncio.get_running_loop().create_future()
+        self._connection = await open_connection(self._closed)
+        channel = await call(self._connection.channel, callback_arg="on_open_callback")
+        await call(channel.exchange_declare, exchange=exchange, exchange_type="fanout")
+        # Mỗi API process một queue riêng, tự xóa khi process mất kết nối
+        declared = await call(channel.queue_declare, queue="", exclusive=True, auto_delete=True)
+        queue = declared.method.queue
+        await call(channel.queue_bind, queue=queue, exchange=exchange)
+        channel.basic_consume(queue=queue, on_message_callback=self.on_message, auto_ack=True)
+        logger.info("Relaying push notifications from consumer processes", extra={"exchange": exchange})
+        return await self._closed
+
+    def on_message(self, channel, method, properties, body: bytes):
+        user_id = (properties.headers or {}).get("user_id")
+        if user_id is not None:
+            notification_hub.deliver(user_id, body.decode())
+
+    async def stop(self):
+        self._stopping = True
+        if self._connection is not None and not (self._connection.is_closed or self._connection.is_closing):
+            self._connection.close()
+            await self._closed
@@ -0,0 +1,135 @@
+from typing import Optional
+
+from config.settings import settings
+from src.monitoring.logs import get_logger
+from src.monitoring.metrics import retries_total
+
+ATTEMPT_HEADER = "x-retry-attempt"
+ORIGIN_HEADER = "x-original-queue"
+ERROR_HEADER = "x-last-error"
+
+# Message hết hạn trong retry queue được dead-letter về đây rồi route về queue nguồn theo tên
+REQUEUE_EXCHANGE = "notifications.requeue"
+
+logger = get_logger("retry")
+
+class RetryLater(Exception):
+    """Handler raise khi dependency lỗi tạm thời (appointment-service chậm/chết): event được xử lý lại sau."""
+
+def retry_delays() -> list[int]:
+    # Backoff lũy thừa: base, 2*base, 4*base... (ms), chặn trên bởi retry_max_delay_ms
+    cfg = settings.rabbitmq
+    return [min(cfg.retry_base_delay_ms * 2 ** attempt, cfg.retry_max_delay_ms) for attempt in range(cfg.max_retries)]
+
+def retry_queue(delay_ms: int) -> str:
+    return f"notifications.retry.{delay_ms}ms"
+
+def topology(queues: list[str]) -> list[tuple[str, dict]]:
+    """
+    Các lệnh declare (tên method của channel, kwargs) cho retry và dead-letter queue.
+
+    Mỗi mức delay có một fanout exchange trỏ vào queue cùng tên với x-message-ttl = delay.
+    Không ai consume retry queue: message hết hạn bị dead-letter sang REQUEUE_EXCHANGE với
+    routing key lúc publish (tên queue nguồn) nên quay về đúng queue đã nhận nó.
+    """
+    ops = [("exchange_declare", {"exchange": REQUEUE_EXCHANGE, "exchange_type": "direct", "durable": True})]
+    for delay in sorted(set(retry_delays())):
+        name = retry_queue(delay)
+        ops += [
+            ("exchange_declare", {"exchange": name, "exchange_type": "fanout", "durable": True}),
+            ("queue_declare", {
+                "queue": name,
+                "durable": True,
+                "arguments": {"x-message-ttl": delay, "x-dead-letter-exchange": REQUEUE_EXCHANGE}
+            }),
+            ("queue_bind", {"queue": name, "exchange": name}),
+        ]
+    ops.append(("queue_declare", {"queue": settings.rabbitmq.dead_letter_queue, "durable": True}))
+    ops += [("queue_bind", {"queue": queue, "exchange": REQUEUE_EXCHANGE, "routing_key": queue}) for queue in queues]
+    return ops
+
+def schedule_retry(channel, queue: str, properties, body: bytes, error: str) -> str:
+    """
+    Publish lại message vào retry queue ứng với số lần đã thử, hoặc vào dead-letter queue
+    khi đã hết `max_retries` lượt. Trả về "retry" hoặc "dead_letter".
+
+    Consumer không chờ (không sleep, không requeue ngay) nên một dependency chậm không
+    chặn các event khác; message gốc được ack như bình thường sau khi publish.
+    """
+    import pika
+    headers = dict((properties.headers if properties is not None else None) or {})
+    attempt = int(headers.get(ATTEMPT_HEADER, 0))
+    delays = retry_delays()
+    headers[ERROR_HEADER] = error[:500]
+    if attempt < len(delays):
+        headers[ATTEMPT_HEADER] = attempt + 1
+        exchange, routing_key, outcome = retry_queue(delays[attempt]), queue, "retry"
+        logger.warning("Retrying event", extra={"queue": queue, "delay_ms": delays[attempt], "attempt": attempt + 1, "max_retries": len(delays)})
+    else:
+        headers[ORIGIN_HEADER] = queue
+        exchange, routing_key, outcome = "", settings.rabbitmq.dead_letter_queue, "dead_letter"
+        logger.error("Event moved to dead-letter queue", extra={"queue": queue, "dead_letter_queue": routing_key, "attempt": attempt, "error": error})
+    channel.basic_publish(
+        exchange=exchange,
+        routing_key=routing_key,
+        body=body,
+        properties=pika.BasicProperties(delivery_mode=pika.DeliveryMode.Persistent, headers=headers)
+    )
+    retries_total.inc(outcome)
+    return outcome
+
+def dead_letter_count() -> int:
+    import pika
+    from src.messaging.consumer import connection_params
+    connection = pika.BlockingConnection(connection_params())
+    try:
+        frame = connection.channel().queue_declare(queue=settings.rabbitmq.dead_letter_queue, durable=True)
+        return frame.method.message_count
+    finally:
+        connection.close()
+
+def replay_dead_letters(limit: int, connection=None) -> dict:
+    """
+    Chuyển tối đa `limit` message từ dead-letter queue về queue nguồn, số lần thử reset về 0.
+
+    Mỗi message chỉ được ack khỏi dead-letter queue sau khi RabbitMQ đã confirm bản publish lại.
+    Message không rõ queue nguồn được giữ unacked tới cuối rồi mới trả lại DLQ: nack ngay thì
+    basic_get lấy lại đúng message đó và chặn các message phía sau.
+    """
+    import pika
+    from src.messaging.consumer import connection_params
+    dead_letter_queue = settings.rabbitmq.dead_letter_queue
+    own_connection = connection is None
+    if own_connection:
+        connection = pika.BlockingConnection(connection_params())
+    try:
+        channel = connection.channel()
+        channel.confirm_delivery()
+        channel.queue_declare(queue=dead_letter_queue, durable=True)
+        replayed, skipped = 0, []
+        while replayed < limit:
+            method, properties, body = channel.basic_get(queue=dead_letter_queue, auto_ack=False)
+            if method is None:
+                break
+            headers = dict(properties.headers or {})
+            queue: Optional[str] = headers.pop(ORIGIN_HEADER, None)
+            if queue is None:
+                # Không rõ queue nguồn (message publish tay vào DLQ): để nguyên
+                skipped.append(method.delivery_tag)
+                continue
+            headers.pop(ATTEMPT_HEADER, None)
+            channel.basic_publish(
+                exchange="",
+                routing_key=queue,
+                body=body,
+                properties=pika.BasicProperties(delivery_mode=pika.DeliveryMode.Persistent, headers=headers)
+            )
+            channel.basic_ack(delivery_tag=method.delivery_tag)
+            replayed += 1
+        for delivery_tag in skipped:
+            channel.basic_nack(delivery_tag=delivery_tag, requeue=True)
+        remaining = channel.queue_declare(queue=dead_letter_queue, durable=True).method.message_count
+        return {"replayed": replayed, "skipped": len(skipped), "remaining": remaining}
+    finally:
+        if own_connection:
+            connection.close()
@@ -0,0 +1,268 @@
+import asyncio
+import multiprocessing
+import signal
+import sys
+import time
+from typing import Optional
+
+from config.settings import settings
+from src.messaging.async_consumer import call, open_connection
+from src.messaging.consumer import QUEUES, QUEUE_ARGUMENTS, reconnect_backoff, start_consumer
+from src.messaging.decoding import Event, InvalidEvent, decode_event
+from src.messaging.partitioning import HashRing, partition_queue
+from src.monitoring.logs import configure_logging, get_logger
+from src.monitoring.metrics import register_mongo_listener
+
+logger = get_logger("worker_pool")
+
+def routing_key(event: Event) -> str:
+    """
+    Key để chọn partition, luôn lấy thẳng từ payload (router không gọi appointment-service).
+
+    Mọi event của một lịch khám (xác nhận, hủy, đơn thuốc) có cùng key nên được một worker xử lý
+    theo đúng thứ tự; broadcast theo id của job. Worker tự tra patient_id cho prescription_ready.
+    """
+    if event.event_type == "broadcast":
+        return f"broadcast:{event.event_id}"
+    return f"appointment:{event.data.appointment_id}"
+
+def partition_key(body: bytes):
+    try:
+        return routing_key(decode_event(body))
+    except InvalidEvent:
+        # Event hỏng vẫn được chuyển tiếp để worker ghi vào rejected_events và ack như consumer thường
+        return body
+
+def drain_orphan_partitions(partitions: int, connection=None) -> dict[str, int]:
+    """
+    Chuyển message còn trong queue partition có index >= `partitions` (để lại từ lần chạy với nhiều
+    worker hơn) sang queue partition hiện tại theo partition_key(). Trả về {queue cũ: số message đã chuyển}.
+
+    Chạy trước khi router khởi động nên event mới của cùng lịch khám (còn ở queue nguồn) vẫn tới
+    partition mới sau các event được chuyển. Queue cũ không bị xóa: message retry quay về nó qua
+    REQUEUE_EXCHANGE, router tiếp tục consume và chuyển tiếp. Queue partition luôn được tạo liên tiếp
+    từ 0 nên dừng ở index đầu tiên không tồn tại.
+    """
+    import pika
+    from src.messaging.consumer import connection_params
+    own_connection = connection is None
+    if own_connection:
+        connection = pika.BlockingConnection(connection_params())
+    ring = HashRing(partitions)
+    persistent = pika.BasicProperties(delivery_mode=pika.DeliveryMode.Persistent)
+    orphans = {}
+    try:
+        channel = connection.channel()
+        channel.confirm_delivery()
+        for i in range(partitions):
+            channel.queue_declare(queue=partition_queue(i), durable=True, arguments=QUEUE_ARGUMENTS)
+        index = partitions
+        while True:
+            queue = partition_queue(index)
+            try:
+                channel.queue_declare(queue=queue, durable=True, passive=True)
+            except pika.exceptions.ChannelClosedByBroker:
+                # 404: broker đóng channel khi queue không tồn tại
+                break
+            moved = 0
+            while True:
+                method, properties, body = channel.basic_get(queue=queue, auto_ack=False)
+                if method is None:
+                    break
+                target = partition_queue(ring.partition(partition_key(body)))
+                channel.basic_publish(exchange="", routing_key=target, body=body, properties=properties or persistent)
+                channel.basic_ack(delivery_tag=method.delivery_tag)
+                moved += 1
+            orphans[queue] = moved
+            index += 1
+    finally:
+        if own_connection:
+            connection.close()
+    return orphans
+
+class PartitionRouter:
+    """
+    Consume các queue nguồn và publish lại từng event sang queue partition theo routing_key().
+
+    Publisher confirm chạy pipeline: router publish tiếp mà không chờ confirm từng message,
+    message nguồn chỉ được ack khi RabbitMQ đã confirm bản trên queue partition (bị nack thì
+    requeue). Số message đang chờ confirm bị giới hạn bởi `prefetch` (basic_qos). Router chết
+    giữa chừng thì event được giao lại và bị dedup ở worker nếu trùng.
+    """
+
+    def __init__(self, partitions: int, prefetch: int, orphans: tuple[str, ...] = ()):
+        import pika
+        self.ring = HashRing(partitions)
+        self.prefetch = prefetch
+        # Queue partition cũ (xem drain_orphan_partitions): consume như queue nguồn để chuyển tiếp message retry về muộn
+        self.orphans = list(orphans)
+        self.channel = None
+        # Sequence number của publish -> delivery tag của message nguồn, theo thứ tự publish
+        self._pending: dict[int, int] = {}
+        self._published = 0
+        self._persistent = pika.BasicProperties(delivery_mode=pika.DeliveryMode.Persistent)
+        self._ack_type = pika.spec.Basic.Ack
+        self._connection = None
+        self._closed: Optional[asyncio.Future] = None
+        self._stopping = False
+
+    async def run(self):
+        """Route cho tới khi stop(); mất kết nối thì kết nối lại với backoff như consumer."""
+        loop = asyncio.get_running_loop()
+        backoff = 0.0
+        while not self._stopping:
+            started = loop.time()
+            try:
+                reason = await self._consume()
+            except Exception as e:
+                reason = e
+            if self._stopping:
+                return
+            backoff = reconnect_backoff(backoff, loop.time() - started)
+            logger.error("Router connection lost: %r", reason, extra={"reconnect_in_s": backoff})
+            await asyncio.sleep(backoff)
+
+    async def _consume(self):
+        partitions = self.ring.partitions
+        self._closed = asyncio.get_running_loop().create_future()
+        # Message chưa được confirm của connection cũ sẽ được RabbitMQ giao lại
+        self._pending.clear()
+        self._published = 0
+        self._connection = await open_connection(self._closed)
+        self.channel = await call(self._connection.channel, callback_arg="on_open_callback")
+        await call(self.channel.confirm_delivery, ack_nack_callback=self.on_confirm)
+        await call(self.channel.basic_qos, prefetch_count=self.prefetch)
+        for queue in QUEUES + [partition_queue(i) for i in range(partitions)]:
+            await call(self.channel.queue_declare, queue=queue, durable=True, arguments=QUEUE_ARGUMENTS)
+        for queue in QUEUES + self.orphans:
+            self.channel.basic_consume(queue=queue, on_message_callback=self.on_message, auto_ack=False)
+        logger.info("Routing notifications", extra={"partitions": partitions, "orphans": self.orphans})
+        return await self._closed
+
+    def on_message(self, channel, method, properties, body: bytes):
+        target = partition_queue(self.ring.partition(partition_key(body)))
+        channel.basic_publish(exchange="", routing_key=target, body=body, properties=self._persistent)
+        self._published += 1
+        self._pending[self._published] = method.delivery_tag
+
+    def on_confirm(self, frame):
+        confirm = frame.method
+        if confirm.multiple:
+            sequences = []
+            for sequence in self._pending:
+                if sequence > confirm.delivery_tag:
+                    break
+                sequences.append(sequence)
+        else:
+            sequences = [confirm.delivery_tag]
+        for sequence in sequences:
+            delivery_tag = self._pending.pop(sequence, None)
+            if delivery_tag is None:
+                continue
+            if isinstance(confirm, self._ack_type):
+                self.channel.basic_ack(delivery_tag=delivery_tag)
+            else:
+                self.channel.basic_nack(delivery_tag=delivery_tag, requeue=True)
+
+    async def stop(self):
+        self._stopping = True
+        if self._connection is not None and not (self._connection.is_closed or self._connection.is_closing):
+            self._connection.close()
+            await self._closed
+
+def run_router(partitions: int, orphans: tuple[str, ...] = ()):
+    _exit_on_sigterm()
+    configure_logging()
+    asyncio.run(PartitionRouter(partitions, settings.rabbitmq.prefetch_count, orphans).run())
+
+def run_worker(index: int):
+    # Mỗi partition chỉ có một worker consume nên event của một lịch khám được xử lý tuần tự
+    _exit_on_sigterm()
+    configure_logging()
+    register_mongo_listener()
+    start_consumer([partition_queue(index)], relay_push=True)
+
+def _exit_on_sigterm():
+    # SystemExit đi qua start_consuming để batch đang chờ được flush và ack trước khi thoát
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+class Supervisor:
+    """
+    Chạy router + `workers` process consumer và khởi động lại process nào bị chết.
+
+    Process chết liên tục được khởi động lại với backoff tăng dần (tối đa `max_backoff` giây);
+    backoff được reset khi process sống đủ `stable_after` giây.
+    """
+
+    def __init__(self, workers: int, max_backoff: float = 30.0, stable_after: float = 60.0):
+        self.workers = workers
+        self.max_backoff = max_backoff
+        self.stable_after = stable_after
+        self._context = multiprocessing.get_context("spawn")
+        self._targets = {"router": (run_router, (workers,))}
+        self._targets.update({f"worker-{i}": (run_worker, (i,)) for i in range(workers)})
+        self._processes: dict[str, multiprocessing.Process] = {}
+        self._started_at: dict[str, float] = {}
+        self._backoff: dict[str, float] = {}
+        self._restart_at: dict[str, float] = {}
+        self._stopping = False
+
+    def _spawn(self, name: str):
+        target, args = self._targets[name]
+        process = self._context.Process(target=target, args=args, name=f"notification-{name}")
+        process.start()
+        self._processes[name] = process
+        self._started_at[name] = time.monotonic()
+        logger.info("Started process", extra={"worker": name, "pid": process.pid})
+
+    def _check(self, name: str):
+        process = self._processes.get(name)
+        if process is not None and process.is_alive():
+            return
+        now = time.monotonic()
+        if process is not None:
+            # Process vừa chết: tính thời điểm khởi động lại
+            uptime = now - self._started_at[name]
+            backoff = 1.0 if uptime >= self.stable_after else min(self._backoff.get(name, 0.5) * 2, self.max_backoff)
+            self._backoff[name] = backoff
+            self._restart_at[name] = now + backoff
+            self._processes.pop(name)
+            logger.error("Process exited, restarting", extra={"worker": name, "exitcode": process.exitcode, "restart_in_s": backoff})
+        if now >= self._restart_at.get(name, 0):
+            self._spawn(name)
+
+    def _drain_orphans(self):
+        # Giảm số worker: event còn trong queue partition thừa được chuyển sang partition hiện tại trước khi router chạy
+        try:
+            orphans = drain_orphan_partitions(self.workers)
+        except Exception as e:
+            logger.error("Error draining orphan partition queues: %r", e)
+            return
+        if orphans:
+            logger.warning("Drained orphan partition queues", extra={"moved": orphans})
+            self._targets["router"] = (run_router, (self.workers, tuple(orphans)))
+
+    def run(self, poll_interval: float = 1.0):
+        signal.signal(signal.SIGTERM, lambda signum, frame: self.stop())
+        signal.signal(signal.SIGINT, lambda signum, frame: self.stop())
+        self._drain_orphans()
+        for name in self._targets:
+            self._spawn(name)
+        while not self._stopping:
+            for name in self._targets:
+                self._check(name)
+            time.sleep(poll_interval)
+        self._shutdown()
+
+    def stop(self):
+        self._stopping = True
+
+    def _shutdown(self, timeout: float = 10.0):
+        # Dừng router trước để không còn event mới được chuyển vào queue partition
+        router = self._processes.pop("router", None)
+        for process in ([router] if router else []) + list(self._processes.values()):
+            process.terminate()
+            process.join(timeout)
+            if process.is_alive():
+                process.kill()
+        self._processes.clear()
@@ -0,0 +1,14 @@
+import argparse
+from src.services.bucket_migration import migrate_to_buckets
+from src.monitoring.metrics import register_mongo_listener
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Chuyển collection notifications sang bucket theo tháng (dùng với MONGO__LAYOUT=monthly)"
+    )
+    parser.add_argument("--batch-size", type=int, default=5000, help="Số document mỗi batch")
+    parser.add_argument("--pause-ms", type=int, default=0, help="Nghỉ giữa các batch để không lấn át traffic thật")
+    args = parser.parse_args()
+
+    register_mongo_listener()
+    print(f"Bucket migration: {migrate_to_buckets(args.batch_size, args.pause_ms / 1000)}")
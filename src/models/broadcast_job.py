@@ -0,0 +1,16 @@
+from datetime import datetime
+from pydantic import BaseModel
+from typing import Optional
+
+
+class BroadcastJob(BaseModel):
+    id: str
+    title: str
+    status: str = "QUEUED"  # QUEUED | RUNNING | COMPLETED | FAILED
+    total: Optional[int] = None
+    written: int = 0
+    skipped: int = 0
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
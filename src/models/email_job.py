@@ -0,0 +1,15 @@
+from datetime import datetime
+from pydantic import BaseModel
+from typing import Optional
+
+
+class EmailJob(BaseModel):
+    id: str
+    to: str
+    subject: str
+    text: str
+    status: str = "QUEUED"  # QUEUED | SENDING | RETRYING | SENT | FAILED
+    attempts: int = 0
+    error: Optional[str] = None
+    created_at: datetime
+    sent_at: Optional[datetime] = None
@@ -0,0 +1,68 @@
+from pydantic import BaseModel, Field, model_validator
+from typing import Literal, Optional, Union
+
+
+class PrescriptionReadyData(BaseModel):
+    prescription_id: int
+    appointment_id: int
+    dispense_id: int
+    prescription_code: Optional[str] = None
+    patient_id: Optional[int] = None  # Producer có thể gửi kèm; không có thì handler tra appointment-service
+
+
+class AppointmentData(BaseModel):
+    appointment_id: int
+    patient_id: int
+    doctor_name: str
+    appointment_date: str
+    appointment_time: str
+    # Thời điểm appointment-service sửa lịch (nếu có), để lần xác nhận lại cùng giờ khám không bị coi là trùng
+    updated_at: Optional[str] = None
+
+
+class AppointmentCancelledData(AppointmentData):
+    cancellation_reason: Optional[str] = None
+
+
+class BroadcastSelector(BaseModel):
+    """Người nhận là các bệnh nhân có lịch khám với bác sĩ vào ngày đó (tra appointment-service)."""
+    doctor_name: str
+    appointment_date: str
+
+
+class BroadcastData(BaseModel):
+    title: str = Field(min_length=1)
+    message: str = Field(min_length=1)
+    user_ids: Optional[list[int]] = None
+    selector: Optional[BroadcastSelector] = None
+
+    @model_validator(mode="after")
+    def _one_audience(self):
+        if (self.user_ids is None) == (self.selector is None):
+            raise ValueError("Exactly one of user_ids or selector is required")
+        return self
+
+
+class PrescriptionReadyEvent(BaseModel):
+    event_type: Literal["prescription_ready"]
+    event_id: Optional[Union[str, int]] = None
+    data: PrescriptionReadyData
+
+
+class AppointmentConfirmedEvent(BaseModel):
+    event_type: Literal["appointment_confirmed"]
+    event_id: Optional[Union[str, int]] = None
+    data: AppointmentData
+
+
+class AppointmentCancelledEvent(BaseModel):
+    event_type: Literal["appointment_cancelled"]
+    event_id: Optional[Union[str, int]] = None
+    data: AppointmentCancelledData
+
+
+class BroadcastEvent(BaseModel):
+    event_type: Literal["broadcast"]
+    # Bắt buộc: là id của broadcast job, event giao lại không tạo job thứ hai
+    event_id: Union[str, int]
+    data: BroadcastData
@@ -10,7 +10,10 @@ class Notification(BaseModel):
     title: str
     message: str
     prescription_id: Optional[int] = None
-    appointment_id: int
+    appointment_id: Optional[int] = None  # None với notification broadcast
     dispense_id: Optional[int] = None
+    event_id: Optional[str] = None
+    kind: Optional[str] = None  # event_type tạo ra notification (None nếu tạo qua API)
+    digest_count: Optional[int] = None  # số notification đã gộp nếu đây là digest
     status: str = "UNREAD"  # UNREAD | READ
     created_at: datetime = datetime.utcnow()
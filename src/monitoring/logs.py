@@ -0,0 +1,163 @@
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import IO, Optional
+
+from config.settings import LoggingConfig, settings
+from src.monitoring.metrics import log_records_dropped_total
+
+try:
+    import orjson
+except ImportError:  # orjson là dependency (pyproject); fallback stdlib cho môi trường cài tay thiếu orjson
+    orjson = None
+
+ROOT_LOGGER = "notification"
+
+# Id theo dõi một event (event_id) hoặc một HTTP request xuyên suốt các dòng log liên quan
+correlation_id: ContextVar[Optional[str]] = ContextVar("correlation_id", default=None)
+
+# Attribute có sẵn của LogRecord; phần còn lại (truyền qua extra=) là field có cấu trúc
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+# Khi chưa gọi configure_logging (benchmark, script) log của service bị bỏ thay vì rơi vào lastResort
+logging.getLogger(ROOT_LOGGER).addHandler(logging.NullHandler())
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+def new_correlation_id() -> str:
+    return uuid.uuid4().hex
+
+class JsonFormatter(logging.Formatter):
+    """Mỗi record là một dòng JSON: ts, level, logger, msg và các field truyền qua `extra`."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        if orjson is not None:
+            return orjson.dumps(entry, default=str).decode()
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+class CorrelationFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "correlation_id", None) is None:
+            current = correlation_id.get()
+            if current is not None:
+                record.correlation_id = current
+        return True
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token bucket theo (logger, mẫu message, event_type): mỗi key được `burst` dòng rồi
+    `rate` dòng/giây. Dòng vượt mức bị bỏ và đếm; dòng kế tiếp được ghi kèm `suppressed`.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        # key -> [tokens, lần cập nhật cuối, số dòng đã bỏ]
+        self._buckets: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate <= 0:
+            return True
+        key = (record.name, record.msg, getattr(record, "event_type", None))
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(self.burst), now, 0]
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                log_records_dropped_total.inc("rate_limited")
+                return False
+            bucket[0] -= 1
+            suppressed, bucket[2] = bucket[2], 0
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler không bao giờ chặn thread gọi log: queue đầy thì bỏ record và đếm.
+
+    Thread gọi chỉ ghép message với args; format JSON và ghi stdout chạy trên thread của
+    QueueListener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Bản sao nông: handler khác (nếu có) vẫn thấy record gốc; rẻ hơn dựng lại LogRecord
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            # Traceback phải được format ngay vì frame không an toàn để giữ qua thread khác
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            log_records_dropped_total.inc("queue_full")
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_configure_lock = threading.Lock()
+
+def configure_logging(cfg: LoggingConfig = settings.logging, stream: Optional[IO[str]] = None):
+    """
+    Gắn pipeline log vào root logger (một lần mỗi process): filter correlation id và rate limit,
+    QueueHandler không chặn, và QueueListener ghi ra `stream` (mặc định stdout, JSON hoặc text)
+    trên thread nền.
+    """
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            return
+        output = logging.StreamHandler(stream or sys.stdout)
+        if cfg.format == "json":
+            output.setFormatter(JsonFormatter())
+        else:
+            output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+        handler = NonBlockingQueueHandler(queue.Queue(maxsize=cfg.queue_size))
+        handler.addFilter(CorrelationFilter())
+        handler.addFilter(RateLimitFilter(cfg.rate_limit_per_second, cfg.rate_limit_burst))
+        root = logging.getLogger()
+        root.handlers = [handler]
+        root.setLevel(cfg.level)
+        _listener = logging.handlers.QueueListener(handler.queue, output)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+def shutdown_logging():
+    """Ghi nốt các record còn trong queue rồi dừng thread ghi log."""
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
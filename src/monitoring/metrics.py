@@ -0,0 +1,280 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+from pymongo import monitoring
+from src.monitoring.profiling import profiler
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class _Metric:
+    """
+    Metric có label, ghi theo shard của từng thread.
+
+    Mỗi thread chỉ ghi vào dict của riêng nó nên hot path không cần lock; lock chỉ dùng
+    khi một thread ghi lần đầu (tạo shard). Lúc scrape các shard được cộng lại.
+    """
+
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._local = threading.local()
+        self._shards: list[dict] = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+            return shard
+
+    def _collect(self) -> list[tuple[tuple, object]]:
+        with self._shards_lock:
+            shards = list(self._shards)
+        return [item for shard in shards for item in list(shard.items())]
+
+    def _labels(self, values: tuple, extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def value(self, *labels) -> float:
+        return sum(value for key, value in self._collect() if key == labels)
+
+    def render(self) -> list[str]:
+        totals: dict[tuple, float] = {}
+        for labels, value in self._collect():
+            totals[labels] = totals.get(labels, 0) + value
+        return super().render() + [f"{self.name}{self._labels(labels)} {value}" for labels, value in totals.items()]
+
+class Gauge(Counter):
+    """Gauge dạng inc/dec (cộng dồn qua các shard), hoặc đọc giá trị từ callback lúc scrape."""
+
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._functions: dict[tuple, Callable[[], float]] = {}
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def set_function(self, function: Callable[[], float], *labels):
+        self._functions[labels] = function
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        for labels, function in list(self._functions.items()):
+            lines.append(f"{self.name}{self._labels(labels)} {function()}")
+        return lines
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels):
+        shard = self._shard()
+        # [count theo từng bucket (không cộng dồn)..., +Inf, sum]
+        state = shard.get(labels)
+        if state is None:
+            state = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        state[bisect.bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def render(self) -> list[str]:
+        merged: dict[tuple, list] = {}
+        for labels, state in self._collect():
+            total = merged.setdefault(labels, [0] * len(state))
+            for i, value in enumerate(state):
+                total[i] += value
+
+        lines = super().render()
+        for labels, state in merged.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), state):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{self._labels(labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{self._labels(labels)} {state[-1]}")
+            lines.append(f"{self.name}_count{self._labels(labels)} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """CommandListener ghi thời gian từng lệnh Mongo; đăng ký toàn cục qua register_mongo_listener()."""
+
+    def started(self, event: monitoring.CommandStartedEvent):
+        pass
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent):
+        mongo_command_duration.observe(event.duration_micros / 1e6, event.command_name, "success")
+        profiler.record("mongo", event.command_name, event.duration_micros / 1e6)
+
+    def failed(self, event: monitoring.CommandFailedEvent):
+        mongo_command_duration.observe(event.duration_micros / 1e6, event.command_name, "failure")
+        profiler.record("mongo", event.command_name, event.duration_micros / 1e6)
+
+registry = MetricsRegistry()
+
+event_duration = registry.histogram(
+    "notification_event_duration_seconds",
+    "Thời gian xử lý một event theo event_type",
+    ("event_type",)
+)
+events_total = registry.counter(
+    "notification_events_total",
+    "Số event đã xử lý theo event_type và kết quả",
+    ("event_type", "outcome")
+)
+rejected_total = registry.counter(
+    "notification_events_rejected_total",
+    "Số message bị từ chối vì không đúng schema",
+    ("event_type",)
+)
+retries_total = registry.counter(
+    "notification_event_retries_total",
+    "Số event được đưa vào retry queue (retry) hoặc dead-letter queue (dead_letter)",
+    ("outcome",)
+)
+dedup_total = registry.counter(
+    "notification_dedup_total",
+    "Kết quả kiểm tra trùng event: memory (bộ lọc trong RAM), store (upsert đã có), new",
+    ("result",)
+)
+digest_merged_total = registry.counter(
+    "notification_digest_merged_total",
+    "Số notification đã được gộp vào digest theo kind",
+    ("kind",)
+)
+cache_requests_total = registry.counter(
+    "notification_cache_requests_total",
+    "Kết quả đọc cache Redis: hit, miss (đã rebuild), wait_timeout (chờ rebuild quá lâu), error",
+    ("result",)
+)
+broadcast_recipients_total = registry.counter(
+    "notification_broadcast_recipients_total",
+    "Số người nhận broadcast đã xử lý: written (tạo mới), skipped (đã có từ lần chạy trước)",
+    ("outcome",)
+)
+archived_total = registry.counter(
+    "notification_archived_total",
+    "Số notification READ đã chuyển sang archive"
+)
+consumer_inflight = registry.gauge(
+    "notification_consumer_inflight",
+    "Số message đã nhận nhưng chưa ack",
+    ("consumer",)
+)
+mongo_command_duration = registry.histogram(
+    "mongo_command_duration_seconds",
+    "Thời gian lệnh MongoDB theo command",
+    ("command", "outcome")
+)
+appointment_request_duration = registry.histogram(
+    "appointment_service_request_duration_seconds",
+    "Thời gian gọi appointment-service theo HTTP status (error nếu lỗi mạng)",
+    ("outcome",)
+)
+appointment_circuit_open = registry.gauge(
+    "appointment_service_circuit_open",
+    "1 khi circuit breaker của appointment-service đang mở (gọi bị fail ngay)"
+)
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds",
+    "Thời gian xử lý HTTP request theo route",
+    ("method", "route", "status")
+)
+log_records_dropped_total = registry.counter(
+    "notification_log_records_dropped_total",
+    "Số dòng log bị bỏ: rate_limited (vượt giới hạn theo loại dòng), queue_full (thread ghi log không kịp)",
+    ("reason",)
+)
+
+mongo_listener = MongoCommandMetrics()
+_mongo_listener_registered = False
+
+def register_mongo_listener():
+    """
+    Đăng ký mongo_listener cho mọi MongoClient/AsyncMongoClient tạo sau lời gọi này.
+
+    Gọi lúc process khởi động (app, worker, script), trước khi client Mongo đầu tiên được tạo;
+    gọi lại nhiều lần không đăng ký trùng.
+    """
+    global _mongo_listener_registered
+    if not _mongo_listener_registered:
+        monitoring.register(mongo_listener)
+        _mongo_listener_registered = True
+
+def record_event(event_type: Optional[str], outcome: str, started: float):
+    event_type = event_type or "unknown"
+    event_duration.observe(time.perf_counter() - started, event_type)
+    events_total.inc(event_type, outcome)
@@ -0,0 +1,255 @@
+import asyncio
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Optional
+
+from config.settings import ProfilingConfig, settings
+
+# Operation (route/event) đang chạy trong context hiện tại, để Mongo/appointment-service ghi breakdown vào
+_current: ContextVar[Optional["Operation"]] = ContextVar("profiling_operation", default=None)
+
+# metrics import profiling nên ở đây không import src.monitoring.logs (vòng import); cùng logger "notification.*"
+logger = logging.getLogger("notification.profiling")
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) + os.sep
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    path = code.co_filename
+    # Rút gọn path: module của repo tính từ thư mục gốc, thư viện chỉ giữ hai cấp cuối
+    if path.startswith(_ROOT):
+        path = path[len(_ROOT):]
+    else:
+        path = "/".join(path.split(os.sep)[-2:])
+    return f"{code.co_name} ({path}:{code.co_firstlineno})"
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+class StackSampler:
+    """
+    Profiler thống kê: thread nền lấy stack của các thread thuộc operation mỗi `interval` giây
+    qua sys._current_frames() và đếm theo stack gộp (collapsed), định dạng đọc được bởi
+    flamegraph.pl, speedscope hoặc inferno.
+
+    Thread chạy event loop không bao giờ được lấy mẫu: stack của nó thuộc về mọi request async
+    đang chạy xen kẽ chứ không riêng operation này.
+    """
+
+    def __init__(self, threads: set[int], interval: float):
+        self.threads = threads
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiling-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopping.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id in list(self.threads):
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                if stack:
+                    self.stacks[";".join(reversed(stack))] += 1
+                    self.samples += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+class Operation:
+    __slots__ = ("kind", "name", "started", "breakdown", "threads", "sampler", "_token")
+
+    def __init__(self, kind: str, name: str):
+        self.kind = kind
+        self.name = name
+        self.started = time.perf_counter()
+        # part -> [số lần gọi, tổng thời gian (giây)]
+        self.breakdown: dict[str, list] = {}
+        # Middleware và route async chạy trên event loop: chỉ thread của threadpool (route sync) được lấy mẫu
+        self.threads = set() if _on_event_loop() else {threading.get_ident()}
+        self.sampler: Optional[StackSampler] = None
+        self._token = None
+
+    def add(self, part: str, seconds: float):
+        entry = self.breakdown.get(part)
+        if entry is None:
+            entry = self.breakdown[part] = [0, 0.0]
+        entry[0] += 1
+        entry[1] += seconds
+        # Route sync chạy trên threadpool: thread gọi Mongo cũng được lấy mẫu từ lần gọi đầu tiên
+        if self.sampler is not None and not _on_event_loop():
+            self.threads.add(threading.get_ident())
+
+class _Disabled:
+    """Context manager rỗng dùng khi profiling tắt: không đo, không cấp phát."""
+
+    @property
+    def name(self) -> None:
+        return None
+
+    @name.setter
+    def name(self, value: str):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_DISABLED = _Disabled()
+
+class _Operation:
+    def __init__(self, profiler: "Profiler", kind: str, name: str):
+        self.profiler = profiler
+        self.operation = Operation(kind, name)
+
+    def __enter__(self) -> Operation:
+        operation = self.operation
+        operation._token = _current.set(operation)
+        self.profiler._maybe_sample(operation)
+        return operation
+
+    def __exit__(self, *exc):
+        operation = self.operation
+        _current.reset(operation._token)
+        self.profiler._finish(operation, time.perf_counter() - operation.started)
+        return False
+
+class Profiler:
+    """
+    Profiling bật/tắt lúc chạy cho route API và event handler.
+
+    - Mỗi operation (route, event) đo tổng thời gian và breakdown theo phần (Mongo command,
+      appointment-service); vượt `slow_threshold_ms` thì vào slow log. Mongo command và lời gọi
+      appointment-service chậm cũng được ghi riêng.
+    - `sample_rate` phần operation được lấy mẫu stack (StackSampler) và lưu dạng collapsed stack.
+
+    Khi tắt, operation() trả về một context manager rỗng dùng chung và record() thoát ngay.
+    Trạng thái nằm trong từng process: consumer chạy bằng consumer_pool có profiler riêng.
+    """
+
+    def __init__(self, cfg: ProfilingConfig):
+        self.enabled = cfg.enabled
+        self.sample_rate = cfg.sample_rate
+        self.slow_threshold = cfg.slow_threshold_ms / 1000
+        self.interval = cfg.interval_ms / 1000
+        self.max_concurrent_samples = cfg.max_concurrent_samples
+        self.profiles: deque = deque(maxlen=cfg.max_profiles)
+        self.slow_operations: deque = deque(maxlen=cfg.max_slow_operations)
+        self._active_samplers = 0
+        self._lock = threading.Lock()
+
+    def configure(
+        self,
+        enabled: Optional[bool] = None,
+        sample_rate: Optional[float] = None,
+        slow_threshold_ms: Optional[float] = None
+    ):
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+        if slow_threshold_ms is not None:
+            self.slow_threshold = slow_threshold_ms / 1000
+        if enabled is not None:
+            self.enabled = enabled
+
+    def status(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "slow_threshold_ms": self.slow_threshold * 1000,
+            "interval_ms": self.interval * 1000,
+            "profiles": len(self.profiles),
+            "slow_operations": len(self.slow_operations),
+        }
+
+    def operation(self, kind: str, name: str):
+        """Context manager bao một route/event; trả về Operation (đổi được `name`) hoặc object rỗng khi tắt."""
+        if not self.enabled:
+            return _DISABLED
+        return _Operation(self, kind, name)
+
+    def record(self, part: str, detail: str, seconds: float):
+        """Ghi thời gian một lời gọi ra ngoài (Mongo command, appointment-service) vào operation hiện tại."""
+        if not self.enabled:
+            return
+        operation = _current.get()
+        if operation is not None:
+            operation.add(f"{part}.{detail}", seconds)
+        if seconds >= self.slow_threshold:
+            self._log_slow(part, detail, seconds, None)
+
+    def get_profile(self, profile_id: str) -> Optional[dict]:
+        return next((profile for profile in self.profiles if profile["id"] == profile_id), None)
+
+    def _maybe_sample(self, operation: Operation):
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return
+        # Giới hạn số sampler chạy cùng lúc để profiling không tự làm chậm service
+        with self._lock:
+            if self._active_samplers >= self.max_concurrent_samples:
+                return
+            self._active_samplers += 1
+        operation.sampler = StackSampler(operation.threads, self.interval)
+        operation.sampler.start()
+
+    def _finish(self, operation: Operation, seconds: float):
+        sampler = operation.sampler
+        if sampler is not None:
+            sampler.stop()
+            with self._lock:
+                self._active_samplers -= 1
+            self.profiles.append({
+                "id": uuid.uuid4().hex,
+                "kind": operation.kind,
+                "name": operation.name,
+                "duration_ms": round(seconds * 1000, 3),
+                "samples": sampler.samples,
+                "created_at": datetime.utcnow(),
+                "collapsed": sampler.collapsed(),
+            })
+        if seconds >= self.slow_threshold:
+            self._log_slow(operation.kind, operation.name, seconds, operation.breakdown)
+
+    def _log_slow(self, kind: str, name: str, seconds: float, breakdown: Optional[dict]):
+        entry = {
+            "kind": kind,
+            "name": name,
+            "duration_ms": round(seconds * 1000, 3),
+            "at": datetime.utcnow(),
+        }
+        if breakdown is not None:
+            parts = {part: {"calls": calls, "ms": round(total * 1000, 3)} for part, (calls, total) in breakdown.items()}
+            # Phần còn lại là thời gian trong code của service (CPU, chờ lock/threadpool...)
+            parts["self"] = {"calls": 1, "ms": round((seconds - sum(total for _, total in breakdown.values())) * 1000, 3)}
+            entry["breakdown"] = parts
+        self.slow_operations.append(entry)
+        logger.warning(
+            "Slow %s %s: %sms", kind, name, entry["duration_ms"],
+            extra={"kind": kind, "operation": name, "duration_ms": entry["duration_ms"], "breakdown": entry.get("breakdown")}
+        )
+
+profiler = Profiler(settings.profiling)
@@ -0,0 +1,12 @@
+import argparse
+from src.services.notification_service import NotificationService
+from src.monitoring.metrics import register_mongo_listener
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tính lại notification summary từ collection notifications")
+    parser.add_argument("--user-id", type=int, default=None, help="Chỉ rebuild cho một user")
+    args = parser.parse_args()
+
+    register_mongo_listener()
+    NotificationService().rebuild_summaries(args.user_id)
+    print("Rebuilt notification summaries" + (f" for user {args.user_id}" if args.user_id is not None else ""))
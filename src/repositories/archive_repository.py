@@ -0,0 +1,122 @@
+import zlib
+from collections import defaultdict
+from datetime import datetime
+from typing import Iterable, Iterator, Optional
+
+import bson
+from bson import Binary, ObjectId
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from src.repositories.notification_repository import db
+
+archive = db["notification_archive"]
+
+ARCHIVE_INDEX = [("user_id", ASCENDING), ("month", DESCENDING)]
+
+def month_of(created_at: datetime) -> datetime:
+    return datetime(created_at.year, created_at.month, 1)
+
+def sort_key(doc: dict) -> tuple[datetime, ObjectId]:
+    return doc["created_at"], doc["_id"]
+
+def encode_block(docs: list[dict], level: int) -> Binary:
+    return Binary(zlib.compress(bson.encode({"items": docs}), level))
+
+def decode_block(data: bytes) -> list[dict]:
+    return bson.decode(zlib.decompress(data))["items"]
+
+def archive_updates(docs: list[dict], level: int) -> list[UpdateOne]:
+    """Mỗi (user, tháng) thêm một block nén vào bucket `<user_id>:<YYYY-MM>`."""
+    buckets = defaultdict(list)
+    for doc in docs:
+        buckets[(doc["user_id"], month_of(doc["created_at"]))].append(doc)
+    return [
+        UpdateOne(
+            {"_id": f"{user_id}:{month:%Y-%m}"},
+            {
+                "$setOnInsert": {"user_id": user_id, "month": month},
+                "$inc": {"count": len(items)},
+                "$min": {"min_created_at": min(doc["created_at"] for doc in items)},
+                "$max": {"max_created_at": max(doc["created_at"] for doc in items)},
+                "$push": {"blocks": {"count": len(items), "data": encode_block(items, level)}},
+            },
+            upsert=True
+        )
+        for (user_id, month), items in buckets.items()
+    ]
+
+def bucket_query(user_id: int, before: Optional[tuple[datetime, ObjectId]]) -> dict:
+    query = {"user_id": user_id}
+    if before:
+        query["month"] = {"$lte": month_of(before[0])}
+    return query
+
+def unpack_bucket(bucket: dict, before: Optional[tuple[datetime, ObjectId]]) -> list[dict]:
+    # Job bị ngắt giữa lúc ghi archive và xóa bản live có thể archive một notification hai lần
+    docs = {}
+    for block in bucket["blocks"]:
+        for doc in decode_block(block["data"]):
+            if before is None or sort_key(doc) < before:
+                docs[doc["_id"]] = doc
+    return sorted(docs.values(), key=sort_key, reverse=True)
+
+def export_bucket_query(user_id: int, created_from: Optional[datetime], created_to: Optional[datetime]) -> dict:
+    query = {"user_id": user_id}
+    if created_from or created_to:
+        query["month"] = {}
+        if created_from:
+            query["month"]["$gte"] = month_of(created_from)
+        if created_to:
+            query["month"]["$lte"] = month_of(created_to)
+    return query
+
+def unpack_export(bucket: dict, created_from: Optional[datetime], created_to: Optional[datetime]) -> list[dict]:
+    return [
+        doc for doc in unpack_bucket(bucket, None)
+        if (created_from is None or doc["created_at"] >= created_from) and (created_to is None or doc["created_at"] < created_to)
+    ]
+
+def collect(buckets: Iterable[dict], before: Optional[tuple[datetime, ObjectId]], limit: int) -> list[dict]:
+    """Bucket đã sort theo tháng giảm dần; chỉ giải nén tới khi đủ `limit` notification."""
+    docs = []
+    for bucket in buckets:
+        docs += unpack_bucket(bucket, before)
+        if len(docs) >= limit:
+            break
+    return docs[:limit]
+
+class ArchiveRepository:
+    """
+    Tầng archive cho notification READ cũ.
+
+    Mỗi document là một bucket theo user và tháng; notification được lưu thành các block
+    BSON nén zlib, mỗi lần compaction thêm một block.
+    """
+
+    @staticmethod
+    def ensure_indexes():
+        archive.create_index(ARCHIVE_INDEX, name="user_month")
+
+    @staticmethod
+    def add(docs: list[dict], level: int):
+        updates = archive_updates(docs, level)
+        if updates:
+            archive.bulk_write(updates, ordered=False)
+
+    @staticmethod
+    def find_by_user(user_id: int, limit: int, before: Optional[tuple[datetime, ObjectId]] = None) -> list[dict]:
+        # batch_size nhỏ vì thường chỉ cần một hai bucket gần nhất
+        buckets = archive.find(bucket_query(user_id, before)).sort("month", DESCENDING).batch_size(2)
+        try:
+            return collect(buckets, before, limit)
+        finally:
+            buckets.close()
+
+    @staticmethod
+    def iter_export(user_id: int, created_from: Optional[datetime], created_to: Optional[datetime]) -> Iterator[list[dict]]:
+        """Notification đã archive của user theo từng bucket (một tháng), mới nhất trước; mỗi lần chỉ giải nén một bucket."""
+        buckets = archive.find(export_bucket_query(user_id, created_from, created_to)).sort("month", DESCENDING).batch_size(2)
+        try:
+            for bucket in buckets:
+                yield unpack_export(bucket, created_from, created_to)
+        finally:
+            buckets.close()
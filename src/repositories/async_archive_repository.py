@@ -0,0 +1,35 @@
+from datetime import datetime
+from typing import AsyncIterator, Optional
+
+from bson import ObjectId
+from pymongo import DESCENDING
+from src.repositories.archive_repository import bucket_query, export_bucket_query, unpack_bucket, unpack_export
+from src.repositories.async_notification_repository import get_async_db
+
+def _archive():
+    return get_async_db()["notification_archive"]
+
+class AsyncArchiveRepository:
+    """Bản async của phần đọc ArchiveRepository (compaction chỉ chạy ở job nền)."""
+
+    @staticmethod
+    async def find_by_user(user_id: int, limit: int, before: Optional[tuple[datetime, ObjectId]] = None) -> list[dict]:
+        docs = []
+        buckets = _archive().find(bucket_query(user_id, before)).sort("month", DESCENDING).batch_size(2)
+        try:
+            async for bucket in buckets:
+                docs += unpack_bucket(bucket, before)
+                if len(docs) >= limit:
+                    break
+        finally:
+            await buckets.close()
+        return docs[:limit]
+
+    @staticmethod
+    async def iter_export(user_id: int, created_from: Optional[datetime], created_to: Optional[datetime]) -> AsyncIterator[list[dict]]:
+        buckets = _archive().find(export_bucket_query(user_id, created_from, created_to)).sort("month", DESCENDING).batch_size(2)
+        try:
+            async for bucket in buckets:
+                yield unpack_export(bucket, created_from, created_to)
+        finally:
+            await buckets.close()
@@ -0,0 +1,214 @@
+from datetime import datetime
+from typing import AsyncIterator, Optional
+
+from bson import ObjectId
+from pymongo import AsyncMongoClient
+from pymongo.errors import BulkWriteError
+from config.settings import settings
+from src.repositories.notification_buckets import (
+    BUCKET_FILTER,
+    LEGACY_COLLECTION,
+    bucket_name,
+    catalog,
+    earlier_collections,
+    group_by_bucket,
+    merge_update_results,
+    monthly
+)
+from src.repositories.notification_repository import (
+    EVENT_ID_INDEX,
+    EXPORT_PROJECTION,
+    LIST_PROJECTION,
+    LIST_SORT,
+    USER_PAGE_INDEX,
+    created_notifications,
+    insert_ops,
+    upserted_indexes,
+    user_page_query
+)
+
+_client: Optional[AsyncMongoClient] = None
+
+def get_async_db():
+    # Tạo client khi dùng lần đầu để gắn với event loop đang chạy
+    global _client
+    if _client is None:
+        mongo_cfg = settings.mongo
+        _client = AsyncMongoClient(
+            host=mongo_cfg.host,
+            port=mongo_cfg.port,
+            username=mongo_cfg.username,
+            password=mongo_cfg.password
+        )
+    return _client[settings.mongo.database]
+
+async def close_async_client():
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+def _collection():
+    return get_async_db()[LEGACY_COLLECTION]
+
+async def _create_indexes(target):
+    await target.create_index(USER_PAGE_INDEX, name="user_created_at_id")
+    await target.create_index("event_id", **EVENT_ID_INDEX)
+
+async def _refresh_catalog():
+    if catalog.stale():
+        names = await get_async_db().list_collection_names(filter=BUCKET_FILTER)
+        catalog.update(names, await _collection().estimated_document_count() > 0)
+
+async def _write_bucket(name: str):
+    bucket = get_async_db()[name]
+    if name not in catalog.indexed:
+        await _create_indexes(bucket)
+        catalog.add(name)
+    return bucket
+
+async def _read_collections(newest: Optional[datetime] = None, oldest: Optional[datetime] = None) -> list:
+    if not monthly():
+        return [_collection()]
+    await _refresh_catalog()
+    return [get_async_db()[name] for name in catalog.read_order(newest, oldest)]
+
+async def _stored_earlier(name: str, notifications: list[dict], positions: list[int]) -> set[int]:
+    event_ids = list({notifications[i]["event_id"] for i in positions if notifications[i].get("event_id")})
+    if not event_ids:
+        return set()
+    stored = set()
+    for earlier in earlier_collections(name):
+        async for doc in get_async_db()[earlier].find({"event_id": {"$in": event_ids}}, {"event_id": 1}):
+            stored.add(doc["event_id"])
+    return {i for i in positions if notifications[i].get("event_id") in stored}
+
+async def _write_groups(notifications: list[dict]) -> list[tuple]:
+    # Như NotificationRepository: bỏ event đã lưu ở bucket tháng trước
+    if not monthly():
+        return [(_collection(), list(range(len(notifications))))]
+    await _refresh_catalog()
+    groups = []
+    for name, positions in group_by_bucket(notifications).items():
+        stored = await _stored_earlier(name, notifications, positions)
+        positions = [i for i in positions if i not in stored]
+        if positions:
+            groups.append((await _write_bucket(name), positions))
+    return groups
+
+async def _id_groups(ids: list[ObjectId]) -> list[tuple]:
+    if not monthly():
+        return [(_collection(), ids)]
+    await _refresh_catalog()
+    return [(get_async_db()[name], bucket_ids) for name, bucket_ids in catalog.id_candidates(ids).items()]
+
+class AsyncNotificationRepository:
+    """Cùng interface với NotificationRepository (kể cả layout monthly) nhưng dùng AsyncMongoClient của PyMongo."""
+
+    @staticmethod
+    async def ensure_indexes():
+        if not monthly():
+            await _create_indexes(_collection())
+            return
+        await _refresh_catalog()
+        for name in catalog.read_order():
+            if name != LEGACY_COLLECTION:
+                await _write_bucket(name)
+
+    @staticmethod
+    async def save(notification: dict):
+        if monthly():
+            target = await _write_bucket(bucket_name(notification.get("created_at") or datetime.utcnow()))
+        else:
+            target = _collection()
+        result = await target.insert_one(notification)
+        return str(result.inserted_id)
+
+    @staticmethod
+    async def save_many(notifications: list[dict]) -> list[dict]:
+        upserted = set()
+        for target, positions in await _write_groups(notifications):
+            part = notifications if len(positions) == len(notifications) else [notifications[i] for i in positions]
+            try:
+                indexes = (await target.bulk_write(insert_ops(part), ordered=False)).upserted_ids
+            except BulkWriteError as e:
+                indexes = upserted_indexes(e)
+            upserted.update(positions[i] for i in indexes)
+        return created_notifications(notifications, upserted)
+
+    @staticmethod
+    async def find_by_user(
+        user_id: int,
+        limit: Optional[int] = None,
+        before: Optional[tuple[datetime, ObjectId]] = None,
+        status: Optional[str] = None
+    ):
+        query = user_page_query(user_id, before, status)
+        docs = []
+        for target in await _read_collections(newest=before[0] if before else None):
+            cursor = target.find(query, LIST_PROJECTION).sort(LIST_SORT)
+            if limit:
+                cursor = cursor.limit(limit - len(docs))
+            docs += await cursor.to_list()
+            if limit and len(docs) >= limit:
+                break
+        return docs
+
+    @staticmethod
+    async def iter_export(query: dict, batch_size: int) -> AsyncIterator[dict]:
+        created_at = query.get("created_at", {})
+        for target in await _read_collections(created_at.get("$lt"), created_at.get("$gte")):
+            cursor = target.find(query, EXPORT_PROJECTION, batch_size=batch_size)
+            if "user_id" in query:
+                cursor = cursor.sort(LIST_SORT)
+            try:
+                async for doc in cursor:
+                    yield doc
+            finally:
+                await cursor.close()
+
+    @staticmethod
+    async def live_ids(ids: list[ObjectId]) -> set[ObjectId]:
+        found = set()
+        for target, group in await _id_groups(ids):
+            found.update(doc["_id"] async for doc in target.find({"_id": {"$in": group}}, {"_id": 1}))
+        return found
+
+    @staticmethod
+    async def mark_as_read(notification_id: str) -> Optional[dict]:
+        for target, ids in await _id_groups([ObjectId(notification_id)]):
+            updated = await target.find_one_and_update(
+                {"_id": ids[0], "status": "UNREAD"},
+                {"$set": {"status": "READ"}},
+                projection={"user_id": 1}
+            )
+            if updated is not None:
+                return updated
+        return None
+
+    @staticmethod
+    async def find_statuses(notification_ids: list[ObjectId]) -> list[dict]:
+        docs = []
+        for target, ids in await _id_groups(notification_ids):
+            docs += await target.find({"_id": {"$in": ids}}, {"user_id": 1, "status": 1}).to_list()
+        return docs
+
+    @staticmethod
+    async def mark_many_as_read(user_id: int, notification_ids: list[ObjectId]):
+        return merge_update_results([
+            await target.update_many(
+                {"_id": {"$in": ids}, "user_id": user_id, "status": "UNREAD"},
+                {"$set": {"status": "READ"}}
+            )
+            for target, ids in await _id_groups(notification_ids)
+        ])
+
+    @staticmethod
+    async def mark_all_as_read(user_id: int, up_to: datetime):
+        return merge_update_results([
+            await target.update_many(
+                {"user_id": user_id, "status": "UNREAD", "created_at": {"$lte": up_to}},
+                {"$set": {"status": "READ"}}
+            )
+            for target in await _read_collections(newest=up_to)
+        ])
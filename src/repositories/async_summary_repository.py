@@ -0,0 +1,45 @@
+from datetime import datetime
+from typing import Optional
+
+from bson import ObjectId
+from src.repositories.async_notification_repository import get_async_db
+from src.repositories.summary_repository import mark_read_update, summary_updates
+
+def _summaries():
+    return get_async_db()["notification_summaries"]
+
+class AsyncSummaryRepository:
+    """Bản async của SummaryRepository (không gồm rebuild, vốn chỉ chạy từ command line)."""
+
+    @staticmethod
+    async def find_by_user(user_id: int) -> Optional[dict]:
+        return await _summaries().find_one({"_id": user_id})
+
+    @staticmethod
+    async def find_version(user_id: int) -> int:
+        summary = await _summaries().find_one({"_id": user_id}, {"version": 1})
+        return summary.get("version", 0) if summary else 0
+
+    @staticmethod
+    async def add(notifications: list[dict]):
+        updates = summary_updates(notifications)
+        if updates:
+            await _summaries().bulk_write(updates, ordered=False)
+
+    @staticmethod
+    async def mark_as_read(user_id: int, notification_id: ObjectId):
+        await AsyncSummaryRepository.mark_many_as_read(user_id, [notification_id], 1)
+
+    @staticmethod
+    async def mark_many_as_read(user_id: int, notification_ids: list[ObjectId], modified: int):
+        await AsyncSummaryRepository._mark_read(user_id, modified, {"header.notification_id": {"$in": notification_ids}})
+
+    @staticmethod
+    async def mark_all_as_read(user_id: int, up_to: datetime, modified: int):
+        await AsyncSummaryRepository._mark_read(user_id, modified, {"header.created_at": {"$lte": up_to}})
+
+    @staticmethod
+    async def _mark_read(user_id: int, modified: int, header_filter: dict):
+        if modified <= 0:
+            return
+        await _summaries().update_one({"_id": user_id}, mark_read_update(modified), array_filters=[header_filter])
@@ -0,0 +1,127 @@
+from datetime import datetime, timedelta
+from typing import Optional
+
+from pymongo.errors import BulkWriteError
+
+from src.repositories.notification_repository import db, duplicate_indexes
+
+broadcast_jobs = db["broadcast_jobs"]
+broadcast_recipients = db["broadcast_recipients"]
+
+# Trạng thái broadcast được giữ 30 ngày rồi tự xóa
+BROADCAST_JOB_TTL_SECONDS = 30 * 86400
+# Job ở các trạng thái này được phép chạy (lại); notification đã ghi trước đó bị bỏ qua nhờ event_id
+RUNNABLE = ["QUEUED", "FAILED"]
+# Số user_id mỗi document broadcast_recipients (~140KB), cố định để submit lại luôn ra cùng các chunk
+RECIPIENTS_PER_DOC = 10000
+
+class BroadcastJobRepository:
+    """
+    Trạng thái và tiến độ broadcast job (_id = job id), dùng chung giữa API và các process consumer.
+
+    Job lưu luôn nội dung và đối tượng nhận (`request`; user_ids tách theo chunk sang
+    broadcast_recipients vì một document không chứa nổi 1 triệu id) để process khác chạy lại được
+    job QUEUED hoặc job RUNNING mà owner không còn cập nhật heartbeat.
+    """
+
+    @staticmethod
+    def ensure_indexes():
+        broadcast_jobs.create_index("created_at", name="created_at_ttl", expireAfterSeconds=BROADCAST_JOB_TTL_SECONDS)
+        broadcast_jobs.create_index([("status", 1), ("heartbeat_at", 1)], name="status_heartbeat")
+        broadcast_recipients.create_index([("job_id", 1), ("index", 1)], name="job_index")
+        broadcast_recipients.create_index("created_at", name="created_at_ttl", expireAfterSeconds=BROADCAST_JOB_TTL_SECONDS)
+
+    @staticmethod
+    def create(job_id: str, request: dict, user_ids: Optional[list[int]]) -> dict:
+        """
+        Tạo job QUEUED nếu chưa có; trả về job hiện tại (có thể đã tồn tại từ lần submit trước).
+
+        user_ids được ghi trước job (_id `{job_id}:{index}`, chunk đã có từ lần submit trước được bỏ qua)
+        nên job đã thấy được thì luôn đủ người nhận.
+        """
+        now = datetime.utcnow()
+        if user_ids and broadcast_jobs.find_one({"_id": job_id}, {"_id": 1}) is None:
+            try:
+                broadcast_recipients.insert_many([
+                    {"_id": f"{job_id}:{index}", "job_id": job_id, "index": index, "user_ids": user_ids[start:start + RECIPIENTS_PER_DOC], "created_at": now}
+                    for index, start in enumerate(range(0, len(user_ids), RECIPIENTS_PER_DOC))
+                ], ordered=False)
+            except BulkWriteError as e:
+                # Chunk đã ghi từ lần submit trước (process chết trước khi tạo job): cùng nội dung
+                duplicate_indexes(e)
+        broadcast_jobs.update_one(
+            {"_id": job_id},
+            {"$setOnInsert": {
+                "title": request["title"],
+                "request": request,
+                "status": "QUEUED",
+                "written": 0,
+                "skipped": 0,
+                "created_at": now,
+            }},
+            upsert=True
+        )
+        return broadcast_jobs.find_one({"_id": job_id})
+
+    @staticmethod
+    def load_user_ids(job_id: str) -> list[int]:
+        user_ids = []
+        for chunk in broadcast_recipients.find({"job_id": job_id}, {"user_ids": 1}).sort("index", 1):
+            user_ids.extend(chunk["user_ids"])
+        return user_ids
+
+    @staticmethod
+    def claim(job_id: str, owner: str, lease_seconds: float) -> bool:
+        """
+        Chuyển job sang RUNNING cho `owner`; False nếu job đang chạy ở nơi khác hoặc đã xong.
+
+        Job RUNNING có heartbeat cũ hơn `lease_seconds` (owner chết giữa chừng) được giành lại.
+        """
+        now = datetime.utcnow()
+        return broadcast_jobs.find_one_and_update(
+            {"_id": job_id, "$or": [
+                {"status": {"$in": RUNNABLE}},
+                {"status": "RUNNING", "heartbeat_at": {"$lt": now - timedelta(seconds=lease_seconds)}},
+            ]},
+            {"$set": {
+                "status": "RUNNING",
+                "owner": owner,
+                "heartbeat_at": now,
+                "written": 0,
+                "skipped": 0,
+                "error": None,
+                "started_at": now,
+                "finished_at": None,
+            }},
+            projection={"_id": 1}
+        ) is not None
+
+    @staticmethod
+    def heartbeat(job_id: str, owner: str, fields: dict) -> bool:
+        """Ghi tiến độ và gia hạn lease; False nếu job đã bị process khác giành lại."""
+        result = broadcast_jobs.update_one(
+            {"_id": job_id, "status": "RUNNING", "owner": owner},
+            {"$set": {**fields, "heartbeat_at": datetime.utcnow()}}
+        )
+        return result.matched_count == 1
+
+    @staticmethod
+    def release(job_id: str, owner: str, fields: dict):
+        """Kết thúc lượt chạy của `owner` (COMPLETED/FAILED/QUEUED); bỏ qua nếu job đã đổi owner."""
+        broadcast_jobs.update_one(
+            {"_id": job_id, "status": "RUNNING", "owner": owner},
+            {"$set": {**fields, "owner": None, "heartbeat_at": None}}
+        )
+
+    @staticmethod
+    def find_recoverable(lease_seconds: float, limit: int = 100) -> list[dict]:
+        """Job QUEUED (chưa ai chạy, vd. còn trong hàng đợi của process đã tắt) và job RUNNING mất heartbeat."""
+        stale_before = datetime.utcnow() - timedelta(seconds=lease_seconds)
+        return list(broadcast_jobs.find(
+            {"$or": [{"status": "QUEUED"}, {"status": "RUNNING", "heartbeat_at": {"$lt": stale_before}}]},
+            {"_id": 1, "request": 1}
+        ).sort("created_at", 1).limit(limit))
+
+    @staticmethod
+    def find(job_id: str) -> Optional[dict]:
+        return broadcast_jobs.find_one({"_id": job_id})
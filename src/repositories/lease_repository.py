@@ -0,0 +1,34 @@
+from datetime import datetime, timedelta
+
+from pymongo.errors import DuplicateKeyError
+
+from src.repositories.notification_repository import db
+
+leases = db["leases"]
+
+class LeaseRepository:
+    """
+    Lease theo tên (_id = tên job) để job nền chỉ chạy ở một process dù app có nhiều replica.
+
+    Người giữ gia hạn lease trong lúc chạy; process chết thì lease hết hạn sau `ttl` giây và
+    process khác giành được.
+    """
+
+    @staticmethod
+    def acquire(name: str, owner: str, ttl: float) -> bool:
+        """Giành hoặc gia hạn lease; False nếu một owner khác đang giữ lease chưa hết hạn."""
+        now = datetime.utcnow()
+        try:
+            leases.update_one(
+                {"_id": name, "$or": [{"owner": owner}, {"expires_at": {"$lte": now}}]},
+                {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=ttl)}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # Lease còn hạn của owner khác: filter không khớp nên upsert đụng _id đã có
+            return False
+        return True
+
+    @staticmethod
+    def release(name: str, owner: str):
+        leases.delete_one({"_id": name, "owner": owner})
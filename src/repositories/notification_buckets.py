@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Iterable, Optional
+
+from bson import ObjectId
+from pymongo.results import UpdateResult
+from config.settings import settings
+
+# Layout "monthly": mỗi tháng (theo created_at, UTC) một collection notifications_YYYYMM.
+# Collection notifications cũ (layout "single") được đọc như bucket cũ nhất cho tới khi migrate xong.
+LEGACY_COLLECTION = "notifications"
+BUCKET_PREFIX = "notifications_"
+BUCKET_FILTER = {"name": {"$regex": rf"^{BUCKET_PREFIX}\d{{6}}$"}}
+# Process khác (consumer, migration) có thể tạo bucket mới: danh sách bucket được đọc lại sau khoảng này
+CATALOG_TTL_SECONDS = 60
+
+def monthly() -> bool:
+    return settings.mongo.layout == "monthly"
+
+def month_of(at: datetime) -> datetime:
+    return datetime(at.year, at.month, 1)
+
+def bucket_name(at: datetime) -> str:
+    return f"{BUCKET_PREFIX}{at:%Y%m}"
+
+def bucket_month(name: str) -> datetime:
+    return datetime.strptime(name[len(BUCKET_PREFIX):], "%Y%m")
+
+def previous_month(month: datetime) -> datetime:
+    return datetime(month.year - 1, 12, 1) if month.month == 1 else datetime(month.year, month.month - 1, 1)
+
+def id_month(_id: ObjectId) -> datetime:
+    return month_of(_id.generation_time.replace(tzinfo=None))
+
+def earlier_collections(name: str) -> list[str]:
+    """Nơi một event ghi vào bucket `name` có thể đã được lưu trước đó: bucket tháng trước và collection cũ."""
+    names = [bucket_name(previous_month(bucket_month(name)))]
+    return names + [LEGACY_COLLECTION] if catalog.legacy else names
+
+def group_by_bucket(notifications: list[dict]) -> dict[str, list[int]]:
+    """Vị trí của các notification theo bucket (created_at; thiếu created_at thì tính theo lúc ghi)."""
+    groups = defaultdict(list)
+    now = datetime.utcnow()
+    for i, notification in enumerate(notifications):
+        groups[bucket_name(notification.get("created_at") or now)].append(i)
+    return groups
+
+def merge_update_results(results: Iterable[UpdateResult]) -> UpdateResult:
+    matched = modified = 0
+    for result in results:
+        matched += result.matched_count
+        modified += result.modified_count
+    return UpdateResult({"n": matched, "nModified": modified}, True)
+
+class BucketCatalog:
+    """
+    Danh sách bucket đang có (đọc bằng listCollections, cache CATALOG_TTL_SECONDS) và các
+    bucket đã được tạo index trong process này.
+
+    Đọc theo khoảng thời gian chỉ đi qua các bucket giao với khoảng đó, mới nhất trước. Bucket
+    của tháng hiện tại và tháng trước luôn được tính là có, để bucket mới do process khác tạo
+    lúc sang tháng không bị bỏ sót trong lúc cache chưa được làm mới.
+    """
+
+    def __init__(self):
+        self.buckets: set[str] = set()
+        self.legacy = False
+        self.indexed: set[str] = set()
+        self._refreshed_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def stale(self) -> bool:
+        return time.monotonic() - self._refreshed_at >= CATALOG_TTL_SECONDS
+
+    def update(self, names: Iterable[str], legacy: bool):
+        with self._lock:
+            self.buckets = set(names)
+            self.legacy = legacy
+            self._refreshed_at = time.monotonic()
+
+    def invalidate(self):
+        self._refreshed_at = float("-inf")
+
+    def add(self, name: str):
+        with self._lock:
+            self.buckets.add(name)
+            self.indexed.add(name)
+
+    def _known(self) -> list[str]:
+        current = month_of(datetime.utcnow())
+        names = self.buckets | {bucket_name(current), bucket_name(previous_month(current))}
+        return sorted(names, reverse=True)
+
+    def read_order(self, newest: Optional[datetime] = None, oldest: Optional[datetime] = None) -> list[str]:
+        """Bucket có thể chứa notification với created_at trong [oldest, newest], mới nhất trước."""
+        names = [
+            name for name in self._known()
+            if (newest is None or bucket_month(name) <= newest) and (oldest is None or bucket_month(name) >= month_of(oldest))
+        ]
+        return names + [LEGACY_COLLECTION] if self.legacy else names
+
+    def id_candidates(self, ids: Iterable[ObjectId]) -> dict[str, list[ObjectId]]:
+        """
+        Bucket có thể chứa từng id: tháng của timestamp trong ObjectId và tháng trước đó
+        (_id được sinh ngay sau created_at nên chỉ lệch tháng khi tạo đúng lúc giao tháng).
+        """
+        known = set(self._known())
+        candidates = defaultdict(list)
+        for _id in ids:
+            month = id_month(_id)
+            for name in (bucket_name(month), bucket_name(previous_month(month))):
+                if name in known:
+                    candidates[name].append(_id)
+            if self.legacy:
+                candidates[LEGACY_COLLECTION].append(_id)
+        return candidates
+
+catalog = BucketCatalog()
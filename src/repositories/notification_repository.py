@@ -1,28 +1,387 @@
-from pymongo import MongoClient
-from config.settings import settings
-
-mongo_cfg = settings.mongo
-client = MongoClient(
-    host=mongo_cfg.host,
-    port=mongo_cfg.port,
-    username=mongo_cfg.username,
-    password=mongo_cfg.password
+from datetime import datetime
+from typing import Iterator, Optional
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+from config.resources import LazyDatabase
+from src.repositories.notification_buckets import (
+    BUCKET_FILTER,
+    LEGACY_COLLECTION,
+    bucket_name,
+    catalog,
+    earlier_collections,
+    group_by_bucket,
+    merge_update_results,
+    monthly
 )
-db = client[mongo_cfg.database]
+
+# MongoClient chỉ được tạo khi có lệnh đầu tiên tới collection (xem config.resources)
+db = LazyDatabase()
 collection = db["notifications"]
 
+# Chỉ lấy các field mà API trả về
+LIST_PROJECTION = {
+    "user_id": 1,
+    "title": 1,
+    "message": 1,
+    "prescription_id": 1,
+    "appointment_id": 1,
+    "dispense_id": 1,
+    "status": 1,
+    "created_at": 1,
+}
+# Export cho support/audit: thêm các field truy vết nguồn gốc notification
+EXPORT_PROJECTION = {**LIST_PROJECTION, "event_id": 1, "kind": 1, "digest_count": 1}
+LIST_SORT = [("created_at", DESCENDING), ("_id", DESCENDING)]
+USER_PAGE_INDEX = [("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]
+# Notification cũ (trước khi có event_id) không bị unique index ràng buộc
+EVENT_ID_INDEX = {"name": "event_id_unique", "unique": True, "partialFilterExpression": {"event_id": {"$exists": True}}}
+DUPLICATE_KEY = 11000
+# Job retention tìm notification READ cũ theo created_at
+RETENTION_INDEX = [("status", ASCENDING), ("created_at", ASCENDING)]
+UNREAD_TTL_INDEX = "unread_ttl"
+
+def user_page_query(
+    user_id: int,
+    before: Optional[tuple[datetime, ObjectId]] = None,
+    status: Optional[str] = None
+) -> dict:
+    query = {"user_id": user_id}
+    if status:
+        query["status"] = status
+    if before:
+        created_at, _id = before
+        query["$or"] = [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": _id}},
+        ]
+    return query
+
+def export_query(user_id: Optional[int], created_from: Optional[datetime], created_to: Optional[datetime]) -> dict:
+    # created_from tính cả mốc, created_to không tính
+    query = {} if user_id is None else {"user_id": user_id}
+    if created_from or created_to:
+        query["created_at"] = {}
+        if created_from:
+            query["created_at"]["$gte"] = created_from
+        if created_to:
+            query["created_at"]["$lt"] = created_to
+    return query
+
+def insert_ops(notifications: list[dict]) -> list:
+    """
+    Notification có event_id được ghi bằng upsert ($setOnInsert) theo event_id nên event
+    giao lại không tạo bản sao; notification không có event_id vẫn insert bình thường.
+    """
+    ops = []
+    for notification in notifications:
+        notification.setdefault("_id", ObjectId())
+        if notification.get("event_id"):
+            # event_id được lấy từ filter khi upsert tạo document mới
+            fields = {key: value for key, value in notification.items() if key != "event_id"}
+            ops.append(UpdateOne({"event_id": notification["event_id"]}, {"$setOnInsert": fields}, upsert=True))
+        else:
+            ops.append(InsertOne(notification))
+    return ops
+
+def upserted_indexes(error: BulkWriteError) -> set[int]:
+    # Hai upsert cùng event_id chạy song song có thể đụng unique index: bản thua được coi là trùng
+    if any(write_error["code"] != DUPLICATE_KEY for write_error in error.details.get("writeErrors", [])):
+        raise error
+    return {upserted["index"] for upserted in error.details.get("upserted", [])}
+
+def duplicate_indexes(error: BulkWriteError) -> set[int]:
+    if any(write_error["code"] != DUPLICATE_KEY for write_error in error.details.get("writeErrors", [])):
+        raise error
+    return {write_error["index"] for write_error in error.details.get("writeErrors", [])}
+
+def aggregate_stages(names: list[str], pipeline: list[dict]) -> list[dict]:
+    """Gộp các bucket bằng $unionWith; $match đầu pipeline được đẩy vào từng bucket để dùng index."""
+    head = pipeline[:1] if pipeline and "$match" in pipeline[0] else []
+    return head + [{"$unionWith": {"coll": name, "pipeline": head}} for name in names] + pipeline[len(head):]
+
+def created_notifications(notifications: list[dict], upserted: set[int]) -> list[dict]:
+    return [
+        notification for i, notification in enumerate(notifications)
+        if not notification.get("event_id") or i in upserted
+    ]
+
+# TTL của UNREAD (giây) do retention đặt; bucket tạo sau đó cũng nhận index retention
+_retention_ttl: Optional[int] = None
+
+def _create_indexes(target):
+    # Khớp với filter user_id + sort (created_at, _id) của find_by_user
+    target.create_index(USER_PAGE_INDEX, name="user_created_at_id")
+    target.create_index("event_id", **EVENT_ID_INDEX)
+    if _retention_ttl is not None:
+        _create_retention_indexes(target, _retention_ttl)
+
+def _create_retention_indexes(target, unread_ttl_seconds: int):
+    target.create_index(RETENTION_INDEX, name="status_created_at")
+    # TTL index chỉ áp dụng cho UNREAD (partial); đổi thời hạn thì collMod thay vì tạo lại index
+    existing = target.index_information().get(UNREAD_TTL_INDEX)
+    if not unread_ttl_seconds:
+        if existing:
+            target.drop_index(UNREAD_TTL_INDEX)
+    elif existing is None:
+        target.create_index(
+            "created_at",
+            name=UNREAD_TTL_INDEX,
+            expireAfterSeconds=unread_ttl_seconds,
+            partialFilterExpression={"status": "UNREAD"}
+        )
+    elif existing.get("expireAfterSeconds") != unread_ttl_seconds:
+        db.command("collMod", target.name, index={"name": UNREAD_TTL_INDEX, "expireAfterSeconds": unread_ttl_seconds})
+
+def _refresh_catalog():
+    if catalog.stale():
+        catalog.update(db.list_collection_names(filter=BUCKET_FILTER), collection.estimated_document_count() > 0)
+
+def _bucket(name: str):
+    return collection if name == LEGACY_COLLECTION else db[name]
+
+def _write_bucket(name: str):
+    bucket = db[name]
+    if name not in catalog.indexed:
+        _create_indexes(bucket)
+        catalog.add(name)
+    return bucket
+
+def _read_collections(newest: Optional[datetime] = None, oldest: Optional[datetime] = None) -> list:
+    """Collection cần đọc cho khoảng created_at [oldest, newest], mới nhất trước."""
+    if not monthly():
+        return [collection]
+    _refresh_catalog()
+    return [_bucket(name) for name in catalog.read_order(newest, oldest)]
+
+def _stored_earlier(name: str, notifications: list[dict], positions: list[int]) -> set[int]:
+    """Vị trí có event_id đã được lưu ở bucket tháng trước hoặc collection cũ (unique index chỉ chặn trong một bucket)."""
+    event_ids = list({notifications[i]["event_id"] for i in positions if notifications[i].get("event_id")})
+    if not event_ids:
+        return set()
+    stored = set()
+    for earlier in earlier_collections(name):
+        stored.update(doc["event_id"] for doc in _bucket(earlier).find({"event_id": {"$in": event_ids}}, {"event_id": 1}))
+    return {i for i in positions if notifications[i].get("event_id") in stored}
+
+def _write_groups(notifications: list[dict]) -> Iterator[tuple]:
+    """
+    (collection, vị trí trong `notifications`) cho từng bucket mà batch ghi vào.
+
+    Với layout monthly, notification có event_id đã nằm ở bucket tháng trước bị bỏ qua (coi như
+    trùng): event giao lại hay broadcast chạy lại ngay sau khi sang tháng không tạo bản thứ hai.
+    """
+    if not monthly():
+        yield collection, list(range(len(notifications)))
+        return
+    _refresh_catalog()
+    for name, positions in group_by_bucket(notifications).items():
+        stored = _stored_earlier(name, notifications, positions)
+        positions = [i for i in positions if i not in stored]
+        if positions:
+            yield _write_bucket(name), positions
+
+def _id_groups(ids: list[ObjectId]) -> list[tuple]:
+    if not monthly():
+        return [(collection, ids)]
+    _refresh_catalog()
+    return [(_bucket(name), bucket_ids) for name, bucket_ids in catalog.id_candidates(ids).items()]
+
+def _part(notifications: list[dict], positions: list[int]) -> list[dict]:
+    return notifications if len(positions) == len(notifications) else [notifications[i] for i in positions]
+
 class NotificationRepository:
+    """
+    Layout "single" (mặc định): mọi notification trong collection notifications.
+    Layout "monthly" (MONGO__LAYOUT=monthly): mỗi tháng một bucket notifications_YYYYMM; ghi
+    vào bucket theo created_at, đọc chỉ đi qua các bucket giao với khoảng cần đọc (mới nhất
+    trước, dừng khi đủ trang), thao tác theo id dựa vào timestamp của ObjectId. Unique index
+    event_id chỉ có hiệu lực trong từng bucket; trước khi ghi, event_id được tìm thêm trong
+    bucket tháng trước (và collection cũ chưa migrate xong) nên event giao lại sau khi sang
+    tháng không bị ghi hai lần.
+    """
+
+    @staticmethod
+    def ensure_indexes():
+        if not monthly():
+            _create_indexes(collection)
+            return
+        _refresh_catalog()
+        for name in catalog.read_order():
+            if name != LEGACY_COLLECTION:
+                _write_bucket(name)
+
     @staticmethod
     def save(notification: dict):
-        result = collection.insert_one(notification)
+        target = collection if not monthly() else _write_bucket(bucket_name(notification.get("created_at") or datetime.utcnow()))
+        result = target.insert_one(notification)
         return str(result.inserted_id)
 
     @staticmethod
-    def find_by_user(user_id: int):
-        docs = collection.find({"user_id": user_id}).sort("created_at", -1)
-        return list(docs)
+    def save_many(notifications: list[dict]) -> list[dict]:
+        """Ghi cả batch, trả về các notification thực sự được tạo mới (bỏ qua event đã lưu trước đó)."""
+        upserted = set()
+        for target, positions in _write_groups(notifications):
+            part = _part(notifications, positions)
+            # Một round trip cho mỗi bucket; ordered=False để một document lỗi không chặn các document còn lại
+            try:
+                indexes = target.bulk_write(insert_ops(part), ordered=False).upserted_ids
+            except BulkWriteError as e:
+                indexes = upserted_indexes(e)
+            upserted.update(positions[i] for i in indexes)
+        return created_notifications(notifications, upserted)
+
+    @staticmethod
+    def insert_many(notifications: list[dict]) -> list[dict]:
+        """
+        insert_many không thứ tự (một round trip, document lỗi không chặn phần còn lại).
+        Document trùng event_id bị bỏ qua; trả về các notification được tạo mới.
+        """
+        created = set()
+        for target, positions in _write_groups(notifications):
+            failed = set()
+            try:
+                target.insert_many(_part(notifications, positions), ordered=False)
+            except BulkWriteError as e:
+                failed = duplicate_indexes(e)
+            created.update(position for i, position in enumerate(positions) if i not in failed)
+        return [notification for i, notification in enumerate(notifications) if i in created]
+
+    @staticmethod
+    def find_by_user(
+        user_id: int,
+        limit: Optional[int] = None,
+        before: Optional[tuple[datetime, ObjectId]] = None,
+        status: Optional[str] = None
+    ):
+        query = user_page_query(user_id, before, status)
+        docs = []
+        for target in _read_collections(newest=before[0] if before else None):
+            cursor = target.find(query, LIST_PROJECTION).sort(LIST_SORT)
+            if limit:
+                cursor = cursor.limit(limit - len(docs))
+            docs += cursor
+            if limit and len(docs) >= limit:
+                break
+        return docs
+
+    @staticmethod
+    def iter_export(query: dict, batch_size: int) -> Iterator[dict]:
+        """
+        Duyệt kết quả bằng cursor phía server: mỗi getMore chỉ mang về `batch_size` document.
+
+        Export theo user đi theo index user_created_at_id (mới nhất trước); export theo khoảng
+        thời gian của mọi user không sort để không phải giữ cả kết quả trên server.
+        """
+        created_at = query.get("created_at", {})
+        for target in _read_collections(created_at.get("$lt"), created_at.get("$gte")):
+            cursor = target.find(query, EXPORT_PROJECTION, batch_size=batch_size)
+            if "user_id" in query:
+                cursor = cursor.sort(LIST_SORT)
+            try:
+                yield from cursor
+            finally:
+                cursor.close()
+
+    @staticmethod
+    def live_ids(ids: list[ObjectId]) -> set[ObjectId]:
+        """Các id trong `ids` vẫn còn trong collection live (vd. đang được retention chuyển sang archive)."""
+        found = set()
+        for target, group in _id_groups(ids):
+            found.update(doc["_id"] for doc in target.find({"_id": {"$in": group}}, {"_id": 1}))
+        return found
+
+    @staticmethod
+    def mark_as_read(notification_id: str) -> Optional[dict]:
+        # Chỉ đổi UNREAD -> READ; trả về document (user_id) nếu trạng thái thực sự thay đổi
+        for target, ids in _id_groups([ObjectId(notification_id)]):
+            updated = target.find_one_and_update(
+                {"_id": ids[0], "status": "UNREAD"},
+                {"$set": {"status": "READ"}},
+                projection={"user_id": 1}
+            )
+            if updated is not None:
+                return updated
+        return None
+
+    @staticmethod
+    def ensure_retention_indexes(unread_ttl_seconds: int):
+        global _retention_ttl
+        _retention_ttl = unread_ttl_seconds
+        if monthly():
+            # Bucket được tạo bởi process khác từ lần trước cũng cần index retention
+            catalog.invalidate()
+        for target in _read_collections():
+            _create_retention_indexes(target, unread_ttl_seconds)
+
+    @staticmethod
+    def find_archivable(cutoff: datetime, limit: int) -> list[dict]:
+        """Notification READ tạo trước `cutoff`, cũ nhất trước."""
+        docs = []
+        for target in reversed(_read_collections(newest=cutoff)):
+            docs += target.find({"status": "READ", "created_at": {"$lt": cutoff}}).sort(RETENTION_INDEX).limit(limit - len(docs))
+            if len(docs) >= limit:
+                break
+        return docs
+
+    @staticmethod
+    def delete_many(notification_ids: list[ObjectId]) -> int:
+        return sum(target.delete_many({"_id": {"$in": ids}}).deleted_count for target, ids in _id_groups(notification_ids))
+
+    @staticmethod
+    def find_statuses(notification_ids: list[ObjectId]) -> list[dict]:
+        return [
+            doc for target, ids in _id_groups(notification_ids)
+            for doc in target.find({"_id": {"$in": ids}}, {"user_id": 1, "status": 1})
+        ]
+
+    @staticmethod
+    def mark_many_as_read(user_id: int, notification_ids: list[ObjectId]):
+        return merge_update_results(
+            target.update_many(
+                {"_id": {"$in": ids}, "user_id": user_id, "status": "UNREAD"},
+                {"$set": {"status": "READ"}}
+            )
+            for target, ids in _id_groups(notification_ids)
+        )
+
+    @staticmethod
+    def mark_all_as_read(user_id: int, up_to: datetime):
+        return merge_update_results(
+            target.update_many(
+                {"user_id": user_id, "status": "UNREAD", "created_at": {"$lte": up_to}},
+                {"$set": {"status": "READ"}}
+            )
+            for target in _read_collections(newest=up_to)
+        )
+
+    @staticmethod
+    def find_recent_user_ids(since: datetime) -> set[int]:
+        """User có notification được ghi từ `since` (lọc theo timestamp của _id, luôn có index)."""
+        query = {"_id": {"$gte": ObjectId.from_datetime(since)}}
+        return {user_id for target in _read_collections(oldest=since) for user_id in target.distinct("user_id", query)}
+
+    @staticmethod
+    def find_legacy(limit: int) -> list[dict]:
+        """Document còn trong collection notifications, mới nhất trước (theo _id, luôn có index)."""
+        return list(collection.find().sort("_id", DESCENDING).limit(limit))
+
+    @staticmethod
+    def move_to_buckets(docs: list[dict]) -> int:
+        """
+        Chuyển document từ collection notifications sang bucket tháng: ghi bucket trước rồi mới
+        xóa bản cũ, nên bị ngắt giữa chừng thì chạy lại sẽ bỏ qua bản đã ghi (trùng _id/event_id).
+        """
+        for name, positions in group_by_bucket(docs).items():
+            try:
+                _write_bucket(name).insert_many([docs[i] for i in positions], ordered=False)
+            except BulkWriteError as e:
+                duplicate_indexes(e)
+        return collection.delete_many({"_id": {"$in": [doc["_id"] for doc in docs]}}).deleted_count
 
     @staticmethod
-    def mark_as_read(notification_id: str):
-        from bson import ObjectId
-        collection.update_one({"_id": ObjectId(notification_id)}, {"$set": {"status": "READ"}})
+    def aggregate(pipeline: list[dict], **kwargs):
+        """Chạy aggregation trên toàn bộ notification live (mọi bucket với layout monthly)."""
+        first, *rest = _read_collections()
+        return first.aggregate(aggregate_stages([target.name for target in rest], pipeline), **kwargs)
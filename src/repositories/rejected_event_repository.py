@@ -0,0 +1,27 @@
+from datetime import datetime
+from typing import Optional
+
+from src.repositories.notification_repository import db
+
+rejected_events = db["rejected_events"]
+
+# Message bị từ chối được giữ lại 30 ngày để điều tra rồi tự xóa
+REJECTED_TTL_SECONDS = 30 * 86400
+# Giới hạn kích thước body lưu lại, tránh một message khổng lồ làm phình collection
+MAX_BODY_BYTES = 64 * 1024
+
+class RejectedEventRepository:
+    @staticmethod
+    def ensure_indexes():
+        rejected_events.create_index("received_at", name="received_at_ttl", expireAfterSeconds=REJECTED_TTL_SECONDS)
+
+    @staticmethod
+    def save(body: bytes, event_type: Optional[str], reason: str, errors: list[dict]):
+        rejected_events.insert_one({
+            "event_type": event_type,
+            "reason": reason,
+            "errors": errors,
+            "body": body[:MAX_BODY_BYTES].decode("utf-8", errors="replace"),
+            "truncated": len(body) > MAX_BODY_BYTES,
+            "received_at": datetime.utcnow(),
+        })
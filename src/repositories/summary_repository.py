@@ -0,0 +1,177 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Optional
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from src.repositories.notification_repository import NotificationRepository, db
+
+summaries = db["notification_summaries"]
+
+# Số notification header mới nhất giữ trong summary
+LATEST_COUNT = 10
+# Số user mỗi lượt rebuild_users khi dựng lại các summary không còn notification live
+REBUILD_BATCH = 1000
+
+def _header(notification: dict) -> dict:
+    return {
+        "notification_id": notification["_id"],
+        "title": notification["title"],
+        "status": notification["status"],
+        "created_at": notification["created_at"],
+    }
+
+def _push_update(user_id: int, notifications: list[dict]) -> UpdateOne:
+    unread = sum(1 for n in notifications if n["status"] == "UNREAD")
+    return UpdateOne(
+        {"_id": user_id},
+        {
+            "$inc": {"unread_count": unread, "version": 1},
+            "$push": {"latest": {
+                "$each": [_header(n) for n in notifications],
+                "$sort": {"created_at": -1, "notification_id": -1},
+                "$slice": LATEST_COUNT,
+            }},
+        },
+        upsert=True
+    )
+
+def summary_updates(notifications: list[dict]) -> list[UpdateOne]:
+    by_user = defaultdict(list)
+    for notification in notifications:
+        by_user[notification["user_id"]].append(notification)
+    return [_push_update(user_id, items) for user_id, items in by_user.items()]
+
+def mark_read_update(modified: int) -> dict:
+    # `modified` là số notification thực sự chuyển UNREAD -> READ
+    return {
+        "$inc": {"unread_count": -modified, "version": 1},
+        "$set": {"latest.$[header].status": "READ"},
+    }
+
+class SummaryRepository:
+    """
+    Summary theo user (_id = user_id): số notification chưa đọc và LATEST_COUNT header mới nhất.
+
+    `version` tăng mỗi khi user có notification mới hoặc có notification chuyển sang READ,
+    dùng làm ETag cho danh sách notification của user.
+
+    Summary nhất quán sau (eventually consistent): notification và $inc của summary là hai lệnh
+    ghi riêng (Mongo standalone không có transaction), process chết giữa hai lệnh làm summary
+    lệch cho tới khi SummaryReconciler dựng lại summary của các user có notification gần đây.
+    """
+
+    @staticmethod
+    def find_by_user(user_id: int) -> Optional[dict]:
+        return summaries.find_one({"_id": user_id})
+
+    @staticmethod
+    def find_version(user_id: int) -> int:
+        summary = summaries.find_one({"_id": user_id}, {"version": 1})
+        return summary.get("version", 0) if summary else 0
+
+    @staticmethod
+    def add(notifications: list[dict]):
+        updates = summary_updates(notifications)
+        if updates:
+            summaries.bulk_write(updates, ordered=False)
+
+    @staticmethod
+    def mark_as_read(user_id: int, notification_id: ObjectId):
+        SummaryRepository.mark_many_as_read(user_id, [notification_id], 1)
+
+    @staticmethod
+    def mark_many_as_read(user_id: int, notification_ids: list[ObjectId], modified: int):
+        SummaryRepository._mark_read(user_id, modified, {"header.notification_id": {"$in": notification_ids}})
+
+    @staticmethod
+    def mark_all_as_read(user_id: int, up_to: datetime, modified: int):
+        SummaryRepository._mark_read(user_id, modified, {"header.created_at": {"$lte": up_to}})
+
+    @staticmethod
+    def _mark_read(user_id: int, modified: int, header_filter: dict):
+        if modified <= 0:
+            return
+        summaries.update_one({"_id": user_id}, mark_read_update(modified), array_filters=[header_filter])
+
+    @staticmethod
+    def bump_versions(user_ids: list[int]):
+        summaries.update_many({"_id": {"$in": user_ids}}, {"$inc": {"version": 1}})
+
+    @staticmethod
+    def find_expired_unread(cutoff: datetime, limit: int) -> list[int]:
+        """User có header UNREAD cũ hơn `cutoff` (đã hoặc sắp bị TTL index xóa)."""
+        stale = summaries.find(
+            {"latest": {"$elemMatch": {"status": "UNREAD", "created_at": {"$lt": cutoff}}}},
+            {"_id": 1}
+        ).limit(limit)
+        return [summary["_id"] for summary in stale]
+
+    @staticmethod
+    def rebuild(user_id: Optional[int] = None):
+        """
+        Tính lại summary từ notification live bằng aggregation rồi $merge đè lên summary cũ.
+
+        Summary không có dòng nào trong $group (user không còn notification live, vd. đã archive
+        hết) được đặt về rỗng thay vì giữ số cũ.
+        """
+        if user_id is not None:
+            SummaryRepository.rebuild_users([user_id])
+            return
+        rebuild_id = ObjectId()
+        _merge_rebuilt([], rebuild_id)
+        stale = summaries.find({"rebuild_id": {"$ne": rebuild_id}}, {"_id": 1}).batch_size(REBUILD_BATCH)
+        batch = []
+        for summary in stale:
+            batch.append(summary["_id"])
+            if len(batch) >= REBUILD_BATCH:
+                SummaryRepository.rebuild_users(batch)
+                batch = []
+        if batch:
+            SummaryRepository.rebuild_users(batch)
+
+    @staticmethod
+    def rebuild_users(user_ids: list[int]):
+        rebuild_id = ObjectId()
+        _merge_rebuilt([{"$match": {"user_id": {"$in": user_ids}}}], rebuild_id)
+        summaries.update_many(
+            {"_id": {"$in": user_ids}, "rebuild_id": {"$ne": rebuild_id}},
+            {"$set": {"unread_count": 0, "latest": [], "rebuild_id": rebuild_id}, "$inc": {"version": 1}}
+        )
+
+def _merge_rebuilt(match: list[dict], rebuild_id: ObjectId):
+    """
+    $group notification live theo user rồi $merge vào summaries; mỗi summary được ghi nhận `rebuild_id`.
+
+    $topN cần MongoDB >= 5.2.
+    """
+    pipeline = match + [
+        {"$group": {
+            "_id": "$user_id",
+            "unread_count": {"$sum": {"$cond": [{"$eq": ["$status", "UNREAD"]}, 1, 0]}},
+            "latest": {"$topN": {
+                "n": LATEST_COUNT,
+                "sortBy": {"created_at": -1, "_id": -1},
+                "output": {
+                    "notification_id": "$_id",
+                    "title": "$title",
+                    "status": "$status",
+                    "created_at": "$created_at",
+                },
+            }},
+        }},
+        {"$set": {"version": 1, "rebuild_id": rebuild_id}},
+        # Giữ version tăng dần để ETag cũ không trùng với dữ liệu sau khi rebuild
+        {"$merge": {
+            "into": summaries.name,
+            "on": "_id",
+            "whenMatched": [{"$set": {
+                "unread_count": "$$new.unread_count",
+                "latest": "$$new.latest",
+                "rebuild_id": "$$new.rebuild_id",
+                "version": {"$add": [{"$ifNull": ["$version", 0]}, 1]},
+            }}],
+            "whenNotMatched": "insert",
+        }},
+    ]
+    NotificationRepository.aggregate(pipeline, allowDiskUse=True)
@@ -0,0 +1,191 @@
+import os
+import queue
+import socket
+import threading
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from bson import ObjectId
+
+from config.settings import BroadcastConfig, settings
+from src.clients.appointment_client import appointment_client
+from src.models.broadcast_job import BroadcastJob
+from src.models.events import BroadcastData
+from src.monitoring.logs import get_logger
+from src.monitoring.metrics import broadcast_recipients_total
+from src.repositories.broadcast_job_repository import RUNNABLE, BroadcastJobRepository
+from src.services.notification_service import NotificationService
+
+service = NotificationService()
+logger = get_logger("broadcast")
+
+def job_model(doc: dict) -> BroadcastJob:
+    return BroadcastJob(id=doc["_id"], **{key: value for key, value in doc.items() if key != "_id"})
+
+class BroadcastService:
+    """
+    Gửi một notification tới nhiều user (danh sách user_id hoặc selector tra appointment-service).
+
+    Job chạy trên một worker thread nền: nội dung được dựng một lần, mỗi chunk `chunk_size`
+    người nhận là một insert_many không thứ tự cùng một bulk_write cập nhật summary, và tiến
+    độ được ghi vào broadcast_jobs sau mỗi chunk. Mỗi notification có event_id
+    `broadcast:{job_id}:{user_id}` nên chạy lại job (FAILED, bị ngắt khi shutdown, event giao
+    lại) không gửi hai lần cho cùng một user.
+
+    Hàng đợi trong bộ nhớ chỉ là đường tắt: job được lưu cùng nội dung trước khi submit trả về
+    (và event được ack), mỗi chunk gia hạn heartbeat của job, và worker quét định kỳ các job
+    QUEUED hoặc RUNNING quá `lease_seconds` không có heartbeat (process chết, restart) để chạy lại.
+    """
+
+    def __init__(self, cfg: BroadcastConfig):
+        self.cfg = cfg
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._queue: queue.Queue = queue.Queue()
+        self._pending: set[str] = set()
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    def start(self):
+        with self._lock:
+            if self._worker is not None:
+                return
+            self._stopping.clear()
+            # Job còn trong hàng đợi cũ vẫn QUEUED trong Mongo, lượt quét đầu tiên sẽ nhận lại.
+            # Worker giữ hàng đợi của riêng nó: worker cũ chưa dừng hẳn không lấy job của worker mới
+            self._queue, self._pending = queue.Queue(), set()
+            self._worker = threading.Thread(target=self._run, args=(self._queue,), name="notification-broadcast", daemon=True)
+            self._worker.start()
+
+    def stop(self, timeout: float = 5.0):
+        # Job đang chạy dừng sau chunk hiện tại và quay về QUEUED để lượt quét recovery chạy lại
+        self._stopping.set()
+        with self._lock:
+            worker, self._worker = self._worker, None
+        if worker is not None:
+            self._queue.put(None)
+            worker.join(timeout)
+
+    def submit(self, data: BroadcastData, job_id: Optional[str] = None) -> BroadcastJob:
+        """Lưu (hoặc lấy lại) job cùng nội dung và đưa vào hàng đợi nếu job chưa chạy xong."""
+        if data.user_ids is not None and len(data.user_ids) > self.cfg.max_recipients:
+            raise ValueError(f"Too many recipients: {len(data.user_ids)} > {self.cfg.max_recipients}")
+        request = data.model_dump(include={"title", "message", "selector"})
+        job = BroadcastJobRepository.create(job_id or uuid.uuid4().hex, request, data.user_ids)
+        if job["status"] in RUNNABLE:
+            # Process consumer chỉ khởi động worker khi có job; API khởi động sẵn lúc startup để quét recovery
+            self.start()
+            self._enqueue(job["_id"], data)
+        return job_model(job)
+
+    def recover(self) -> int:
+        """Đưa vào hàng đợi các job không ai chạy: QUEUED, hoặc RUNNING mà owner đã mất heartbeat."""
+        recovered = 0
+        for job in BroadcastJobRepository.find_recoverable(self.cfg.lease_seconds):
+            with self._lock:
+                if job["_id"] in self._pending:
+                    continue
+            # Nội dung được đọc lại từ Mongo sau khi claim được job
+            self._enqueue(job["_id"], None)
+            recovered += 1
+        if recovered:
+            logger.info("Recovered broadcast jobs", extra={"jobs": recovered})
+        return recovered
+
+    def get_job(self, job_id: str) -> Optional[BroadcastJob]:
+        job = BroadcastJobRepository.find(job_id)
+        return job_model(job) if job is not None else None
+
+    def load_request(self, job_id: str) -> BroadcastData:
+        request = BroadcastJobRepository.find(job_id)["request"]
+        user_ids = BroadcastJobRepository.load_user_ids(job_id) if request.get("selector") is None else None
+        return BroadcastData(user_ids=user_ids, **request)
+
+    def recipients(self, data: BroadcastData) -> list[int]:
+        if data.user_ids is not None:
+            user_ids = data.user_ids
+        else:
+            user_ids = appointment_client.find_patient_ids(data.selector.doctor_name, data.selector.appointment_date)
+        # Bỏ trùng nhưng giữ thứ tự
+        user_ids = list(dict.fromkeys(user_ids))
+        if len(user_ids) > self.cfg.max_recipients:
+            raise ValueError(f"Too many recipients: {len(user_ids)} > {self.cfg.max_recipients}")
+        return user_ids
+
+    def _enqueue(self, job_id: str, data: Optional[BroadcastData]):
+        with self._lock:
+            self._pending.add(job_id)
+            self._queue.put((job_id, data))
+
+    def _recover(self):
+        try:
+            self.recover()
+        except Exception:
+            logger.exception("Error recovering broadcast jobs")
+
+    def _run(self, jobs: queue.Queue):
+        self._recover()
+        while True:
+            try:
+                item = jobs.get(timeout=self.cfg.recovery_interval_seconds)
+            except queue.Empty:
+                self._recover()
+                continue
+            if item is None or self._stopping.is_set():
+                return
+            with self._lock:
+                self._pending.discard(item[0])
+            try:
+                self.run_job(*item)
+            except Exception:
+                logger.exception("Error running broadcast", extra={"job_id": item[0]})
+
+    def run_job(self, job_id: str, data: Optional[BroadcastData] = None):
+        if not BroadcastJobRepository.claim(job_id, self.owner, self.cfg.lease_seconds):
+            return
+        try:
+            if data is None:
+                data = self.load_request(job_id)
+            user_ids = self.recipients(data)
+            if not self._heartbeat(job_id, {"total": len(user_ids)}):
+                return
+            # Dựng nội dung một lần; mỗi người nhận chỉ là bản sao nông với user_id/_id/event_id riêng
+            template = {
+                "title": data.title,
+                "message": data.message,
+                "status": "UNREAD",
+                "kind": "broadcast",
+                "created_at": datetime.utcnow(),
+            }
+            written = skipped = 0
+            for start in range(0, len(user_ids), self.cfg.chunk_size):
+                if self._stopping.is_set():
+                    BroadcastJobRepository.release(job_id, self.owner, {"status": "QUEUED"})
+                    logger.warning("Broadcast interrupted", extra={"job_id": job_id, "processed": written + skipped, "total": len(user_ids)})
+                    return
+                chunk = [
+                    {**template, "_id": ObjectId(), "user_id": user_id, "event_id": f"broadcast:{job_id}:{user_id}"}
+                    for user_id in user_ids[start:start + self.cfg.chunk_size]
+                ]
+                created = len(service.create_broadcast_chunk(chunk))
+                written, skipped = written + created, skipped + len(chunk) - created
+                broadcast_recipients_total.inc("written", amount=created)
+                broadcast_recipients_total.inc("skipped", amount=len(chunk) - created)
+                if not self._heartbeat(job_id, {"written": written, "skipped": skipped}):
+                    return
+        except Exception as e:
+            logger.exception("Broadcast failed", extra={"job_id": job_id})
+            BroadcastJobRepository.release(job_id, self.owner, {"status": "FAILED", "error": str(e)[:500], "finished_at": datetime.utcnow()})
+            return
+        BroadcastJobRepository.release(job_id, self.owner, {"status": "COMPLETED", "finished_at": datetime.utcnow()})
+        logger.info("Broadcast completed", extra={"job_id": job_id, "written": written, "skipped": skipped})
+
+    def _heartbeat(self, job_id: str, progress: dict) -> bool:
+        if BroadcastJobRepository.heartbeat(job_id, self.owner, progress):
+            return True
+        # Heartbeat trễ quá lease_seconds và process khác đã nhận lại job: dừng, không ghi đè trạng thái
+        logger.warning("Broadcast lease lost", extra={"job_id": job_id, "owner": self.owner})
+        return False
+
+broadcast_service = BroadcastService(settings.broadcast)
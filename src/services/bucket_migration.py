@@ -0,0 +1,45 @@
+import time
+
+from src.monitoring.logs import get_logger
+from src.repositories.notification_buckets import bucket_name, id_month, previous_month
+from src.repositories.notification_repository import NotificationRepository
+
+logger = get_logger("bucket_migration")
+
+def _reachable_by_id(doc: dict) -> bool:
+    # Thao tác theo id chỉ tìm trong bucket của tháng trong ObjectId và tháng trước đó
+    if "created_at" not in doc:
+        return True
+    month = id_month(doc["_id"])
+    return bucket_name(doc["created_at"]) in (bucket_name(month), bucket_name(previous_month(month)))
+
+def migrate_to_buckets(batch_size: int = 5000, pause: float = 0.0) -> dict:
+    """
+    Chuyển toàn bộ collection notifications sang các bucket notifications_YYYYMM.
+
+    Đi từ document mới nhất về cũ nhất nên trong lúc migrate, phần còn lại ở collection cũ
+    luôn cũ hơn mọi bucket và service (MONGO__LAYOUT=monthly) đọc nó như bucket cuối cùng.
+    Chạy lại được bất cứ lúc nào; `unreachable_by_id` đếm document có _id lệch quá một tháng
+    so với created_at (vẫn đọc được theo trang/khoảng thời gian nhưng không đánh dấu đọc theo id được).
+    """
+    moved = unreachable = batches = 0
+    started = time.perf_counter()
+    while True:
+        docs = NotificationRepository.find_legacy(batch_size)
+        if not docs:
+            break
+        unreachable += sum(1 for doc in docs if not _reachable_by_id(doc))
+        moved += NotificationRepository.move_to_buckets(docs)
+        batches += 1
+        if batches % 100 == 0:
+            logger.info("Bucket migration progress", extra={"moved": moved})
+        if len(docs) < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+    return {
+        "moved": moved,
+        "batches": batches,
+        "unreachable_by_id": unreachable,
+        "seconds": round(time.perf_counter() - started, 1),
+    }
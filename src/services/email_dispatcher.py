@@ -0,0 +1,227 @@
+import queue
+import smtplib
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from email.mime.text import MIMEText
+from typing import Optional
+
+from config.settings import EmailConfig, settings
+from src.models.email_job import EmailJob
+from src.monitoring.logs import get_logger
+
+logger = get_logger("email_dispatcher")
+
+# Lỗi làm hỏng cả session SMTP (cần mở kết nối mới), khác với lỗi riêng của một email
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError)
+
+class SMTPConnectionPool:
+    """Giữ tối đa `size` session SMTP đã login để tái sử dụng giữa các batch."""
+
+    def __init__(self, cfg: EmailConfig):
+        self.cfg = cfg
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(cfg.pool_size)
+
+    def _connect(self) -> smtplib.SMTP:
+        cls = smtplib.SMTP_SSL if self.cfg.use_ssl else smtplib.SMTP
+        conn = cls(self.cfg.smtp_host, self.cfg.smtp_port, timeout=self.cfg.timeout)
+        if self.cfg.username:
+            conn.login(self.cfg.username, self.cfg.password or "")
+        return conn
+
+    def acquire(self) -> smtplib.SMTP:
+        self._slots.acquire()
+        try:
+            while True:
+                try:
+                    conn = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._connect()
+                # Session idle có thể đã bị server đóng
+                try:
+                    if conn.noop()[0] == 250:
+                        return conn
+                except CONNECTION_ERRORS:
+                    pass
+                self._discard(conn)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, conn: smtplib.SMTP, broken: bool = False):
+        if broken:
+            self._discard(conn)
+        else:
+            self._idle.put(conn)
+        self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                conn.quit()
+            except Exception:
+                self._discard(conn)
+
+    @staticmethod
+    def _discard(conn: smtplib.SMTP):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+class EmailDispatcher:
+    """
+    Hàng đợi gửi email chạy nền.
+
+    Endpoint chỉ enqueue và trả về job id; các worker thread lấy job theo batch,
+    gửi qua session SMTP lấy từ pool và retry với exponential backoff khi lỗi.
+    Trạng thái job được giữ trong bộ nhớ (tối đa `max_tracked_jobs` job gần nhất).
+    """
+
+    def __init__(self, cfg: EmailConfig):
+        self.cfg = cfg
+        self.pool = SMTPConnectionPool(cfg)
+        self._queue: queue.Queue = queue.Queue()
+        self._jobs: OrderedDict[str, EmailJob] = OrderedDict()
+        self._jobs_lock = threading.Lock()
+        self._timers: set[threading.Timer] = set()
+        self._workers: list[threading.Thread] = []
+        self._stopping = threading.Event()
+
+    def start(self):
+        if self._workers:
+            return
+        self._stopping.clear()
+        for i in range(self.cfg.pool_size):
+            worker = threading.Thread(target=self._run, name=f"email-worker-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def stop(self, timeout: float = 5.0):
+        self._stopping.set()
+        for timer in list(self._timers):
+            timer.cancel()
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join(timeout)
+        self._workers.clear()
+        self.pool.close()
+
+    def enqueue(self, to: str, subject: str, text: str) -> EmailJob:
+        job = EmailJob(id=uuid.uuid4().hex, to=to, subject=subject, text=text, created_at=datetime.utcnow())
+        with self._jobs_lock:
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.cfg.max_tracked_jobs:
+                self._jobs.popitem(last=False)
+        self._queue.put(job)
+        return job
+
+    def get_job(self, job_id: str) -> Optional[EmailJob]:
+        return self._jobs.get(job_id)
+
+    def _next_batch(self) -> list[EmailJob]:
+        first = self._queue.get()
+        if first is None:
+            return []
+        batch = [first]
+        while len(batch) < self.cfg.batch_size:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:
+                # Trả lại tín hiệu dừng cho worker này ở vòng sau
+                self._queue.put(None)
+                break
+            batch.append(job)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+            try:
+                self._send_batch(batch)
+            except Exception:
+                # Lỗi ngoài dự kiến không được làm chết worker (và giữ mãi một slot của pool)
+                logger.exception("Error sending email batch", extra={"jobs": len(batch)})
+
+    def _send_batch(self, batch: list[EmailJob]):
+        try:
+            conn = self.pool.acquire()
+        except Exception as e:
+            for job in batch:
+                job.attempts += 1
+                self._fail(job, e)
+            return
+
+        broken = False
+        try:
+            for i, job in enumerate(batch):
+                job.status = "SENDING"
+                job.attempts += 1
+                try:
+                    message = self._build_message(job)
+                except Exception as e:
+                    # Email không dựng được (vd. header không hợp lệ): gửi lại cũng vậy nên FAILED ngay
+                    self._fail(job, e, permanent=True)
+                    continue
+                try:
+                    conn.sendmail(self.cfg.sender, [job.to], message)
+                except smtplib.SMTPException as e:
+                    if not isinstance(e, CONNECTION_ERRORS):
+                        # Server từ chối riêng email này; session vẫn dùng tiếp được
+                        self._fail(job, e)
+                        continue
+                    error = e
+                except Exception as e:
+                    # Mất kết nối hoặc lỗi không rõ giữa chừng: session không còn dùng được
+                    error = e
+                else:
+                    job.status = "SENT"
+                    job.error = None
+                    job.sent_at = datetime.utcnow()
+                    continue
+                # Session hỏng: job hiện tại tính là một lần thử lỗi, các job còn lại quay về hàng đợi
+                broken = True
+                self._fail(job, error)
+                for remaining in batch[i + 1:]:
+                    remaining.status = "QUEUED"
+                    self._queue.put(remaining)
+                break
+        finally:
+            self.pool.release(conn, broken=broken)
+
+    def _build_message(self, job: EmailJob) -> str:
+        msg = MIMEText(job.text)
+        msg["Subject"] = job.subject
+        msg["From"] = self.cfg.sender
+        msg["To"] = job.to
+        return msg.as_string()
+
+    def _fail(self, job: EmailJob, error: Exception, permanent: bool = False):
+        job.error = str(error)
+        if permanent or job.attempts > self.cfg.max_retries or self._stopping.is_set():
+            job.status = "FAILED"
+            return
+        job.status = "RETRYING"
+        delay = self.cfg.backoff_base_seconds * (2 ** max(job.attempts - 1, 0))
+        timer = threading.Timer(delay, self._requeue, args=(job,))
+        timer.daemon = True
+        self._timers.add(timer)
+        timer.start()
+
+    def _requeue(self, job: EmailJob):
+        self._timers.discard(threading.current_thread())
+        if not self._stopping.is_set():
+            self._queue.put(job)
+
+email_dispatcher = EmailDispatcher(settings.email)
@@ -0,0 +1,45 @@
+import threading
+from collections import OrderedDict
+from typing import Iterable
+
+from config.settings import settings
+
+class RecentEventIds:
+    """
+    Tập event_id đã được lưu gần đây (LRU, tối đa `max_size` id). Thread-safe.
+
+    Chỉ là lớp lọc nhanh cho các bản trùng "nóng" (redelivery, producer retry); unique index
+    trên event_id mới là chốt chặn cuối cùng. Id chỉ được thêm sau khi ghi thành công để
+    message bị nack rồi giao lại không bị bỏ qua nhầm.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._ids: OrderedDict[str, None] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, event_id: str) -> bool:
+        with self._lock:
+            if event_id in self._ids:
+                self._ids.move_to_end(event_id)
+                return True
+            return False
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def clear(self):
+        with self._lock:
+            self._ids.clear()
+
+    def add_many(self, event_ids: Iterable[str]):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            for event_id in event_ids:
+                self._ids[event_id] = None
+                self._ids.move_to_end(event_id)
+            while len(self._ids) > self.max_size:
+                self._ids.popitem(last=False)
+
+recent_events = RecentEventIds(settings.rabbitmq.dedup_cache_size)
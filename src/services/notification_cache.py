@@ -0,0 +1,201 @@
+import asyncio
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Iterable, Optional
+
+import bson
+
+from config.resources import resources
+from config.settings import RedisConfig, settings
+from src.monitoring.logs import get_logger
+from src.monitoring.metrics import cache_requests_total
+
+logger = get_logger("notification_cache")
+
+KEY_PREFIX = "notifications:"
+# Generation phải sống lâu hơn mọi lượt rebuild đang chạy
+GENERATION_TTL_MS = 3600 * 1000
+WAIT_STEP_SECONDS = 0.002
+
+# Chỉ ghi entry khi generation của user chưa đổi kể từ lúc đọc (không có write nào xen giữa),
+# sau đó nhả lock rebuild nếu lock vẫn thuộc về caller này
+FILL_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '0') == ARGV[3] then
+    redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+    redis.call('PEXPIRE', KEYS[1], ARGV[4])
+end
+if redis.call('GET', KEYS[3]) == ARGV[5] then
+    redis.call('DEL', KEYS[3])
+end
+return 1
+"""
+
+def _encode(value: Any) -> bytes:
+    # BSON giữ nguyên ObjectId và datetime như document đọc từ Mongo
+    return bson.encode({"value": value})
+
+def _decode(raw: bytes) -> Any:
+    return bson.decode(raw)["value"]
+
+class NotificationCache:
+    """
+    Cache read-through trên Redis cho các lượt đọc nóng của từng user: trang đầu danh sách
+    notification, summary (unread_count) và version dùng cho ETag.
+
+    Mỗi user có một hash `notifications:{user_id}` (mỗi field là một biến thể) và một key
+    generation. Mọi write (notification mới, mark-read, archive...) tăng generation rồi xóa
+    hash; kết quả rebuild chỉ được ghi nếu generation không đổi nên dữ liệu cũ không đè lên
+    write xen giữa. Key nguội chỉ được rebuild bởi caller giữ lock (SET NX PX), các caller
+    khác chờ tối đa `cache_wait_ms` rồi đọc thẳng Mongo.
+
+    Redis lỗi thì request đọc thẳng Mongo; write không xóa được cache thì dữ liệu cũ
+    tồn tại tối đa `cache_ttl_seconds`.
+    """
+
+    def __init__(self, cfg: RedisConfig, client=None):
+        self.cfg = cfg
+        self._client = client
+        self._fill = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.cfg.cache_enabled
+
+    @property
+    def client(self):
+        return self._client if self._client is not None else resources.get("redis")
+
+    def use_client(self, client):
+        self._client = client
+        self._fill = None
+
+    @staticmethod
+    def _keys(user_id: int, field: str = "") -> tuple[str, str, str]:
+        key = f"{KEY_PREFIX}{user_id}"
+        return key, f"{key}:gen", f"{key}:lock:{field}"
+
+    def _probe(self, user_id: int, field: str) -> tuple[Optional[bytes], bytes, Optional[str]]:
+        """Một lượt đọc cache; miss thì thử lấy lock rebuild. Trả về (value, generation, lock token)."""
+        key, gen_key, lock_key = self._keys(user_id, field)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hget(key, field)
+        pipe.get(gen_key)
+        value, generation = pipe.execute()
+        if value is not None:
+            return value, generation, None
+        token = uuid.uuid4().hex
+        if not self.client.set(lock_key, token, nx=True, px=self.cfg.cache_lock_ms):
+            return None, generation or b"0", None
+        # Caller trước có thể vừa rebuild xong và nhả lock giữa hai lệnh trên
+        value = self.client.hget(key, field)
+        if value is not None:
+            self.client.delete(lock_key)
+            return value, generation, None
+        return None, generation or b"0", token
+
+    def _store(self, user_id: int, field: str, value: Any, generation: bytes, token: str):
+        if self._fill is None:
+            self._fill = self.client.register_script(FILL_SCRIPT)
+        ttl_ms = int(self.cfg.cache_ttl_seconds * 1000)
+        self._fill(keys=list(self._keys(user_id, field)), args=[field, _encode(value), generation, ttl_ms, token])
+
+    def _unlock(self, user_id: int, field: str):
+        try:
+            self.client.delete(self._keys(user_id, field)[2])
+        except Exception:
+            pass
+
+    def _finish(self, user_id: int, field: str, value: Any, generation: bytes, token: Optional[str]) -> Any:
+        if token is None:
+            # Chờ caller khác rebuild quá lâu: trả kết quả đọc thẳng, không ghi cache
+            cache_requests_total.inc("wait_timeout")
+            return value
+        cache_requests_total.inc("miss")
+        try:
+            self._store(user_id, field, value, generation, token)
+        except Exception as e:
+            logger.warning("Error filling notification cache: %s", e)
+        return value
+
+    def get_or_load(self, user_id: int, field: str, load: Callable[[], Any]) -> Any:
+        if not self.enabled:
+            return load()
+        try:
+            raw, generation, token = self._probe(user_id, field)
+            deadline = time.monotonic() + self.cfg.cache_wait_ms / 1000
+            while raw is None and token is None and time.monotonic() < deadline:
+                time.sleep(WAIT_STEP_SECONDS)
+                raw, generation, token = self._probe(user_id, field)
+        except Exception as e:
+            logger.warning("Notification cache unavailable: %s", e)
+            cache_requests_total.inc("error")
+            return load()
+        if raw is not None:
+            cache_requests_total.inc("hit")
+            return _decode(raw)
+        try:
+            value = load()
+        except BaseException:
+            if token is not None:
+                self._unlock(user_id, field)
+            raise
+        return self._finish(user_id, field, value, generation, token)
+
+    async def get_or_load_async(self, user_id: int, field: str, load: Callable[[], Awaitable[Any]]) -> Any:
+        # Client Redis là sync nên mỗi round trip chạy trên thread pool, không chặn event loop
+        if not self.enabled:
+            return await load()
+        try:
+            raw, generation, token = await asyncio.to_thread(self._probe, user_id, field)
+            deadline = time.monotonic() + self.cfg.cache_wait_ms / 1000
+            while raw is None and token is None and time.monotonic() < deadline:
+                await asyncio.sleep(WAIT_STEP_SECONDS)
+                raw, generation, token = await asyncio.to_thread(self._probe, user_id, field)
+        except Exception as e:
+            logger.warning("Notification cache unavailable: %s", e)
+            cache_requests_total.inc("error")
+            return await load()
+        if raw is not None:
+            cache_requests_total.inc("hit")
+            return _decode(raw)
+        try:
+            value = await load()
+        except BaseException:
+            if token is not None:
+                await asyncio.to_thread(self._unlock, user_id, field)
+            raise
+        return await asyncio.to_thread(self._finish, user_id, field, value, generation, token)
+
+    def invalidate(self, user_ids: Iterable[int]):
+        if not self.enabled:
+            return
+        user_ids = set(user_ids)
+        if not user_ids:
+            return
+        try:
+            pipe = self.client.pipeline(transaction=True)
+            for user_id in user_ids:
+                key, gen_key, _ = self._keys(user_id)
+                pipe.incr(gen_key)
+                pipe.pexpire(gen_key, GENERATION_TTL_MS)
+                pipe.delete(key)
+            pipe.execute()
+        except Exception as e:
+            logger.warning("Error invalidating notification cache: %s", e)
+
+    async def invalidate_async(self, user_ids: Iterable[int]):
+        if self.enabled:
+            await asyncio.to_thread(self.invalidate, list(user_ids))
+
+    def clear(self):
+        """Xóa cache của mọi user (sau khi rebuild toàn bộ summary)."""
+        if not self.enabled:
+            return
+        try:
+            keys = list(self.client.scan_iter(match=f"{KEY_PREFIX}*", count=1000))
+            for start in range(0, len(keys), 1000):
+                self.client.delete(*keys[start:start + 1000])
+        except Exception as e:
+            logger.warning("Error clearing notification cache: %s", e)
+
+notification_cache = NotificationCache(settings.redis)
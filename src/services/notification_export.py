@@ -0,0 +1,117 @@
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, Iterator, Optional
+
+from config.settings import settings
+from src.dto.notification_dto import dump_ndjson_line
+from src.repositories.archive_repository import ArchiveRepository
+from src.repositories.async_archive_repository import AsyncArchiveRepository
+from src.repositories.async_notification_repository import AsyncNotificationRepository
+from src.repositories.notification_repository import NotificationRepository, export_query
+
+# Mỗi chunk gửi cho client khoảng 64KB: đủ lớn để ít lượt ghi socket, đủ nhỏ để RAM không đổi
+CHUNK_BYTES = 64 * 1024
+GZIP_LEVEL = 6
+
+class NdjsonWriter:
+    """Gom các dòng NDJSON thành chunk CHUNK_BYTES, nén gzip dạng stream nếu `compress`."""
+
+    def __init__(self, compress: bool = False):
+        # wbits=31: định dạng gzip (header + CRC) thay vì zlib thô
+        self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31) if compress else None
+        self._buffer = bytearray()
+        self.count = 0
+
+    def write(self, doc: dict) -> Optional[bytes]:
+        """Trả về chunk cần gửi khi buffer đầy, None nếu chưa."""
+        self._buffer += dump_ndjson_line(doc)
+        self.count += 1
+        if len(self._buffer) < CHUNK_BYTES:
+            return None
+        return self._drain() or None
+
+    def close(self) -> bytes:
+        data = self._drain()
+        if self._compressor is not None:
+            data += self._compressor.flush()
+        return data
+
+    def _drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        if self._compressor is not None:
+            # compressor có thể giữ lại dữ liệu và trả về b"" cho tới khi đủ một block
+            data = self._compressor.compress(data)
+        return data
+
+def export_notifications(
+    user_id: Optional[int],
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    include_archive: bool = False,
+    compress: bool = False
+) -> Iterator[bytes]:
+    """
+    Stream notification (NDJSON) của một user hoặc của mọi user trong khoảng thời gian.
+
+    Document đi thẳng từ cursor qua writer, không dựng list kết quả hay DTO nên bộ nhớ chỉ
+    phụ thuộc batch_size của cursor, kích thước chunk và (khi có archive) một bucket archive.
+
+    Archive (chỉ khi export theo user) nằm sau phần live và được đọc từng bucket (user, tháng).
+    Notification đang được retention chuyển sang archive có thể có ở cả hai nơi: id của mỗi
+    bucket được đối chiếu với collection live và bản còn live bị bỏ. Notification bị chuyển
+    đúng trong lúc export (đã xuất ở phần live, bản live bị xóa trước khi tới phần archive)
+    vẫn có thể xuất hiện hai lần, không bao giờ bị thiếu; người đọc file bỏ trùng theo _id.
+    """
+    writer = NdjsonWriter(compress)
+    docs = NotificationRepository.iter_export(export_query(user_id, created_from, created_to), settings.mongo.export_batch_size)
+    for doc in docs:
+        chunk = writer.write(doc)
+        if chunk:
+            yield chunk
+    if include_archive and user_id is not None:
+        for bucket in ArchiveRepository.iter_export(user_id, created_from, created_to):
+            live = NotificationRepository.live_ids([doc["_id"] for doc in bucket]) if bucket else set()
+            for doc in bucket:
+                if doc["_id"] in live:
+                    continue
+                chunk = writer.write(doc)
+                if chunk:
+                    yield chunk
+    yield writer.close()
+
+async def export_notifications_async(
+    user_id: Optional[int],
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    include_archive: bool = False,
+    compress: bool = False
+) -> AsyncIterator[bytes]:
+    writer = NdjsonWriter(compress)
+    query = export_query(user_id, created_from, created_to)
+    async for doc in AsyncNotificationRepository.iter_export(query, settings.mongo.export_batch_size):
+        chunk = writer.write(doc)
+        if chunk:
+            yield chunk
+    if include_archive and user_id is not None:
+        async for bucket in AsyncArchiveRepository.iter_export(user_id, created_from, created_to):
+            live = await AsyncNotificationRepository.live_ids([doc["_id"] for doc in bucket]) if bucket else set()
+            for doc in bucket:
+                if doc["_id"] in live:
+                    continue
+                chunk = writer.write(doc)
+                if chunk:
+                    yield chunk
+    yield writer.close()
+
+def export_stream(*args, **kwargs):
+    # MONGO__BACKEND=async duyệt cursor trên event loop; sync thì StreamingResponse lấy từng chunk qua threadpool
+    if settings.mongo.backend == "async":
+        return export_notifications_async(*args, **kwargs)
+    return export_notifications(*args, **kwargs)
+
+def export_headers(filename: str, compress: bool) -> tuple[str, dict]:
+    """media type và header cho file export (tải về dạng attachment)."""
+    if compress:
+        return "application/gzip", {"Content-Disposition": f'attachment; filename="{filename}.ndjson.gz"'}
+    return "application/x-ndjson", {"Content-Disposition": f'attachment; filename="{filename}.ndjson"'}
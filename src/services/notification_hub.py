@@ -0,0 +1,84 @@
+import asyncio
+import threading
+from collections import defaultdict
+from typing import Callable, Optional
+
+from config.settings import settings
+from src.dto.notification_dto import dump_notification
+
+class Subscription:
+    def __init__(self, user_id: int, buffer_size: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=buffer_size)
+        self.closed = False
+
+class NotificationHub:
+    """
+    Pub/sub trong process: mỗi kết nối SSE/WebSocket là một Subscription với buffer giới hạn.
+
+    publish() gọi được từ mọi thread (consumer thread, threadpool); việc phân phát luôn
+    chạy trên event loop của app. Subscriber nào để đầy buffer sẽ bị ngắt thay vì làm chậm
+    người khác. Consumer process (RABBITMQ__CONSUMER_MODE=process) không phục vụ kết nối nào:
+    hub ở đó chuyển notification cho relay (src.messaging.push_relay) để tới hub của API.
+    """
+
+    def __init__(self, buffer_size: int = 100):
+        self.buffer_size = buffer_size
+        self._subscribers: dict[int, set[Subscription]] = defaultdict(set)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._relay: Optional[Callable[[int, str], None]] = None
+        self.dropped = 0
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._loop_thread = threading.get_ident()
+
+    def relay_to(self, relay: Callable[[int, str], None]):
+        self._relay = relay
+
+    def subscribe(self, user_id: int) -> Subscription:
+        subscription = Subscription(user_id, self.buffer_size)
+        self._subscribers[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscription.closed = True
+        subscribers = self._subscribers.get(subscription.user_id)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.user_id]
+
+    def connection_count(self) -> int:
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def publish(self, notification: dict):
+        user_id = notification["user_id"]
+        if self._relay is not None:
+            self._relay(user_id, dump_notification(notification))
+            return
+        # Không có ai đang nghe thì không tốn công serialize
+        if self._loop is None or user_id not in self._subscribers:
+            return
+        # Cùng field và định dạng (created_at ISO 8601) với GET /notifications/{user_id}
+        self.deliver(user_id, dump_notification(notification))
+
+    def deliver(self, user_id: int, payload: str):
+        """Phân phát payload đã serialize, vd. nhận từ consumer process qua push relay."""
+        if self._loop is None or user_id not in self._subscribers:
+            return
+        if threading.get_ident() == self._loop_thread:
+            self._dispatch(user_id, payload)
+        else:
+            self._loop.call_soon_threadsafe(self._dispatch, user_id, payload)
+
+    def _dispatch(self, user_id: int, payload: str):
+        for subscription in list(self._subscribers.get(user_id, ())):
+            try:
+                subscription.queue.put_nowait(payload)
+            except asyncio.QueueFull:
+                self.dropped += 1
+                self.unsubscribe(subscription)
+
+notification_hub = NotificationHub(buffer_size=settings.push.buffer_size)
@@ -1,10 +1,99 @@
 from src.repositories.notification_repository import NotificationRepository
+from src.repositories.summary_repository import SummaryRepository
+from src.repositories.async_notification_repository import AsyncNotificationRepository
+from src.repositories.async_summary_repository import AsyncSummaryRepository
+from src.repositories.archive_repository import ArchiveRepository, sort_key
+from src.repositories.async_archive_repository import AsyncArchiveRepository
+from src.repositories.rejected_event_repository import RejectedEventRepository
+from src.repositories.broadcast_job_repository import BroadcastJobRepository
+from src.services.notification_hub import notification_hub
+from src.services.event_dedup import recent_events
+from src.services.retention_service import retention_service
+from src.services.notification_cache import notification_cache
+from src.monitoring.logs import get_logger
+from src.monitoring.metrics import dedup_total
 from src.models.notification import Notification
-from datetime import datetime
+from bson import ObjectId
+from bson.errors import InvalidId
+from collections import defaultdict
+from datetime import datetime, timezone
 from typing import Optional
+import asyncio
+import base64
+import logging
+
+logger = get_logger("notification_service")
+
+def encode_cursor(doc: dict) -> str:
+    raw = f"{doc['created_at'].isoformat()}|{doc['_id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str) -> tuple[datetime, ObjectId]:
+    try:
+        created_at, _id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), ObjectId(_id)
+    except (ValueError, InvalidId) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+def _page(docs: list[dict], limit: int) -> tuple[list[dict], Optional[str]]:
+    # Repository được yêu cầu limit + 1 document để biết còn trang sau hay không
+    if len(docs) > limit:
+        docs = docs[:limit]
+        return docs, encode_cursor(docs[-1])
+    return docs, None
+
+def _needs_archive(docs: list[dict], limit: int, status: Optional[str]) -> bool:
+    # Archive chỉ chứa notification READ cũ hơn mốc retention: trang live đã đủ và mới hơn mốc đó thì bỏ qua
+    if status == "UNREAD":
+        return False
+    return len(docs) <= limit or docs[-1]["created_at"] < retention_service.archive_cutoff()
+
+def _page_field(limit: int, status: Optional[str], include_archive: bool) -> str:
+    return f"page:{status}:{limit}:{int(include_archive)}"
+
+def _merge(live: list[dict], archived: list[dict]) -> list[dict]:
+    # Retention ghi archive trước rồi mới xóa bản live: giữa hai bước notification có ở cả hai nơi
+    live_ids = {doc["_id"] for doc in live}
+    return sorted(live + [doc for doc in archived if doc["_id"] not in live_ids], key=sort_key, reverse=True)
+
+def _parse_id(notification_id: str) -> ObjectId:
+    try:
+        return ObjectId(notification_id)
+    except (InvalidId, TypeError) as e:
+        raise ValueError(f"Invalid notification id: {notification_id}") from e
+
+def _parse_ids(notification_ids: list[str]) -> tuple[list[ObjectId], list[dict]]:
+    errors, object_ids = [], []
+    for notification_id in dict.fromkeys(notification_ids):
+        try:
+            object_ids.append(ObjectId(notification_id))
+        except (InvalidId, TypeError):
+            errors.append({"notification_id": notification_id, "error": "invalid id"})
+    return object_ids, errors
+
+def _group_unread(object_ids: list[ObjectId], found: list[dict]) -> tuple[dict, list[dict]]:
+    found_ids = {doc["_id"] for doc in found}
+    errors = [
+        {"notification_id": str(object_id), "error": "not found"}
+        for object_id in object_ids if object_id not in found_ids
+    ]
+    # Thường tất cả id thuộc cùng một user nên chỉ tốn một update_many
+    unread_by_user = defaultdict(list)
+    for doc in found:
+        if doc["status"] == "UNREAD":
+            unread_by_user[doc["user_id"]].append(doc["_id"])
+    return unread_by_user, errors
+
+def _normalize_up_to(up_to: Optional[datetime]) -> datetime:
+    # created_at được lưu dạng UTC naive
+    if up_to is None:
+        return datetime.utcnow()
+    if up_to.tzinfo is not None:
+        return up_to.astimezone(timezone.utc).replace(tzinfo=None)
+    return up_to
 
 class NotificationService:
-    def create_notification(
+    def build_notification(
         self,
         user_id: int,
         appointment_id: Optional[int] = None,
@@ -13,7 +102,7 @@ class NotificationService:
         prescription_code: Optional[str] = None,
         title: Optional[str] = None,
         message: Optional[str] = None
-    ):
+    ) -> dict:
         notif = Notification(
             user_id=user_id,
             title=title or "Đơn thuốc đã sẵn sàng",
@@ -24,10 +113,240 @@ class NotificationService:
             status="UNREAD",
             created_at=datetime.utcnow()
         )
-        return NotificationRepository.save(notif.dict(exclude_none=True))
+        return notif.dict(exclude_none=True)
+
+    def create_notification(self, **kwargs):
+        notification = self.build_notification(**kwargs)
+        notification_id = NotificationRepository.save(notification)
+        SummaryRepository.add([notification])
+        notification_cache.invalidate([notification["user_id"]])
+        notification_hub.publish(notification)
+        return notification_id
+
+    def create_notifications(self, notifications: list[dict]):
+        """Lưu một batch; event đã được lưu trước đó (trùng event_id) bị bỏ qua. Trả về id của các notification mới."""
+        if not notifications:
+            return []
+        created = NotificationRepository.save_many(notifications)
+        SummaryRepository.add(created)
+        notification_cache.invalidate(n["user_id"] for n in created)
+        self._after_save(notifications, created)
+        return [str(notification["_id"]) for notification in created]
+
+    def _after_save(self, notifications: list[dict], created: list[dict]):
+        event_ids = [n["event_id"] for n in notifications if n.get("event_id")]
+        if event_ids:
+            event_ids += [key for n in notifications for key in n.get("digest_event_ids", ())]
+            recent_events.add_many(event_ids)
+            dedup_total.inc("store", amount=len(notifications) - len(created))
+            dedup_total.inc("new", amount=sum(1 for n in created if n.get("event_id")))
+        # Nối event với notification đã tạo: correlation_id là event_id của event gốc
+        if logger.isEnabledFor(logging.DEBUG):
+            for notification in created:
+                logger.debug("Notification created", extra={
+                    "correlation_id": notification.get("event_id"),
+                    "notification_id": str(notification["_id"]),
+                    "user_id": notification["user_id"],
+                    "digest_event_ids": notification.get("digest_event_ids"),
+                })
+        # Đẩy tới các client đang kết nối SSE/WebSocket sau khi đã ghi thành công
+        for notification in created:
+            notification_hub.publish(notification)
+
+    def create_broadcast_chunk(self, notifications: list[dict]) -> list[dict]:
+        """
+        Ghi một chunk của broadcast; trả về các notification được tạo mới.
+
+        event_id của broadcast không đưa vào bộ lọc trùng trong RAM để không đẩy event của
+        consumer ra khỏi cache: chạy lại broadcast được dedup bởi unique index.
+        """
+        created = NotificationRepository.insert_many(notifications)
+        SummaryRepository.add(created)
+        notification_cache.invalidate(n["user_id"] for n in created)
+        for notification in created:
+            notification_hub.publish(notification)
+        return created
+
+    def ensure_indexes(self):
+        NotificationRepository.ensure_indexes()
+        RejectedEventRepository.ensure_indexes()
+        BroadcastJobRepository.ensure_indexes()
+
+    def get_notifications_for_user(
+        self,
+        user_id: int,
+        limit: int = 50,
+        before: Optional[str] = None,
+        status: Optional[str] = None,
+        include_archive: bool = False
+    ) -> tuple[list[dict], Optional[str]]:
+        """
+        Trả về một trang notification (mới nhất trước) và cursor của trang kế tiếp.
+
+        Cursor là chuỗi opaque tạo từ (created_at, _id) của document cuối trang. Với
+        `include_archive`, trang được trộn với notification đã chuyển sang archive.
+        Trang đầu đi qua cache Redis (nếu bật).
+        """
+        if before is not None:
+            return self._find_page(user_id, limit, decode_cursor(before), status, include_archive)
+        docs, next_cursor = notification_cache.get_or_load(
+            user_id,
+            _page_field(limit, status, include_archive),
+            lambda: self._find_page(user_id, limit, None, status, include_archive)
+        )
+        return docs, next_cursor
+
+    def _find_page(
+        self,
+        user_id: int,
+        limit: int,
+        before_key: Optional[tuple[datetime, ObjectId]],
+        status: Optional[str],
+        include_archive: bool
+    ) -> tuple[list[dict], Optional[str]]:
+        docs = NotificationRepository.find_by_user(user_id, limit=limit + 1, before=before_key, status=status)
+        if include_archive and _needs_archive(docs, limit, status):
+            docs = _merge(docs, ArchiveRepository.find_by_user(user_id, limit + 1, before_key))
+        return _page(docs, limit)
+
+    def get_version(self, user_id: int) -> int:
+        return notification_cache.get_or_load(user_id, "version", lambda: SummaryRepository.find_version(user_id))
+
+    def get_summary(self, user_id: int) -> dict:
+        summary = notification_cache.get_or_load(user_id, "summary", lambda: SummaryRepository.find_by_user(user_id))
+        return summary or {"_id": user_id, "unread_count": 0, "latest": []}
+
+    def rebuild_summaries(self, user_id: Optional[int] = None):
+        SummaryRepository.rebuild(user_id)
+        if user_id is None:
+            notification_cache.clear()
+        else:
+            notification_cache.invalidate([user_id])
+
+    def mark_as_read(self, notification_id: str) -> bool:
+        """False nếu không có notification `notification_id`; raise ValueError nếu id không hợp lệ."""
+        object_id = _parse_id(notification_id)
+        # Summary chỉ bị trừ khi notification thực sự chuyển từ UNREAD sang READ
+        updated = NotificationRepository.mark_as_read(notification_id)
+        if updated:
+            SummaryRepository.mark_as_read(updated["user_id"], updated["_id"])
+            notification_cache.invalidate([updated["user_id"]])
+            return True
+        # Không đổi gì: đã READ từ trước hoặc không tồn tại
+        return bool(NotificationRepository.find_statuses([object_id]))
+
+    def mark_many_as_read(self, notification_ids: list[str]) -> dict:
+        """
+        Đánh dấu đã đọc một danh sách notification.
+
+        Id không hợp lệ hoặc không tồn tại được báo lỗi theo từng phần tử thay vì làm hỏng cả batch.
+        """
+        object_ids, errors = _parse_ids(notification_ids)
+        found = NotificationRepository.find_statuses(object_ids) if object_ids else []
+        unread_by_user, not_found = _group_unread(object_ids, found)
+
+        modified = 0
+        for user_id, ids in unread_by_user.items():
+            result = NotificationRepository.mark_many_as_read(user_id, ids)
+            SummaryRepository.mark_many_as_read(user_id, ids, result.modified_count)
+            modified += result.modified_count
+        notification_cache.invalidate(unread_by_user)
+
+        return {"matched": len(found), "modified": modified, "errors": errors + not_found}
+
+    def mark_all_as_read(self, user_id: int, up_to: Optional[datetime] = None) -> dict:
+        up_to = _normalize_up_to(up_to)
+        result = NotificationRepository.mark_all_as_read(user_id, up_to)
+        SummaryRepository.mark_all_as_read(user_id, up_to, result.modified_count)
+        if result.modified_count:
+            notification_cache.invalidate([user_id])
+        return {"matched": result.matched_count, "modified": result.modified_count, "errors": []}
+
+    # Các bản async dùng khi MONGO__BACKEND=async
+
+    async def create_notifications_async(self, notifications: list[dict]):
+        if not notifications:
+            return []
+        created = await AsyncNotificationRepository.save_many(notifications)
+        await AsyncSummaryRepository.add(created)
+        await notification_cache.invalidate_async(n["user_id"] for n in created)
+        self._after_save(notifications, created)
+        return [str(notification["_id"]) for notification in created]
+
+    async def ensure_indexes_async(self):
+        await AsyncNotificationRepository.ensure_indexes()
+        # Collection rejected_events và broadcast_jobs chỉ được ghi qua client sync
+        await asyncio.to_thread(RejectedEventRepository.ensure_indexes)
+        await asyncio.to_thread(BroadcastJobRepository.ensure_indexes)
+
+    async def get_notifications_for_user_async(
+        self,
+        user_id: int,
+        limit: int = 50,
+        before: Optional[str] = None,
+        status: Optional[str] = None,
+        include_archive: bool = False
+    ) -> tuple[list[dict], Optional[str]]:
+        if before is not None:
+            return await self._find_page_async(user_id, limit, decode_cursor(before), status, include_archive)
+        docs, next_cursor = await notification_cache.get_or_load_async(
+            user_id,
+            _page_field(limit, status, include_archive),
+            lambda: self._find_page_async(user_id, limit, None, status, include_archive)
+        )
+        return docs, next_cursor
+
+    async def _find_page_async(
+        self,
+        user_id: int,
+        limit: int,
+        before_key: Optional[tuple[datetime, ObjectId]],
+        status: Optional[str],
+        include_archive: bool
+    ) -> tuple[list[dict], Optional[str]]:
+        docs = await AsyncNotificationRepository.find_by_user(user_id, limit=limit + 1, before=before_key, status=status)
+        if include_archive and _needs_archive(docs, limit, status):
+            docs = _merge(docs, await AsyncArchiveRepository.find_by_user(user_id, limit + 1, before_key))
+        return _page(docs, limit)
+
+    async def get_version_async(self, user_id: int) -> int:
+        return await notification_cache.get_or_load_async(
+            user_id, "version", lambda: AsyncSummaryRepository.find_version(user_id)
+        )
+
+    async def get_summary_async(self, user_id: int) -> dict:
+        summary = await notification_cache.get_or_load_async(
+            user_id, "summary", lambda: AsyncSummaryRepository.find_by_user(user_id)
+        )
+        return summary or {"_id": user_id, "unread_count": 0, "latest": []}
+
+    async def mark_as_read_async(self, notification_id: str) -> bool:
+        object_id = _parse_id(notification_id)
+        updated = await AsyncNotificationRepository.mark_as_read(notification_id)
+        if updated:
+            await AsyncSummaryRepository.mark_as_read(updated["user_id"], updated["_id"])
+            await notification_cache.invalidate_async([updated["user_id"]])
+            return True
+        return bool(await AsyncNotificationRepository.find_statuses([object_id]))
+
+    async def mark_many_as_read_async(self, notification_ids: list[str]) -> dict:
+        object_ids, errors = _parse_ids(notification_ids)
+        found = await AsyncNotificationRepository.find_statuses(object_ids) if object_ids else []
+        unread_by_user, not_found = _group_unread(object_ids, found)
+
+        modified = 0
+        for user_id, ids in unread_by_user.items():
+            result = await AsyncNotificationRepository.mark_many_as_read(user_id, ids)
+            await AsyncSummaryRepository.mark_many_as_read(user_id, ids, result.modified_count)
+            modified += result.modified_count
+        await notification_cache.invalidate_async(unread_by_user)
 
-    def get_notifications_for_user(self, user_id: int):
-        return NotificationRepository.find_by_user(user_id)
+        return {"matched": len(found), "modified": modified, "errors": errors + not_found}
 
-    def mark_as_read(self, notification_id: str):
-        NotificationRepository.mark_as_read(notification_id)
+    async def mark_all_as_read_async(self, user_id: int, up_to: Optional[datetime] = None) -> dict:
+        up_to = _normalize_up_to(up_to)
+        result = await AsyncNotificationRepository.mark_all_as_read(user_id, up_to)
+        await AsyncSummaryRepository.mark_all_as_read(user_id, up_to, result.modified_count)
+        if result.modified_count:
+            await notification_cache.invalidate_async([user_id])
+        return {"matched": result.matched_count, "modified": result.modified_count, "errors": []}
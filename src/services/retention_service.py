@@ -0,0 +1,121 @@
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+
+from config.settings import RetentionConfig, settings
+from src.monitoring.logs import get_logger
+from src.monitoring.metrics import archived_total
+from src.repositories.archive_repository import ArchiveRepository
+from src.repositories.lease_repository import LeaseRepository
+from src.repositories.notification_repository import NotificationRepository
+from src.repositories.summary_repository import SummaryRepository
+from src.services.notification_cache import notification_cache
+
+logger = get_logger("retention")
+
+LEASE_NAME = "retention"
+
+class RetentionService:
+    """
+    Job nền áp dụng retention cho collection notifications.
+
+    - Notification READ cũ hơn `archive_read_after_days` được chuyển sang notification_archive.
+    - Nếu `unread_ttl_days` > 0, notification UNREAD hết hạn qua TTL index của Mongo. Job chỉ
+      dựng lại summary của các user còn header UNREAD đã hết hạn; unread_count của user có
+      notification hết hạn nằm ngoài `latest` chỉ đúng lại sau khi chạy rebuild-summaries.
+
+    Mỗi batch tối đa `batch_size` document, nghỉ `batch_pause_ms` giữa các batch để không
+    lấn át traffic thật, và job dừng giữa hai batch khi app shutdown. Job chỉ chạy khi giữ được
+    lease Mongo (gia hạn sau mỗi batch) nên nhiều replica của API không compact cùng lúc.
+    """
+
+    def __init__(self, cfg: RetentionConfig):
+        self.cfg = cfg
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if not self.cfg.enabled or self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="notification-retention", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def ensure_indexes(self):
+        NotificationRepository.ensure_retention_indexes(self.cfg.unread_ttl_days * 86400)
+        ArchiveRepository.ensure_indexes()
+
+    def archive_cutoff(self) -> datetime:
+        return datetime.utcnow() - timedelta(days=self.cfg.archive_read_after_days)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            # Lặp lại mỗi lượt: với MONGO__LAYOUT=monthly, bucket tháng mới (do consumer tạo) cũng cần index retention
+            try:
+                self.ensure_indexes()
+            except Exception:
+                logger.exception("Error creating retention indexes")
+            try:
+                result = self.compact()
+                if result["skipped"]:
+                    logger.debug("Retention held by another process")
+                elif result["archived"] or result["summaries_rebuilt"]:
+                    logger.info("Retention applied", extra=result)
+            except Exception:
+                logger.exception("Error applying retention")
+            self._stopping.wait(self.cfg.interval_seconds)
+
+    def compact(self) -> dict:
+        if not LeaseRepository.acquire(LEASE_NAME, self.owner, self.cfg.lease_seconds):
+            return {"archived": 0, "summaries_rebuilt": 0, "skipped": True}
+        try:
+            return self._compact()
+        finally:
+            LeaseRepository.release(LEASE_NAME, self.owner)
+
+    def _compact(self) -> dict:
+        cutoff = self.archive_cutoff()
+        archived = 0
+        while not self._stopping.is_set():
+            docs = NotificationRepository.find_archivable(cutoff, self.cfg.batch_size)
+            if not docs:
+                break
+            # Ghi archive trước rồi mới xóa bản live: bị ngắt giữa chừng thì chỉ có bản trùng trong archive
+            ArchiveRepository.add(docs, self.cfg.compression_level)
+            deleted = NotificationRepository.delete_many([doc["_id"] for doc in docs])
+            # Danh sách live của các user này đã đổi nên ETag cũ không được khớp nữa
+            user_ids = list({doc["user_id"] for doc in docs})
+            SummaryRepository.bump_versions(user_ids)
+            notification_cache.invalidate(user_ids)
+            archived += deleted
+            archived_total.inc(amount=deleted)
+            if len(docs) < self.cfg.batch_size:
+                break
+            self._stopping.wait(self.cfg.batch_pause_ms / 1000)
+            if not LeaseRepository.acquire(LEASE_NAME, self.owner, self.cfg.lease_seconds):
+                # Lease đã hết hạn và bị process khác giành (vd. batch quá chậm): nhường lại
+                logger.warning("Retention lease lost, stopping")
+                return {"archived": archived, "summaries_rebuilt": 0, "skipped": False}
+
+        rebuilt = self._rebuild_expired_summaries() if self.cfg.unread_ttl_days else 0
+        return {"archived": archived, "summaries_rebuilt": rebuilt, "skipped": False}
+
+    def _rebuild_expired_summaries(self) -> int:
+        cutoff = datetime.utcnow() - timedelta(days=self.cfg.unread_ttl_days)
+        user_ids = SummaryRepository.find_expired_unread(cutoff, self.cfg.batch_size)
+        if user_ids:
+            SummaryRepository.rebuild_users(user_ids)
+            notification_cache.invalidate(user_ids)
+        return len(user_ids)
+
+retention_service = RetentionService(settings.retention)
@@ -0,0 +1,61 @@
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+
+from config.settings import SummaryConfig, settings
+from src.monitoring.logs import get_logger
+from src.repositories.notification_repository import NotificationRepository
+from src.repositories.summary_repository import REBUILD_BATCH, SummaryRepository
+from src.services.notification_cache import notification_cache
+
+logger = get_logger("summary_reconciler")
+
+class SummaryReconciler:
+    """
+    Job nền sửa summary bị lệch: mỗi `reconcile_interval_seconds` dựng lại summary của các user
+    có notification được ghi trong `reconcile_window_seconds` vừa qua.
+
+    Notification được ghi trước, $inc summary sau; process chết giữa hai lệnh để lại notification
+    mới mà summary không đếm. Cửa sổ dài hơn chu kỳ để lượt sau vẫn bắt được notification ghi
+    ngay trước khi lượt trước chạy.
+    """
+
+    def __init__(self, cfg: SummaryConfig):
+        self.cfg = cfg
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if not self.cfg.reconcile_interval_seconds or self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="notification-summary-reconciler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stopping.wait(self.cfg.reconcile_interval_seconds):
+            try:
+                rebuilt = self.reconcile()
+                if rebuilt:
+                    logger.info("Summaries reconciled", extra={"users": rebuilt})
+            except Exception:
+                logger.exception("Error reconciling summaries")
+
+    def reconcile(self) -> int:
+        since = datetime.utcnow() - timedelta(seconds=self.cfg.reconcile_window_seconds)
+        user_ids = list(NotificationRepository.find_recent_user_ids(since))
+        for offset in range(0, len(user_ids), REBUILD_BATCH):
+            if self._stopping.is_set():
+                break
+            batch = user_ids[offset:offset + REBUILD_BATCH]
+            SummaryRepository.rebuild_users(batch)
+            notification_cache.invalidate(batch)
+        return len(user_ids)
+
+summary_reconciler = SummaryReconciler(settings.summary)
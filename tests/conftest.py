@@ -0,0 +1,144 @@
+import functools
+import os
+import uuid
+
+import mongomock
+import pytest
+from mongomock.collection import BulkOperationBuilder
+from pymongo.errors import BulkWriteError
+
+from config.resources import resources
+from config.settings import settings
+
+
+def _drop_sort(method):
+    # pymongo >= 4.11 truyền `sort` (UpdateOne/ReplaceOne) cho bulk builder; mongomock 4.3 chưa nhận tham số này
+    @functools.wraps(method)
+    def wrapper(self, *args, sort=None, **kwargs):
+        assert sort is None, "mongomock không hỗ trợ sort trong bulk_write"
+        return method(self, *args, **kwargs)
+    return wrapper
+
+
+def _upsert_positions(execute):
+    # mongomock 4.3 đánh "index" của upsert theo số upsert đã có thay vì vị trí lệnh trong bulk như MongoDB
+    @functools.wraps(execute)
+    def wrapper(self, *args, **kwargs):
+        positions = []
+
+        def track(index, operation):
+            @functools.wraps(operation)
+            def run():
+                result = operation()
+                if result.get("upserted"):
+                    positions.append(index)
+                return result
+            return run
+
+        self.executors = [track(index, operation) for index, operation in enumerate(self.executors)]
+        try:
+            result = execute(self, *args, **kwargs)
+        except BulkWriteError as error:
+            _set_upsert_indexes(error.details, positions)
+            raise
+        _set_upsert_indexes(result, positions)
+        return result
+    return wrapper
+
+
+def _set_upsert_indexes(result: dict, positions: list[int]):
+    for upserted, index in zip(result.get("upserted", []), positions):
+        upserted["index"] = index
+
+
+BulkOperationBuilder.add_update = _drop_sort(BulkOperationBuilder.add_update)
+BulkOperationBuilder.add_replace = _drop_sort(BulkOperationBuilder.add_replace)
+BulkOperationBuilder.execute = _upsert_positions(BulkOperationBuilder.execute)
+
+
+class FakeChannel:
+    """Channel pika tối thiểu: ghi lại ack/nack/publish, timer chỉ chạy khi test gọi fire()."""
+
+    is_open = True
+
+    def __init__(self):
+        self.settled: list[tuple] = []
+        self.published: list[tuple] = []
+        self.timers: dict[int, tuple[float, object]] = {}
+        self._next_timer = 0
+
+    def call_later(self, delay, callback):
+        self._next_timer += 1
+        self.timers[self._next_timer] = (delay, callback)
+        return self._next_timer
+
+    def remove_timeout(self, timer_id):
+        self.timers.pop(timer_id, None)
+
+    def fire(self):
+        for timer_id, (_, callback) in list(self.timers.items()):
+            if self.timers.pop(timer_id, None) is not None:
+                callback()
+
+    def basic_ack(self, delivery_tag, multiple=False):
+        self.settled.append(("ack", delivery_tag, multiple))
+
+    def basic_nack(self, delivery_tag, multiple=False, requeue=True):
+        self.settled.append(("nack", delivery_tag, multiple, requeue))
+
+    def basic_publish(self, exchange, routing_key, body, properties=None):
+        self.published.append((exchange, routing_key, body, properties))
+
+    def acked(self) -> set[int]:
+        """Tag đã được ack, tính cả các tag được phủ bởi ack multiple=True."""
+        tags = set()
+        for kind, tag, multiple, *_ in self.settled:
+            if kind == "ack":
+                tags.update(range(1, tag + 1) if multiple else [tag])
+        return tags
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def mongo(monkeypatch):
+    """Database mongomock thay cho resource "mongo": mọi collection lazy của repository trỏ vào đây."""
+    client = mongomock.MongoClient()
+    monkeypatch.setattr(resources._resources["mongo"], "_value", client)
+    return client[settings.mongo.database]
+
+
+@pytest.fixture
+def mongo_server(monkeypatch):
+    """
+    MongoDB thật (MONGO_TEST_URI, >= 5.2) cho các test cần array_filters, $topN, $merge mà mongomock chưa có.
+
+    Mỗi test dùng một database riêng và xóa nó khi xong; không đặt biến môi trường thì test bị skip.
+    """
+    uri = os.getenv("MONGO_TEST_URI")
+    if not uri:
+        pytest.skip("MONGO_TEST_URI chưa đặt")
+    from pymongo import MongoClient
+    client = MongoClient(uri, serverSelectionTimeoutMS=2000)
+    name = f"{settings.mongo.database}-test-{uuid.uuid4().hex[:8]}"
+    monkeypatch.setattr(settings.mongo, "database", name)
+    monkeypatch.setattr(resources._resources["mongo"], "_value", client)
+    yield client[name]
+    client.drop_database(name)
+    client.close()
+
+
+@pytest.fixture
+def channel():
+    return FakeChannel()
+
+
+@pytest.fixture
+def clock():
+    return Clock()
@@ -0,0 +1,42 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from config.settings import settings
+from src.controllers import admin_controller
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(settings.app, "admin_token", "s3cret")
+    app = FastAPI()
+    app.include_router(admin_controller.router)
+    return TestClient(app)
+
+
+def admin_routes() -> list[tuple[str, str]]:
+    return [
+        (method, route.path.replace("{job_id}", "job").replace("{profile_id}", "p"))
+        for route in admin_controller.router.routes
+        for method in route.methods
+    ]
+
+
+def test_every_admin_route_requires_the_token(client):
+    routes = admin_routes()
+    assert ("POST", "/admin/broadcasts") in routes and ("POST", "/admin/dead-letters/replay") in routes
+    for method, path in routes:
+        assert client.request(method, path).status_code == 401, (method, path)
+        assert client.request(method, path, headers={"X-Admin-Token": "wrong"}).status_code == 401, (method, path)
+
+
+def test_admin_api_is_disabled_without_configured_token(client, monkeypatch):
+    monkeypatch.setattr(settings.app, "admin_token", None)
+    for method, path in admin_routes():
+        assert client.request(method, path, headers={"X-Admin-Token": ""}).status_code == 403, (method, path)
+
+
+def test_valid_token_reaches_the_route(client):
+    response = client.get("/admin/profiling", headers={"X-Admin-Token": "s3cret"})
+    assert response.status_code == 200
+    assert "enabled" in response.json()
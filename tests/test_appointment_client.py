@@ -0,0 +1,232 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+
+from benchmarks.stubs import AppointmentServiceStub
+from src.clients.appointment_client import AppointmentClient, CircuitBreaker, CircuitOpenError, SelectorLookupError, TTLCache
+from src.messaging import prescription_handler
+from src.messaging.retry import RetryLater
+from src.models.events import PrescriptionReadyEvent
+
+
+@pytest.fixture
+def stub():
+    with AppointmentServiceStub(latency=0.0, patients=1000) as server:
+        yield server
+
+
+def make_client(url: str, failure_threshold: int = 3, reset_timeout: float = 60.0, timeout: float = 2.0) -> AppointmentClient:
+    return AppointmentClient(
+        url,
+        timeout=timeout,
+        max_connections=4,
+        cache=TTLCache(max_size=100, ttl=60),
+        breaker=CircuitBreaker(failure_threshold=failure_threshold, reset_timeout=reset_timeout)
+    )
+
+
+def unreachable_url() -> str:
+    # Cổng vừa được cấp rồi đóng lại: kết nối tới đó bị từ chối ngay
+    with AppointmentServiceStub() as server:
+        url = server.url
+    return url
+
+
+def test_cache_hit_miss_and_expiry():
+    cache = TTLCache(max_size=10, ttl=0.05)
+    assert cache.get(1) == (False, None)
+    cache.set(1, 100)
+    assert cache.get(1) == (True, 100)
+    time.sleep(0.06)
+    assert cache.get(1) == (False, None)
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+def test_cache_evicts_least_recently_used():
+    cache = TTLCache(max_size=2, ttl=60)
+    cache.set(1, "a")
+    cache.set(2, "b")
+    cache.get(1)
+    cache.set(3, "c")
+    assert cache.get(2) == (False, None)
+    assert cache.get(1) == (True, "a")
+    assert cache.get(3) == (True, "c")
+
+
+def test_breaker_opens_after_threshold_and_fails_fast():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_breaker_success_resets_failure_count():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def test_breaker_half_open_allows_single_probe():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.state == "open"
+    time.sleep(0.06)
+    assert breaker.state == "half_open"
+    breaker.before_call()
+    # Trong lúc lời gọi thử chưa xong, các lời gọi khác vẫn fail ngay
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.before_call()
+
+
+def test_breaker_failed_probe_reopens():
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=0.05)
+    for _ in range(5):
+        breaker.record_failure()
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_lookup_uses_cache(stub):
+    client = make_client(stub.url)
+    try:
+        assert client.get_patient_id(1234) == 234
+        assert client.get_patient_id(1234) == 234
+    finally:
+        client.close()
+    assert stub.requests == 1
+    assert client.stats()["hits"] == 1
+
+
+def test_prime_skips_lookup(stub):
+    client = make_client(stub.url)
+    client.prime(42, 7)
+    try:
+        assert client.get_patient_id(42) == 7
+    finally:
+        client.close()
+    assert stub.requests == 0
+
+
+def test_single_flight_collapses_concurrent_misses():
+    stub = AppointmentServiceStub(latency=0.2)
+    with stub:
+        client = make_client(stub.url)
+        start = threading.Barrier(8)
+
+        def lookup():
+            start.wait()
+            return client.get_patient_id(5)
+
+        try:
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                results = list(pool.map(lambda _: lookup(), range(8)))
+        finally:
+            client.close()
+    assert results == [5] * 8
+    assert stub.requests == 1
+
+
+def test_single_flight_shares_failure():
+    stub = AppointmentServiceStub(latency=0.2, status=503)
+    with stub:
+        client = make_client(stub.url, failure_threshold=100)
+        start = threading.Barrier(4)
+
+        def lookup():
+            start.wait()
+            with pytest.raises(httpx.HTTPStatusError):
+                client.get_patient_id(5)
+
+        try:
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                list(pool.map(lambda _: lookup(), range(4)))
+        finally:
+            client.close()
+    # Lỗi của leader được trả cho mọi caller đang chờ; breaker chỉ đếm một lần
+    assert stub.requests == 1
+    assert client.breaker.failures == 1
+
+
+def test_single_flight_async_collapses_concurrent_misses():
+    stub = AppointmentServiceStub(latency=0.2)
+
+    async def run():
+        client = make_client(stub.url)
+        try:
+            return await asyncio.gather(*(client.get_patient_id_async(9) for _ in range(8)))
+        finally:
+            await client.aclose()
+
+    with stub:
+        results = asyncio.run(run())
+    assert results == [9] * 8
+    assert stub.requests == 1
+
+
+def test_open_breaker_stops_calls_to_service():
+    client = make_client(unreachable_url(), failure_threshold=2)
+    try:
+        for appointment_id in (1, 2):
+            with pytest.raises(httpx.HTTPError):
+                client.get_patient_id(appointment_id)
+        assert client.breaker.state == "open"
+        with pytest.raises(CircuitOpenError):
+            client.get_patient_id(3)
+    finally:
+        client.close()
+
+
+def test_prescription_falls_back_to_retry_queue_when_circuit_open(monkeypatch, stub):
+    client = make_client(stub.url, failure_threshold=1)
+    client.breaker.record_failure()
+    monkeypatch.setattr(prescription_handler, "appointment_client", client)
+    event = PrescriptionReadyEvent.model_validate({
+        "event_type": "prescription_ready",
+        "data": {"prescription_id": 1, "appointment_id": 77, "dispense_id": 1},
+    })
+    with pytest.raises(RetryLater):
+        prescription_handler.handle_prescription_ready(event)
+    assert stub.requests == 0
+
+
+def test_prescription_uses_patient_id_sent_by_producer(monkeypatch, stub):
+    client = make_client(stub.url, failure_threshold=1)
+    client.breaker.record_failure()
+    monkeypatch.setattr(prescription_handler, "appointment_client", client)
+    event = PrescriptionReadyEvent.model_validate({
+        "event_type": "prescription_ready",
+        "data": {"prescription_id": 1, "appointment_id": 77, "dispense_id": 1, "patient_id": 12},
+    })
+    notification = prescription_handler.handle_prescription_ready(event)
+    assert notification["user_id"] == 12
+    assert stub.requests == 0
+
+
+def test_selector_lookup_fails_clearly_when_endpoint_is_missing(stub):
+    client = make_client(stub.url)
+    # Stub chỉ có GET /appointments/{id}: tra theo bác sĩ/ngày trả 404
+    with pytest.raises(SelectorLookupError, match="GET /appointments returned 404"):
+        client.find_patient_ids("BS. An", "2025-06-01")
+    # 4xx không phải lỗi của appointment-service: circuit không mở
+    assert client.breaker.state == "closed"
@@ -0,0 +1,94 @@
+import asyncio
+from datetime import datetime
+
+import pika
+import pytest
+
+from src.messaging import async_consumer
+from src.messaging.async_consumer import AsyncConsumer
+from src.messaging.retry import ATTEMPT_HEADER, RetryLater
+
+QUEUE = "prescription_notifications"
+BODY = b'{"event_type": "prescription_ready"}'
+
+
+def notification() -> dict:
+    return {"user_id": 1, "title": "Đơn thuốc đã sẵn sàng", "message": "Đơn thuốc RX-1 đã sẵn sàng để nhận",
+            "status": "UNREAD", "created_at": datetime(2025, 6, 1, 8), "event_id": "prescription_ready:9"}
+
+
+def handled_by(monkeypatch, handler):
+    monkeypatch.setattr(async_consumer, "handle_event_async", handler)
+
+
+def process(channel, delivery_tag: int = 1, properties=None):
+    asyncio.run(AsyncConsumer()._process(channel, QUEUE, delivery_tag, properties, BODY))
+
+
+def test_saved_notification_is_acked(mongo, channel, monkeypatch):
+    async def handle(body):
+        return notification()
+    handled_by(monkeypatch, handle)
+
+    process(channel, delivery_tag=7)
+    assert channel.settled == [("ack", 7, False)]
+    assert mongo.notifications.count_documents({"event_id": "prescription_ready:9"}) == 1
+
+
+def test_retry_is_published_then_acked(channel, monkeypatch):
+    async def handle(body):
+        raise RetryLater("appointment-service unavailable")
+    handled_by(monkeypatch, handle)
+
+    process(channel, properties=pika.BasicProperties(headers={ATTEMPT_HEADER: 1}))
+    [(exchange, routing_key, body, properties)] = channel.published
+    assert exchange.startswith("notifications.retry.") and routing_key == QUEUE and body == BODY
+    assert properties.headers[ATTEMPT_HEADER] == 2
+    assert channel.settled == [("ack", 1, False)]
+
+
+def test_save_failure_is_nacked_with_requeue(channel, monkeypatch):
+    async def handle(body):
+        return notification()
+    def fail(notifications):
+        raise RuntimeError("mongo down")
+    handled_by(monkeypatch, handle)
+    monkeypatch.setattr(async_consumer.service, "create_notifications", fail)
+
+    process(channel)
+    assert channel.settled == [("nack", 1, False, True)]
+
+
+def test_unexpected_error_is_nacked_with_requeue(channel, monkeypatch):
+    async def handle(body):
+        raise RuntimeError("bug")
+    handled_by(monkeypatch, handle)
+
+    process(channel)
+    assert channel.settled == [("nack", 1, False, True)] and channel.published == []
+
+
+def test_cancelled_task_is_nacked_with_requeue(channel, monkeypatch):
+    async def handle(body):
+        await asyncio.Event().wait()
+    handled_by(monkeypatch, handle)
+
+    async def run():
+        task = asyncio.ensure_future(AsyncConsumer()._process(channel, QUEUE, 1, None, BODY))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+    asyncio.run(run())
+    assert channel.settled == [("nack", 1, False, True)]
+
+
+def test_closed_channel_is_not_settled(channel, monkeypatch):
+    async def handle(body):
+        raise RetryLater("appointment-service unavailable")
+    handled_by(monkeypatch, handle)
+    channel.is_open = False
+
+    process(channel)
+    # Channel đã đóng: RabbitMQ tự giao lại message chưa ack
+    assert channel.settled == [] and channel.published == []
@@ -0,0 +1,88 @@
+import asyncio
+import inspect
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+from pymongo import AsyncMongoClient
+
+from config.settings import settings
+from src.repositories import async_notification_repository
+from src.repositories.async_notification_repository import AsyncNotificationRepository, close_async_client
+from src.repositories.notification_buckets import catalog
+from src.repositories.notification_repository import NotificationRepository
+
+START = datetime(2025, 6, 30, 23, 58)
+
+
+def notification(minute: int, user_id: int = 1, event_id: str = None) -> dict:
+    created_at = START + timedelta(minutes=minute)
+    doc = {
+        "_id": ObjectId(ObjectId.from_datetime(created_at).binary[:4] + minute.to_bytes(8, "big")),
+        "user_id": user_id,
+        "title": f"Thông báo {minute}",
+        "message": "Lịch khám đã được xác nhận",
+        "status": "UNREAD",
+        "created_at": created_at,
+    }
+    if event_id is not None:
+        doc["event_id"] = event_id
+    return doc
+
+
+async def scenario(repository) -> list:
+    """Cùng một chuỗi thao tác cho repository sync hoặc async; kết quả so sánh được với nhau."""
+    async def call(method, *args, **kwargs):
+        result = getattr(repository, method)(*args, **kwargs)
+        return await result if inspect.isawaitable(result) else result
+
+    # Batch đi qua nửa đêm cuối tháng để layout monthly ghi vào hai bucket
+    first = [notification(minute, user_id=1 + minute % 2, event_id=f"e-{minute}") for minute in range(6)]
+    again = [notification(minute + 10, event_id=f"e-{minute}") for minute in (0, 3)] + [notification(20, event_id="e-20")]
+    results = [
+        [doc["event_id"] for doc in await call("save_many", first)],
+        [doc["event_id"] for doc in await call("save_many", again)],
+    ]
+    page = await call("find_by_user", 1, limit=2)
+    before = (page[-1]["created_at"], page[-1]["_id"])
+    results += [page, await call("find_by_user", 1, limit=2, before=before)]
+
+    ids = [doc["_id"] for doc in first]
+    results += [
+        (await call("mark_as_read", str(ids[0])))["user_id"],
+        await call("mark_as_read", str(ids[0])),
+        await call("mark_as_read", str(ObjectId())),
+    ]
+    marked = await call("mark_many_as_read", 1, ids)
+    results.append((marked.matched_count, marked.modified_count))
+    results.append(sorted((doc["_id"], doc["status"]) for doc in await call("find_statuses", ids + [ObjectId()])))
+    marked = await call("mark_all_as_read", 2, START + timedelta(minutes=3))
+    results.append((marked.matched_count, marked.modified_count))
+    results.append(await call("find_by_user", 2, status="UNREAD"))
+    results.append(sorted(await call("live_ids", ids[:3] + [ObjectId()])))
+    return results
+
+
+@pytest.mark.parametrize("layout", ["single", "monthly"])
+def test_async_repository_matches_sync(mongo_server, monkeypatch, layout):
+    monkeypatch.setattr(settings.mongo, "layout", layout)
+    monkeypatch.setattr(catalog, "buckets", set())
+    monkeypatch.setattr(catalog, "indexed", set())
+    monkeypatch.setattr(catalog, "legacy", False)
+
+    catalog.invalidate()
+    expected = asyncio.run(scenario(NotificationRepository))
+    mongo_server.client.drop_database(mongo_server.name)
+    catalog.buckets, catalog.indexed = set(), set()
+    catalog.invalidate()
+
+    async def run_async():
+        # Client async gắn với event loop đang chạy nên được tạo trong loop của test
+        async_notification_repository._client = AsyncMongoClient(os.environ["MONGO_TEST_URI"])
+        try:
+            return await scenario(AsyncNotificationRepository)
+        finally:
+            await close_async_client()
+    assert asyncio.run(run_async()) == expected
+    assert expected[1] == ["e-20"]
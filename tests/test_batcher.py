@@ -0,0 +1,104 @@
+import json
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from src.messaging import batcher as batcher_module
+from src.messaging import consumer
+from src.messaging.batcher import NotificationBatcher
+from src.messaging.digest import DigestCoalescer
+from src.messaging.retry import ATTEMPT_HEADER, ERROR_HEADER
+from src.services.event_dedup import recent_events
+
+
+def make_batcher(channel, **kwargs) -> NotificationBatcher:
+    options = {"batch_size": 3, "max_delay": 0.2, **kwargs}
+    return NotificationBatcher(channel, call_later=channel.call_later, remove_timeout=channel.remove_timeout, **options)
+
+
+def notification(i: int, user_id: int = 1, kind=None) -> dict:
+    doc = {"user_id": user_id, "title": f"Thông báo {i}", "message": f"Nội dung {i}", "status": "UNREAD",
+           "created_at": datetime(2025, 6, 1) + timedelta(seconds=i)}
+    if kind is not None:
+        doc |= {"kind": kind, "event_id": f"{kind}:{i}"}
+    return doc
+
+
+def test_full_batch_is_saved_and_acked_at_once(mongo, channel):
+    batcher = make_batcher(channel)
+    for tag in (1, 2):
+        batcher.add(tag, notification(tag))
+    assert channel.settled == [] and mongo.notifications.count_documents({}) == 0
+    assert len(channel.timers) == 1
+
+    batcher.add(3, notification(3))
+    assert mongo.notifications.count_documents({}) == 3
+    assert channel.settled == [("ack", 3, True)]
+    assert channel.timers == {} and batcher.unacked == 0
+
+
+def test_partial_batch_is_flushed_by_timer(mongo, channel):
+    batcher = make_batcher(channel)
+    batcher.add(1, notification(1))
+    # Event không tạo notification vẫn chờ ack cùng batch
+    batcher.add(2, None)
+    [(delay, _)] = channel.timers.values()
+    assert delay == pytest.approx(0.2, abs=0.05)
+    assert channel.settled == []
+
+    channel.fire()
+    assert mongo.notifications.count_documents({}) == 1
+    assert channel.settled == [("ack", 2, True)]
+
+
+def test_save_failure_nacks_with_requeue(channel, monkeypatch):
+    def fail(notifications):
+        raise RuntimeError("mongo down")
+    monkeypatch.setattr(batcher_module.service, "create_notifications", fail)
+    batcher = make_batcher(channel)
+    for tag in (1, 2, 3):
+        batcher.add(tag, notification(tag))
+    assert channel.settled == [("nack", 3, True, True)]
+    assert channel.acked() == set()
+
+
+def test_multiple_ack_never_covers_held_digest_tags(mongo, channel, clock):
+    coalescer = DigestCoalescer(window=1.0, max_hold=5.0, max_items=10, clock=clock)
+    batcher = make_batcher(channel, coalescer=coalescer)
+    batcher.add(1, notification(1, kind="appointment_cancelled"))
+    batcher.add(2, notification(2))
+    batcher.add(3, notification(3, kind="appointment_cancelled"))
+    batcher.add(4, notification(4))
+    batcher.add(5, notification(5))
+    # Batch thường (2, 4, 5) đã lưu; 1 và 3 còn giữ trong nhóm digest nên không ack multiple qua chúng
+    assert channel.acked() == {2, 4, 5}
+    assert all(not multiple or tag < 1 for _, tag, multiple in channel.settled)
+
+    clock.now = 1.5
+    channel.fire()
+    assert channel.acked() == {1, 2, 3, 4, 5} and batcher.unacked == 0
+    digest = mongo.notifications.find_one({"digest_count": 2})
+    assert digest["event_id"] == "appointment_cancelled:1"
+    assert digest["digest_event_ids"] == ["appointment_cancelled:3"]
+
+
+def test_unexpected_handler_error_goes_to_retry_queue(mongo, channel, monkeypatch):
+    def broken(event):
+        raise KeyError("patient_id")
+    monkeypatch.setitem(consumer.HANDLERS, "prescription_ready", broken)
+    recent_events.clear()
+    batcher = make_batcher(channel)
+    callback = consumer.on_message(batcher, "prescription_notifications")
+    body = json.dumps({"event_type": "prescription_ready", "data": {"prescription_id": 1, "appointment_id": 3, "dispense_id": 9}}).encode()
+
+    callback(channel, SimpleNamespace(delivery_tag=1), SimpleNamespace(headers=None), body)
+    channel.fire()
+
+    # Message gốc chỉ được ack sau khi bản retry đã được publish (không bị ack rồi mất)
+    [(exchange, routing_key, published, properties)] = channel.published
+    assert exchange.startswith("notifications.retry.") and routing_key == "prescription_notifications"
+    assert published == body
+    assert properties.headers[ATTEMPT_HEADER] == 1 and "KeyError" in properties.headers[ERROR_HEADER]
+    assert channel.acked() == {1}
+    assert mongo.notifications.count_documents({}) == 0
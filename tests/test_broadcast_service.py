@@ -0,0 +1,128 @@
+import time
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+
+from config.settings import BroadcastConfig
+from src.clients.appointment_client import SelectorLookupError
+from src.models.events import BroadcastData, BroadcastSelector
+from src.repositories import broadcast_job_repository
+from src.repositories.broadcast_job_repository import BroadcastJobRepository
+from src.services import broadcast_service as broadcast_module
+from src.services.broadcast_service import BroadcastService
+
+
+@pytest.fixture(autouse=True)
+def jobs(monkeypatch):
+    db = mongomock.MongoClient().db
+    monkeypatch.setattr(broadcast_job_repository, "broadcast_jobs", db.broadcast_jobs)
+    monkeypatch.setattr(broadcast_job_repository, "broadcast_recipients", db.broadcast_recipients)
+    return db.broadcast_jobs
+
+
+@pytest.fixture
+def written(monkeypatch):
+    chunks = []
+
+    def create_broadcast_chunk(chunk):
+        chunks.append([doc["user_id"] for doc in chunk])
+        return chunk
+
+    monkeypatch.setattr(broadcast_module.service, "create_broadcast_chunk", create_broadcast_chunk)
+    return chunks
+
+
+def make_service(**overrides) -> BroadcastService:
+    return BroadcastService(BroadcastConfig(**{"chunk_size": 2, **overrides}))
+
+
+def create_job(job_id: str, user_ids: list[int]) -> dict:
+    data = BroadcastData(title="Phòng khám tạm đóng cửa", message="Lịch khám sẽ được sắp xếp lại.", user_ids=user_ids)
+    return BroadcastJobRepository.create(job_id, data.model_dump(include={"title", "message", "selector"}), user_ids)
+
+
+def test_job_keeps_request_and_recipients_for_recovery(monkeypatch):
+    monkeypatch.setattr(broadcast_job_repository, "RECIPIENTS_PER_DOC", 2)
+    create_job("job", [5, 3, 9, 3, 1])
+    assert broadcast_job_repository.broadcast_recipients.count_documents({"job_id": "job"}) == 3
+    # Submit lại (event giao lại) không ghi thêm người nhận
+    create_job("job", [5, 3, 9, 3, 1])
+    assert broadcast_job_repository.broadcast_recipients.count_documents({"job_id": "job"}) == 3
+    data = make_service().load_request("job")
+    assert data.title == "Phòng khám tạm đóng cửa"
+    assert data.user_ids == [5, 3, 9, 3, 1]
+    assert data.selector is None
+
+
+def test_recover_requeues_queued_job_and_runs_it_from_mongo(jobs, written):
+    create_job("job", [1, 2, 3])
+    service = make_service()
+    assert service.recover() == 1
+    # Job đã nằm trong hàng đợi thì lượt quét sau không thêm lần nữa
+    assert service.recover() == 0
+    job_id, data = service._queue.get_nowait()
+    service.run_job(job_id, data)
+    assert written == [[1, 2], [3]]
+    job = jobs.find_one({"_id": "job"})
+    assert (job["status"], job["written"], job["owner"]) == ("COMPLETED", 3, None)
+
+
+def test_stale_running_job_is_reclaimed(jobs):
+    create_job("job", [1])
+    assert BroadcastJobRepository.claim("job", "a", lease_seconds=60)
+    assert not BroadcastJobRepository.claim("job", "b", lease_seconds=60)
+    assert BroadcastJobRepository.find_recoverable(lease_seconds=60) == []
+    # Process "a" chết: heartbeat không còn được gia hạn
+    jobs.update_one({"_id": "job"}, {"$set": {"heartbeat_at": datetime.utcnow() - timedelta(seconds=120)}})
+    assert [job["_id"] for job in BroadcastJobRepository.find_recoverable(lease_seconds=60)] == ["job"]
+    assert BroadcastJobRepository.claim("job", "b", lease_seconds=60)
+    assert not BroadcastJobRepository.heartbeat("job", "a", {"written": 1})
+    BroadcastJobRepository.release("job", "a", {"status": "COMPLETED"})
+    assert jobs.find_one({"_id": "job"})["status"] == "RUNNING"
+
+
+def test_run_stops_when_another_process_takes_over(monkeypatch, jobs, written):
+    create_job("job", [1, 2, 3, 4])
+    service = make_service()
+    original = broadcast_module.service.create_broadcast_chunk
+
+    def slow_chunk(chunk):
+        # Chunk đầu chạy quá lease: process khác nhận lại job
+        jobs.update_one({"_id": "job"}, {"$set": {"owner": "other"}})
+        return original(chunk)
+
+    monkeypatch.setattr(broadcast_module.service, "create_broadcast_chunk", slow_chunk)
+    service.run_job("job")
+    assert written == [[1, 2]]
+    assert jobs.find_one({"_id": "job"})["status"] == "RUNNING"
+
+
+def test_worker_recovers_jobs_left_by_previous_process(jobs, written):
+    create_job("queued", [1, 2])
+    create_job("crashed", [3])
+    BroadcastJobRepository.claim("crashed", "dead-process", lease_seconds=60)
+    jobs.update_one({"_id": "crashed"}, {"$set": {"heartbeat_at": datetime.utcnow() - timedelta(seconds=120)}})
+    service = make_service(lease_seconds=60, recovery_interval_seconds=0.05)
+    service.start()
+    try:
+        deadline = time.monotonic() + 5
+        while jobs.count_documents({"status": "COMPLETED"}) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        service.stop()
+    assert {job["_id"]: job["status"] for job in jobs.find()} == {"queued": "COMPLETED", "crashed": "COMPLETED"}
+    assert sorted(user_id for chunk in written for user_id in chunk) == [1, 2, 3]
+
+
+def test_selector_job_fails_when_lookup_is_unsupported(monkeypatch, jobs, written):
+    def find_patient_ids(doctor_name, appointment_date):
+        raise SelectorLookupError("appointment-service GET /appointments returned 404: ")
+    monkeypatch.setattr(broadcast_module.appointment_client, "find_patient_ids", find_patient_ids)
+    data = BroadcastData(title="Bác sĩ nghỉ", message="Lịch khám sẽ được sắp xếp lại.", selector=BroadcastSelector(doctor_name="BS. An", appointment_date="2025-06-01"))
+    BroadcastJobRepository.create("job", data.model_dump(include={"title", "message", "selector"}), None)
+
+    make_service().run_job("job")
+    job = jobs.find_one({"_id": "job"})
+    assert job["status"] == "FAILED" and "returned 404" in job["error"]
+    assert written == [] and "total" not in job
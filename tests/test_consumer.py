@@ -0,0 +1,135 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from src.messaging import consumer
+from src.messaging.batcher import NotificationBatcher
+from src.messaging.consumer import event_id
+from src.messaging.decoding import InvalidEvent, UnknownEventType, decode_event
+from src.repositories.rejected_event_repository import MAX_BODY_BYTES
+from src.services.event_dedup import recent_events
+
+UNKNOWN_TYPE = json.dumps({"event_type": "lab_result_ready", "data": {"lab_id": 1}}).encode()
+MISSING_FIELD = json.dumps({"event_type": "prescription_ready", "data": {"prescription_id": 1}}).encode()
+NOT_JSON = b"prescription_ready: 1"
+
+
+def decode(payload: dict):
+    return decode_event(json.dumps(payload))
+
+
+def appointment_event(event_type: str = "appointment_confirmed", **data):
+    data = {
+        "appointment_id": 3,
+        "patient_id": 7,
+        "doctor_name": "BS. An",
+        "appointment_date": "2025-06-01",
+        "appointment_time": "08:30",
+        **data,
+    }
+    return decode({"event_type": event_type, "data": data})
+
+
+def test_producer_event_id_is_used_as_is():
+    event = decode({"event_type": "appointment_confirmed", "event_id": 42, "data": appointment_event().data.model_dump()})
+    assert event_id(event) == "42"
+
+
+def test_redelivered_appointment_event_has_same_key():
+    assert event_id(appointment_event()) == event_id(appointment_event())
+    assert event_id(appointment_event()) == "appointment_confirmed:3:2025-06-01:08:30"
+
+
+def test_rescheduled_appointment_is_a_new_event():
+    assert event_id(appointment_event()) != event_id(appointment_event(appointment_time="10:00"))
+    assert event_id(appointment_event()) != event_id(appointment_event(appointment_date="2025-06-02"))
+
+
+def test_reconfirmation_with_new_version_is_a_new_event():
+    first = appointment_event(updated_at="2025-05-20T10:00:00Z")
+    again = appointment_event(updated_at="2025-05-21T09:00:00Z")
+    assert event_id(first) != event_id(again)
+
+
+def test_cancellation_does_not_share_key_with_confirmation():
+    assert event_id(appointment_event("appointment_cancelled")) != event_id(appointment_event())
+
+
+def test_prescription_key_uses_dispense_id():
+    event = decode({
+        "event_type": "prescription_ready",
+        "data": {"prescription_id": 1, "appointment_id": 3, "dispense_id": 9},
+    })
+    assert event_id(event) == "prescription_ready:9"
+
+
+def test_unknown_event_type_is_an_invalid_event():
+    with pytest.raises(UnknownEventType) as error:
+        decode_event(UNKNOWN_TYPE)
+    assert isinstance(error.value, InvalidEvent)
+    assert error.value.event_type == "lab_result_ready"
+    assert error.value.errors[0]["loc"] == ["event_type"]
+
+
+def test_schema_errors_keep_event_type_and_field():
+    with pytest.raises(InvalidEvent) as error:
+        decode_event(MISSING_FIELD)
+    assert not isinstance(error.value, UnknownEventType)
+    assert error.value.event_type == "prescription_ready"
+    assert any(e["loc"][-1] == "appointment_id" for e in error.value.errors)
+
+
+@pytest.mark.parametrize("body", [NOT_JSON, b"", b"[1, 2]", json.dumps({"data": {}}).encode()])
+def test_malformed_body_is_invalid_without_event_type(body):
+    with pytest.raises(InvalidEvent) as error:
+        decode_event(body)
+    assert error.value.event_type is None and error.value.errors
+
+
+@pytest.mark.parametrize("body, event_type", [
+    (UNKNOWN_TYPE, "lab_result_ready"),
+    (MISSING_FIELD, "prescription_ready"),
+    (NOT_JSON, None),
+], ids=["unknown-type", "schema-invalid", "not-json"])
+def test_rejected_message_is_persisted_and_acked(mongo, channel, body, event_type):
+    batcher = NotificationBatcher(channel, batch_size=3, max_delay=0.2, call_later=channel.call_later, remove_timeout=channel.remove_timeout)
+    callback = consumer.on_message(batcher, "prescription_notifications")
+
+    callback(channel, SimpleNamespace(delivery_tag=1), SimpleNamespace(headers=None), body)
+    channel.fire()
+
+    # Giao lại không sửa được message: ack, không requeue và không đi đường retry
+    assert channel.acked() == {1}
+    assert not any(kind == "nack" for kind, *_ in channel.settled)
+    assert channel.published == []
+    [rejected] = mongo.rejected_events.find()
+    assert rejected["event_type"] == event_type
+    assert rejected["body"] == body.decode() and rejected["truncated"] is False
+    assert rejected["reason"] and rejected["errors"]
+    assert mongo.notifications.count_documents({}) == 0
+
+
+def test_rejected_body_is_truncated(mongo):
+    body = json.dumps({"event_type": "lab_result_ready", "data": {"note": "x" * MAX_BODY_BYTES}}).encode()
+    assert consumer.handle_event(body) is None
+    rejected = mongo.rejected_events.find_one()
+    assert rejected["truncated"] is True and len(rejected["body"]) == MAX_BODY_BYTES
+
+
+@pytest.mark.parametrize("forget", [False, True], ids=["memory", "unique-index"])
+def test_duplicate_event_is_acked_and_stored_once(mongo, channel, forget):
+    recent_events.clear()
+    batcher = NotificationBatcher(channel, batch_size=1, max_delay=0.2, call_later=channel.call_later, remove_timeout=channel.remove_timeout)
+    callback = consumer.on_message(batcher, "appointment_notifications")
+    body = json.dumps({"event_type": "appointment_confirmed", "data": appointment_event().data.model_dump(mode="json")}).encode()
+
+    callback(channel, SimpleNamespace(delivery_tag=1), SimpleNamespace(headers=None), body)
+    if forget:
+        # Process khác (hoặc sau restart) không có event_id trong RAM: upsert theo event_id chặn bản trùng
+        recent_events.clear()
+    callback(channel, SimpleNamespace(delivery_tag=2), SimpleNamespace(headers=None), body)
+    channel.fire()
+
+    assert channel.acked() == {1, 2} and channel.published == []
+    assert mongo.notifications.count_documents({"event_id": event_id(appointment_event())}) == 1
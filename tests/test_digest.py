@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.messaging.batcher import NotificationBatcher
+from src.messaging.digest import DEFAULT_DIGEST_TITLE, DigestCoalescer, digest
+
+
+def cancellation(i: int, user_id: int = 1, kind: str = "appointment_cancelled", event_id: str = None) -> dict:
+    return {
+        "user_id": user_id,
+        "title": "Lịch khám đã bị hủy",
+        "message": f"Lịch khám #{i} đã bị hủy",
+        "status": "UNREAD",
+        "appointment_id": i,
+        "created_at": datetime(2025, 6, 1, 8) + timedelta(seconds=i),
+        "kind": kind,
+        "event_id": event_id or f"{kind}:{i}",
+    }
+
+
+@pytest.fixture
+def coalescer(clock):
+    return DigestCoalescer(window=1.0, max_hold=3.0, max_items=10, clock=clock)
+
+
+def test_single_item_is_stored_unchanged():
+    item = cancellation(1)
+    assert digest([item]) is item
+
+
+def test_digest_merges_items_into_newest():
+    merged = digest([cancellation(1), cancellation(2), cancellation(3)])
+    assert merged["title"] == "3 lịch khám đã bị hủy"
+    assert merged["message"] == "- Lịch khám #1 đã bị hủy\n- Lịch khám #2 đã bị hủy\n- Lịch khám #3 đã bị hủy"
+    assert merged["digest_count"] == 3
+    # Tham chiếu và thời điểm theo item mới nhất, khóa chống trùng theo item đầu tiên
+    assert (merged["appointment_id"], merged["created_at"]) == (3, cancellation(3)["created_at"])
+    assert merged["event_id"] == "appointment_cancelled:1"
+    assert merged["digest_event_ids"] == ["appointment_cancelled:2", "appointment_cancelled:3"]
+
+
+def test_digest_of_unknown_kind_uses_default_title():
+    merged = digest([cancellation(1, kind="lab_result"), cancellation(2, kind="lab_result")])
+    assert merged["title"] == DEFAULT_DIGEST_TITLE.format(count=2)
+
+
+def test_each_item_extends_the_window(coalescer, clock):
+    coalescer.add(1, cancellation(1))
+    clock.now = 0.8
+    coalescer.add(2, cancellation(2))
+    assert coalescer.next_deadline() == pytest.approx(1.8)
+
+    clock.now = 1.5
+    assert coalescer.pop_due() == ([], [])
+    clock.now = 1.8
+    [merged], tags = coalescer.pop_due()
+    assert merged["digest_count"] == 2 and tags == [1, 2]
+    assert coalescer.size == 0 and coalescer.next_deadline() is None
+
+
+def test_max_hold_caps_a_steady_stream(coalescer, clock):
+    for i in range(6):
+        clock.now = i * 0.6
+        coalescer.add(i + 1, cancellation(i))
+    # Mỗi item đến trước khi cửa sổ hết hạn nhưng nhóm không được giữ quá max_hold kể từ item đầu
+    assert coalescer.next_deadline() == pytest.approx(3.0)
+    clock.now = 3.0
+    [merged], tags = coalescer.pop_due()
+    assert merged["digest_count"] == 6 and tags == [1, 2, 3, 4, 5, 6]
+
+
+def test_groups_are_kept_per_user_and_kind(coalescer, clock):
+    coalescer.add(1, cancellation(1))
+    coalescer.add(2, cancellation(2, user_id=2))
+    coalescer.add(3, cancellation(3, kind="appointment_confirmed"))
+    coalescer.add(4, cancellation(4))
+    assert coalescer.oldest_tag() == 1
+
+    notifications, tags = coalescer.pop_due(force=True)
+    assert sorted(tags) == [1, 2, 3, 4]
+    assert sorted(doc.get("digest_count", 1) for doc in notifications) == [1, 1, 2]
+
+
+def test_duplicate_event_id_is_acked_without_a_second_line(coalescer, clock):
+    coalescer.add(1, cancellation(1))
+    coalescer.add(2, cancellation(1))
+    coalescer.add(3, cancellation(2))
+    assert coalescer.size == 3
+
+    clock.now = 1.0
+    [merged], tags = coalescer.pop_due()
+    # Tag của bản trùng vẫn được giải phóng để ack, nhưng chỉ có một dòng cho event đó
+    assert tags == [1, 2, 3]
+    assert merged["digest_count"] == 2
+    assert merged["event_id"] == "appointment_cancelled:1"
+    assert merged["digest_event_ids"] == ["appointment_cancelled:2"]
+
+
+def test_max_items_forces_a_flush(mongo, channel, clock):
+    coalescer = DigestCoalescer(window=1.0, max_hold=3.0, max_items=3, clock=clock)
+    batcher = NotificationBatcher(channel, call_later=channel.call_later, remove_timeout=channel.remove_timeout, coalescer=coalescer)
+    batcher.add(1, cancellation(1))
+    batcher.add(2, cancellation(2, user_id=2))
+    assert channel.acked() == set() and mongo.notifications.count_documents({}) == 0
+
+    # Đủ max_items message đang giữ: xả mọi nhóm dù chưa tới hạn để không chiếm hết prefetch
+    batcher.add(3, cancellation(3))
+    assert channel.acked() == {1, 2, 3} and coalescer.size == 0
+    assert mongo.notifications.count_documents({}) == 2
+    assert mongo.notifications.find_one({"user_id": 1})["digest_count"] == 2
@@ -0,0 +1,138 @@
+import socket
+import threading
+import time
+
+import pytest
+from aiosmtpd.controller import Controller
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from config.settings import EmailConfig
+from src.controllers import notification_controller
+from src.services.email_dispatcher import EmailDispatcher
+
+
+class RecordingHandler:
+    """Handler aiosmtpd lưu lại email nhận được; `reject_first` lần DATA đầu tiên trả lỗi tạm thời."""
+
+    def __init__(self, reject_first: int = 0):
+        self.reject_first = reject_first
+        self.messages: list[tuple[list[str], bytes]] = []
+        self.sessions: set[int] = set()
+        self._lock = threading.Lock()
+
+    async def handle_DATA(self, server, session, envelope):
+        with self._lock:
+            self.sessions.add(id(session))
+            if self.reject_first:
+                self.reject_first -= 1
+                return "451 Try again later"
+            self.messages.append((envelope.rcpt_tos, envelope.content))
+        return "250 OK"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server():
+    servers = []
+
+    def start(handler: RecordingHandler) -> Controller:
+        controller = Controller(handler, hostname="127.0.0.1", port=free_port())
+        controller.start()
+        servers.append(controller)
+        return controller
+
+    yield start
+    for controller in servers:
+        controller.stop()
+
+
+def make_dispatcher(port: int, **overrides) -> EmailDispatcher:
+    options = {"timeout": 5, "backoff_base_seconds": 0.05, **overrides}
+    return EmailDispatcher(EmailConfig(smtp_host="127.0.0.1", smtp_port=port, use_ssl=False, sender="noreply@example.com", **options))
+
+
+def wait_for(jobs, statuses=("SENT", "FAILED"), timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if all(job.status in statuses for job in jobs):
+            return
+        time.sleep(0.01)
+    raise AssertionError(f"jobs not finished: {[job.status for job in jobs]}")
+
+
+def test_sends_batch_over_reused_session(smtp_server):
+    handler = RecordingHandler()
+    controller = smtp_server(handler)
+    dispatcher = make_dispatcher(controller.port, pool_size=1)
+    dispatcher.start()
+    try:
+        jobs = [dispatcher.enqueue(f"user{i}@example.com", "Subject", "Body") for i in range(5)]
+        wait_for(jobs)
+    finally:
+        dispatcher.stop()
+    assert [job.status for job in jobs] == ["SENT"] * 5
+    assert sorted(rcpt[0] for rcpt, _ in handler.messages) == sorted(f"user{i}@example.com" for i in range(5))
+    assert len(handler.sessions) == 1
+
+
+def test_transient_error_is_retried_with_backoff(smtp_server):
+    controller = smtp_server(RecordingHandler(reject_first=1))
+    dispatcher = make_dispatcher(controller.port, pool_size=1)
+    dispatcher.start()
+    try:
+        job = dispatcher.enqueue("user@example.com", "Subject", "Body")
+        wait_for([job])
+    finally:
+        dispatcher.stop()
+    assert job.status == "SENT"
+    assert job.attempts == 2
+
+
+def test_bad_message_fails_without_stopping_workers(smtp_server):
+    handler = RecordingHandler()
+    controller = smtp_server(handler)
+    dispatcher = make_dispatcher(controller.port, pool_size=1, batch_size=1)
+    dispatcher.start()
+    try:
+        bad = dispatcher.enqueue("a@b\nBcc: evil@x", "Subject", "Body")
+        good = dispatcher.enqueue("user@example.com", "Subject", "Body")
+        wait_for([bad, good])
+        # Worker và slot duy nhất của pool vẫn còn: job sau đó cũng được gửi
+        later = dispatcher.enqueue("later@example.com", "Subject", "Body")
+        wait_for([later])
+    finally:
+        dispatcher.stop()
+    assert bad.status == "FAILED"
+    assert bad.attempts == 1
+    assert good.status == "SENT"
+    assert later.status == "SENT"
+    assert all("evil@x" not in rcpt for rcpt, _ in handler.messages)
+
+
+def test_unreachable_server_fails_after_retries():
+    dispatcher = make_dispatcher(free_port(), max_retries=1, timeout=0.5)
+    dispatcher.start()
+    try:
+        job = dispatcher.enqueue("user@example.com", "Subject", "Body")
+        wait_for([job])
+    finally:
+        dispatcher.stop()
+    assert job.status == "FAILED"
+    assert job.attempts == 2
+
+
+def test_send_email_endpoint_rejects_invalid_recipient(monkeypatch):
+    enqueued = []
+    monkeypatch.setattr(notification_controller.email_dispatcher, "enqueue", lambda *args: enqueued.append(args))
+    app = FastAPI()
+    app.include_router(notification_controller.router)
+    client = TestClient(app)
+    response = client.post("/notifications/send-email", json={"to": "a@b\nBcc: evil@x", "subject": "s", "text": "t"})
+    assert response.status_code == 422
+    assert enqueued == []
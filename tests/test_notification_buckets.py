@@ -0,0 +1,137 @@
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from config.settings import settings
+from src.repositories import notification_repository
+from src.repositories.notification_buckets import catalog
+from src.repositories.notification_repository import NotificationRepository
+from src.services.bucket_migration import migrate_to_buckets
+from src.services.notification_service import decode_cursor, encode_cursor
+
+JUNE_END = datetime(2025, 6, 30, 23, 59, 59, 900000)
+JULY_START = datetime(2025, 7, 1)
+
+
+@pytest.fixture
+def monthly(mongo, monkeypatch):
+    monkeypatch.setattr(settings.mongo, "layout", "monthly")
+    # Catalog là global của process: mỗi test bắt đầu với danh sách bucket trống
+    monkeypatch.setattr(catalog, "buckets", set())
+    monkeypatch.setattr(catalog, "indexed", set())
+    monkeypatch.setattr(catalog, "legacy", False)
+    catalog.invalidate()
+    return mongo
+
+
+def object_id(at: datetime) -> ObjectId:
+    # Timestamp của `at`, phần còn lại ngẫu nhiên để các id cùng giây không trùng
+    return ObjectId(ObjectId.from_datetime(at).binary[:4] + ObjectId().binary[4:])
+
+
+def notification(created_at: datetime, user_id: int = 1, generated_at: datetime = None, **fields) -> dict:
+    return {
+        "_id": object_id(generated_at or created_at),
+        "user_id": user_id,
+        "title": "Lịch khám đã được xác nhận",
+        "message": f"Lịch khám lúc {created_at:%d/%m %H:%M}",
+        "status": "UNREAD",
+        "created_at": created_at,
+        **fields,
+    }
+
+
+def bucket_counts(db) -> dict[str, int]:
+    return {name: db[name].count_documents({}) for name in sorted(db.list_collection_names()) if db[name].count_documents({})}
+
+
+def test_pages_read_newest_bucket_first_and_legacy_last(monthly):
+    legacy = [notification(datetime(2025, 4, 10)), notification(datetime(2025, 4, 5))]
+    monthly.notifications.insert_many(legacy)
+    NotificationRepository.save_many([
+        notification(datetime(2025, 6, 1)),
+        notification(datetime(2025, 7, 2)),
+        notification(datetime(2025, 6, 10)),
+        notification(datetime(2025, 7, 3), user_id=2),
+    ])
+    assert bucket_counts(monthly) == {"notifications": 2, "notifications_202506": 2, "notifications_202507": 2}
+
+    # Trang 3 dòng đi qua bucket 07 rồi 06, trang sau tiếp tục ở 06 rồi collection cũ
+    first = NotificationRepository.find_by_user(1, limit=3)
+    assert [doc["created_at"].day for doc in first] == [2, 10, 1]
+    before = decode_cursor(encode_cursor(first[-1]))
+    rest = NotificationRepository.find_by_user(1, limit=3, before=before)
+    assert [doc["_id"] for doc in rest] == [doc["_id"] for doc in legacy]
+    assert NotificationRepository.find_by_user(1, limit=3, before=decode_cursor(encode_cursor(rest[-1]))) == []
+
+
+def test_id_lookup_checks_previous_month_bucket(monthly):
+    # created_at trước nửa đêm nhưng _id sinh sau: nằm ở bucket 06 dù timestamp của id thuộc tháng 07
+    straddling = notification(JUNE_END, generated_at=JULY_START)
+    NotificationRepository.save_many([straddling])
+    assert monthly.notifications_202506.count_documents({}) == 1
+
+    assert NotificationRepository.mark_as_read(str(straddling["_id"]))["user_id"] == 1
+    assert NotificationRepository.find_statuses([straddling["_id"]]) == [
+        {"_id": straddling["_id"], "user_id": 1, "status": "READ"}
+    ]
+    assert NotificationRepository.mark_as_read(str(straddling["_id"])) is None
+
+
+def test_update_results_are_merged_across_buckets(monthly):
+    legacy = notification(datetime(2025, 5, 20))
+    monthly.notifications.insert_one(legacy)
+    june, july = notification(datetime(2025, 6, 15)), notification(datetime(2025, 7, 15))
+    other_user = notification(datetime(2025, 7, 16), user_id=2)
+    NotificationRepository.save_many([june, july, other_user])
+
+    result = NotificationRepository.mark_many_as_read(1, [june["_id"], july["_id"], other_user["_id"]])
+    assert (result.matched_count, result.modified_count) == (2, 2)
+    result = NotificationRepository.mark_all_as_read(1, datetime(2025, 8, 1))
+    assert (result.matched_count, result.modified_count) == (1, 1)
+    assert monthly.notifications.find_one()["status"] == "READ"
+    assert monthly.notifications_202507.find_one({"user_id": 2})["status"] == "UNREAD"
+
+
+def test_migration_resumes_after_interruption(monthly):
+    docs = [notification(datetime(2025, 5, 1) + timedelta(days=9 * i)) for i in range(6)]
+    monthly.notifications.insert_many(docs)
+    # Lần chạy trước bị ngắt sau khi ghi batch đầu (mới nhất) vào bucket nhưng trước khi xóa bản cũ
+    newest = sorted(docs, key=lambda doc: doc["_id"], reverse=True)[:2]
+    for doc in newest:
+        notification_repository._write_bucket(f"notifications_{doc['created_at']:%Y%m}").insert_one(dict(doc))
+
+    stats = migrate_to_buckets(batch_size=2)
+    assert stats["moved"] == 6 and stats["unreachable_by_id"] == 0
+    assert bucket_counts(monthly) == {"notifications_202505": 4, "notifications_202506": 2}
+    assert sorted(doc["_id"] for doc in NotificationRepository.find_by_user(1)) == sorted(doc["_id"] for doc in docs)
+    assert migrate_to_buckets(batch_size=2)["moved"] == 0
+
+
+def test_event_stored_last_month_is_not_written_again(monthly):
+    first = NotificationRepository.save_many([notification(JUNE_END, event_id="appointment_confirmed:3")])
+    assert len(first) == 1
+
+    # Giao lại sau nửa đêm: created_at mới thuộc bucket 07, unique index của bucket 07 không thấy bản ở 06
+    redelivered = notification(JULY_START, event_id="appointment_confirmed:3")
+    created = NotificationRepository.save_many([redelivered, notification(JULY_START, event_id="appointment_confirmed:4")])
+    assert [doc["event_id"] for doc in created] == ["appointment_confirmed:4"]
+    assert monthly.notifications_202507.count_documents({"event_id": "appointment_confirmed:3"}) == 0
+
+
+def test_broadcast_rerun_after_rollover_skips_written_recipients(monthly):
+    chunk = [notification(JUNE_END, user_id=user_id, event_id=f"broadcast:job:{user_id}") for user_id in (1, 2)]
+    assert len(NotificationRepository.insert_many(chunk)) == 2
+
+    rerun = [notification(JULY_START, user_id=user_id, event_id=f"broadcast:job:{user_id}") for user_id in (1, 2, 3)]
+    created = NotificationRepository.insert_many(rerun)
+    assert [doc["user_id"] for doc in created] == [3]
+    assert bucket_counts(monthly) == {"notifications_202506": 2, "notifications_202507": 1}
+
+
+def test_event_still_in_legacy_collection_is_not_written_again(monthly):
+    monthly.notifications.insert_one(notification(datetime(2025, 3, 1), event_id="prescription_ready:9"))
+    assert NotificationRepository.save_many([notification(JULY_START, event_id="prescription_ready:9")]) == []
+    assert monthly.notifications.count_documents({}) == 1
+    assert bucket_counts(monthly) == {"notifications": 1}
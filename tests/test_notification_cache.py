@@ -0,0 +1,166 @@
+import asyncio
+import socket
+import threading
+import time
+from datetime import datetime
+
+import fakeredis
+import pytest
+import redis
+from bson import ObjectId
+from redis.backoff import NoBackoff
+from redis.retry import Retry
+
+from config.settings import RedisConfig
+from src.services.notification_cache import FILL_SCRIPT, KEY_PREFIX, NotificationCache
+
+
+@pytest.fixture
+def client():
+    # fakeredis chạy FILL_SCRIPT bằng Lua thật (lupa)
+    client = fakeredis.FakeRedis()
+    assert client.eval("return 1", 0) == 1
+    return client
+
+
+def make_cache(client, **overrides) -> NotificationCache:
+    options = {"cache_enabled": True, "cache_wait_ms": 1000, "cache_lock_ms": 2000, **overrides}
+    return NotificationCache(RedisConfig(**options), client=client)
+
+
+class Loader:
+    def __init__(self, value, delay: float = 0.0):
+        self.value = value
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        return self.value
+
+
+def test_miss_then_hit_keeps_bson_types(client):
+    cache = make_cache(client)
+    page = [{"_id": ObjectId(), "created_at": datetime(2025, 6, 1, 8, 30, 15, 123000), "title": "Lịch khám"}]
+    load = Loader(page)
+    assert cache.get_or_load(7, "page", load) == page
+    assert cache.get_or_load(7, "page", load) == page
+    assert load.calls == 1
+    assert client.pttl(f"{KEY_PREFIX}7") > 0
+    # Lock rebuild được FILL_SCRIPT nhả sau khi ghi
+    assert client.get(f"{KEY_PREFIX}7:lock:page") is None
+
+
+def test_invalidate_forces_reload(client):
+    cache = make_cache(client)
+    load = Loader({"unread_count": 1})
+    cache.get_or_load(7, "summary", load)
+    cache.invalidate([7])
+    cache.get_or_load(7, "summary", load)
+    assert load.calls == 2
+    assert client.get(f"{KEY_PREFIX}7:gen") == b"1"
+
+
+def test_fill_is_dropped_when_a_write_happens_during_rebuild(client):
+    cache = make_cache(client)
+
+    def load_then_write():
+        # Notification mới được lưu trong lúc đang đọc Mongo: kết quả vừa đọc đã cũ
+        cache.invalidate([7])
+        return {"unread_count": 1}
+
+    assert cache.get_or_load(7, "summary", load_then_write) == {"unread_count": 1}
+    assert client.hget(f"{KEY_PREFIX}7", "summary") is None
+    assert client.get(f"{KEY_PREFIX}7:lock:summary") is None
+
+
+def test_concurrent_misses_rebuild_once(client):
+    cache = make_cache(client)
+    load = Loader({"unread_count": 3}, delay=0.1)
+    start = threading.Barrier(8)
+    results = []
+
+    def read():
+        start.wait()
+        results.append(cache.get_or_load(7, "summary", load))
+
+    threads = [threading.Thread(target=read) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [{"unread_count": 3}] * 8
+    assert load.calls == 1
+
+
+def test_waiters_fall_back_to_mongo_after_wait_timeout(client):
+    cache = make_cache(client, cache_wait_ms=20)
+    client.set(f"{KEY_PREFIX}7:lock:summary", "other-caller")
+    load = Loader({"unread_count": 0})
+    assert cache.get_or_load(7, "summary", load) == {"unread_count": 0}
+    # Không giữ lock nên không ghi đè lên lượt rebuild của caller khác
+    assert client.hget(f"{KEY_PREFIX}7", "summary") is None
+
+
+def test_failed_load_releases_lock(client):
+    cache = make_cache(client)
+
+    def broken():
+        raise RuntimeError("mongo down")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_load(7, "summary", broken)
+    assert client.get(f"{KEY_PREFIX}7:lock:summary") is None
+
+
+def test_redis_unavailable_reads_through():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    cache = make_cache(redis.Redis(port=port, socket_connect_timeout=0.2, retry=Retry(NoBackoff(), 0)))
+    load = Loader({"unread_count": 5})
+    assert cache.get_or_load(7, "summary", load) == {"unread_count": 5}
+    cache.invalidate([7])
+    assert load.calls == 1
+
+
+def test_clear_removes_every_user(client):
+    cache = make_cache(client)
+    for user_id in range(3):
+        cache.get_or_load(user_id, "summary", Loader({"unread_count": user_id}))
+    client.set("unrelated", 1)
+    cache.clear()
+    assert client.keys(f"{KEY_PREFIX}*") == []
+    assert client.get("unrelated") == b"1"
+
+
+def test_async_miss_then_hit(client):
+    cache = make_cache(client)
+    calls = []
+
+    async def load():
+        calls.append(1)
+        return {"unread_count": 2}
+
+    async def run():
+        return [await cache.get_or_load_async(7, "summary", load) for _ in range(2)]
+
+    assert asyncio.run(run()) == [{"unread_count": 2}] * 2
+    assert len(calls) == 1
+
+
+def test_fill_script_checks_generation_and_lock_owner(client):
+    fill = client.register_script(FILL_SCRIPT)
+    keys = [f"{KEY_PREFIX}7", f"{KEY_PREFIX}7:gen", f"{KEY_PREFIX}7:lock:page"]
+    client.set(keys[1], 2)
+    client.set(keys[2], "owner")
+    fill(keys=keys, args=["page", b"stale", b"1", 1000, "someone-else"])
+    assert client.hget(keys[0], "page") is None
+    assert client.get(keys[2]) == b"owner"
+    fill(keys=keys, args=["page", b"fresh", b"2", 1000, "owner"])
+    assert client.hget(keys[0], "page") == b"fresh"
+    assert client.get(keys[2]) is None
@@ -0,0 +1,139 @@
+import base64
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pydantic import TypeAdapter
+
+from src.controllers import notification_controller
+from src.controllers.notification_controller import _etag_matches
+from src.dto import notification_dto
+from src.dto.notification_dto import NotificationResponseDTO, dump_notifications, notification_row
+from src.repositories.notification_repository import NotificationRepository
+from src.services.notification_service import encode_cursor
+
+ETAG = '"1-3-0123456789abcdef"'
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(notification_controller.router)
+    return TestClient(app)
+
+
+def create(user_id: int = 1, **fields) -> str:
+    return notification_controller.service.create_notification(
+        user_id=user_id, title="Đơn thuốc đã sẵn sàng", message="Đơn thuốc RX-1 đã sẵn sàng để nhận", **fields
+    )
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, False),
+    ("", False),
+    ("*", True),
+    (" * ", True),
+    (ETAG, True),
+    (f"W/{ETAG}", True),
+    (f'"1-2-0123456789abcdef", W/{ETAG}', True),
+    (f'"1-2-0123456789abcdef",{ETAG}', True),
+    ('"1-2-0123456789abcdef", W/"1-4-0123456789abcdef"', False),
+    (ETAG.strip('"'), False),
+])
+def test_etag_matches(header, expected):
+    assert _etag_matches(header, ETAG) is expected
+
+
+def test_unchanged_list_returns_304(mongo, client):
+    create()
+    response = client.get("/notifications/1")
+    assert response.status_code == 200 and len(response.json()) == 1
+    etag = response.headers["ETag"]
+
+    cached = client.get("/notifications/1", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b"" and cached.headers["ETag"] == etag
+    assert client.get("/notifications/1", headers={"If-None-Match": f"W/{etag}"}).status_code == 304
+    # Query khác (limit, status, cursor...) có ETag khác dù version không đổi
+    assert client.get("/notifications/1?limit=10", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_new_notification_changes_etag(mongo, client):
+    create()
+    etag = client.get("/notifications/1").headers["ETag"]
+    create(user_id=2)
+    assert client.get("/notifications/1", headers={"If-None-Match": etag}).status_code == 304
+
+    create()
+    response = client.get("/notifications/1", headers={"If-None-Match": etag})
+    assert response.status_code == 200 and len(response.json()) == 2
+    assert response.headers["ETag"] != etag
+
+
+def test_mark_read_changes_etag(mongo_server, client):
+    notification_id = create()
+    etag = client.get("/notifications/1").headers["ETag"]
+    assert client.post("/notifications/read", json={"notification_id": notification_id}).status_code == 200
+
+    response = client.get("/notifications/1", headers={"If-None-Match": etag})
+    assert response.status_code == 200 and response.headers["ETag"] != etag
+    assert response.json()[0]["status"] == "READ"
+    # Đã READ: mark-read lần nữa không đổi gì nên ETag giữ nguyên
+    client.post("/notifications/read", json={"notification_id": notification_id})
+    assert client.get("/notifications/1", headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
+
+
+@pytest.mark.parametrize("use_orjson", [True, False], ids=["orjson", "stdlib"])
+def test_dump_notifications_matches_pydantic(mongo, monkeypatch, use_orjson):
+    if not use_orjson:
+        monkeypatch.setattr(notification_dto, "orjson", None)
+    created_at = datetime(2025, 6, 1, 8, 30)
+    mongo.notifications.insert_many([
+        {"user_id": 1, "title": "Lịch khám", "message": "Bác sĩ Trần Thị B", "status": "UNREAD",
+         "appointment_id": 7, "created_at": created_at, "event_id": "e-1", "kind": "event"},
+        {"user_id": 1, "title": "Đơn thuốc \"RX-1\"", "message": "Sẵn sàng\nnhận", "status": "READ",
+         "prescription_id": 3, "dispense_id": 4, "created_at": created_at - timedelta(microseconds=123000)},
+    ])
+    docs = NotificationRepository.find_by_user(1)
+
+    expected = TypeAdapter(list[NotificationResponseDTO]).dump_json(
+        [NotificationResponseDTO(**notification_row(doc)) for doc in docs]
+    )
+    assert json.loads(dump_notifications(docs)) == json.loads(expected)
+    assert "event_id" not in json.loads(dump_notifications(docs))[0]
+
+
+@pytest.mark.parametrize("cursor", [
+    "not-a-cursor",
+    base64.urlsafe_b64encode(b"2025-06-01T08:30:00|not-an-object-id").decode(),
+    base64.urlsafe_b64encode(b"yesterday|6650a1f2c3d4e5f607182930").decode(),
+    # Cursor hợp lệ bị sửa mất phần id
+    encode_cursor({"created_at": datetime(2025, 6, 1), "_id": ObjectId()})[:-8],
+])
+def test_invalid_cursor_returns_400(mongo, client, cursor):
+    response = client.get("/notifications/1", params={"before": cursor})
+    assert response.status_code == 400
+    assert "Invalid cursor" in response.json()["detail"]
+
+
+def test_mark_read_rejects_malformed_id_and_reports_missing(mongo, client):
+    response = client.post("/notifications/read", json={"notification_id": "not-an-id"})
+    assert response.status_code == 400 and "Invalid notification id" in response.json()["detail"]
+    assert client.post("/notifications/read", json={"notification_id": str(ObjectId())}).status_code == 404
+
+    # Đã READ từ trước: vẫn thành công (idempotent)
+    read = mongo.notifications.insert_one({"user_id": 1, "title": "t", "message": "m", "status": "READ", "created_at": datetime(2025, 6, 1)})
+    assert client.post("/notifications/read", json={"notification_id": str(read.inserted_id)}).json() == {"status": "ok"}
+
+
+def test_bulk_mark_read_returns_per_item_errors(mongo, client):
+    missing = str(ObjectId())
+    response = client.post("/notifications/read/bulk", json={"notification_ids": ["bad", missing]})
+    assert response.status_code == 200
+    assert response.json() == {"matched": 0, "modified": 0, "errors": [
+        {"notification_id": "bad", "error": "invalid id"},
+        {"notification_id": missing, "error": "not found"},
+    ]}
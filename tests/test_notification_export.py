@@ -0,0 +1,100 @@
+import gzip
+import json
+import tracemalloc
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+from bson import ObjectId
+
+from benchmarks.export_memory import START, expected_documents, use_synthetic
+from src.repositories import archive_repository, notification_repository
+from src.repositories.archive_repository import encode_block
+from src.services.notification_export import CHUNK_BYTES, NdjsonWriter, export_notifications
+
+
+@pytest.fixture
+def restore_collections(monkeypatch):
+    # use_synthetic gán thẳng vào module repository; monkeypatch trả lại sau test
+    monkeypatch.setattr(notification_repository, "collection", notification_repository.collection)
+    monkeypatch.setattr(archive_repository, "archive", archive_repository.archive)
+
+
+def notification(i: int) -> dict:
+    return {
+        "_id": ObjectId(),
+        "user_id": 1,
+        "title": "Lịch khám đã được xác nhận",
+        "message": f"Lịch khám số {i} với bác sĩ Trần Thị B đã được xác nhận.",
+        "status": "UNREAD",
+        "created_at": START + timedelta(seconds=i),
+    }
+
+
+def write_all(writer: NdjsonWriter, docs: list[dict]) -> list[bytes]:
+    chunks = [chunk for chunk in map(writer.write, docs) if chunk]
+    return chunks + [writer.close()]
+
+
+def test_writer_sends_chunks_of_chunk_bytes():
+    docs = [notification(i) for i in range(3000)]
+    writer = NdjsonWriter()
+    chunks = write_all(writer, docs)
+    assert len(chunks) > 2
+    assert all(len(chunk) >= CHUNK_BYTES for chunk in chunks[:-1])
+    lines = b"".join(chunks).splitlines()
+    assert writer.count == len(lines) == 3000
+    assert json.loads(lines[7])["message"] == docs[7]["message"]
+    assert json.loads(lines[7])["id"] == str(docs[7]["_id"])
+
+
+def test_writer_gzip_round_trips():
+    docs = [notification(i) for i in range(3000)]
+    plain = b"".join(write_all(NdjsonWriter(), docs))
+    compressed = write_all(NdjsonWriter(compress=True), docs)
+    assert gzip.decompress(b"".join(compressed)) == plain
+    # Không có dòng nào: vẫn là file gzip hợp lệ
+    assert gzip.decompress(NdjsonWriter(compress=True).close()) == b""
+
+
+def test_archive_copy_still_live_is_exported_once(monkeypatch):
+    db = mongomock.MongoClient().db
+    monkeypatch.setattr(notification_repository, "collection", db.notifications)
+    monkeypatch.setattr(archive_repository, "archive", db.notification_archive)
+    live = [notification(i) for i in range(3)]
+    db.notifications.insert_many(live)
+    # Retention bị ngắt: live[0] đã được ghi vào archive nhưng bản live chưa bị xóa
+    archived = [dict(live[0]), {**notification(-40 * 86400), "status": "READ"}]
+    db.notification_archive.insert_one({
+        "_id": "1:2024-11", "user_id": 1, "month": datetime(2024, 11, 1),
+        "blocks": [{"count": 2, "data": encode_block(archived, 1)}],
+    })
+    lines = b"".join(export_notifications(1, include_archive=True)).splitlines()
+    ids = [json.loads(line)["id"] for line in lines]
+    assert sorted(ids) == sorted(str(doc["_id"]) for doc in live + archived[1:])
+
+
+def peak_allocated(**kwargs) -> tuple[int, int]:
+    tracemalloc.start()
+    try:
+        lines = sum(chunk.count(b"\n") for chunk in export_notifications(**kwargs))
+        return lines, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.parametrize("archive", [False, True], ids=["live", "with_archive"])
+def test_export_memory_does_not_grow_with_result_size(restore_collections, archive):
+    # Bản thu nhỏ của benchmarks.export_memory: 4 lần số document, bộ nhớ đỉnh gần như không đổi
+    peaks = []
+    for documents in (10_000, 40_000):
+        if archive:
+            use_synthetic(documents // 2, documents // 2)
+            lines, peak = peak_allocated(user_id=1, include_archive=True)
+            assert lines == expected_documents(documents // 2, documents // 2)
+        else:
+            use_synthetic(documents)
+            lines, peak = peak_allocated(user_id=None, created_from=START)
+            assert lines == documents
+        peaks.append(peak)
+    assert peaks[1] - peaks[0] < 256 * 1024, peaks
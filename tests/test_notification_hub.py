@@ -0,0 +1,69 @@
+import asyncio
+import json
+from datetime import datetime
+from types import SimpleNamespace
+
+from bson import ObjectId
+
+from src.dto.notification_dto import dump_notification, dump_notifications
+from src.messaging import push_relay
+from src.services.notification_hub import NotificationHub
+
+
+def make_notification(**overrides) -> dict:
+    return {
+        "_id": ObjectId(),
+        "user_id": 7,
+        "title": "Lịch khám đã được xác nhận",
+        "message": "...",
+        "appointment_id": 3,
+        "status": "UNREAD",
+        "created_at": datetime(2025, 6, 1, 8, 30, 15, 123000),
+        "event_id": "appointment_confirmed:3",
+        "kind": "appointment_confirmed",
+        "digest_event_ids": ["a", "b"],
+        **overrides,
+    }
+
+
+def test_push_payload_matches_list_rows():
+    notification = make_notification()
+
+    async def run():
+        hub = NotificationHub()
+        hub.bind(asyncio.get_running_loop())
+        subscription = hub.subscribe(7)
+        hub.publish(notification)
+        return await asyncio.wait_for(subscription.queue.get(), timeout=1)
+
+    payload = json.loads(asyncio.run(run()))
+    assert payload == json.loads(dump_notifications([notification]))[0]
+    assert payload["created_at"] == "2025-06-01T08:30:15.123000"
+    assert "event_id" not in payload and "kind" not in payload and "digest_event_ids" not in payload
+
+
+def test_consumer_process_relays_instead_of_pushing():
+    relayed = []
+    hub = NotificationHub()
+    hub.relay_to(lambda user_id, payload: relayed.append((user_id, payload)))
+    notification = make_notification()
+    hub.publish(notification)
+    assert relayed == [(7, dump_notification(notification))]
+
+
+def test_relayed_notification_reaches_api_subscribers(monkeypatch):
+    notification = make_notification()
+
+    async def run():
+        hub = NotificationHub()
+        hub.bind(asyncio.get_running_loop())
+        monkeypatch.setattr(push_relay, "notification_hub", hub)
+        subscription = hub.subscribe(7)
+        other = hub.subscribe(8)
+        properties = SimpleNamespace(headers={"user_id": 7})
+        push_relay.PushRelayConsumer().on_message(None, None, properties, dump_notification(notification).encode())
+        return await asyncio.wait_for(subscription.queue.get(), timeout=1), other.queue.qsize()
+
+    payload, other_queued = asyncio.run(run())
+    assert json.loads(payload) == json.loads(dump_notifications([notification]))[0]
+    assert other_queued == 0
@@ -0,0 +1,30 @@
+from datetime import datetime, timedelta
+
+from src.repositories.notification_repository import NotificationRepository
+
+
+def notification(i: int, event_id: str = None) -> dict:
+    doc = {"user_id": 1, "title": f"Thông báo {i}", "message": "Đơn thuốc đã sẵn sàng", "status": "UNREAD",
+           "created_at": datetime(2025, 6, 1, 8) + timedelta(seconds=i)}
+    if event_id is not None:
+        doc["event_id"] = event_id
+    return doc
+
+
+def test_repeated_event_id_in_a_batch_is_inserted_once(mongo):
+    batch = [notification(1, "prescription_ready:9"), notification(2, "prescription_ready:9"), notification(3, "prescription_ready:10")]
+    created = NotificationRepository.save_many(batch)
+    assert created == [batch[0], batch[2]]
+    assert mongo.notifications.count_documents({"event_id": "prescription_ready:9"}) == 1
+    # $setOnInsert: bản đầu tiên được giữ, bản sau không ghi đè
+    assert mongo.notifications.find_one({"event_id": "prescription_ready:9"})["title"] == "Thông báo 1"
+
+
+def test_redelivered_event_is_not_written_again(mongo):
+    NotificationRepository.save_many([notification(1, "prescription_ready:9")])
+    redelivered = [notification(5, "prescription_ready:9"), notification(6), notification(7, "prescription_ready:11")]
+    created = NotificationRepository.save_many(redelivered)
+    # Notification không có event_id luôn được insert
+    assert created == redelivered[1:]
+    assert mongo.notifications.count_documents({}) == 3
+    assert mongo.notifications.find_one({"event_id": "prescription_ready:9"})["title"] == "Thông báo 1"
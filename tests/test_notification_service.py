@@ -0,0 +1,115 @@
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from src.repositories.summary_repository import SummaryRepository
+from src.services.notification_service import NotificationService, decode_cursor, encode_cursor
+
+service = NotificationService()
+CREATED_AT = datetime(2025, 6, 1, 8, 30, 15, 123000)
+
+
+def notification(created_at: datetime, user_id: int = 1, **fields) -> dict:
+    return {
+        "_id": ObjectId(),
+        "user_id": user_id,
+        "title": "Đơn thuốc đã sẵn sàng",
+        "message": "Đơn thuốc RX-1 đã sẵn sàng để nhận",
+        "status": "UNREAD",
+        "created_at": created_at,
+        **fields,
+    }
+
+
+def all_pages(user_id: int, limit: int, **kwargs) -> list[list[dict]]:
+    pages, before = [], None
+    while True:
+        docs, before = service.get_notifications_for_user(user_id, limit=limit, before=before, **kwargs)
+        pages.append(docs)
+        if before is None:
+            return pages
+
+
+def test_cursor_round_trips():
+    doc = notification(CREATED_AT)
+    cursor = encode_cursor(doc)
+    assert decode_cursor(cursor) == (CREATED_AT, doc["_id"])
+    # Dùng được trong query string không cần escape
+    assert set(cursor) <= set("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_=")
+
+
+@pytest.mark.parametrize("cursor", ["", "%%%", "MjAyNS0wNi0wMQ==", encode_cursor(notification(CREATED_AT)) + "x"])
+def test_malformed_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(cursor)
+
+
+def test_pages_through_ties_on_created_at_without_gaps_or_repeats(mongo):
+    # 7 notification cùng created_at (một batch) kẹp giữa các notification khác
+    docs = [notification(CREATED_AT) for _ in range(7)]
+    docs += [notification(CREATED_AT + timedelta(seconds=1)), notification(CREATED_AT - timedelta(seconds=1))]
+    docs += [notification(CREATED_AT, user_id=2)]
+    mongo.notifications.insert_many(docs)
+
+    pages = all_pages(1, limit=3)
+    assert [len(page) for page in pages] == [3, 3, 3]
+    ids = [doc["_id"] for page in pages for doc in page]
+    expected = sorted((doc for doc in docs if doc["user_id"] == 1), key=lambda doc: (doc["created_at"], doc["_id"]), reverse=True)
+    assert ids == [doc["_id"] for doc in expected]
+
+
+def test_last_full_page_has_no_next_cursor(mongo):
+    mongo.notifications.insert_many([notification(CREATED_AT) for _ in range(4)])
+    assert [len(page) for page in all_pages(1, limit=2)] == [2, 2]
+    assert [len(page) for page in all_pages(1, limit=4)] == [4]
+
+
+@pytest.fixture
+def summary_calls(monkeypatch):
+    # array_filters của summary chưa có trong mongomock: chỉ kiểm tra số modified truyền cho summary
+    calls = []
+    monkeypatch.setattr(SummaryRepository, "mark_many_as_read", lambda user_id, ids, modified: calls.append((user_id, set(ids), modified)))
+    return calls
+
+
+def test_mark_many_reports_invalid_and_missing_ids_per_item(mongo, summary_calls):
+    first, second = notification(CREATED_AT), notification(CREATED_AT)
+    already_read = notification(CREATED_AT, status="READ")
+    other_user = notification(CREATED_AT, user_id=2)
+    mongo.notifications.insert_many([first, second, already_read, other_user])
+    missing = str(ObjectId())
+
+    ids = [str(first["_id"]), "not-an-id", missing, str(second["_id"]), str(already_read["_id"]), str(other_user["_id"]), "", str(first["_id"])]
+    result = service.mark_many_as_read(ids)
+
+    assert (result["matched"], result["modified"]) == (4, 3)
+    assert result["errors"] == [
+        {"notification_id": "not-an-id", "error": "invalid id"},
+        {"notification_id": "", "error": "invalid id"},
+        {"notification_id": missing, "error": "not found"},
+    ]
+    assert sorted(summary_calls) == [(1, {first["_id"], second["_id"]}, 2), (2, {other_user["_id"]}, 1)]
+    assert mongo.notifications.count_documents({"status": "READ"}) == 4
+
+    # Gọi lại: không còn gì để đổi, summary không bị trừ lần hai
+    summary_calls.clear()
+    assert service.mark_many_as_read(ids)["modified"] == 0
+    assert summary_calls == []
+
+
+def test_mark_many_with_only_invalid_ids_does_not_query(mongo, summary_calls):
+    result = service.mark_many_as_read(["x", "y"])
+    assert result == {"matched": 0, "modified": 0, "errors": [
+        {"notification_id": "x", "error": "invalid id"},
+        {"notification_id": "y", "error": "invalid id"},
+    ]}
+
+
+def test_mark_as_read_distinguishes_invalid_missing_and_already_read(mongo):
+    already_read = notification(CREATED_AT, status="READ")
+    mongo.notifications.insert_one(already_read)
+    with pytest.raises(ValueError, match="Invalid notification id"):
+        service.mark_as_read("not-an-id")
+    assert service.mark_as_read(str(ObjectId())) is False
+    assert service.mark_as_read(str(already_read["_id"])) is True
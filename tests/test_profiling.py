@@ -0,0 +1,50 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from config.settings import ProfilingConfig
+from src.monitoring.profiling import Profiler
+
+
+@pytest.fixture
+def profiler():
+    return Profiler(ProfilingConfig(enabled=True, sample_rate=1.0, interval_ms=1.0, slow_threshold_ms=10000))
+
+
+def busy(seconds: float):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def test_sync_operation_samples_its_own_thread(profiler):
+    with profiler.operation("event", "prescription_ready") as operation:
+        assert operation.threads == {threading.get_ident()}
+        busy(0.05)
+    [profile] = profiler.profiles
+    assert profile["samples"] > 0 and "busy (tests/test_profiling.py" in profile["collapsed"]
+
+
+def test_async_route_never_samples_the_event_loop(profiler):
+    def sync_route():
+        # Route sync trên threadpool: thread được thêm từ lời gọi Mongo đầu tiên
+        profiler.record("mongo", "find", 0.001)
+        busy(0.05)
+        return threading.get_ident()
+
+    async def handle():
+        with profiler.operation("route", "GET /notifications/{user_id}") as operation:
+            assert operation.threads == set()
+            # Request async khác chạy xen kẽ trên cùng event loop không được tính vào profile này
+            profiler.record("mongo", "find", 0.001)
+            busy(0.02)
+            worker = await asyncio.to_thread(sync_route)
+            return operation.threads, worker
+    threads, worker = asyncio.run(handle())
+
+    assert threads == {worker}
+    [profile] = profiler.profiles
+    assert "handle (tests/test_profiling.py" not in profile["collapsed"]
+    assert "sync_route (tests/test_profiling.py" in profile["collapsed"]
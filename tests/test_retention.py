@@ -0,0 +1,75 @@
+import time
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+from bson import ObjectId
+
+from config.settings import RetentionConfig
+from src.repositories import lease_repository
+from src.repositories.lease_repository import LeaseRepository
+from src.repositories.notification_repository import NotificationRepository
+from src.services.notification_service import _merge
+from src.services.retention_service import LEASE_NAME, RetentionService
+
+
+@pytest.fixture(autouse=True)
+def leases(monkeypatch):
+    collection = mongomock.MongoClient().db.leases
+    monkeypatch.setattr(lease_repository, "leases", collection)
+    return collection
+
+
+def notification(created_at: datetime, _id: ObjectId = None) -> dict:
+    return {"_id": _id or ObjectId(), "user_id": 7, "created_at": created_at}
+
+
+def test_merge_drops_archived_copy_of_live_notification():
+    now = datetime(2025, 6, 1)
+    moving = notification(now - timedelta(days=100))
+    live = [notification(now), moving]
+    archived = [dict(moving), notification(now - timedelta(days=200))]
+    merged = _merge(live, archived)
+    assert [doc["_id"] for doc in merged] == [live[0]["_id"], moving["_id"], archived[1]["_id"]]
+
+
+def test_lease_has_a_single_holder_until_it_expires():
+    assert LeaseRepository.acquire("job", "a", ttl=0.2)
+    assert not LeaseRepository.acquire("job", "b", ttl=0.2)
+    # Người giữ gia hạn được
+    assert LeaseRepository.acquire("job", "a", ttl=0.2)
+    time.sleep(0.25)
+    assert LeaseRepository.acquire("job", "b", ttl=10)
+    assert not LeaseRepository.acquire("job", "a", ttl=10)
+
+
+def test_release_only_drops_own_lease():
+    LeaseRepository.acquire("job", "a", ttl=10)
+    LeaseRepository.release("job", "b")
+    assert not LeaseRepository.acquire("job", "b", ttl=10)
+    LeaseRepository.release("job", "a")
+    assert LeaseRepository.acquire("job", "b", ttl=10)
+
+
+def test_retention_is_opt_in():
+    service = RetentionService(RetentionConfig())
+    service.start()
+    assert service._thread is None
+
+
+def test_compact_skips_while_another_process_holds_lease(monkeypatch, leases):
+    LeaseRepository.acquire(LEASE_NAME, "other-replica", ttl=60)
+
+    def unexpected(*args):
+        raise AssertionError("compaction ran without the lease")
+
+    monkeypatch.setattr(NotificationRepository, "find_archivable", unexpected)
+    result = RetentionService(RetentionConfig(enabled=True)).compact()
+    assert result == {"archived": 0, "summaries_rebuilt": 0, "skipped": True}
+
+
+def test_compact_releases_lease_when_done(monkeypatch, leases):
+    monkeypatch.setattr(NotificationRepository, "find_archivable", lambda cutoff, limit: [])
+    service = RetentionService(RetentionConfig(enabled=True))
+    assert service.compact() == {"archived": 0, "summaries_rebuilt": 0, "skipped": False}
+    assert leases.count_documents({}) == 0
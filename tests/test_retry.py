@@ -0,0 +1,136 @@
+import json
+from types import SimpleNamespace
+
+import pika
+import pytest
+
+from config.settings import settings
+from src.messaging import consumer
+from src.messaging.batcher import NotificationBatcher
+from src.messaging.retry import (
+    ATTEMPT_HEADER, ERROR_HEADER, ORIGIN_HEADER, REQUEUE_EXCHANGE, RetryLater, replay_dead_letters, retry_delays,
+    retry_queue, schedule_retry, topology,
+)
+from src.services.event_dedup import recent_events
+
+QUEUE = "prescription_notifications"
+DEAD_LETTER = "notifications.dead_letter"
+BODY = json.dumps({"event_type": "prescription_ready", "data": {"prescription_id": 1, "appointment_id": 3, "dispense_id": 9}}).encode()
+
+
+@pytest.fixture
+def backoff(monkeypatch):
+    monkeypatch.setattr(settings.rabbitmq, "retry_base_delay_ms", 1000)
+    monkeypatch.setattr(settings.rabbitmq, "retry_max_delay_ms", 5000)
+    monkeypatch.setattr(settings.rabbitmq, "max_retries", 4)
+    monkeypatch.setattr(settings.rabbitmq, "dead_letter_queue", DEAD_LETTER)
+
+
+class FakeRabbit:
+    """BlockingConnection + channel tối thiểu cho replay_dead_letters: message unacked giữ theo delivery tag."""
+
+    def __init__(self, queues: dict[str, list[tuple[dict, bytes]]]):
+        self.queues = {name: [(pika.BasicProperties(headers=headers), body) for headers, body in messages] for name, messages in queues.items()}
+        self.unacked: dict[int, tuple[str, tuple]] = {}
+        self.published: list[tuple[str, bytes, pika.BasicProperties]] = []
+        self._next_tag = 0
+
+    def channel(self):
+        return self
+
+    def confirm_delivery(self):
+        pass
+
+    def queue_declare(self, queue, durable=False):
+        self.queues.setdefault(queue, [])
+        return SimpleNamespace(method=SimpleNamespace(message_count=len(self.queues[queue])))
+
+    def basic_get(self, queue, auto_ack=False):
+        if not self.queues[queue]:
+            return None, None, None
+        self._next_tag += 1
+        message = self.queues[queue].pop(0)
+        self.unacked[self._next_tag] = (queue, message)
+        return SimpleNamespace(delivery_tag=self._next_tag), *message
+
+    def basic_publish(self, exchange, routing_key, body, properties=None):
+        self.published.append((routing_key, body, properties))
+
+    def basic_ack(self, delivery_tag, multiple=False):
+        del self.unacked[delivery_tag]
+
+    def basic_nack(self, delivery_tag, multiple=False, requeue=True):
+        queue, message = self.unacked.pop(delivery_tag)
+        self.queues[queue].insert(0, message)
+
+
+def test_delays_double_up_to_the_cap(backoff):
+    assert retry_delays() == [1000, 2000, 4000, 5000]
+
+
+def test_topology_declares_ttl_queues_dead_lettering_back_to_the_source(backoff, monkeypatch):
+    monkeypatch.setattr(settings.rabbitmq, "max_retries", 6)
+    ops = topology([QUEUE, "appointment_notifications"])
+    declared = {kwargs["queue"]: kwargs for method, kwargs in ops if method == "queue_declare"}
+    # Các mức bị chặn bởi retry_max_delay_ms dùng chung một queue
+    assert set(declared) == {retry_queue(1000), retry_queue(2000), retry_queue(4000), retry_queue(5000), DEAD_LETTER}
+    for delay in (1000, 2000, 4000, 5000):
+        assert declared[retry_queue(delay)]["arguments"] == {"x-message-ttl": delay, "x-dead-letter-exchange": REQUEUE_EXCHANGE}
+        assert ("queue_bind", {"queue": retry_queue(delay), "exchange": retry_queue(delay)}) in ops
+    assert "arguments" not in declared[DEAD_LETTER]
+    assert ops[0] == ("exchange_declare", {"exchange": REQUEUE_EXCHANGE, "exchange_type": "direct", "durable": True})
+    assert ops[-2:] == [
+        ("queue_bind", {"queue": QUEUE, "exchange": REQUEUE_EXCHANGE, "routing_key": QUEUE}),
+        ("queue_bind", {"queue": "appointment_notifications", "exchange": REQUEUE_EXCHANGE, "routing_key": "appointment_notifications"}),
+    ]
+
+
+def test_attempts_are_counted_in_headers_until_dead_letter(backoff, channel):
+    properties = pika.BasicProperties(headers={"x-trace": "t-1"})
+    for attempt, delay in enumerate(retry_delays(), start=1):
+        assert schedule_retry(channel, QUEUE, properties, BODY, "appointment-service timeout") == "retry"
+        exchange, routing_key, body, properties = channel.published[-1]
+        # Routing key là queue nguồn: hết TTL message được dead-letter về đúng queue đó
+        assert (exchange, routing_key, body) == (retry_queue(delay), QUEUE, BODY)
+        assert properties.headers[ATTEMPT_HEADER] == attempt and properties.headers["x-trace"] == "t-1"
+        assert properties.delivery_mode == pika.DeliveryMode.Persistent.value
+
+    assert schedule_retry(channel, QUEUE, properties, BODY, "x" * 2000) == "dead_letter"
+    exchange, routing_key, body, properties = channel.published[-1]
+    assert (exchange, routing_key, body) == ("", DEAD_LETTER, BODY)
+    assert properties.headers[ATTEMPT_HEADER] == 4 and properties.headers[ORIGIN_HEADER] == QUEUE
+    assert len(properties.headers[ERROR_HEADER]) == 500
+    assert len(channel.published) == 5
+
+
+def test_consumer_dead_letters_after_max_attempts(backoff, mongo, channel, monkeypatch):
+    def unavailable(event):
+        raise RetryLater("appointment-service unavailable")
+    monkeypatch.setitem(consumer.HANDLERS, "prescription_ready", unavailable)
+    recent_events.clear()
+    batcher = NotificationBatcher(channel, batch_size=3, max_delay=0.2, call_later=channel.call_later, remove_timeout=channel.remove_timeout)
+    callback = consumer.on_message(batcher, QUEUE)
+
+    callback(channel, SimpleNamespace(delivery_tag=1), pika.BasicProperties(headers={ATTEMPT_HEADER: 4}), BODY)
+    channel.fire()
+
+    [(exchange, routing_key, body, properties)] = channel.published
+    assert (exchange, routing_key, body) == ("", DEAD_LETTER, BODY)
+    assert properties.headers[ORIGIN_HEADER] == QUEUE and "unavailable" in properties.headers[ERROR_HEADER]
+    assert channel.acked() == {1}
+
+
+def test_replay_moves_exactly_the_requested_messages(backoff):
+    dead = [({ATTEMPT_HEADER: 4, ORIGIN_HEADER: QUEUE, ERROR_HEADER: "timeout"}, f"event-{i}".encode()) for i in range(5)]
+    # Message publish tay vào DLQ (không có queue nguồn) đứng đầu queue
+    rabbit = FakeRabbit({DEAD_LETTER: [({}, b"manual"), *dead]})
+
+    assert replay_dead_letters(3, connection=rabbit) == {"replayed": 3, "skipped": 1, "remaining": 3}
+    assert [(queue, body) for queue, body, _ in rabbit.published] == [(QUEUE, b"event-0"), (QUEUE, b"event-1"), (QUEUE, b"event-2")]
+    # Số lần thử reset, queue nguồn không còn trong header; lỗi cuối giữ lại để điều tra
+    assert all(properties.headers == {ERROR_HEADER: "timeout"} for _, _, properties in rabbit.published)
+    assert [body for _, body in rabbit.queues[DEAD_LETTER]] == [b"manual", b"event-3", b"event-4"]
+    assert rabbit.unacked == {}
+
+    assert replay_dead_letters(10, connection=rabbit) == {"replayed": 2, "skipped": 1, "remaining": 1}
+    assert [body for _, body in rabbit.queues[DEAD_LETTER]] == [b"manual"]
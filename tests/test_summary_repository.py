@@ -0,0 +1,133 @@
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from config.settings import SummaryConfig
+from src.repositories.summary_repository import LATEST_COUNT, SummaryRepository, mark_read_update, summary_updates
+from src.services.notification_service import NotificationService
+from src.services.summary_reconciler import SummaryReconciler
+
+service = NotificationService()
+START = datetime(2025, 6, 1, 8, 0)
+
+
+def notification(minute: int, user_id: int = 1, status: str = "UNREAD") -> dict:
+    # $push/$sort của mongomock chỉ sort theo một khóa (lấy bất kỳ): _id sinh theo created_at để
+    # (created_at, _id) cùng thứ tự, kết quả giống MongoDB thật
+    created_at = START + timedelta(minutes=minute)
+    return {
+        "_id": ObjectId(ObjectId.from_datetime(created_at).binary[:4] + ObjectId().binary[4:]),
+        "user_id": user_id,
+        "title": f"Thông báo {minute}",
+        "message": "Lịch khám đã được xác nhận",
+        "status": status,
+        "created_at": created_at,
+    }
+
+
+def headers(docs: list[dict]) -> list[dict]:
+    newest = sorted(docs, key=lambda doc: (doc["created_at"], doc["_id"]), reverse=True)[:LATEST_COUNT]
+    return [
+        {"notification_id": doc["_id"], "title": doc["title"], "status": doc["status"], "created_at": doc["created_at"]}
+        for doc in newest
+    ]
+
+
+def test_updates_are_grouped_per_user():
+    docs = [notification(1), notification(2, status="READ"), notification(3, user_id=2)]
+    updates = {op._filter["_id"]: op._doc for op in summary_updates(docs)}
+    assert updates[1]["$inc"] == {"unread_count": 1, "version": 1}
+    assert updates[2]["$inc"] == {"unread_count": 1, "version": 1}
+    assert updates[1]["$push"]["latest"]["$slice"] == LATEST_COUNT
+    assert mark_read_update(3)["$inc"] == {"unread_count": -3, "version": 1}
+
+
+def test_add_counts_unread_and_keeps_newest_headers(mongo):
+    first = [notification(minute, status="READ" if minute % 4 == 0 else "UNREAD") for minute in range(0, 16, 2)]
+    # Batch sau xen kẽ thời gian với batch trước: $sort trong $push giữ đúng thứ tự mới nhất trước
+    second = [notification(minute) for minute in (1, 5, 9, 15, 17)]
+    SummaryRepository.add(first)
+    SummaryRepository.add(second + [notification(3, user_id=2)])
+
+    summary = SummaryRepository.find_by_user(1)
+    assert summary["unread_count"] == 4 + 5
+    assert summary["version"] == SummaryRepository.find_version(1) == 2
+    assert summary["latest"] == headers(first + second)
+    assert SummaryRepository.find_version(2) == 1 and SummaryRepository.find_version(3) == 0
+
+
+def test_incremental_summary_follows_created_notifications(mongo):
+    created = []
+    for batch in range(3):
+        docs = [notification(batch * 10 + i, user_id=1 + i % 2) for i in range(7)]
+        service.create_notifications(docs)
+        created += docs
+
+    for user_id in (1, 2):
+        own = [doc for doc in created if doc["user_id"] == user_id]
+        summary = service.get_summary(user_id)
+        assert summary["unread_count"] == len(own)
+        assert summary["latest"] == headers(own)
+        assert summary["version"] == 3
+
+
+# Các test dưới cần array_filters, $topN, $merge: chạy với MONGO_TEST_URI
+
+
+def test_mark_read_updates_only_matching_headers(mongo_server):
+    docs = [notification(minute) for minute in range(5)]
+    service.create_notifications(docs)
+
+    SummaryRepository.mark_many_as_read(1, [docs[1]["_id"], docs[3]["_id"]], 2)
+    summary = SummaryRepository.find_by_user(1)
+    assert summary["unread_count"] == 3 and summary["version"] == 2
+    assert {header["notification_id"] for header in summary["latest"] if header["status"] == "READ"} == {docs[1]["_id"], docs[3]["_id"]}
+
+    # Không có gì thực sự đổi trạng thái: summary giữ nguyên
+    SummaryRepository.mark_many_as_read(1, [docs[1]["_id"]], 0)
+    assert SummaryRepository.find_version(1) == 2
+
+    SummaryRepository.mark_all_as_read(1, docs[2]["created_at"], 2)
+    summary = SummaryRepository.find_by_user(1)
+    assert summary["unread_count"] == 1
+    assert [header["status"] for header in summary["latest"]] == ["UNREAD", "READ", "READ", "READ", "READ"]
+
+
+def test_rebuild_matches_incremental_summary(mongo_server):
+    docs = [notification(minute, user_id=1 + minute % 3, status="READ" if minute % 5 == 0 else "UNREAD") for minute in range(40)]
+    service.create_notifications(docs)
+    incremental = {user_id: SummaryRepository.find_by_user(user_id) for user_id in (1, 2, 3)}
+    mongo_server.notification_summaries.update_one({"_id": 2}, {"$set": {"unread_count": 99, "latest": []}})
+
+    SummaryRepository.rebuild()
+    for user_id, before in incremental.items():
+        rebuilt = SummaryRepository.find_by_user(user_id)
+        assert rebuilt["unread_count"] == before["unread_count"]
+        assert rebuilt["latest"] == before["latest"]
+        # Version luôn tăng để ETag cũ không khớp với dữ liệu sau rebuild
+        assert rebuilt["version"] > before["version"]
+
+
+def test_rebuild_resets_users_without_live_notifications(mongo_server):
+    docs = [notification(minute) for minute in range(3)]
+    service.create_notifications(docs)
+    mongo_server.notifications.delete_many({})
+
+    SummaryRepository.rebuild()
+    summary = SummaryRepository.find_by_user(1)
+    assert (summary["unread_count"], summary["latest"]) == (0, [])
+
+
+def test_reconciler_repairs_summary_missed_by_a_crash(mongo_server):
+    service.create_notifications([notification(1), notification(2)])
+    # Process chết sau khi ghi notification, trước $inc summary
+    missed = {**notification(3), "_id": ObjectId()}
+    mongo_server.notifications.insert_one(missed)
+    assert SummaryRepository.find_by_user(1)["unread_count"] == 2
+
+    reconciler = SummaryReconciler(SummaryConfig(reconcile_interval_seconds=0, reconcile_window_seconds=3600))
+    assert reconciler.reconcile() == 1
+    summary = SummaryRepository.find_by_user(1)
+    assert summary["unread_count"] == 3
+    assert summary["latest"][0]["notification_id"] == missed["_id"]
@@ -0,0 +1,163 @@
+import json
+from types import SimpleNamespace
+
+import pika
+import pytest
+
+from benchmarks.fakes import FakeBroker
+from src.messaging.decoding import decode_event
+from src.messaging.partitioning import HashRing, partition_queue
+from src.messaging.retry import ATTEMPT_HEADER
+from src.messaging.worker_pool import PartitionRouter, drain_orphan_partitions, routing_key
+
+
+def encode(payload: dict) -> bytes:
+    return json.dumps(payload).encode()
+
+
+def prescription(appointment_id: int, dispense_id: int) -> bytes:
+    return encode({
+        "event_type": "prescription_ready",
+        "data": {"prescription_id": 1, "appointment_id": appointment_id, "dispense_id": dispense_id},
+    })
+
+
+def confirmation(appointment_id: int, event_type: str = "appointment_confirmed") -> bytes:
+    return encode({
+        "event_type": event_type,
+        "data": {
+            "appointment_id": appointment_id,
+            "patient_id": 7,
+            "doctor_name": "BS. An",
+            "appointment_date": "2025-06-01",
+            "appointment_time": "08:30",
+        },
+    })
+
+
+def confirm(router: PartitionRouter, delivery_tag: int, multiple: bool = False, ack: bool = True):
+    method = pika.spec.Basic.Ack if ack else pika.spec.Basic.Nack
+    router.on_confirm(SimpleNamespace(method=method(delivery_tag=delivery_tag, multiple=multiple)))
+
+
+@pytest.fixture
+def router():
+    router = PartitionRouter(partitions=4, prefetch=10)
+    router.channel = FakeBroker([])
+    return router
+
+
+def deliver(router: PartitionRouter, body: bytes, delivery_tag: int):
+    router.channel.outstanding.add(delivery_tag)
+    router.on_message(router.channel, SimpleNamespace(delivery_tag=delivery_tag), None, body)
+
+
+def test_events_of_an_appointment_share_a_partition_without_lookup():
+    keys = {
+        routing_key(decode_event(body))
+        for body in (confirmation(3), confirmation(3, "appointment_cancelled"), prescription(3, 9))
+    }
+    assert keys == {"appointment:3"}
+
+
+def test_source_message_is_acked_only_after_confirm(router):
+    deliver(router, confirmation(3), delivery_tag=11)
+    deliver(router, prescription(3, 9), delivery_tag=12)
+    (_, first, body, properties), (_, second, _, _) = router.channel.published
+    assert first == second == partition_queue(router.ring.partition("appointment:3"))
+    assert body == confirmation(3)
+    assert properties.delivery_mode == pika.DeliveryMode.Persistent.value
+    assert router.channel.outstanding == {11, 12}
+
+    confirm(router, 1)
+    assert router.channel.outstanding == {12}
+    confirm(router, 2)
+    assert router.channel.outstanding == set()
+
+
+def test_multiple_confirm_acks_every_earlier_publish(router):
+    for tag in range(1, 6):
+        deliver(router, prescription(tag, tag), delivery_tag=100 + tag)
+    confirm(router, 3, multiple=True)
+    assert router.channel.outstanding == {104, 105}
+    confirm(router, 5, multiple=True)
+    assert router.channel.outstanding == set()
+
+
+def test_nacked_publish_requeues_source_message(router):
+    deliver(router, confirmation(3), delivery_tag=5)
+    confirm(router, 1, ack=False)
+    assert router.channel.nacked == 1
+    assert router.channel.outstanding == {5}
+
+
+def test_invalid_event_is_forwarded_to_a_worker(router):
+    deliver(router, b"not json", delivery_tag=1)
+    assert router.channel.published[0][2] == b"not json"
+
+
+class FakeRabbit:
+    """BlockingConnection + channel tối thiểu cho drain_orphan_partitions: mỗi queue là một list body."""
+
+    def __init__(self, queues: dict[str, list[bytes]]):
+        self.queues = {name: list(bodies) for name, bodies in queues.items()}
+        self.properties = []
+        self.acked = 0
+
+    def channel(self):
+        return self
+
+    def confirm_delivery(self):
+        pass
+
+    def queue_declare(self, queue, durable=False, passive=False, arguments=None):
+        if queue not in self.queues:
+            if passive:
+                raise pika.exceptions.ChannelClosedByBroker(404, f"NOT_FOUND - no queue '{queue}'")
+            self.queues[queue] = []
+
+    def basic_get(self, queue, auto_ack=False):
+        if not self.queues[queue]:
+            return None, None, None
+        return SimpleNamespace(delivery_tag=1), pika.BasicProperties(headers={ATTEMPT_HEADER: 2}), self.queues[queue].pop(0)
+
+    def basic_publish(self, exchange, routing_key, body, properties=None):
+        # Publish vào queue chưa declare sẽ bị broker bỏ: KeyError ở đây
+        self.queues[routing_key].append(body)
+        self.properties.append(properties)
+
+    def basic_ack(self, delivery_tag, multiple=False):
+        self.acked += 1
+
+
+def test_shrinking_drains_orphan_partitions_into_the_current_ring():
+    # Lần chạy trước có 4 worker; partition 2 và 3 còn event chưa xử lý
+    leftover = {
+        partition_queue(2): [confirmation(3), prescription(3, 9), confirmation(8)],
+        partition_queue(3): [b"not json", confirmation(5, "appointment_cancelled")],
+    }
+    rabbit = FakeRabbit({partition_queue(0): [confirmation(1)], partition_queue(1): [], **leftover})
+
+    assert drain_orphan_partitions(2, connection=rabbit) == {partition_queue(2): 3, partition_queue(3): 2}
+    assert rabbit.queues[partition_queue(2)] == rabbit.queues[partition_queue(3)] == []
+    assert rabbit.acked == 5 and all(p.headers[ATTEMPT_HEADER] == 2 for p in rabbit.properties)
+    ring = HashRing(2)
+    target = partition_queue(ring.partition("appointment:3"))
+    # Event của một lịch khám giữ nguyên thứ tự, sau các event đã có sẵn trong partition mới
+    assert [body for body in rabbit.queues[target] if body in (confirmation(3), prescription(3, 9))] == [confirmation(3), prescription(3, 9)]
+    assert sum(len(rabbit.queues[partition_queue(i)]) for i in range(2)) == 6
+    assert b"not json" in rabbit.queues[partition_queue(ring.partition(b"not json"))]
+
+
+def test_no_orphans_when_worker_count_did_not_shrink():
+    rabbit = FakeRabbit({})
+    assert drain_orphan_partitions(3, connection=rabbit) == {}
+    assert set(rabbit.queues) == {partition_queue(i) for i in range(3)}
+
+
+def test_router_forwards_from_orphan_queues():
+    router = PartitionRouter(partitions=2, prefetch=10, orphans=(partition_queue(3),))
+    router.channel = FakeBroker([])
+    assert router.orphans == [partition_queue(3)]
+    deliver(router, confirmation(3), delivery_tag=1)
+    assert router.channel.published[0][1] == partition_queue(HashRing(2).partition("appointment:3"))